@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gestion.middleware.MetricasRendimientoMiddleware',  # Server-Timing y presupuesto de consultas
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'gestion.middleware.LicenseCheckMiddleware',  # Verificar licencia en cada request
+    'gestion.middleware.CacheSolicitudMiddleware',  # Memoización de efecto cadena por request
 ]
 
 ROOT_URLCONF = 'contratos.urls'
@@ -81,9 +83,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Espera hasta SQLITE_TIMEOUT segundos por un bloqueo en lugar de fallar con
+        # "database is locked" (hilos de exportación, programador y peticiones comparten la base)
+        'OPTIONS': {'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20))},
     }
 }
 
+# SQLite en modo WAL (ver gestion.signals.configurar_sqlite): las lecturas largas, como las
+# exportaciones streaming, no bloquean las escrituras de las peticiones
+SQLITE_WAL = os.environ.get('SQLITE_WAL', 'True') == 'True'
+
 # Configuración alternativa para MySQL (descomentar si migras a MySQL)
 # Requiere: Plan Hacker ($5/mes) o superior en PythonAnywhere
 # Requiere: pip install mysqlclient
@@ -281,3 +290,92 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@example.com')
 
+
+# Caché de alertas calculadas (gestion/services/cache_alertas.py)
+# ALERTAS_CACHE_BACKEND: 'locmem' (memoria de cada proceso), 'file' (directorio compartido
+# entre procesos) o 'db' (tabla en la base de datos; crearla con: python manage.py createcachetable)
+# Con varios procesos/workers usar 'file' o 'db': la invalidación de 'locmem' solo afecta al proceso que escribe.
+_BACKENDS_CACHE_ALERTAS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'alertas'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache' / 'alertas')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'gestion_cache_alertas'),
+}
+_backend_alertas, _ubicacion_alertas = _BACKENDS_CACHE_ALERTAS.get(
+    os.environ.get('ALERTAS_CACHE_BACKEND', 'file'),
+    _BACKENDS_CACHE_ALERTAS['file'],
+)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'alertas': {
+        'BACKEND': _backend_alertas,
+        'LOCATION': os.environ.get('ALERTAS_CACHE_LOCATION', _ubicacion_alertas),
+        # Las claves incluyen la fecha de referencia: basta con conservarlas un día
+        'TIMEOUT': int(os.environ.get('ALERTAS_CACHE_TIMEOUT', 86400)),
+    },
+}
+
+# Exportaciones Excel: motor streaming (filas escritas a medida y archivo enviado por bloques)
+EXPORTACIONES_XLSX_STREAMING = os.environ.get('EXPORTACIONES_XLSX_STREAMING', 'True') == 'True'
+
+# Exportaciones pesadas (contratos, informes de ventas) en segundo plano: ExportJob
+# EXPORTACIONES_WORKER: 'hilos' (pool dentro del proceso web) o 'comando' (python manage.py procesar_exportaciones)
+EXPORTACIONES_ASINCRONAS = os.environ.get('EXPORTACIONES_ASINCRONAS', 'True') == 'True'
+EXPORTACIONES_WORKER = os.environ.get('EXPORTACIONES_WORKER', 'hilos')
+EXPORTACIONES_WORKERS = int(os.environ.get('EXPORTACIONES_WORKERS', 2))
+EXPORTACIONES_DIR = os.environ.get('EXPORTACIONES_DIR', str(BASE_DIR / 'exportaciones'))
+EXPORTACIONES_TTL_HORAS = int(os.environ.get('EXPORTACIONES_TTL_HORAS', 24))
+# Minutos tras los cuales un trabajo EN_PROCESO se considera interrumpido y uno PENDIENTE
+# perdido (reinicio del proceso web); con 'hilos' se reencolan al solicitar otra exportación
+EXPORTACIONES_MINUTOS_INTERRUMPIDO = int(os.environ.get('EXPORTACIONES_MINUTOS_INTERRUMPIDO', 30))
+
+# Licencia: caché de proceso del estado (segundos) e intervalo mínimo entre reverificaciones
+# remotas en segundo plano cuando la licencia aparece revocada o inactiva
+LICENCIA_CACHE_TTL = int(os.environ.get('LICENCIA_CACHE_TTL', 60))
+LICENCIA_REVERIFICACION_INTERVALO = int(os.environ.get('LICENCIA_REVERIFICACION_INTERVALO', 300))
+
+# Cola de salida de correos (HistorialEnvioEmail): python manage.py procesar_cola_email
+# Reintentos con espera exponencial desde EMAIL_COLA_REINTENTO_BASE_SEGUNDOS hasta el máximo
+EMAIL_COLA_ASINCRONA = os.environ.get('EMAIL_COLA_ASINCRONA', 'True') == 'True'
+EMAIL_COLA_WORKERS = int(os.environ.get('EMAIL_COLA_WORKERS', 4))
+EMAIL_COLA_MAX_POR_HOST = int(os.environ.get('EMAIL_COLA_MAX_POR_HOST', 2))
+EMAIL_COLA_MAX_INTENTOS = int(os.environ.get('EMAIL_COLA_MAX_INTENTOS', 5))
+EMAIL_COLA_REINTENTO_BASE_SEGUNDOS = int(os.environ.get('EMAIL_COLA_REINTENTO_BASE_SEGUNDOS', 60))
+EMAIL_COLA_REINTENTO_MAX_SEGUNDOS = int(os.environ.get('EMAIL_COLA_REINTENTO_MAX_SEGUNDOS', 3600))
+
+# Programador interno (python manage.py run_scheduler): hora diaria del backup ('' = sin backup),
+# hora diaria de rebuild_estado_vigente ('' = desactivado; si hay alertas antes, se ejecuta antes
+# de enviarlas) y horas entre reverificaciones de la licencia (0 = desactivado)
+PROGRAMADOR_HORA_BACKUP = os.environ.get('PROGRAMADOR_HORA_BACKUP', '02:00')
+PROGRAMADOR_HORA_ESTADO_VIGENTE = os.environ.get('PROGRAMADOR_HORA_ESTADO_VIGENTE', '01:00')
+PROGRAMADOR_LICENCIA_HORAS = int(os.environ.get('PROGRAMADOR_LICENCIA_HORAS', 12))
+
+# Backups locales (python manage.py backup_database): compresión gzip de los archivos y páginas
+# copiadas por paso en la copia en caliente de SQLite (entre pasos la base queda libre; tras
+# BACKUP_SQLITE_MAX_REINICIOS reinicios por escrituras concurrentes se copia en un solo paso)
+BACKUP_COMPRIMIR = os.environ.get('BACKUP_COMPRIMIR', 'True') == 'True'
+BACKUP_NIVEL_COMPRESION = int(os.environ.get('BACKUP_NIVEL_COMPRESION', 6))
+BACKUP_SQLITE_PAGINAS_POR_PASO = int(os.environ.get('BACKUP_SQLITE_PAGINAS_POR_PASO', 1024))
+BACKUP_SQLITE_MAX_REINICIOS = int(os.environ.get('BACKUP_SQLITE_MAX_REINICIOS', 3))
+# Tamaño de los bloques de los backups incrementales (--format incremental), en KiB
+BACKUP_BLOQUE_KB = int(os.environ.get('BACKUP_BLOQUE_KB', 256))
+
+# Dashboard: cada sección de alertas se pide por separado (gestion:dashboard_fragmento) con su
+# propia entrada en la caché de alertas; segundos que el navegador puede reutilizar una sección
+DASHBOARD_FRAGMENTOS_MAX_AGE = int(os.environ.get('DASHBOARD_FRAGMENTOS_MAX_AGE', 60))
+
+# Métricas de rendimiento por petición (MetricasRendimientoMiddleware): fracción de peticiones
+# medidas (0 = desactivado, 1 = todas; en producción se muestrea), con cabecera Server-Timing y línea de log
+RENDIMIENTO_MUESTREO = float(os.environ.get('RENDIMIENTO_MUESTREO', 0.05))
+# Máximo de consultas por vista (nombre de URL). Excederlo registra una advertencia o, con
+# PRESUPUESTO_CONSULTAS_ESTRICTO (pruebas), lanza PresupuestoConsultasExcedido
+PRESUPUESTO_CONSULTAS = {
+    'gestion:dashboard': 30,
+    'gestion:dashboard_fragmento': 40,
+    'gestion:kpis_portafolio_api': 10,
+    'gestion:lista_contratos': 30,
+    'gestion:autocompletar_contratos': 10,
+    'gestion:detalle_contrato': 30,
+}
+PRESUPUESTO_CONSULTAS_ESTRICTO = os.environ.get('PRESUPUESTO_CONSULTAS_ESTRICTO', 'False') == 'True'
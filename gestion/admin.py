@@ -5,7 +5,7 @@ from .models import (
     SalarioMinimoHistorico, CalculoSalarioMinimo,
     TipoCondicionIPC, PeriodicidadIPC, ClienteLicense,
     ConfiguracionEmail, ConfiguracionAlerta, DestinatarioAlerta, HistorialEnvioEmail,
-    Clausula, ClausulaObligatoria, ClausulaContrato
+    Clausula, ClausulaObligatoria, ClausulaContrato, ContratoEstadoVigente, ExportJob
 )
 from .forms import ConfiguracionEmailForm
 
@@ -50,6 +50,14 @@ admin.site.register(ClausulaObligatoria)
 admin.site.register(ClausulaContrato)
 
 
+@admin.register(ContratoEstadoVigente)
+class ContratoEstadoVigenteAdmin(admin.ModelAdmin):
+    list_display = ['contrato', 'fecha_referencia', 'vigente', 'fecha_final_vigente', 'valor_canon', 'modalidad_pago', 'fecha_actualizacion']
+    list_filter = ['vigente', 'modalidad_pago', 'tipo_condicion_ipc']
+    search_fields = ['contrato__num_contrato']
+    readonly_fields = [campo.name for campo in ContratoEstadoVigente._meta.fields]
+
+
 @admin.register(ConfiguracionEmail)
 class ConfiguracionEmailAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'email_from', 'email_host', 'activo', 'fecha_creacion')
@@ -151,7 +159,7 @@ class DestinatarioAlertaAdmin(admin.ModelAdmin):
 
 @admin.register(HistorialEnvioEmail)
 class HistorialEnvioEmailAdmin(admin.ModelAdmin):
-    list_display = ('tipo_alerta', 'destinatario', 'estado', 'fecha_envio', 'cantidad_alertas', 'fecha_creacion')
+    list_display = ('tipo_alerta', 'destinatario', 'estado', 'fecha_envio', 'intentos', 'proximo_intento', 'cantidad_alertas', 'fecha_creacion')
     list_filter = ('estado', 'tipo_alerta', 'fecha_creacion')
     search_fields = ('destinatario', 'asunto', 'error_mensaje')
     readonly_fields = ('fecha_creacion', 'fecha_modificacion', 'creado_por', 'modificado_por')
@@ -160,6 +168,10 @@ class HistorialEnvioEmailAdmin(admin.ModelAdmin):
         ('Información del Envío', {
             'fields': ('tipo_alerta', 'destinatario', 'asunto', 'estado', 'fecha_envio', 'cantidad_alertas')
         }),
+        ('Cola de Envío', {
+            'fields': ('intentos', 'proximo_intento', 'contenido_texto', 'contenido_html'),
+            'classes': ('collapse',)
+        }),
         ('Error', {
             'fields': ('error_mensaje',),
             'classes': ('collapse',)
@@ -168,4 +180,12 @@ class HistorialEnvioEmailAdmin(admin.ModelAdmin):
             'fields': ('creado_por', 'fecha_creacion', 'modificado_por', 'fecha_modificacion'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'progreso', 'filas_procesadas', 'solicitado_por', 'fecha_creacion', 'expira_en']
+    list_filter = ['tipo', 'estado']
+    search_fields = ['solicitado_por', 'nombre_archivo']
+    readonly_fields = [campo.name for campo in ExportJob._meta.fields]
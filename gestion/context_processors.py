@@ -28,11 +28,10 @@ def license_status(request):
     
     if request.user.is_authenticated:
         try:
-            from gestion.models import ClienteLicense
-            from django.utils import timezone
+            from gestion.services.cache_licencia import obtener_licencia_principal
             
-            # Obtener la licencia principal de la organización (compartida por todos)
-            cliente_license = ClienteLicense.objects.filter(is_primary=True).first()
+            # Obtener la licencia principal de la organización (compartida por todos, en caché)
+            cliente_license = obtener_licencia_principal()
             
             if not cliente_license:
                 return {
@@ -1230,6 +1230,13 @@ class PolizaForm(BaseModelForm):
 
 
 
+FORMATO_EXPORTACION_CHOICES = [
+    ('xlsx', 'Excel (.xlsx)'),
+    ('csv', 'CSV (separado por comas)'),
+    ('tsv', 'TSV (separado por tabulaciones)'),
+]
+
+
 class FiltroExportacionContratosForm(BaseForm):
     """Formulario para filtrar contratos en la exportación"""
     
@@ -1316,6 +1323,14 @@ class FiltroExportacionContratosForm(BaseForm):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
+    formato = forms.ChoiceField(
+        choices=FORMATO_EXPORTACION_CHOICES,
+        required=False,
+        initial='xlsx',
+        label='Formato',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         from gestion.models import Tercero
@@ -1440,10 +1455,10 @@ class FiltroContratosVentasForm(BaseForm):
     
     buscar = forms.CharField(
         required=False,
-        label='Buscar por Cliente',
+        label='Buscar',
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Buscar por nombre del cliente...'
+            'placeholder': 'Número de contrato, tercero, NIT, local o tipo...'
         })
     )
     
@@ -1531,10 +1546,10 @@ class FiltroListaContratosForm(BaseForm):
     
     buscar = forms.CharField(
         required=False,
-        label='Buscar por Tercero',
+        label='Buscar',
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Buscar por nombre del tercero...'
+            'placeholder': 'Número de contrato, tercero, NIT, local o tipo...'
         })
     )
     
@@ -1672,6 +1687,14 @@ class FiltroExportacionAlertasForm(BaseForm):
         label='Tipo de Contrato',
         widget=forms.Select(attrs={'class': 'form-select form-select-lg'})
     )
+    
+    formato = forms.ChoiceField(
+        choices=FORMATO_EXPORTACION_CHOICES,
+        required=False,
+        initial='xlsx',
+        label='Formato',
+        widget=forms.Select(attrs={'class': 'form-select form-select-lg'})
+    )
 
 
 class CalculoFacturacionVentasForm(BaseForm):
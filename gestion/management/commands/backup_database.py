@@ -1,16 +1,22 @@
 """
 Comando de gestión para realizar backups de la base de datos.
-Soporta SQLite (dumpdata JSON y copia de archivo) y preparado para MySQL/PostgreSQL.
+Soporta SQLite (volcado JSON y copia en caliente del archivo) y preparado para MySQL/PostgreSQL.
+Los archivos se comprimen con gzip y se describen en un manifiesto con su SHA-256.
+El formato incremental guarda solo los bloques de la base que cambiaron (ver backup_incremental).
 Incluye envío automático a ubicaciones remotas.
 """
 import os
-import shutil
 from pathlib import Path
-from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.utils import timezone
-from io import StringIO
+from gestion.services.backup_local import (
+    backup_comprimido_por_defecto,
+    backup_json,
+    backup_sqlite,
+    escribir_manifiesto,
+)
+from gestion.services.backup_incremental import backup_incremental, recolectar_bloques
 from gestion.services.backup_remote import BackupRemoteService
 
 
@@ -33,9 +39,12 @@ class Command(BaseCommand):
         parser.add_argument(
             '--format',
             type=str,
-            choices=['json', 'sqlite', 'both'],
+            choices=['json', 'sqlite', 'both', 'incremental'],
             default='both',
-            help='Formato de backup: json, sqlite, o both (por defecto: both)',
+            help=(
+                'Formato de backup: json, sqlite, both o incremental (solo los bloques de la base '
+                'SQLite que cambiaron desde el último backup) (por defecto: both)'
+            ),
         )
         parser.add_argument(
             '--remote',
@@ -47,6 +56,11 @@ class Command(BaseCommand):
             action='store_true',
             help='No enviar backup a ubicación remota (sobrescribe configuración)',
         )
+        parser.add_argument(
+            '--no-compress',
+            action='store_true',
+            help='No comprimir los archivos de backup (por defecto según BACKUP_COMPRIMIR)',
+        )
 
     def handle(self, *args, **options):
         output_dir = options['output_dir']
@@ -54,6 +68,7 @@ class Command(BaseCommand):
         backup_format = options['format']
         send_remote = options.get('remote', False)
         no_remote = options.get('no_remote', False)
+        comprimir = backup_comprimido_por_defecto() and not options.get('no_compress', False)
 
         # Determinar directorio de backups
         if output_dir:
@@ -73,41 +88,74 @@ class Command(BaseCommand):
         self.stdout.write(f'Directorio de backups: {backup_dir}')
         
         backups_created = []
+        descripciones = []
         
-        # Backup JSON (dumpdata)
+        # Backup incremental (manifiesto + bloques nuevos en backups/chunks/)
+        if backup_format == 'incremental':
+            db_path = Path(settings.DATABASES['default']['NAME'])
+            
+            if db_path.exists() and 'sqlite' in settings.DATABASES['default']['ENGINE']:
+                manifest_path = backup_dir / f'backup_inc_{date_str}_{timestamp}.json'
+                
+                try:
+                    self.stdout.write('Generando backup incremental...')
+                    descripcion = backup_incremental(db_path, manifest_path)
+                    
+                    success_msg = (
+                        f'[OK] Backup incremental creado: {manifest_path.name} '
+                        f'({descripcion["bloques_nuevos"]} de {descripcion["bloques"]} bloques nuevos, '
+                        f'{descripcion["bytes_nuevos"] / (1024 * 1024):.2f} MB)'
+                    )
+                    self.stdout.write(self.style.SUCCESS(success_msg))
+                    backups_created.append(manifest_path)
+                    # Al destino remoto solo viajan el manifiesto y los bloques que no existían
+                    backups_created.extend(descripcion['nuevos'])
+                except Exception as e:
+                    error_msg = f'[ERROR] Error creando backup incremental: {str(e)}'
+                    self.stdout.write(self.style.ERROR(error_msg))
+            else:
+                self.stdout.write(
+                    self.style.ERROR('[ERROR] El backup incremental requiere una base de datos SQLite')
+                )
+        
+        # Backup JSON (equivalente a dumpdata, escrito por lotes)
         if backup_format in ['json', 'both']:
-            json_filename = f'backup_{date_str}_{timestamp}.json'
-            json_path = backup_dir / json_filename
+            json_path = backup_dir / f'backup_{date_str}_{timestamp}.json'
             
             try:
                 self.stdout.write('Generando backup JSON...')
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    call_command('dumpdata', '--natural-foreign', '--natural-primary', stdout=f)
+                descripcion = backup_json(json_path, comprimir=comprimir)
+                descripciones.append(descripcion)
                 
-                file_size = json_path.stat().st_size / (1024 * 1024)  # MB
-                success_msg = f'[OK] Backup JSON creado: {json_filename} ({file_size:.2f} MB)'
+                json_filename = descripcion['archivo']
+                file_size = descripcion['bytes'] / (1024 * 1024)  # MB
+                success_msg = (
+                    f'[OK] Backup JSON creado: {json_filename} ({file_size:.2f} MB, '
+                    f'{descripcion["registros"]} registros)'
+                )
                 self.stdout.write(self.style.SUCCESS(success_msg))
-                backups_created.append(json_path)
+                backups_created.append(backup_dir / json_filename)
             except Exception as e:
                 error_msg = f'[ERROR] Error creando backup JSON: {str(e)}'
                 self.stdout.write(self.style.ERROR(error_msg))
         
-        # Backup SQLite (copia de archivo)
+        # Backup SQLite (copia en caliente con la API de backup de SQLite)
         if backup_format in ['sqlite', 'both']:
             db_path = Path(settings.DATABASES['default']['NAME'])
             
             if db_path.exists() and 'sqlite' in settings.DATABASES['default']['ENGINE']:
-                sqlite_filename = f'backup_db_{date_str}_{timestamp}.sqlite3'
-                sqlite_path = backup_dir / sqlite_filename
+                sqlite_path = backup_dir / f'backup_db_{date_str}_{timestamp}.sqlite3'
                 
                 try:
                     self.stdout.write('Generando backup SQLite...')
-                    shutil.copy2(db_path, sqlite_path)
+                    descripcion = backup_sqlite(db_path, sqlite_path, comprimir=comprimir)
+                    descripciones.append(descripcion)
                     
-                    file_size = sqlite_path.stat().st_size / (1024 * 1024)  # MB
+                    sqlite_filename = descripcion['archivo']
+                    file_size = descripcion['bytes'] / (1024 * 1024)  # MB
                     success_msg = f'[OK] Backup SQLite creado: {sqlite_filename} ({file_size:.2f} MB)'
                     self.stdout.write(self.style.SUCCESS(success_msg))
-                    backups_created.append(sqlite_path)
+                    backups_created.append(backup_dir / sqlite_filename)
                 except Exception as e:
                     error_msg = f'[ERROR] Error creando backup SQLite: {str(e)}'
                     self.stdout.write(self.style.ERROR(error_msg))
@@ -119,6 +167,16 @@ class Command(BaseCommand):
                     )
                 )
         
+        # Manifiesto con el SHA-256 de cada archivo
+        if descripciones:
+            manifest_path = backup_dir / f'backup_{date_str}_{timestamp}.manifest.json'
+            try:
+                escribir_manifiesto(manifest_path, descripciones)
+                self.stdout.write(self.style.SUCCESS(f'[OK] Manifiesto creado: {manifest_path.name}'))
+                backups_created.append(manifest_path)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'[ERROR] Error creando manifiesto: {str(e)}'))
+        
         # Limpiar backups antiguos
         if keep_days > 0:
             self.stdout.write(f'Limpiando backups más antiguos de {keep_days} días...')
@@ -128,6 +186,13 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(success_msg))
             else:
                 self.stdout.write('No hay backups antiguos para eliminar')
+            
+            recoleccion = recolectar_bloques(backup_dir)
+            if recoleccion['eliminados']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'[OK] Eliminados {recoleccion["eliminados"]} bloques sin referencias '
+                    f'({recoleccion["bytes_liberados"] / (1024 * 1024):.2f} MB)'
+                ))
         
         # Resumen
         if backups_created:
@@ -153,7 +218,8 @@ class Command(BaseCommand):
                 remote_result = remote_service.send_backup(
                     backups_created,
                     success_callback=on_success,
-                    error_callback=on_error
+                    error_callback=on_error,
+                    base_dir=backup_dir,
                 )
                 
                 if remote_result.get('skipped'):
@@ -165,8 +231,14 @@ class Command(BaseCommand):
         # Información adicional
         self.stdout.write('')
         self.stdout.write('Para restaurar un backup:')
-        self.stdout.write('  JSON: python manage.py loaddata backups/backup_YYYYMMDD_HHMMSS.json')
-        self.stdout.write('  SQLite: cp backups/backup_db_YYYYMMDD_HHMMSS.sqlite3 db.sqlite3')
+        if backup_format == 'incremental':
+            self.stdout.write('  python manage.py restore_backup backups/backup_inc_YYYYMMDD_HHMMSS.json')
+        elif comprimir:
+            self.stdout.write('  JSON: python manage.py loaddata backups/backup_YYYYMMDD_HHMMSS.json.gz')
+            self.stdout.write('  SQLite: gunzip -c backups/backup_db_YYYYMMDD_HHMMSS.sqlite3.gz > db.sqlite3')
+        else:
+            self.stdout.write('  JSON: python manage.py loaddata backups/backup_YYYYMMDD_HHMMSS.json')
+            self.stdout.write('  SQLite: cp backups/backup_db_YYYYMMDD_HHMMSS.sqlite3 db.sqlite3')
 
     def _clean_old_backups(self, backup_dir, keep_days):
         """Elimina backups más antiguos que keep_days"""
@@ -0,0 +1,263 @@
+"""
+Comando de gestión para medir el costo de evaluar las alertas del dashboard.
+Ejecutar con: python manage.py benchmark_alertas [--contratos 5000] [--sin-individual]
+
+Genera contratos sintéticos (con Otro Sí, Renovaciones Automáticas, pólizas y cálculos
+IPC/Salario Mínimo) dentro de una transacción que se revierte al final, y compara:
+  - las ocho funciones obtener_* llamadas por separado (cada una con su propio motor)
+  - una sola pasada de MotorAlertas para los ocho tipos
+"""
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from gestion.models import (
+    CalculoIPC,
+    CalculoSalarioMinimo,
+    Contrato,
+    IPCHistorico,
+    OtroSi,
+    Poliza,
+    RenovacionAutomatica,
+    SalarioMinimoHistorico,
+)
+from gestion.services.alertas import (
+    MotorAlertas,
+    TIPOS_ALERTA,
+    obtener_alertas_expiracion_contratos,
+    obtener_alertas_ipc,
+    obtener_alertas_polizas_requeridas_no_aportadas,
+    obtener_alertas_preaviso,
+    obtener_alertas_renovacion_automatica,
+    obtener_alertas_salario_minimo,
+    obtener_alertas_terminacion_anticipada,
+    obtener_polizas_criticas,
+)
+
+TAMANO_LOTE_INSERCION = 2000
+
+TIPOS_POLIZA = ['RCE - Responsabilidad Civil', 'Cumplimiento']
+
+
+class _RevertirDatos(Exception):
+    """Fuerza la reversión de la transacción con los datos sintéticos."""
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo de las alertas del dashboard con datos sintéticos (se revierten al final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=int,
+            default=500,
+            help='Cantidad de contratos sintéticos a generar (por defecto: 500)',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=7,
+            help='Semilla del generador aleatorio (por defecto: 7)',
+        )
+        parser.add_argument(
+            '--sin-individual',
+            action='store_true',
+            help='No medir las ocho funciones por separado (útil con volúmenes grandes)',
+        )
+
+    def handle(self, *args, **options):
+        cantidad = max(1, options['contratos'])
+        random.seed(options['semilla'])
+
+        try:
+            with transaction.atomic():
+                inicio = time.perf_counter()
+                resumen = self._generar_datos(cantidad)
+                self.stdout.write(
+                    f'Datos sintéticos generados en {time.perf_counter() - inicio:.1f}s: '
+                    f'{resumen["contratos"]} contratos, {resumen["otrosi"]} Otro Sí, '
+                    f'{resumen["renovaciones"]} renovaciones, {resumen["polizas"]} pólizas, '
+                    f'{resumen["calculos"]} cálculos'
+                )
+
+                if not options['sin_individual']:
+                    self._medir('Funciones individuales (8 llamadas)', self._evaluar_individual)
+                self._medir('MotorAlertas (una pasada)', lambda fecha: MotorAlertas(fecha).evaluar())
+
+                raise _RevertirDatos()
+        except _RevertirDatos:
+            self.stdout.write(self.style.SUCCESS('\nDatos sintéticos revertidos'))
+
+    def _medir(self, etiqueta, funcion):
+        fecha_referencia = timezone.now().date()
+        consultas = 0
+
+        # Se cuentan con un wrapper: el registro de consultas de DEBUG se trunca en 9000
+        def _contar_consulta(execute, sql, params, many, context):
+            nonlocal consultas
+            consultas += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(_contar_consulta):
+            inicio = time.perf_counter()
+            resultados = funcion(fecha_referencia)
+            duracion = time.perf_counter() - inicio
+
+        total_alertas = sum(len(alertas) for alertas in resultados.values())
+        self.stdout.write(
+            f'\n{etiqueta}: {consultas} consultas, '
+            f'{duracion:.2f}s, {total_alertas} alertas'
+        )
+        for tipo in TIPOS_ALERTA:
+            self.stdout.write(f'  {tipo}: {len(resultados.get(tipo, []))}')
+
+    def _evaluar_individual(self, fecha_referencia):
+        return {
+            'VENCIMIENTO_CONTRATOS': obtener_alertas_expiracion_contratos(fecha_referencia=fecha_referencia),
+            'ALERTAS_IPC': obtener_alertas_ipc(fecha_referencia=fecha_referencia),
+            'ALERTAS_SALARIO_MINIMO': obtener_alertas_salario_minimo(fecha_referencia=fecha_referencia),
+            'POLIZAS_CRITICAS': obtener_polizas_criticas(fecha_referencia=fecha_referencia),
+            'PREAVISO_RENOVACION': obtener_alertas_preaviso(fecha_referencia=fecha_referencia),
+            'POLIZAS_REQUERIDAS': obtener_alertas_polizas_requeridas_no_aportadas(fecha_referencia=fecha_referencia),
+            'TERMINACION_ANTICIPADA': obtener_alertas_terminacion_anticipada(fecha_referencia=fecha_referencia),
+            'RENOVACION_AUTOMATICA': obtener_alertas_renovacion_automatica(fecha_referencia=fecha_referencia),
+        }
+
+    def _generar_datos(self, cantidad):
+        hoy = date.today()
+        ahora = timezone.now()
+
+        contratos = []
+        for indice in range(cantidad):
+            fecha_inicial = hoy - timedelta(days=random.randint(0, 1500))
+            contratos.append(Contrato(
+                num_contrato=f'BENCH-{indice:06d}',
+                objeto_destinacion='Contrato sintético de benchmark',
+                nit_concedente='900000000',
+                rep_legal_concedente='Benchmark',
+                fecha_firma=fecha_inicial,
+                fecha_inicial_contrato=fecha_inicial,
+                fecha_final_inicial=fecha_inicial + timedelta(days=random.choice([365, 730, 1095])),
+                vigente=random.random() < 0.85,
+                prorroga_automatica=random.random() < 0.4,
+                tipo_contrato_cliente_proveedor=random.choice(['CLIENTE', 'PROVEEDOR']),
+                modalidad_pago=random.choice(['Fijo', 'Variable Puro', 'Hibrido (Min Garantizado)']),
+                valor_canon_fijo=Decimal(random.randint(1, 90)) * 100000,
+                tipo_condicion_ipc=random.choice(['IPC', 'SALARIO_MINIMO']),
+                periodicidad_ipc=random.choice(['ANUAL', 'FECHA_ESPECIFICA']),
+                fecha_aumento_ipc=fecha_inicial + timedelta(days=365),
+                exige_poliza_rce=random.random() < 0.5,
+                exige_poliza_cumplimiento=random.random() < 0.5,
+                dias_terminacion_anticipada=random.choice([0, 30, 60, 90]),
+            ))
+        Contrato.objects.bulk_create(contratos, batch_size=TAMANO_LOTE_INSERCION)
+        contratos = list(Contrato.objects.filter(num_contrato__startswith='BENCH-'))
+
+        otrosis = []
+        renovaciones = []
+        polizas = []
+        for contrato in contratos:
+            for numero in range(1, random.randint(0, 4) + 1):
+                effective_from = contrato.fecha_inicial_contrato + timedelta(days=random.randint(0, 1200))
+                otrosis.append(OtroSi(
+                    contrato=contrato,
+                    numero_otrosi=f'OS-{numero}',
+                    version=numero,
+                    tipo=random.choice(['AMENDMENT', 'RENEWAL']),
+                    estado=random.choice(['APROBADO', 'APROBADO', 'APROBADO', 'BORRADOR']),
+                    fecha_otrosi=effective_from,
+                    descripcion='Otro Sí sintético',
+                    effective_from=effective_from,
+                    effective_to=random.choice([None, effective_from + timedelta(days=random.randint(30, 500))]),
+                    fecha_aprobacion=ahora - timedelta(days=random.randint(0, 900)),
+                    nuevo_valor_canon=random.choice([None, Decimal(random.randint(1, 90)) * 100000]),
+                    nueva_fecha_final_actualizada=random.choice(
+                        [None, effective_from + timedelta(days=random.randint(100, 900))]
+                    ),
+                    nueva_periodicidad_ipc=random.choice([None, None, 'ANUAL', 'FECHA_ESPECIFICA']),
+                    nueva_fecha_aumento_ipc=random.choice(
+                        [None, effective_from + timedelta(days=random.randint(1, 400))]
+                    ),
+                    nuevo_tipo_condicion_ipc=random.choice([None, None, 'IPC', 'SALARIO_MINIMO']),
+                    nuevo_exige_poliza_rce=random.choice([None, True, False]),
+                ))
+            for numero in range(1, random.randint(0, 2) + 1):
+                effective_from = contrato.fecha_final_inicial + timedelta(days=random.randint(-30, 600))
+                renovaciones.append(RenovacionAutomatica(
+                    contrato=contrato,
+                    numero_renovacion=f'RA-{numero}',
+                    version=numero,
+                    estado=random.choice(['APROBADO', 'APROBADO', 'ANULADA']),
+                    fecha_renovacion=effective_from,
+                    fecha_inicio_nueva_vigencia=effective_from,
+                    meses_renovacion=12,
+                    fecha_final_anterior=contrato.fecha_final_inicial,
+                    effective_from=effective_from,
+                    effective_to=random.choice([None, effective_from + timedelta(days=365)]),
+                    fecha_aprobacion=ahora - timedelta(days=random.randint(0, 900)),
+                    nueva_fecha_final_actualizada=random.choice([None, effective_from + timedelta(days=365)]),
+                ))
+            for tipo_poliza in TIPOS_POLIZA:
+                if random.random() < 0.5:
+                    polizas.append(Poliza(
+                        contrato=contrato,
+                        tipo=tipo_poliza,
+                        numero_poliza=f'BENCH-{contrato.pk}-{tipo_poliza[:3]}',
+                        valor_asegurado=Decimal(1000000),
+                        fecha_vencimiento=hoy + timedelta(days=random.randint(-60, 200)),
+                    ))
+        OtroSi.objects.bulk_create(otrosis, batch_size=TAMANO_LOTE_INSERCION)
+        RenovacionAutomatica.objects.bulk_create(renovaciones, batch_size=TAMANO_LOTE_INSERCION)
+        Poliza.objects.bulk_create(polizas, batch_size=TAMANO_LOTE_INSERCION)
+
+        ipc_por_anio = {
+            anio: IPCHistorico.objects.get_or_create(año=anio, defaults={'valor_ipc': Decimal('5')})[0]
+            for anio in range(hoy.year - 5, hoy.year + 2)
+        }
+        salario_por_anio = {
+            anio: SalarioMinimoHistorico.objects.get_or_create(
+                año=anio, defaults={'valor_salario_minimo': Decimal('1300000')}
+            )[0]
+            for anio in range(hoy.year - 5, hoy.year + 2)
+        }
+        calculos_ipc = []
+        calculos_salario = []
+        for contrato in contratos:
+            if random.random() >= 0.3:
+                continue
+            fecha_aplicacion = contrato.fecha_inicial_contrato + timedelta(days=365)
+            datos = dict(
+                contrato=contrato,
+                año_aplicacion=fecha_aplicacion.year,
+                fecha_aplicacion=fecha_aplicacion,
+                canon_anterior=contrato.valor_canon_fijo,
+                porcentaje_total_aplicar=Decimal('5'),
+                valor_incremento=Decimal('1'),
+                nuevo_canon=contrato.valor_canon_fijo,
+                estado=random.choice(['APLICADO', 'PENDIENTE']),
+            )
+            if fecha_aplicacion.year not in ipc_por_anio:
+                continue
+            if random.random() < 0.5:
+                calculos_ipc.append(CalculoIPC(ipc_historico=ipc_por_anio[fecha_aplicacion.year], **datos))
+            else:
+                calculos_salario.append(CalculoSalarioMinimo(
+                    salario_minimo_historico=salario_por_anio[fecha_aplicacion.year],
+                    porcentaje_salario_minimo=Decimal('100'),
+                    **datos
+                ))
+        CalculoIPC.objects.bulk_create(calculos_ipc, batch_size=TAMANO_LOTE_INSERCION)
+        CalculoSalarioMinimo.objects.bulk_create(calculos_salario, batch_size=TAMANO_LOTE_INSERCION)
+
+        return {
+            'contratos': len(contratos),
+            'otrosi': len(otrosis),
+            'renovaciones': len(renovaciones),
+            'polizas': len(polizas),
+            'calculos': len(calculos_ipc) + len(calculos_salario),
+        }
@@ -2,6 +2,9 @@
 Comando de management para enviar alertas por correo electrónico.
 Este comando debe ejecutarse periódicamente (ej: todos los lunes a las 8:00 AM)
 usando cron o programador de tareas.
+
+Con EMAIL_COLA_ASINCRONA los correos se encolan y, al terminar, el comando envía los que
+estén listos en la cola (salvo --solo-encolar). Los reintentos quedan para procesar_cola_email.
 """
 
 from django.core.management.base import BaseCommand
@@ -10,6 +13,8 @@ from datetime import date
 import logging
 
 from gestion.services.alerta_email_service import AlertaEmailService
+from gestion.services.cache_solicitud import cache_por_solicitud
+from gestion.services.cola_email import cola_email_activa, drenar_cola
 
 logger = logging.getLogger(__name__)
 
@@ -42,8 +47,18 @@ class Command(BaseCommand):
             type=str,
             help='Fecha de referencia en formato YYYY-MM-DD (por defecto hoy)',
         )
+        parser.add_argument(
+            '--solo-encolar',
+            action='store_true',
+            help='Con la cola de correo activa, solo encolar (el envío lo hace procesar_cola_email)',
+        )
 
     def handle(self, *args, **options):
+        # Las consultas de efecto cadena que se repiten entre tipos de alerta se memoizan
+        with cache_por_solicitud():
+            self._enviar_alertas(options)
+
+    def _enviar_alertas(self, options):
         self.stdout.write(self.style.SUCCESS('Iniciando envío de alertas por correo...'))
         
         fecha_referencia = None
@@ -67,12 +82,14 @@ class Command(BaseCommand):
                 forzar_envio=forzar_envio
             )
             self._mostrar_resultado(resultado)
+            self._procesar_cola(options)
         else:
             self.stdout.write('Enviando todas las alertas programadas...')
             resultados = servicio.enviar_todas_alertas_programadas(fecha_referencia=fecha_referencia)
             
             if not resultados:
                 self.stdout.write(self.style.WARNING('No hay alertas programadas para hoy'))
+                self._procesar_cola(options)
                 return
             
             self.stdout.write(f'\nProcesadas {len(resultados)} configuración(es) de alerta:\n')
@@ -89,6 +106,19 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'{total_errores} error(es) encontrado(s)'))
             else:
                 self.stdout.write(self.style.SUCCESS('Todos los envíos fueron exitosos'))
+            self._procesar_cola(options)
+    
+    def _procesar_cola(self, options):
+        """Envía los correos listos de la cola (si está activa)"""
+        if not cola_email_activa() or options.get('solo_encolar'):
+            return
+        
+        self.stdout.write('\nEnviando correos en cola...')
+        totales = drenar_cola()
+        self.stdout.write(
+            f"Cola de correo: {totales['enviados']} enviado(s), "
+            f"{totales['reintentos']} programado(s) para reintento, {totales['descartados']} descartado(s)"
+        )
     
     def _mostrar_resultado(self, resultado):
         """Muestra el resultado de un envío de alertas"""
@@ -97,7 +127,14 @@ class Command(BaseCommand):
         
         self.stdout.write(f'\n--- {nombre_tipo} ---')
         
-        if resultado['enviado']:
+        if resultado.get('encolado'):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"[OK] Encolado para {resultado['destinatarios']} destinatario(s) "
+                    f"({resultado['alertas_enviadas']} alerta(s))"
+                )
+            )
+        elif resultado['enviado']:
             self.stdout.write(
                 self.style.SUCCESS(
                     f"[OK] Enviado a {resultado['destinatarios']} destinatario(s) "
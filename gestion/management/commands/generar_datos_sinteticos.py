@@ -0,0 +1,568 @@
+"""
+Comando de gestión para generar un portafolio sintético de contratos (pruebas de carga y benchmarks).
+Ejecutar con: python manage.py generar_datos_sinteticos [--contratos 10000] [--semilla 7] [--salida bench.sqlite3]
+
+Genera, por lotes con bulk_create, contratos de clientes y proveedores con sus terceros y locales,
+cadenas de Otro Sí, Renovaciones Automáticas, pólizas (con y sin colchón), cálculos IPC/Salario
+Mínimo año a año e informes de ventas mensuales. Con la misma semilla y --fecha-base los datos
+son idénticos, de modo que todos los benchmarks se pueden correr sobre la misma base.
+
+Con --salida los datos se escriben en un archivo SQLite nuevo (migrado desde cero) en lugar de
+la base configurada; para usarlo: DATABASE_NAME=bench.sqlite3 python manage.py ...
+Al final se reconstruyen el estado vigente y el índice de búsqueda (bulk_create no dispara señales).
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from dateutil.relativedelta import relativedelta
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from gestion.models import (
+    CalculoIPC,
+    CalculoSalarioMinimo,
+    Contrato,
+    InformeVentas,
+    IPCHistorico,
+    Local,
+    OtroSi,
+    Poliza,
+    RenovacionAutomatica,
+    SalarioMinimoHistorico,
+    Tercero,
+    TipoContrato,
+    TipoServicio,
+)
+from gestion.utils import calcular_fecha_vencimiento
+
+TAMANO_LOTE_INSERCION = 2000
+
+TIPOS_CONTRATO = [
+    'AIRE ACONDICIONADO', 'ANTENAS', 'BODEGAS', 'ESTACIONAMIENTO', 'PUBLICIDAD',
+    'STAND PRIMER PISO', 'STAND SEGUNDO PISO', 'STAND TERCER PISO', 'ARRIENDO PLAZOLETA', 'STAND SÓTANO',
+]
+TIPOS_SERVICIO = ['Mantenimiento', 'Seguridad', 'Aseo', 'Tecnología', 'Parqueaderos']
+MODALIDADES = ['Fijo', 'Variable Puro', 'Hibrido (Min Garantizado)']
+ASEGURADORAS = ['Seguros Bolívar', 'Sura', 'Allianz', 'Mapfre', 'Liberty']
+
+# Columnas de Contrato que exigen cada tipo de póliza
+POLIZAS_EXIGIDAS = {
+    'RCE - Responsabilidad Civil': ('exige_poliza_rce', 'valor_asegurado_rce', 'meses_vigencia_rce'),
+    'Cumplimiento': ('exige_poliza_cumplimiento', 'valor_asegurado_cumplimiento', 'meses_vigencia_cumplimiento'),
+    'Poliza de Arrendamiento': (
+        'exige_poliza_arrendamiento', 'valor_asegurado_arrendamiento', 'meses_vigencia_arrendamiento'
+    ),
+}
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor}. Use el formato AAAA-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Genera un portafolio sintético y determinista de contratos para pruebas de carga y benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=int,
+            default=1000,
+            help='Cantidad de contratos a generar (por defecto: 1000)',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=7,
+            help='Semilla del generador aleatorio (por defecto: 7)',
+        )
+        parser.add_argument(
+            '--fecha-base',
+            type=_fecha,
+            default=None,
+            help='Fecha de referencia AAAA-MM-DD de los datos (por defecto: hoy). '
+                 'Fijarla para obtener exactamente los mismos datos otro día',
+        )
+        parser.add_argument(
+            '--prefijo',
+            default='SINT',
+            help='Prefijo de números de contrato, terceros y locales (por defecto: SINT)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_INSERCION,
+            help=f'Contratos generados e insertados por lote (por defecto: {TAMANO_LOTE_INSERCION})',
+        )
+        parser.add_argument(
+            '--otrosi-promedio',
+            type=float,
+            default=1.5,
+            help='Largo promedio de la cadena de Otro Sí por contrato (por defecto: 1.5)',
+        )
+        parser.add_argument(
+            '--otrosi-max',
+            type=int,
+            default=8,
+            help='Largo máximo de la cadena de Otro Sí (por defecto: 8)',
+        )
+        parser.add_argument(
+            '--prob-renovacion',
+            type=float,
+            default=0.6,
+            help='Probabilidad de que un contrato con prórroga automática tenga renovaciones (por defecto: 0.6)',
+        )
+        parser.add_argument(
+            '--prob-poliza',
+            type=float,
+            default=0.7,
+            help='Probabilidad de que una póliza exigida haya sido aportada (por defecto: 0.7)',
+        )
+        parser.add_argument(
+            '--prob-colchon',
+            type=float,
+            default=0.25,
+            help='Probabilidad de que una póliza aportada tenga colchón (por defecto: 0.25)',
+        )
+        parser.add_argument(
+            '--prob-ajuste',
+            type=float,
+            default=0.7,
+            help='Probabilidad de que un contrato tenga cálculos IPC/Salario Mínimo (por defecto: 0.7)',
+        )
+        parser.add_argument(
+            '--meses-ventas',
+            type=int,
+            default=12,
+            help='Meses de informes de ventas por contrato que reporta ventas (por defecto: 12)',
+        )
+        parser.add_argument(
+            '--salida',
+            help='Archivo SQLite nuevo donde escribir los datos (por defecto: la base configurada)',
+        )
+        parser.add_argument(
+            '--sobrescribir',
+            action='store_true',
+            help='Reemplazar el archivo de --salida si ya existe',
+        )
+        parser.add_argument(
+            '--sin-derivados',
+            action='store_true',
+            help='No reconstruir el estado vigente ni el índice de búsqueda al final',
+        )
+
+    def handle(self, *args, **options):
+        if options['contratos'] < 1:
+            raise CommandError('--contratos debe ser mayor que cero')
+        for opcion in ('prob_renovacion', 'prob_poliza', 'prob_colchon', 'prob_ajuste'):
+            if not 0 <= options[opcion] <= 1:
+                raise CommandError(f'--{opcion.replace("_", "-")} debe estar entre 0 y 1')
+
+        if not options['salida']:
+            self._generar(options)
+            return
+
+        if connection.vendor != 'sqlite':
+            raise CommandError('--salida solo está disponible con SQLite')
+        ruta = Path(options['salida']).resolve()
+        if ruta.exists():
+            if not options['sobrescribir']:
+                raise CommandError(f'{ruta} ya existe (use --sobrescribir para reemplazarlo)')
+            for archivo in (ruta, Path(f'{ruta}-wal'), Path(f'{ruta}-shm')):
+                archivo.unlink(missing_ok=True)
+
+        # La conexión 'default' (y las de los hilos de rebuild_estado_vigente, que comparten el
+        # mismo settings_dict) apunta al archivo nuevo mientras dura la generación
+        nombre_original = connection.settings_dict['NAME']
+        connection.close()
+        connection.settings_dict['NAME'] = str(ruta)
+        try:
+            self.stdout.write(f'Creando {ruta}...')
+            call_command('migrate', interactive=False, verbosity=0)
+            self._generar(options)
+        finally:
+            connection.close()
+            connection.settings_dict['NAME'] = nombre_original
+        self.stdout.write(self.style.SUCCESS(f'\n[OK] Base sintética lista en {ruta}'))
+
+    def _generar(self, options):
+        self.rng = random.Random(options['semilla'])
+        self.hoy = options['fecha_base'] or date.today()
+        self.ahora = timezone.make_aware(datetime.combine(self.hoy, datetime.min.time()))
+        self.opciones = options
+        prefijo = options['prefijo']
+
+        if Contrato.objects.filter(num_contrato__startswith=f'{prefijo}-').exists():
+            raise CommandError(
+                f'Ya existen contratos con el prefijo {prefijo}-. Use otro --prefijo o --salida'
+            )
+
+        inicio = time.perf_counter()
+        self._preparar_catalogos(options['contratos'], prefijo)
+
+        totales = dict.fromkeys(
+            ('contratos', 'otrosi', 'renovaciones', 'polizas', 'calculos', 'informes'), 0
+        )
+        cantidad = options['contratos']
+        tamano_lote = max(1, options['lote'])
+        for desde in range(0, cantidad, tamano_lote):
+            with transaction.atomic():
+                resumen = self._generar_lote(desde, min(desde + tamano_lote, cantidad), prefijo)
+            for clave, valor in resumen.items():
+                totales[clave] += valor
+            self.stdout.write(f'  {totales["contratos"]}/{cantidad} contratos')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos sintéticos generados en {time.perf_counter() - inicio:.1f}s: '
+            f'{totales["contratos"]} contratos, {totales["otrosi"]} Otro Sí, '
+            f'{totales["renovaciones"]} renovaciones, {totales["polizas"]} pólizas, '
+            f'{totales["calculos"]} cálculos, {totales["informes"]} informes de ventas'
+        ))
+
+        if not options['sin_derivados']:
+            call_command('rebuild_estado_vigente', fecha=self.hoy.isoformat(), stdout=self.stdout)
+            try:
+                call_command('rebuild_search_index', stdout=self.stdout)
+            except CommandError as e:
+                self.stdout.write(self.style.WARNING(str(e)))
+
+    def _preparar_catalogos(self, cantidad, prefijo):
+        """Tipos de contrato/servicio, terceros, locales e históricos IPC/Salario Mínimo."""
+        rng = self.rng
+        self.tipos_contrato = [TipoContrato.objects.get_or_create(nombre=nombre)[0] for nombre in TIPOS_CONTRATO]
+        self.tipos_servicio = [TipoServicio.objects.get_or_create(nombre=nombre)[0] for nombre in TIPOS_SERVICIO]
+
+        # Cerca de tres contratos por tercero y dos por local, como en un centro comercial real
+        cantidad_terceros = max(1, cantidad // 3)
+        terceros = []
+        for tipo in ('ARRENDATARIO', 'PROVEEDOR'):
+            for indice in range(cantidad_terceros):
+                terceros.append(Tercero(
+                    nit=f'{prefijo}{tipo[0]}{indice:08d}',
+                    razon_social=f'{tipo.title()} sintético {indice:06d}',
+                    tipo=tipo,
+                    nombre_rep_legal=f'Representante {indice:06d}',
+                ))
+        Tercero.objects.bulk_create(terceros, batch_size=TAMANO_LOTE_INSERCION)
+        self.arrendatarios = list(Tercero.objects.filter(nit__startswith=f'{prefijo}A').order_by('pk'))
+        self.proveedores = list(Tercero.objects.filter(nit__startswith=f'{prefijo}P').order_by('pk'))
+
+        locales = [
+            Local(
+                nombre_comercial_stand=f'{prefijo}-L{indice:06d}',
+                ubicacion=rng.choice(['Primer Piso', 'Segundo Piso', 'Tercer Piso', 'Sótano', 'Plazoleta']),
+                total_area_m2=Decimal(rng.randint(8, 400)),
+            )
+            for indice in range(max(1, cantidad // 2))
+        ]
+        Local.objects.bulk_create(locales, batch_size=TAMANO_LOTE_INSERCION)
+        self.locales = list(Local.objects.filter(nombre_comercial_stand__startswith=f'{prefijo}-L').order_by('pk'))
+
+        self.ipc_por_anio = {}
+        self.salario_por_anio = {}
+        salario = Decimal('877803')
+        for anio in range(self.hoy.year - 12, self.hoy.year + 1):
+            salario = (salario * (1 + Decimal(rng.randint(40, 160)) / 1000)).quantize(Decimal('1'))
+            self.ipc_por_anio[anio] = IPCHistorico.objects.get_or_create(
+                año=anio, defaults={'valor_ipc': Decimal(rng.randint(25, 130)) / 10}
+            )[0]
+            self.salario_por_anio[anio] = SalarioMinimoHistorico.objects.get_or_create(
+                año=anio, defaults={'valor_salario_minimo': salario}
+            )[0]
+
+    def _geometrica(self, promedio, maximo):
+        """Largo de cadena con distribución geométrica de media `promedio`, acotado a `maximo`."""
+        if promedio <= 0 or maximo <= 0:
+            return 0
+        continuar = promedio / (1 + promedio)
+        largo = 0
+        while largo < maximo and self.rng.random() < continuar:
+            largo += 1
+        return largo
+
+    def _generar_lote(self, desde, hasta, prefijo):
+        rng = self.rng
+        contratos = [self._nuevo_contrato(indice, prefijo) for indice in range(desde, hasta)]
+        # SQLite y PostgreSQL devuelven las llaves primarias en bulk_create
+        Contrato.objects.bulk_create(contratos)
+
+        otrosis, renovaciones, polizas, calculos_ipc, calculos_salario, informes = [], [], [], [], [], []
+        for contrato in contratos:
+            fecha_final = contrato.fecha_final_inicial
+
+            cadena = self._cadena_otrosi(contrato)
+            otrosis.extend(cadena)
+            for otrosi in cadena:
+                if otrosi.estado == 'APROBADO' and otrosi.nueva_fecha_final_actualizada:
+                    fecha_final = max(fecha_final, otrosi.nueva_fecha_final_actualizada)
+
+            if contrato.prorroga_automatica and rng.random() < self.opciones['prob_renovacion']:
+                nuevas, fecha_final = self._cadena_renovaciones(contrato, fecha_final)
+                renovaciones.extend(nuevas)
+
+            polizas.extend(self._polizas(contrato, fecha_final))
+
+            if rng.random() < self.opciones['prob_ajuste']:
+                ipc, salario = self._calculos_ajuste(contrato, fecha_final)
+                calculos_ipc.extend(ipc)
+                calculos_salario.extend(salario)
+
+            if contrato.reporta_ventas:
+                informes.extend(self._informes_ventas(contrato, fecha_final))
+
+        OtroSi.objects.bulk_create(otrosis, batch_size=TAMANO_LOTE_INSERCION)
+        RenovacionAutomatica.objects.bulk_create(renovaciones, batch_size=TAMANO_LOTE_INSERCION)
+        Poliza.objects.bulk_create(polizas, batch_size=TAMANO_LOTE_INSERCION)
+        CalculoIPC.objects.bulk_create(calculos_ipc, batch_size=TAMANO_LOTE_INSERCION)
+        CalculoSalarioMinimo.objects.bulk_create(calculos_salario, batch_size=TAMANO_LOTE_INSERCION)
+        InformeVentas.objects.bulk_create(informes, batch_size=TAMANO_LOTE_INSERCION)
+
+        return {
+            'contratos': len(contratos),
+            'otrosi': len(otrosis),
+            'renovaciones': len(renovaciones),
+            'polizas': len(polizas),
+            'calculos': len(calculos_ipc) + len(calculos_salario),
+            'informes': len(informes),
+        }
+
+    def _nuevo_contrato(self, indice, prefijo):
+        rng = self.rng
+        cliente = rng.random() < 0.8
+        duracion = rng.choice([12, 12, 24, 36, 60])
+        fecha_inicial = self.hoy - timedelta(days=rng.randint(0, 6 * 365))
+        modalidad = rng.choice(MODALIDADES) if cliente else 'Fijo'
+        canon = Decimal(rng.randint(5, 400)) * 100000
+        tipo_condicion = rng.choice(['IPC', 'IPC', 'SALARIO_MINIMO'])
+
+        contrato = Contrato(
+            num_contrato=f'{prefijo}-{indice:06d}',
+            tipo_contrato_cliente_proveedor='CLIENTE' if cliente else 'PROVEEDOR',
+            objeto_destinacion='Contrato sintético para pruebas de carga',
+            tipo_contrato=rng.choice(self.tipos_contrato) if cliente else None,
+            tipo_servicio=None if cliente else rng.choice(self.tipos_servicio),
+            arrendatario=rng.choice(self.arrendatarios) if cliente else None,
+            proveedor=None if cliente else rng.choice(self.proveedores),
+            local=rng.choice(self.locales) if cliente else None,
+            nit_concedente='900000000',
+            rep_legal_concedente='Representante Concedente',
+            fecha_firma=fecha_inicial - timedelta(days=rng.randint(0, 30)),
+            duracion_inicial_meses=duracion,
+            fecha_inicial_contrato=fecha_inicial,
+            fecha_final_inicial=calcular_fecha_vencimiento(fecha_inicial, duracion) - timedelta(days=1),
+            prorroga_automatica=rng.random() < 0.4,
+            dias_preaviso_no_renovacion=rng.choice([30, 60, 90]),
+            dias_terminacion_anticipada=rng.choice([0, 30, 60, 90]),
+            vigente=rng.random() < 0.9,
+            modalidad_pago=modalidad,
+            valor_canon_fijo=canon if modalidad != 'Variable Puro' else None,
+            canon_minimo_garantizado=canon if modalidad == 'Hibrido (Min Garantizado)' else None,
+            porcentaje_ventas=Decimal(rng.randint(3, 15)) if modalidad != 'Fijo' else None,
+            reporta_ventas=modalidad != 'Fijo',
+            dia_limite_reporte_ventas=rng.choice([5, 10, 15]) if modalidad != 'Fijo' else None,
+            tipo_condicion_ipc=tipo_condicion,
+            puntos_adicionales_ipc=Decimal(rng.choice([0, 0, 1, 2])) if tipo_condicion == 'IPC' else 0,
+            porcentaje_salario_minimo=Decimal('100') if tipo_condicion == 'SALARIO_MINIMO' else None,
+            periodicidad_ipc=rng.choice(['ANUAL', 'ANUAL', 'FECHA_ESPECIFICA']),
+            fecha_aumento_ipc=fecha_inicial + relativedelta(years=1),
+        )
+        for tipo, (exige, valor, meses) in POLIZAS_EXIGIDAS.items():
+            if rng.random() < (0.6 if tipo != 'Poliza de Arrendamiento' or cliente else 0):
+                setattr(contrato, exige, True)
+                setattr(contrato, valor, canon * rng.choice([6, 12, 24]))
+                setattr(contrato, meses, duracion)
+        # Lo que haría Contrato.save(), que bulk_create no llama
+        contrato.calcular_fechas_polizas()
+        return contrato
+
+    def _cadena_otrosi(self, contrato):
+        """Otro Sí sucesivos: cada uno entra en vigencia después del anterior."""
+        rng = self.rng
+        largo = self._geometrica(self.opciones['otrosi_promedio'], self.opciones['otrosi_max'])
+        cadena = []
+        vigencia = contrato.fecha_inicial_contrato
+        fecha_final = contrato.fecha_final_inicial
+        canon = contrato.valor_canon_fijo
+        for numero in range(1, largo + 1):
+            vigencia = vigencia + timedelta(days=rng.randint(60, 540))
+            ultimo = numero == largo
+            estado = rng.choice(['BORRADOR', 'EN_REVISION', 'APROBADO']) if ultimo and rng.random() < 0.3 else 'APROBADO'
+            tipo = rng.choice(['AMENDMENT', 'RENEWAL', 'CANON_CHANGE'])
+
+            otrosi = OtroSi(
+                contrato=contrato,
+                numero_otrosi=f'OS-{numero}',
+                version=numero,
+                tipo=tipo,
+                estado=estado,
+                fecha_otrosi=vigencia - timedelta(days=rng.randint(0, 20)),
+                effective_from=vigencia,
+                descripcion=f'Otro Sí sintético {numero}',
+                creado_por='generar_datos_sinteticos',
+                fecha_aprobacion=(
+                    timezone.make_aware(datetime.combine(vigencia, datetime.min.time())) if estado == 'APROBADO' else None
+                ),
+            )
+            if tipo == 'RENEWAL' or rng.random() < 0.2:
+                fecha_final = calcular_fecha_vencimiento(fecha_final, rng.choice([6, 12, 24]))
+                otrosi.nueva_fecha_final_actualizada = fecha_final
+            if canon and (tipo == 'CANON_CHANGE' or rng.random() < 0.2):
+                canon = (canon * (1 + Decimal(rng.randint(2, 12)) / 100)).quantize(Decimal('1'))
+                otrosi.nuevo_valor_canon = canon
+            if contrato.tipo_contrato_cliente_proveedor == 'CLIENTE' and rng.random() < 0.1:
+                otrosi.nueva_modalidad_pago = rng.choice(MODALIDADES)
+            if rng.random() < 0.1:
+                otrosi.nuevo_tipo_condicion_ipc = rng.choice(['IPC', 'SALARIO_MINIMO'])
+                otrosi.nueva_periodicidad_ipc = rng.choice(['ANUAL', 'FECHA_ESPECIFICA'])
+                otrosi.nueva_fecha_aumento_ipc = vigencia + relativedelta(years=1)
+            if rng.random() < 0.1:
+                otrosi.nuevo_exige_poliza_rce = not contrato.exige_poliza_rce
+            cadena.append(otrosi)
+        return cadena
+
+    def _cadena_renovaciones(self, contrato, fecha_final):
+        """Renovaciones automáticas encadenadas mientras el contrato llegue a su fecha final."""
+        rng = self.rng
+        renovaciones = []
+        meses = contrato.duracion_inicial_meses
+        numero = 0
+        while fecha_final < self.hoy and numero < 6:
+            numero += 1
+            inicio = fecha_final + timedelta(days=1)
+            nueva_final = calcular_fecha_vencimiento(inicio, meses) - timedelta(days=1)
+            estado = 'ANULADO' if rng.random() < 0.05 else 'APROBADO'
+            renovaciones.append(RenovacionAutomatica(
+                contrato=contrato,
+                numero_renovacion=f'RA-{numero}',
+                version=numero,
+                estado=estado,
+                fecha_renovacion=inicio,
+                effective_from=inicio,
+                fecha_inicio_nueva_vigencia=inicio,
+                nueva_fecha_final_actualizada=nueva_final,
+                meses_renovacion=meses,
+                fecha_final_anterior=fecha_final,
+                descripcion=f'Renovación automática sintética {numero}',
+                creado_por='generar_datos_sinteticos',
+                fecha_aprobacion=(
+                    timezone.make_aware(datetime.combine(inicio, datetime.min.time())) if estado == 'APROBADO' else None
+                ),
+            ))
+            if estado == 'APROBADO':
+                fecha_final = nueva_final
+        return renovaciones, fecha_final
+
+    def _polizas(self, contrato, fecha_final):
+        rng = self.rng
+        polizas = []
+        for tipo, (exige, valor, _meses) in POLIZAS_EXIGIDAS.items():
+            if not getattr(contrato, exige) or rng.random() >= self.opciones['prob_poliza']:
+                continue
+            # Vencimientos alrededor de la fecha final: vigentes, por vencer y vencidas
+            vencimiento = fecha_final + timedelta(days=rng.randint(-120, 90))
+            poliza = Poliza(
+                contrato=contrato,
+                tipo=tipo,
+                numero_poliza=f'{contrato.num_contrato}-{tipo[:3].upper()}',
+                valor_asegurado=getattr(contrato, valor),
+                fecha_inicio_vigencia=contrato.fecha_inicial_contrato,
+                fecha_vencimiento=vencimiento,
+                aseguradora=rng.choice(ASEGURADORAS),
+                creado_por='generar_datos_sinteticos',
+            )
+            if rng.random() < self.opciones['prob_colchon']:
+                # Como Poliza.save(): la fecha real descuenta los meses de colchón
+                poliza.tiene_colchon = True
+                poliza.meses_colchon = rng.choice([1, 2, 3])
+                poliza.fecha_vencimiento = vencimiento + relativedelta(months=poliza.meses_colchon)
+                poliza.fecha_vencimiento_real = poliza.fecha_vencimiento - relativedelta(months=poliza.meses_colchon)
+            polizas.append(poliza)
+        return polizas
+
+    def _calculos_ajuste(self, contrato, fecha_final):
+        """Un cálculo por aniversario hasta la fecha base; el último puede quedar pendiente."""
+        rng = self.rng
+        calculos_ipc, calculos_salario = [], []
+        canon = contrato.valor_canon_fijo or contrato.canon_minimo_garantizado
+        if not canon:
+            return calculos_ipc, calculos_salario
+
+        fecha = contrato.fecha_aumento_ipc
+        limite = min(self.hoy, fecha_final)
+        while fecha <= limite:
+            siguiente = fecha + relativedelta(years=1)
+            estado = 'PENDIENTE' if siguiente > limite and rng.random() < 0.3 else 'APLICADO'
+            if contrato.tipo_condicion_ipc == 'SALARIO_MINIMO':
+                historico = self.salario_por_anio.get(fecha.year)
+                anterior = self.salario_por_anio.get(fecha.year - 1)
+                if historico is None or anterior is None:
+                    break
+                porcentaje = ((historico.valor_salario_minimo / anterior.valor_salario_minimo - 1) * 100).quantize(
+                    Decimal('0.01')
+                )
+            else:
+                historico = self.ipc_por_anio.get(fecha.year - 1)
+                if historico is None:
+                    break
+                porcentaje = historico.valor_ipc + contrato.puntos_adicionales_ipc
+
+            incremento = (canon * porcentaje / 100).quantize(Decimal('0.01'))
+            datos = dict(
+                contrato=contrato,
+                año_aplicacion=fecha.year,
+                fecha_aplicacion=fecha,
+                # Derivada de la fecha de aplicación (no del reloj) para que la misma semilla
+                # produzca los mismos cálculos; el orden por fecha_calculo depende de ella
+                fecha_calculo=timezone.make_aware(datetime.combine(fecha, datetime.min.time())),
+                canon_anterior=canon,
+                porcentaje_total_aplicar=porcentaje,
+                valor_incremento=incremento,
+                nuevo_canon=canon + incremento,
+                estado=estado,
+            )
+            if contrato.tipo_condicion_ipc == 'SALARIO_MINIMO':
+                calculos_salario.append(CalculoSalarioMinimo(
+                    salario_minimo_historico=historico,
+                    porcentaje_salario_minimo=contrato.porcentaje_salario_minimo,
+                    **datos
+                ))
+            else:
+                calculos_ipc.append(CalculoIPC(
+                    ipc_historico=historico, puntos_adicionales=contrato.puntos_adicionales_ipc, **datos
+                ))
+            if estado == 'APLICADO':
+                canon = canon + incremento
+            fecha = siguiente
+        return calculos_ipc, calculos_salario
+
+    def _informes_ventas(self, contrato, fecha_final):
+        """Informes de los últimos meses cerrados dentro de la vigencia del contrato."""
+        rng = self.rng
+        informes = []
+        primer_mes = date(self.hoy.year, self.hoy.month, 1)
+        for atras in range(self.opciones['meses_ventas'], 0, -1):
+            mes = primer_mes - relativedelta(months=atras)
+            if mes < date(contrato.fecha_inicial_contrato.year, contrato.fecha_inicial_contrato.month, 1):
+                continue
+            if mes > fecha_final:
+                break
+            fecha_limite = mes + relativedelta(months=1, day=contrato.dia_limite_reporte_ventas)
+            entregado = fecha_limite < self.hoy and rng.random() < 0.85
+            informes.append(InformeVentas(
+                contrato=contrato,
+                mes=mes.month,
+                año=mes.year,
+                estado='ENTREGADO' if entregado else 'PENDIENTE',
+                fecha_limite=fecha_limite,
+                fecha_entrega=fecha_limite - timedelta(days=rng.randint(0, 4)) if entregado else None,
+                registrado_por='generar_datos_sinteticos' if entregado else None,
+                fecha_registro=self.ahora,
+            ))
+        return informes
@@ -0,0 +1,78 @@
+"""
+Comando de gestión que envía los correos de la cola de salida (HistorialEnvioEmail PENDIENTE).
+Ejecutar con: python manage.py procesar_cola_email [--workers 4] [--intervalo 30] [--una-vez]
+
+Puede ejecutarse como servicio permanente o periódicamente desde cron con --una-vez.
+Los correos fallidos se reintentan con espera exponencial y, tras EMAIL_COLA_MAX_INTENTOS,
+quedan DESCARTADO.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.services.cola_email import (
+    TAMANO_LOTE_COLA,
+    drenar_cola,
+    recuperar_envios_interrumpidos,
+)
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos pendientes de la cola de salida con reintentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'EMAIL_COLA_WORKERS', 4),
+            help='Cantidad de hilos de envío (por defecto: EMAIL_COLA_WORKERS)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_COLA,
+            help=f'Correos enviados por cada conexión SMTP (por defecto: {TAMANO_LOTE_COLA})',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=30,
+            help='Segundos de espera entre consultas de la cola (por defecto: 30)',
+        )
+        parser.add_argument(
+            '--minutos-interrumpido',
+            type=int,
+            default=30,
+            help='Minutos tras los cuales un correo EN_PROCESO se considera interrumpido (por defecto: 30)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Enviar los correos listos y terminar',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        lote = max(1, options['lote'])
+        intervalo = max(1, options['intervalo'])
+
+        self.stdout.write(f'Procesando la cola de correo ({workers} hilos)...')
+        while True:
+            recuperados = recuperar_envios_interrumpidos(options['minutos_interrumpido'])
+            if recuperados:
+                self.stdout.write(self.style.WARNING(f'  {recuperados} correos interrumpidos vuelven a la cola'))
+
+            inicio = time.perf_counter()
+            totales = drenar_cola(workers=workers, tamano_lote=lote)
+            if any(totales.values()):
+                self.stdout.write(
+                    f"  {totales['enviados']} enviados, {totales['reintentos']} para reintento, "
+                    f"{totales['descartados']} descartados en {time.perf_counter() - inicio:.1f}s"
+                )
+
+            if options['una_vez']:
+                break
+            time.sleep(intervalo)
+
+        self.stdout.write(self.style.SUCCESS('Procesamiento de la cola de correo finalizado'))
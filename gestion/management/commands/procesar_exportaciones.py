@@ -0,0 +1,92 @@
+"""
+Comando de gestión que ejecuta los trabajos de exportación en segundo plano (ExportJob).
+Ejecutar con: python manage.py procesar_exportaciones [--workers 2] [--intervalo 5] [--una-vez]
+
+Necesario con EXPORTACIONES_WORKER='comando'. Con el pool de hilos del proceso web
+('hilos') sirve para retomar trabajos interrumpidos por un reinicio y limpiar archivos expirados
+(por ejemplo con --una-vez desde cron).
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from gestion.models import ExportJob
+from gestion.services.trabajos_exportacion import (
+    ejecutar_trabajo,
+    limpiar_exportaciones_expiradas,
+    recuperar_trabajos_interrumpidos,
+)
+
+
+def _ejecutar(trabajo_id):
+    """Ejecuta un trabajo en un hilo de trabajo y libera su conexión a la base de datos."""
+    try:
+        return ejecutar_trabajo(trabajo_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos de exportación pendientes y elimina los archivos expirados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'EXPORTACIONES_WORKERS', 2),
+            help='Cantidad de exportaciones simultáneas (por defecto: EXPORTACIONES_WORKERS)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera entre consultas de trabajos pendientes (por defecto: 5)',
+        )
+        parser.add_argument(
+            '--minutos-interrumpido',
+            type=int,
+            default=30,
+            help='Minutos tras los cuales un trabajo EN_PROCESO se considera interrumpido (por defecto: 30)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesar los trabajos pendientes y terminar',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        intervalo = max(0.5, options['intervalo'])
+
+        self.stdout.write(f'Procesando exportaciones en segundo plano ({workers} hilos)...')
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                expirados = limpiar_exportaciones_expiradas()
+                if expirados:
+                    self.stdout.write(f'  {expirados} archivos expirados eliminados')
+
+                recuperados = recuperar_trabajos_interrumpidos(options['minutos_interrumpido'])
+                if recuperados:
+                    self.stdout.write(self.style.WARNING(f'  {recuperados} trabajos interrumpidos vuelven a la cola'))
+
+                pendientes = list(
+                    ExportJob.objects.filter(estado='PENDIENTE')
+                    .order_by('fecha_creacion')
+                    .values_list('pk', flat=True)[:workers]
+                )
+                inicio = time.perf_counter()
+                ejecutados = sum(1 for tomado in executor.map(_ejecutar, pendientes) if tomado)
+                if ejecutados:
+                    self.stdout.write(
+                        f'  {ejecutados} exportaciones ejecutadas en {time.perf_counter() - inicio:.1f}s'
+                    )
+
+                if options['una_vez'] and not pendientes:
+                    break
+                if not pendientes:
+                    time.sleep(intervalo)
+
+        self.stdout.write(self.style.SUCCESS('Procesamiento de exportaciones finalizado'))
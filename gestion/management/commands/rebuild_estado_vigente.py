@@ -0,0 +1,107 @@
+"""
+Comando de gestión para reconstruir la tabla ContratoEstadoVigente de todos los contratos.
+Ejecutar con: python manage.py rebuild_estado_vigente [--workers 4] [--lote 500] [--fecha AAAA-MM-DD]
+
+Se recomienda programarlo una vez al día: el estado vigente depende de la fecha
+(un Otro Sí aprobado con effective_from futuro entra en vigencia sin que nada se guarde).
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from gestion.models import Contrato, ContratoEstadoVigente
+from gestion.services.estado_vigente import (
+    TAMANO_LOTE_REBUILD,
+    calcular_estados_vigentes,
+    guardar_estados_vigentes,
+)
+
+
+def _calcular_lote(contratos_ids, fecha_referencia):
+    """Calcula un lote en un hilo de trabajo y libera su conexión a la base de datos."""
+    try:
+        return calcular_estados_vigentes(contratos_ids, fecha_referencia)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el estado vigente (efecto cadena resuelto) de todos los contratos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Cantidad de hilos que calculan lotes en paralelo (por defecto: 4)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_REBUILD,
+            help=f'Cantidad de contratos por lote (por defecto: {TAMANO_LOTE_REBUILD})',
+        )
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            help='Fecha de referencia en formato AAAA-MM-DD (por defecto: hoy)',
+        )
+        parser.add_argument(
+            '--contrato',
+            type=int,
+            action='append',
+            dest='contratos',
+            help='ID de contrato a reconstruir (se puede repetir). Por defecto: todos',
+        )
+
+    def handle(self, *args, **options):
+        fecha_referencia = date.today()
+        if options.get('fecha'):
+            try:
+                fecha_referencia = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+
+        workers = max(1, options['workers'])
+        tamano_lote = max(1, options['lote'])
+
+        contratos = Contrato.objects.order_by('pk')
+        if options.get('contratos'):
+            contratos = contratos.filter(pk__in=options['contratos'])
+        contratos_ids = list(contratos.values_list('pk', flat=True))
+
+        if not contratos_ids:
+            self.stdout.write(self.style.WARNING('No hay contratos para reconstruir'))
+            return
+
+        lotes = [
+            contratos_ids[inicio:inicio + tamano_lote]
+            for inicio in range(0, len(contratos_ids), tamano_lote)
+        ]
+        self.stdout.write(
+            f'Reconstruyendo estado vigente al {fecha_referencia} de {len(contratos_ids)} contratos '
+            f'({len(lotes)} lotes, {workers} hilos)...'
+        )
+
+        inicio = time.perf_counter()
+        guardados = 0
+        # Los hilos solo leen; la escritura se hace en el hilo principal para no
+        # competir por el bloqueo de escritura de SQLite.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(_calcular_lote, lote, fecha_referencia) for lote in lotes]
+            for futuro in as_completed(futuros):
+                guardados += guardar_estados_vigentes(futuro.result())
+                self.stdout.write(f'  {guardados}/{len(contratos_ids)} contratos procesados')
+
+        if not options.get('contratos'):
+            eliminados, _ = ContratoEstadoVigente.objects.exclude(contrato_id__in=Contrato.objects.values('pk')).delete()
+            if eliminados:
+                self.stdout.write(f'  {eliminados} estados huérfanos eliminados')
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'\nReconstrucción completada! {guardados} estados guardados en {duracion:.1f}s'
+        ))
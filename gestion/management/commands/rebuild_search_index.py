@@ -0,0 +1,32 @@
+"""
+Comando de gestión para reconstruir el índice de búsqueda de contratos.
+Ejecutar con: python manage.py rebuild_search_index
+
+Las señales mantienen el índice al día; este comando se usa tras cargar datos con
+loaddata o restaurar un backup, o si se sospecha que el índice quedó desactualizado.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from gestion.services.busqueda import crear_indice, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo de contratos'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        # Crea la estructura si falta (por ejemplo, tras restaurar una base anterior a la migración)
+        if not crear_indice(connection):
+            raise CommandError(
+                f'El motor {connection.vendor} no tiene índice de búsqueda; '
+                f'la búsqueda de contratos usa coincidencias parciales (icontains)'
+            )
+
+        indexados = reconstruir_indice(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Índice de búsqueda reconstruido: {indexados} contratos '
+            f'en {time.perf_counter() - inicio:.2f}s'
+        ))
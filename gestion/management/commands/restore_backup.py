@@ -0,0 +1,98 @@
+"""
+Comando de gestión para restaurar la base SQLite desde un backup de backup_database.
+Ejecutar con: python manage.py restore_backup [archivo | --ultimo] [--listar] [--destino RUTA]
+
+Acepta manifiestos incrementales (backup_inc_*.json) y copias completas
+(backup_db_*.sqlite3 / .sqlite3.gz). La aplicación debe estar detenida durante la restauración.
+"""
+from pathlib import Path
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.services.backup_incremental import listar_backups_restaurables, restaurar_backup
+
+
+class Command(BaseCommand):
+    help = 'Restaura la base de datos SQLite desde un backup incremental o completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archivo',
+            nargs='?',
+            help='Backup a restaurar (ruta, o nombre dentro del directorio de backups)',
+        )
+        parser.add_argument(
+            '--ultimo',
+            action='store_true',
+            help='Restaurar el backup más reciente del directorio de backups',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Listar los backups restaurables y terminar',
+        )
+        parser.add_argument(
+            '--backup-dir',
+            type=str,
+            default=None,
+            help='Directorio de backups (por defecto: BASE_DIR/backups)',
+        )
+        parser.add_argument(
+            '--destino',
+            type=str,
+            default=None,
+            help='Archivo de base de datos a reemplazar (por defecto: la base configurada)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Hilos que descomprimen bloques en paralelo (por defecto: 4)',
+        )
+
+    def handle(self, *args, **options):
+        backup_dir = Path(options['backup_dir']) if options['backup_dir'] else Path(settings.BASE_DIR) / 'backups'
+        disponibles = listar_backups_restaurables(backup_dir)
+
+        if options['listar']:
+            if not disponibles:
+                self.stdout.write(f'No hay backups restaurables en {backup_dir}')
+            for archivo in disponibles:
+                self.stdout.write(f'{archivo.name} ({archivo.stat().st_size / (1024 * 1024):.2f} MB)')
+            return
+
+        if options['ultimo']:
+            if not disponibles:
+                raise CommandError(f'No hay backups restaurables en {backup_dir}')
+            archivo = disponibles[0]
+        elif options['archivo']:
+            archivo = Path(options['archivo'])
+            if not archivo.exists() and (backup_dir / archivo).exists():
+                archivo = backup_dir / archivo
+            if not archivo.exists():
+                raise CommandError(f'No existe el backup {options["archivo"]}')
+        else:
+            raise CommandError('Indique el backup a restaurar o use --ultimo (--listar muestra los disponibles)')
+
+        if options['destino']:
+            destino = Path(options['destino'])
+        else:
+            if 'sqlite' not in settings.DATABASES['default']['ENGINE']:
+                raise CommandError('restore_backup solo restaura bases de datos SQLite')
+            destino = Path(settings.DATABASES['default']['NAME'])
+
+        self.stdout.write(f'Restaurando {archivo.name} en {destino}...')
+        inicio = time.perf_counter()
+        try:
+            resultado = restaurar_backup(archivo, destino, workers=options['workers'])
+        except Exception as e:
+            raise CommandError(f'No se pudo restaurar el backup: {str(e)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Base restaurada ({resultado["bytes"] / (1024 * 1024):.2f} MB) '
+            f'en {time.perf_counter() - inicio:.1f}s'
+        ))
+        if resultado['anterior']:
+            self.stdout.write(f'La base anterior se conservó en {resultado["anterior"]}')
@@ -0,0 +1,82 @@
+"""
+Comando de gestión que ejecuta el programador interno de tareas (alertas por correo,
+reconstrucción del estado vigente, backup de la base de datos y reverificación de la licencia).
+Ejecutar con: python manage.py run_scheduler [--workers 4] [--una-vez]
+
+Debe ejecutarse como un servicio permanente (systemd, supervisor, tarea always-on) y
+reemplaza las entradas de cron de enviar_alertas_email, rebuild_estado_vigente y backup_database.
+"""
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gestion.services.programador import Programador
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las alertas por correo, reconstrucción del estado vigente, backups y reverificación de licencia en sus horarios configurados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Tipos de alerta despachados en paralelo (por defecto: EMAIL_COLA_WORKERS)',
+        )
+        parser.add_argument(
+            '--max-retraso-minutos',
+            type=int,
+            default=120,
+            help='Horarios vencidos hace más de estos minutos se omiten hasta el día siguiente (por defecto: 120)',
+        )
+        parser.add_argument(
+            '--sin-estado-vigente',
+            action='store_true',
+            help='No reconstruir el estado vigente de los contratos',
+        )
+        parser.add_argument(
+            '--sin-backup',
+            action='store_true',
+            help='No ejecutar el backup programado',
+        )
+        parser.add_argument(
+            '--sin-licencia',
+            action='store_true',
+            help='No reverificar la licencia',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Ejecutar las tareas que tocan ahora y terminar',
+        )
+
+    def handle(self, *args, **options):
+        programador = Programador(
+            workers=options['workers'],
+            max_retraso=timedelta(minutes=max(0, options['max_retraso_minutos'])),
+            backup=not options['sin_backup'],
+            licencia=not options['sin_licencia'],
+            estado_vigente=not options['sin_estado_vigente'],
+        )
+
+        self.stdout.write('Programador de tareas iniciado')
+        try:
+            while True:
+                inicio = time.perf_counter()
+                for tarea in programador.ejecutar_pendientes():
+                    self.stdout.write(
+                        f'  [{timezone.localtime().strftime("%Y-%m-%d %H:%M")}] {tarea} '
+                        f'({time.perf_counter() - inicio:.1f}s)'
+                    )
+
+                if options['una_vez']:
+                    break
+
+                espera = (programador.proxima_revision() - timezone.now()).total_seconds()
+                time.sleep(max(1, espera))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Programador de tareas detenido'))
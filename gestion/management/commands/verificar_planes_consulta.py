@@ -0,0 +1,226 @@
+"""
+Comando de gestión para verificar que las consultas del dashboard y de las alertas usen índices.
+Ejecutar con: python manage.py verificar_planes_consulta [--contratos 300] [--datos-existentes]
+
+Ejecuta el dashboard y cada una de sus secciones, MotorAlertas, las ocho funciones obtener_* y
+los helpers por contrato (Otro Sí vigente, pólizas vigentes, último cálculo IPC, fecha final),
+captura cada SELECT que emiten y corre EXPLAIN QUERY PLAN sobre ella. Falla (código de salida distinto de cero) si
+alguna consulta con WHERE recorre completa una tabla (`SCAN tabla` sin índice), salvo las
+tablas de configuración de una sola fila listadas en TABLAS_PERMITIDAS.
+
+Por defecto genera datos sintéticos (los de benchmark_alertas) dentro de una transacción que
+se revierte al final; con --datos-existentes usa los datos de la base de datos actual.
+Solo funciona con SQLite (EXPLAIN QUERY PLAN).
+"""
+import random
+import re
+from collections import OrderedDict
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from gestion.management.commands.benchmark_alertas import Command as BenchmarkAlertas
+from gestion.models import Contrato
+from gestion.services.alertas import MotorAlertas
+from gestion.services.cache_alertas import invalidar_cache_alertas
+
+# Tablas de configuración con una o muy pocas filas: recorrerlas completas es más barato que un índice
+TABLAS_PERMITIDAS = {
+    'gestion_configuracionempresa',
+    'gestion_clientelicense',
+    'gestion_configuracionalerta',
+    'gestion_configuracionemail',
+    'gestion_tipocondicionipc',
+    'gestion_periodicidadipc',
+}
+
+CONTRATOS_MUESTRA = 25
+
+_PATRON_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX)?')
+_PATRON_TABLA = re.compile(r'(?:FROM|JOIN) "(\w+)"(?: (?:AS )?"?(\w+)"?)?')
+
+
+def _sin_parentesis(sql):
+    """SQL sin el contenido de los paréntesis (subconsultas, FILTER, listas IN)."""
+    resultado = []
+    profundidad = 0
+    for caracter in sql:
+        if caracter == '(':
+            profundidad += 1
+        elif caracter == ')':
+            profundidad = max(0, profundidad - 1)
+        elif profundidad == 0:
+            resultado.append(caracter)
+    return ''.join(resultado)
+
+
+class _RevertirDatos(Exception):
+    """Fuerza la reversión de la transacción con los datos sintéticos."""
+
+
+class Command(BaseCommand):
+    help = 'Verifica con EXPLAIN QUERY PLAN que las consultas del dashboard y las alertas usen índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=int,
+            default=300,
+            help='Cantidad de contratos sintéticos a generar (por defecto: 300)',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=7,
+            help='Semilla del generador aleatorio (por defecto: 7)',
+        )
+        parser.add_argument(
+            '--datos-existentes',
+            action='store_true',
+            help='No generar datos sintéticos: usar los contratos de la base de datos actual',
+        )
+        parser.add_argument(
+            '--permitir',
+            action='append',
+            default=[],
+            metavar='TABLA',
+            help='Tabla adicional que puede recorrerse completa (se puede repetir)',
+        )
+        parser.add_argument(
+            '--mostrar-planes',
+            action='store_true',
+            help='Mostrar el plan de todas las consultas, no solo las que fallan',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('verificar_planes_consulta requiere SQLite (EXPLAIN QUERY PLAN)')
+
+        permitidas = TABLAS_PERMITIDAS | set(options['permitir'])
+        random.seed(options['semilla'])
+
+        try:
+            with transaction.atomic():
+                if not options['datos_existentes']:
+                    resumen = BenchmarkAlertas()._generar_datos(max(1, options['contratos']))
+                    self.stdout.write(
+                        f'Datos sintéticos: {resumen["contratos"]} contratos, {resumen["otrosi"]} Otro Sí, '
+                        f'{resumen["renovaciones"]} renovaciones, {resumen["polizas"]} pólizas'
+                    )
+
+                consultas = self._capturar_consultas()
+                fallas = self._analizar(consultas, permitidas, options['mostrar_planes'])
+                raise _RevertirDatos()
+        except _RevertirDatos:
+            pass
+
+        total = sum(len(lista) for lista in consultas.values())
+        self.stdout.write(f'\n{total} consultas analizadas')
+        for flujo, lista in consultas.items():
+            self.stdout.write(f'  {flujo}: {len(lista)}')
+
+        if fallas:
+            for flujo, plan, sql in fallas:
+                self.stderr.write(f'\n[{flujo}] {plan}\n  {sql}')
+            raise CommandError(f'{len(fallas)} consulta(s) recorren una tabla completa sin índice')
+
+        self.stdout.write(self.style.SUCCESS('Ninguna consulta recorre una tabla completa sin índice'))
+
+    def _capturar_consultas(self):
+        """Ejecuta cada flujo y retorna {flujo: [(sql, params), ...]} con los SELECT emitidos."""
+        fecha_referencia = date.today()
+        consultas = OrderedDict()
+
+        def _flujo(nombre, funcion):
+            lista = consultas.setdefault(nombre, [])
+
+            def _capturar(execute, sql, params, many, context):
+                if not many and sql.lstrip().upper().startswith('SELECT'):
+                    lista.append((sql, params))
+                return execute(sql, params, many, context)
+
+            invalidar_cache_alertas()
+            with connection.execute_wrapper(_capturar):
+                funcion()
+
+        _flujo('dashboard', lambda: self._ejecutar_dashboard())
+        _flujo('dashboard (clientes)', lambda: self._ejecutar_dashboard({'tipo_alerta': 'CLIENTE'}))
+        for tipo in (None, 'CLIENTE', 'PROVEEDOR'):
+            _flujo(
+                f'MotorAlertas ({tipo or "todos"})',
+                lambda tipo=tipo: MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo).evaluar(),
+            )
+        _flujo('funciones obtener_*', lambda: BenchmarkAlertas()._evaluar_individual(fecha_referencia))
+        _flujo('helpers por contrato', lambda: self._ejecutar_helpers_contrato(fecha_referencia))
+        return consultas
+
+    def _ejecutar_dashboard(self, parametros=None):
+        from gestion.views import dashboard, dashboard_fragmento
+        from gestion.views.dashboard import SECCIONES_DASHBOARD
+
+        def _request():
+            request = RequestFactory().get('/', parametros or {})
+            request.user = User(username='verificar_planes', is_staff=True, is_superuser=True)
+            request.session = SessionStore()
+            request._messages = FallbackStorage(request)
+            return request
+
+        dashboard(_request())
+        for seccion in SECCIONES_DASHBOARD:
+            dashboard_fragmento(_request(), seccion)
+
+    def _ejecutar_helpers_contrato(self, fecha_referencia):
+        from gestion.utils_ipc import obtener_ultimo_calculo_aplicado_hasta_fecha, obtener_ultimo_calculo_ipc_aplicado
+        from gestion.utils_otrosi import (
+            get_otrosi_vigente,
+            get_polizas_vigentes,
+            get_ultimo_otrosi_que_modifico_campo_hasta_fecha,
+        )
+        from gestion.views.utils import _obtener_fecha_final_contrato
+
+        contratos = list(Contrato.objects.filter(otrosi__isnull=False).distinct()[:CONTRATOS_MUESTRA])
+        for contrato in contratos:
+            get_otrosi_vigente(contrato, fecha_referencia)
+            list(get_polizas_vigentes(contrato, fecha_referencia))
+            get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, 'nuevo_valor_canon', fecha_referencia)
+            obtener_ultimo_calculo_ipc_aplicado(contrato)
+            obtener_ultimo_calculo_aplicado_hasta_fecha(contrato, fecha_referencia)
+            _obtener_fecha_final_contrato(contrato, fecha_referencia)
+
+    def _analizar(self, consultas, permitidas, mostrar_planes):
+        """Retorna [(flujo, plan, sql)] de las consultas con un SCAN sin índice sobre una tabla no permitida."""
+        fallas = []
+        vistas = set()
+        with connection.cursor() as cursor:
+            for flujo, lista in consultas.items():
+                for sql, params in lista:
+                    texto = re.sub(r'\s+', ' ', sql).strip()
+                    if texto in vistas:
+                        continue
+                    vistas.add(texto)
+
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    pasos = [fila[-1] for fila in cursor.fetchall()]
+                    plan = ' / '.join(pasos)
+                    if mostrar_planes:
+                        self.stdout.write(f'[{flujo}] {plan}\n  {texto}')
+
+                    # Sin WHERE propio (fuera de subconsultas y FILTER) la consulta pide la tabla
+                    # completa, p. ej. un agregado sobre todos los contratos: el SCAN es lo esperado
+                    if ' WHERE ' not in _sin_parentesis(texto):
+                        continue
+                    alias = {(nombre or tabla): tabla for tabla, nombre in _PATRON_TABLA.findall(texto)}
+                    for paso in pasos:
+                        coincidencia = _PATRON_SCAN.match(paso)
+                        if not coincidencia or ' USING ' in paso:
+                            continue
+                        tabla = alias.get(coincidencia.group(1), coincidencia.group(1))
+                        if tabla not in permitidas:
+                            fallas.append((flujo, plan, texto))
+                            break
+        return fallas
@@ -2,9 +2,12 @@
 Middleware para verificar licencias en cada request
 """
 
+import random
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.urls import reverse
+from django.urls import Resolver404, resolve, reverse
 from django.utils.deprecation import MiddlewareMixin
 
 
@@ -12,6 +15,9 @@ class LicenseCheckMiddleware(MiddlewareMixin):
     """
     Middleware que verifica la licencia del usuario en cada request
     Bloquea el acceso si la licencia está expirada, revocada o deshabilitada
+
+    El estado de la licencia se lee de la caché de proceso (gestion.services.cache_licencia)
+    y la verificación con Firebase se ejecuta en segundo plano: ninguna petición la espera.
     """
     
     # URLs que no requieren verificación de licencia
@@ -36,17 +42,13 @@ class LicenseCheckMiddleware(MiddlewareMixin):
         # Si está revocada, bloquear completamente
         if request.path == '/' or request.path == '/dashboard/' or request.path.startswith('/dashboard'):
             try:
-                from gestion.models import ClienteLicense
-                from gestion.license_manager import LicenseManager
+                from gestion.services.cache_licencia import obtener_licencia_principal, solicitar_reverificacion
                 
-                cliente_license = ClienteLicense.objects.filter(is_primary=True).first()
+                cliente_license = obtener_licencia_principal()
                 if cliente_license:
-                    cliente_license.refresh_from_db()
-                    
-                    # Si la licencia está marcada como revocada, forzar verificación con Firebase
+                    # Si la licencia está marcada como revocada, reverificar con Firebase en segundo plano
                     if cliente_license.verification_status == 'revoked' or not cliente_license.is_active:
-                        LicenseManager.verificar_licencia_cliente(request.user, forzar_verificacion=True)
-                        cliente_license.refresh_from_db()
+                        solicitar_reverificacion()
                     
                     is_valid = (
                         cliente_license.is_active and
@@ -88,22 +90,18 @@ class LicenseCheckMiddleware(MiddlewareMixin):
         
         # Para todas las demás URLs, bloquear si la licencia no está activa y vigente
         try:
-            from gestion.models import ClienteLicense
-            from gestion.license_manager import LicenseManager
+            from gestion.services.cache_licencia import obtener_licencia_principal, solicitar_reverificacion
             
-            cliente_license = ClienteLicense.objects.filter(is_primary=True).first()
+            cliente_license = obtener_licencia_principal()
             
             if not cliente_license:
                 messages.error(request, 'No hay licencia configurada para la organización.')
                 return redirect('gestion:dashboard')
             
-            cliente_license.refresh_from_db()
-            
-            # Si la licencia está marcada como revocada localmente, forzar verificación con Firebase
-            # para asegurar que el estado esté actualizado
+            # Si la licencia está marcada como revocada localmente, reverificar con Firebase en segundo
+            # plano; el resultado se aplica a las peticiones siguientes
             if cliente_license.verification_status == 'revoked' or not cliente_license.is_active:
-                LicenseManager.verificar_licencia_cliente(request.user, forzar_verificacion=True)
-            cliente_license.refresh_from_db()
+                solicitar_reverificacion()
             
             # Verificar que la licencia esté activa, vigente y no expirada
             is_valid = (
@@ -135,3 +133,60 @@ class LicenseCheckMiddleware(MiddlewareMixin):
         
         return None
 
+
+class CacheSolicitudMiddleware:
+    """
+    Memoiza durante cada petición las consultas de efecto cadena de un contrato
+    (ver gestion.services.cache_solicitud). La caché se descarta al terminar la petición.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from gestion.services.cache_solicitud import cache_por_solicitud
+
+        with cache_por_solicitud():
+            return self.get_response(request)
+
+
+class MetricasRendimientoMiddleware:
+    """
+    Mide tiempo total, tiempo y número de consultas, consultas duplicadas y aciertos de caché
+    de cada petición muestreada (RENDIMIENTO_MUESTREO, entre 0 y 1) y los publica en la
+    cabecera Server-Timing y en el log. Verifica el presupuesto de consultas de la vista
+    (PRESUPUESTO_CONSULTAS). Ver gestion.services.metricas_rendimiento.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        muestreo = getattr(settings, 'RENDIMIENTO_MUESTREO', 0)
+        if muestreo <= 0 or (muestreo < 1 and random.random() >= muestreo):
+            return self.get_response(request)
+
+        from gestion.services import metricas_rendimiento
+
+        with metricas_rendimiento.medir_rendimiento() as metricas:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # Respuesta de un middleware anterior a la resolución de la URL (p. ej. licencia)
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                match = None
+        vista = match.view_name if match else None
+        response['Server-Timing'] = metricas_rendimiento.cabecera_server_timing(metricas)
+        metricas_rendimiento.registrar_metricas(
+            metricas, vista, request.method, request.path, response.status_code
+        )
+        metricas_rendimiento.verificar_presupuesto(
+            metricas,
+            vista,
+            getattr(settings, 'PRESUPUESTO_CONSULTAS', {}),
+            getattr(settings, 'PRESUPUESTO_CONSULTAS_ESTRICTO', False),
+        )
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0067_agregar_historial_y_colchon_polizas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContratoEstadoVigente',
+            fields=[
+                ('contrato', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estado_vigente', serialize=False, to='gestion.contrato', verbose_name='Contrato')),
+                ('fecha_referencia', models.DateField(help_text='Fecha para la cual se resolvió el efecto cadena', verbose_name='Fecha de Referencia')),
+                ('vigente', models.BooleanField(default=False, verbose_name='Vigente')),
+                ('fecha_final_vigente', models.DateField(blank=True, null=True, verbose_name='Fecha Final Vigente')),
+                ('origen_fecha_final', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Fecha Final')),
+                ('valor_canon', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True, verbose_name='Valor Canon Vigente')),
+                ('origen_valor_canon', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Valor Canon')),
+                ('canon_minimo_garantizado', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True, verbose_name='Canon Mínimo Garantizado Vigente')),
+                ('origen_canon_minimo_garantizado', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Canon Mínimo Garantizado')),
+                ('porcentaje_ventas', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Porcentaje de Ventas Vigente (%)')),
+                ('origen_porcentaje_ventas', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Porcentaje de Ventas')),
+                ('modalidad_pago', models.CharField(blank=True, max_length=30, null=True, verbose_name='Modalidad de Pago Vigente')),
+                ('origen_modalidad_pago', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Modalidad de Pago')),
+                ('tipo_condicion_ipc', models.CharField(blank=True, max_length=20, null=True, verbose_name='Tipo de Condición IPC Vigente')),
+                ('origen_tipo_condicion_ipc', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Tipo de Condición IPC')),
+                ('periodicidad_ipc', models.CharField(blank=True, max_length=20, null=True, verbose_name='Periodicidad Ajuste Vigente')),
+                ('origen_periodicidad_ipc', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Periodicidad Ajuste')),
+                ('fecha_aumento_ipc', models.DateField(blank=True, null=True, verbose_name='Fecha de Aumento IPC Vigente')),
+                ('origen_fecha_aumento_ipc', models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Fecha de Aumento IPC')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Estado Vigente de Contrato',
+                'verbose_name_plural': 'Estados Vigentes de Contratos',
+                'ordering': ['contrato'],
+                'indexes': [models.Index(fields=['vigente', 'fecha_final_vigente'], name='gestion_con_vigente_cb6270_idx'), models.Index(fields=['fecha_aumento_ipc'], name='gestion_con_fecha_a_a19b8b_idx'), models.Index(fields=['modalidad_pago'], name='gestion_con_modalid_bdf9e4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+def descartar_estados_sin_ajuste(apps, schema_editor):
+    """
+    Los estados existentes no tienen el próximo ajuste resuelto. Se descartan para que
+    las alertas los calculen en línea hasta ejecutar rebuild_estado_vigente.
+    """
+    ContratoEstadoVigente = apps.get_model('gestion', 'ContratoEstadoVigente')
+    ContratoEstadoVigente.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0068_contratoestadovigente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='tipo_ajuste',
+            field=models.CharField(blank=True, max_length=20, null=True, verbose_name='Tipo de Ajuste'),
+        ),
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='periodicidad_ajuste',
+            field=models.CharField(blank=True, max_length=20, null=True, verbose_name='Periodicidad de Ajuste'),
+        ),
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='proxima_fecha_ajuste',
+            field=models.DateField(blank=True, null=True, verbose_name='Próxima Fecha de Ajuste'),
+        ),
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='origen_proxima_fecha_ajuste',
+            field=models.CharField(blank=True, max_length=50, null=True, verbose_name='Origen Próxima Fecha de Ajuste'),
+        ),
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='ajuste_calculado',
+            field=models.BooleanField(default=False, help_text='Ya existe un cálculo de la condición vigente para la próxima fecha de ajuste', verbose_name='Ajuste Calculado'),
+        ),
+        migrations.AddIndex(
+            model_name='contratoestadovigente',
+            index=models.Index(fields=['tipo_ajuste', 'proxima_fecha_ajuste'], name='gestion_con_tipo_aj_e1c3c1_idx'),
+        ),
+        migrations.RunPython(descartar_estados_sin_ajuste, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0069_contratoestadovigente_proxima_fecha_ajuste'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CONTRATOS', 'Contratos'), ('INFORMES_VENTAS', 'Informes de Ventas')], max_length=30, verbose_name='Tipo de Exportación')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error'), ('EXPIRADO', 'Expirado')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('progreso', models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('total_filas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Filas')),
+                ('ruta_archivo', models.CharField(blank=True, max_length=500, null=True, verbose_name='Ruta del Archivo')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255, null=True, verbose_name='Nombre del Archivo')),
+                ('mensaje_error', models.TextField(blank=True, null=True, verbose_name='Mensaje de Error')),
+                ('solicitado_por', models.CharField(blank=True, max_length=150, null=True, verbose_name='Solicitado Por')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+                ('expira_en', models.DateTimeField(blank=True, null=True, verbose_name='Expira En')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Exportación',
+                'verbose_name_plural': 'Trabajos de Exportación',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [
+                    models.Index(fields=['estado', 'fecha_creacion'], name='gestion_exp_estado_6f7b2e_idx'),
+                    models.Index(fields=['expira_en'], name='gestion_exp_expira__863c23_idx'),
+                ],
+            },
+        ),
+    ]
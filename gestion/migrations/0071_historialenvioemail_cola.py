@@ -0,0 +1,47 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0070_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialenvioemail',
+            name='contenido_html',
+            field=models.TextField(blank=True, help_text='Cuerpo del correo en cola; se elimina una vez enviado', null=True, verbose_name='Contenido HTML'),
+        ),
+        migrations.AddField(
+            model_name='historialenvioemail',
+            name='contenido_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='Contenido en Texto Plano'),
+        ),
+        migrations.AddField(
+            model_name='historialenvioemail',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos Fallidos'),
+        ),
+        migrations.AddField(
+            model_name='historialenvioemail',
+            name='proximo_intento',
+            field=models.DateTimeField(blank=True, help_text='Fecha a partir de la cual el correo en cola puede enviarse', null=True, verbose_name='Próximo Intento'),
+        ),
+        migrations.AlterField(
+            model_name='historialenvioemail',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('ENVIADO', 'Enviado'), ('ERROR', 'Error'), ('DESCARTADO', 'Descartado (sin más reintentos)'), ('CANCELADO', 'Cancelado')], default='PENDIENTE', max_length=20, verbose_name='Estado'),
+        ),
+        migrations.AlterField(
+            model_name='historialenvioemail',
+            name='tipo_alerta',
+            field=models.CharField(choices=[('VENCIMIENTO_CONTRATOS', 'Vencimiento de Contratos'), ('ALERTAS_IPC', 'Alertas IPC'), ('ALERTAS_SALARIO_MINIMO', 'Alertas de Ajuste de Salario Mínimo'), ('POLIZAS_CRITICAS', 'Pólizas Críticas'), ('PREAVISO_RENOVACION', 'Preaviso de Renovación'), ('POLIZAS_REQUERIDAS', 'Pólizas Requeridas No Aportadas'), ('TERMINACION_ANTICIPADA', 'Terminación Anticipada'), ('RENOVACION_AUTOMATICA', 'Renovación Automática'), ('NOTIFICACION_BACKUP', 'Notificación de Backup')], max_length=50, verbose_name='Tipo de Alerta'),
+        ),
+        migrations.AddIndex(
+            model_name='historialenvioemail',
+            index=models.Index(fields=['estado', 'proximo_intento'], name='gestion_his_estado_e3af50_idx'),
+        ),
+    ]
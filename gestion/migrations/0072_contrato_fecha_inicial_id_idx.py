@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0071_historialenvioemail_cola'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contrato',
+            index=models.Index(fields=['fecha_inicial_contrato', 'id'], name='gestion_con_fecha_i_7d3b87_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:00
+
+from django.db import migrations
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    """
+    Crea el índice de búsqueda (FTS5 en SQLite, tsvector en PostgreSQL) y lo llena con los
+    contratos existentes. Con otros motores no hace nada y la búsqueda usa icontains.
+    """
+    from gestion.services.busqueda import crear_indice, reconstruir_indice
+
+    if crear_indice(schema_editor.connection):
+        reconstruir_indice(schema_editor.connection)
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    from gestion.services.busqueda import eliminar_indice
+
+    eliminar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0072_contrato_fecha_inicial_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
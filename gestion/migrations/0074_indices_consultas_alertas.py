@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0073_indice_busqueda_contratos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contrato',
+            index=models.Index(
+                condition=models.Q(('vigente', True)),
+                fields=['tipo_contrato_cliente_proveedor'],
+                name='gestion_con_vigente_tipo_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['fecha_vencimiento'], name='gestion_pol_fecha_v_cb1688_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(
+                fields=['contrato', 'otrosi', 'fecha_vencimiento'], name='gestion_pol_contrat_6162bb_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='otrosi',
+            index=models.Index(fields=['contrato', 'estado', '-effective_from'], name='gestion_otr_contrat_910e73_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0074_indices_consultas_alertas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contratoestadovigente',
+            name='ajuste_vigente_hasta',
+            field=models.DateField(
+                blank=True,
+                help_text='Último día en que el próximo ajuste se resuelve igual (ningún evento inicia ni termina antes)',
+                null=True,
+                verbose_name='Ajuste Vigente Hasta',
+            ),
+        ),
+    ]
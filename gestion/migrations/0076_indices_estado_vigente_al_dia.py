@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0075_contratoestadovigente_ajuste_vigente_hasta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contratoestadovigente',
+            index=models.Index(fields=['fecha_referencia'], name='gestion_con_fecha_r_7eba3b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contratoestadovigente',
+            index=models.Index(fields=['ajuste_vigente_hasta'], name='gestion_con_ajuste__99d5b4_idx'),
+        ),
+    ]
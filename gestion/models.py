@@ -539,6 +539,17 @@ class Contrato(models.Model):
         verbose_name = 'Contrato'
         verbose_name_plural = 'Contratos'
         ordering = ['-fecha_inicial_contrato']
+        indexes = [
+            # Paginación por cursor de lista_contratos
+            models.Index(fields=['fecha_inicial_contrato', 'id']),
+            # Filtros vigente=True (con o sin tipo) del dashboard y las alertas. En SQLite un
+            # booleano se compara como `WHERE "vigente"`, que solo puede usar un índice parcial
+            models.Index(
+                fields=['tipo_contrato_cliente_proveedor'],
+                condition=models.Q(vigente=True),
+                name='gestion_con_vigente_tipo_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.num_contrato
@@ -824,6 +835,11 @@ class Poliza(PolizaMixin, AuditoriaMixin):
         verbose_name = 'Póliza'
         verbose_name_plural = 'Pólizas'
         ordering = ['-fecha_vencimiento']
+        indexes = [
+            # Pólizas por vencer (alertas) y pólizas vigentes de un contrato
+            models.Index(fields=['fecha_vencimiento']),
+            models.Index(fields=['contrato', 'otrosi', 'fecha_vencimiento']),
+        ]
 
     def __str__(self):
         return self.numero_poliza
@@ -1761,6 +1777,9 @@ class OtroSi(models.Model):
         verbose_name_plural = 'Otros Sí'
         ordering = ['-effective_from', '-version']
         unique_together = [['contrato', 'numero_otrosi']]
+        indexes = [
+            models.Index(fields=['contrato', 'estado', '-effective_from']),
+        ]
 
     def __str__(self):
         return f"{self.numero_otrosi} - {self.get_tipo_display()} ({self.effective_from})"
@@ -1873,6 +1892,81 @@ class OtroSi(models.Model):
         super().save(*args, **kwargs)
 
 
+class ContratoEstadoVigente(models.Model):
+    """
+    Estado vigente desnormalizado de un contrato (efecto cadena ya resuelto).
+    Se reconstruye al aprobar, editar o eliminar Otro Sí / Renovaciones Automáticas
+    para poder filtrar y ordenar en SQL sin recalcular el efecto cadena.
+    """
+    contrato = models.OneToOneField(
+        Contrato,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estado_vigente',
+        verbose_name='Contrato'
+    )
+    fecha_referencia = models.DateField(
+        verbose_name='Fecha de Referencia',
+        help_text='Fecha para la cual se resolvió el efecto cadena'
+    )
+    vigente = models.BooleanField(default=False, verbose_name='Vigente')
+    
+    fecha_final_vigente = models.DateField(blank=True, null=True, verbose_name='Fecha Final Vigente')
+    origen_fecha_final = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Fecha Final')
+    
+    valor_canon = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True, verbose_name='Valor Canon Vigente')
+    origen_valor_canon = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Valor Canon')
+    canon_minimo_garantizado = models.DecimalField(max_digits=20, decimal_places=2, blank=True, null=True, verbose_name='Canon Mínimo Garantizado Vigente')
+    origen_canon_minimo_garantizado = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Canon Mínimo Garantizado')
+    porcentaje_ventas = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True, verbose_name='Porcentaje de Ventas Vigente (%)')
+    origen_porcentaje_ventas = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Porcentaje de Ventas')
+    modalidad_pago = models.CharField(max_length=30, blank=True, null=True, verbose_name='Modalidad de Pago Vigente')
+    origen_modalidad_pago = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Modalidad de Pago')
+    
+    tipo_condicion_ipc = models.CharField(max_length=20, blank=True, null=True, verbose_name='Tipo de Condición IPC Vigente')
+    origen_tipo_condicion_ipc = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Tipo de Condición IPC')
+    periodicidad_ipc = models.CharField(max_length=20, blank=True, null=True, verbose_name='Periodicidad Ajuste Vigente')
+    origen_periodicidad_ipc = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Periodicidad Ajuste')
+    fecha_aumento_ipc = models.DateField(blank=True, null=True, verbose_name='Fecha de Aumento IPC Vigente')
+    origen_fecha_aumento_ipc = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Fecha de Aumento IPC')
+
+    # Próximo ajuste IPC / Salario Mínimo resuelto como en las alertas (resolver_proximo_ajuste)
+    tipo_ajuste = models.CharField(max_length=20, blank=True, null=True, verbose_name='Tipo de Ajuste')
+    periodicidad_ajuste = models.CharField(max_length=20, blank=True, null=True, verbose_name='Periodicidad de Ajuste')
+    proxima_fecha_ajuste = models.DateField(blank=True, null=True, verbose_name='Próxima Fecha de Ajuste')
+    origen_proxima_fecha_ajuste = models.CharField(max_length=50, blank=True, null=True, verbose_name='Origen Próxima Fecha de Ajuste')
+    ajuste_calculado = models.BooleanField(
+        default=False,
+        verbose_name='Ajuste Calculado',
+        help_text='Ya existe un cálculo de la condición vigente para la próxima fecha de ajuste'
+    )
+    ajuste_vigente_hasta = models.DateField(
+        blank=True,
+        null=True,
+        verbose_name='Ajuste Vigente Hasta',
+        help_text='Último día en que el próximo ajuste se resuelve igual (ningún evento inicia ni termina antes)'
+    )
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+    
+    class Meta:
+        verbose_name = 'Estado Vigente de Contrato'
+        verbose_name_plural = 'Estados Vigentes de Contratos'
+        ordering = ['contrato']
+        indexes = [
+            models.Index(fields=['vigente', 'fecha_final_vigente']),
+            models.Index(fields=['fecha_aumento_ipc']),
+            models.Index(fields=['modalidad_pago']),
+            models.Index(fields=['tipo_ajuste', 'proxima_fecha_ajuste']),
+            # Estados al día para MotorAlertas: fecha_referencia = X OR ajuste_vigente_hasta >= X
+            models.Index(fields=['fecha_referencia']),
+            models.Index(fields=['ajuste_vigente_hasta']),
+        ]
+
+    def __str__(self):
+        return f"{self.contrato.num_contrato} - Estado vigente al {self.fecha_referencia}"
+
+
 class InformeVentas(models.Model):
     """
     Modelo para controlar los informes de ventas mensuales requeridos por contrato.
@@ -3034,10 +3128,17 @@ DIAS_SEMANA_CHOICES = [
     (6, 'Domingo'),
 ]
 
+# Tipos de correo registrados en el historial: alertas y notificaciones del sistema
+TIPO_ENVIO_EMAIL_CHOICES = TIPO_ALERTA_CHOICES + [
+    ('NOTIFICACION_BACKUP', 'Notificación de Backup'),
+]
+
 ESTADO_ENVIO_CHOICES = [
     ('PENDIENTE', 'Pendiente'),
+    ('EN_PROCESO', 'En Proceso'),
     ('ENVIADO', 'Enviado'),
     ('ERROR', 'Error'),
+    ('DESCARTADO', 'Descartado (sin más reintentos)'),
     ('CANCELADO', 'Cancelado'),
 ]
 
@@ -3261,10 +3362,15 @@ class DestinatarioAlerta(AuditoriaMixin):
 
 
 class HistorialEnvioEmail(AuditoriaMixin):
-    """Historial de envíos de correos de alertas"""
+    """
+    Historial de envíos de correos de alertas.
+    
+    También es la cola de salida: los registros PENDIENTE con contenido se envían con el
+    comando procesar_cola_email (ver gestion.services.cola_email).
+    """
     tipo_alerta = models.CharField(
         max_length=50,
-        choices=TIPO_ALERTA_CHOICES,
+        choices=TIPO_ENVIO_EMAIL_CHOICES,
         verbose_name='Tipo de Alerta'
     )
     destinatario = models.EmailField(
@@ -3296,6 +3402,27 @@ class HistorialEnvioEmail(AuditoriaMixin):
         verbose_name='Cantidad de Alertas',
         help_text='Cantidad de alertas incluidas en el correo'
     )
+    contenido_html = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Contenido HTML',
+        help_text='Cuerpo del correo en cola; se elimina una vez enviado'
+    )
+    contenido_texto = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Contenido en Texto Plano'
+    )
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos Fallidos'
+    )
+    proximo_intento = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Próximo Intento',
+        help_text='Fecha a partir de la cual el correo en cola puede enviarse'
+    )
     
     class Meta:
         verbose_name = 'Historial de Envío de Email'
@@ -3304,6 +3431,7 @@ class HistorialEnvioEmail(AuditoriaMixin):
         indexes = [
             models.Index(fields=['tipo_alerta', '-fecha_creacion']),
             models.Index(fields=['estado', '-fecha_creacion']),
+            models.Index(fields=['estado', 'proximo_intento']),
         ]
     
     def __str__(self):
@@ -3389,3 +3517,53 @@ class ClausulaContrato(AuditoriaMixin):
     def __str__(self):
         return f"{self.contrato.num_contrato} - {self.clausula.titulo}"
 
+
+
+class ExportJob(models.Model):
+    """
+    Exportación pesada ejecutada en segundo plano. El archivo resultante se conserva
+    en disco hasta expira_en y se descarga desde la página de estado del trabajo.
+    """
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En Proceso'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+        ('EXPIRADO', 'Expirado'),
+    ]
+
+    TIPO_CHOICES = [
+        ('CONTRATOS', 'Contratos'),
+        ('INFORMES_VENTAS', 'Informes de Ventas'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name='Tipo de Exportación')
+    parametros = models.JSONField(default=dict, blank=True, verbose_name='Parámetros')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE', verbose_name='Estado')
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')
+    total_filas = models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Filas')
+    ruta_archivo = models.CharField(max_length=500, blank=True, null=True, verbose_name='Ruta del Archivo')
+    nombre_archivo = models.CharField(max_length=255, blank=True, null=True, verbose_name='Nombre del Archivo')
+    mensaje_error = models.TextField(blank=True, null=True, verbose_name='Mensaje de Error')
+    solicitado_por = models.CharField(max_length=150, blank=True, null=True, verbose_name='Solicitado Por')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_inicio = models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')
+    fecha_fin = models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')
+    expira_en = models.DateTimeField(blank=True, null=True, verbose_name='Expira En')
+
+    class Meta:
+        verbose_name = 'Trabajo de Exportación'
+        verbose_name_plural = 'Trabajos de Exportación'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+            models.Index(fields=['expira_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} - {self.get_estado_display()}"
+
+    @property
+    def finalizado(self):
+        return self.estado in ('COMPLETADO', 'ERROR', 'EXPIRADO')
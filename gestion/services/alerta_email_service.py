@@ -2,47 +2,116 @@
 Servicio para envío de alertas por correo electrónico.
 """
 
+from contextlib import ExitStack
+from dataclasses import fields
 from datetime import date, datetime, time
 from typing import List, Optional, Dict, Any
+from django.db import models
 from django.utils import timezone
 from django.template.loader import render_to_string
 import logging
 
 from gestion.models import (
     ConfiguracionAlerta,
+    Contrato,
     DestinatarioAlerta,
     HistorialEnvioEmail,
+    Poliza,
     TIPO_ALERTA_CHOICES,
 )
+from gestion.services.cola_email import cola_email_activa, encolar_emails
 from gestion.services.email_service import EmailService
-from gestion.services.alertas import (
-    obtener_alertas_expiracion_contratos,
-    obtener_alertas_ipc,
-    obtener_alertas_salario_minimo,
-    obtener_polizas_criticas,
-    obtener_alertas_preaviso,
-    obtener_alertas_polizas_requeridas_no_aportadas,
-    obtener_alertas_terminacion_anticipada,
-    obtener_alertas_renovacion_automatica,
-)
+from gestion.services.alertas import MotorAlertas, TIPOS_ALERTA
 
 logger = logging.getLogger(__name__)
 
+# Relaciones del contrato que usan las plantillas de correo (tercero y local)
+_RELACIONES_CONTRATO_EMAIL = ('arrendatario', 'proveedor', 'local')
+
+
+def _contrato_de_alerta(alerta):
+    """(id, instancia ya cargada o None) del contrato de una alerta, sin consultar la base de datos"""
+    if isinstance(alerta, Contrato):
+        return alerta.pk, alerta
+    if isinstance(alerta, Poliza):
+        campo = Poliza._meta.get_field('contrato')
+        return alerta.contrato_id, alerta.contrato if campo.is_cached(alerta) else None
+    return alerta.contrato.pk, alerta.contrato
+
+
+def _precargar_contratos(alertas: List) -> Dict[int, Contrato]:
+    """
+    Contratos de las alertas con tercero y local cargados. Los que ya traen esas relaciones
+    (MotorAlertas usa select_related) se reutilizan; los demás se cargan en una sola consulta.
+    """
+    por_id = {}
+    faltantes = set()
+    for alerta in alertas:
+        contrato_id, contrato = _contrato_de_alerta(alerta)
+        if contrato is None:
+            faltantes.add(contrato_id)
+            continue
+        por_id[contrato_id] = contrato
+        for nombre in _RELACIONES_CONTRATO_EMAIL:
+            campo = Contrato._meta.get_field(nombre)
+            if getattr(contrato, campo.attname) is not None and not campo.is_cached(contrato):
+                faltantes.add(contrato_id)
+                break
+    if faltantes:
+        por_id.update(
+            Contrato.objects.select_related(*_RELACIONES_CONTRATO_EMAIL).in_bulk(list(faltantes))
+        )
+    return por_id
+
+
+def _datos_contrato(contrato: Contrato) -> Dict[str, Any]:
+    tercero = contrato.obtener_tercero()
+    return {
+        'num_contrato': contrato.num_contrato,
+        'tercero': tercero.razon_social if tercero else None,
+        'nombre_tercero': tercero.razon_social if tercero else 'Sin tercero asignado',
+        'local': contrato.local.nombre_comercial_stand if contrato.local_id else '',
+    }
+
+
+def serializar_alertas(alertas: List) -> List[Dict[str, Any]]:
+    """
+    Convierte las alertas (contratos, pólizas o dataclasses de MotorAlertas) en diccionarios
+    con todos los datos que usan las plantillas de correo. Las plantillas no acceden al ORM:
+    se renderizan una vez por tipo de alerta sin consultas adicionales.
+    """
+    contratos_por_id = _precargar_contratos(alertas)
+
+    serializadas = []
+    for alerta in alertas:
+        contrato_id, _ = _contrato_de_alerta(alerta)
+        datos = _datos_contrato(contratos_por_id[contrato_id])
+        if isinstance(alerta, Contrato):
+            datos.update(
+                fecha_final_actualizada=alerta.fecha_final_actualizada,
+                fecha_final_inicial=alerta.fecha_final_inicial,
+                descripcion=str(alerta),
+            )
+        elif isinstance(alerta, Poliza):
+            datos.update(
+                tipo_display=alerta.get_tipo_display(),
+                fecha_vencimiento=alerta.fecha_vencimiento,
+                descripcion=f"{alerta} - {datos['num_contrato']}",
+            )
+        else:
+            # Dataclasses de MotorAlertas: copiar los campos simples (no las instancias del ORM)
+            for campo in fields(alerta):
+                valor = getattr(alerta, campo.name)
+                if not isinstance(valor, models.Model):
+                    datos[campo.name] = valor
+            datos['descripcion'] = f"{datos['num_contrato']} - {datos['nombre_tercero']}"
+        serializadas.append(datos)
+    return serializadas
+
 
 class AlertaEmailService:
     """Servicio para envío de alertas por correo electrónico"""
     
-    MAPEO_FUNCIONES_ALERTA = {
-        'VENCIMIENTO_CONTRATOS': obtener_alertas_expiracion_contratos,
-        'ALERTAS_IPC': obtener_alertas_ipc,
-        'ALERTAS_SALARIO_MINIMO': obtener_alertas_salario_minimo,
-        'POLIZAS_CRITICAS': obtener_polizas_criticas,
-        'PREAVISO_RENOVACION': obtener_alertas_preaviso,
-        'POLIZAS_REQUERIDAS': obtener_alertas_polizas_requeridas_no_aportadas,
-        'TERMINACION_ANTICIPADA': obtener_alertas_terminacion_anticipada,
-        'RENOVACION_AUTOMATICA': obtener_alertas_renovacion_automatica,
-    }
-    
     MAPEO_NOMBRES_ALERTA = {
         'VENCIMIENTO_CONTRATOS': 'Vencimiento de Contratos',
         'ALERTAS_IPC': 'Alertas IPC',
@@ -61,7 +130,8 @@ class AlertaEmailService:
         self,
         tipo_alerta: str,
         fecha_referencia: Optional[date] = None,
-        solo_criticas: bool = False
+        solo_criticas: bool = False,
+        motor: Optional[MotorAlertas] = None
     ) -> List:
         """
         Obtiene las alertas según el tipo especificado.
@@ -70,17 +140,19 @@ class AlertaEmailService:
             tipo_alerta: Tipo de alerta a obtener
             fecha_referencia: Fecha de referencia para calcular alertas
             solo_criticas: Si es True, solo retorna alertas críticas
+            motor: MotorAlertas compartido (evita recargar contratos por cada tipo)
         
         Returns:
             Lista de alertas
         """
-        funcion = self.MAPEO_FUNCIONES_ALERTA.get(tipo_alerta)
-        if not funcion:
+        if tipo_alerta not in TIPOS_ALERTA:
             logger.warning(f"Tipo de alerta no reconocido: {tipo_alerta}")
             return []
         
         try:
-            alertas = funcion(fecha_referencia=fecha_referencia)
+            if motor is None:
+                motor = MotorAlertas(fecha_referencia)
+            alertas = list(motor.evaluar([tipo_alerta])[tipo_alerta])
             cantidad_inicial = len(alertas)
             logger.info(
                 f"Tipo {tipo_alerta}: Se obtuvieron {cantidad_inicial} alerta(s) inicial(es) "
@@ -151,7 +223,7 @@ class AlertaEmailService:
         contexto = {
             'tipo_alerta': tipo_alerta,
             'nombre_alerta': nombre_alerta,
-            'alertas': alertas,
+            'alertas': serializar_alertas(alertas),
             'cantidad': cantidad,
             'fecha_referencia': fecha_referencia or timezone.localtime(timezone.now()).date(),
             'fecha_actual': timezone.localtime(timezone.now()),
@@ -178,7 +250,8 @@ class AlertaEmailService:
         self,
         tipo_alerta: str,
         fecha_referencia: Optional[date] = None,
-        forzar_envio: bool = False
+        forzar_envio: bool = False,
+        motor: Optional[MotorAlertas] = None
     ) -> Dict[str, Any]:
         """
         Envía las alertas de un tipo específico por correo.
@@ -187,6 +260,7 @@ class AlertaEmailService:
             tipo_alerta: Tipo de alerta a enviar
             fecha_referencia: Fecha de referencia para calcular alertas
             forzar_envio: Si es True, envía aunque no sea el día programado
+            motor: MotorAlertas compartido entre varios tipos de alerta
         
         Returns:
             Diccionario con el resultado del envío
@@ -194,6 +268,7 @@ class AlertaEmailService:
         resultado = {
             'tipo_alerta': tipo_alerta,
             'enviado': False,
+            'encolado': False,
             'destinatarios': 0,
             'alertas_enviadas': 0,
             'errores': [],
@@ -218,7 +293,8 @@ class AlertaEmailService:
             alertas = self.obtener_alertas_por_tipo(
                 tipo_alerta=tipo_alerta,
                 fecha_referencia=fecha_ref,
-                solo_criticas=config.solo_criticas
+                solo_criticas=config.solo_criticas,
+                motor=motor
             )
             
             logger.info(f"Tipo {tipo_alerta}: Se obtuvieron {len(alertas)} alerta(s) después de filtros")
@@ -243,41 +319,55 @@ class AlertaEmailService:
             contenido = self.generar_contenido_email(tipo_alerta, alertas, fecha_ref)
             asunto = config.asunto or contenido['asunto']
             
-            emails_destinatarios = [d.email for d in destinatarios]
+            if cola_email_activa():
+                # Encolar es un INSERT: el envío y sus reintentos los hace la cola de correo
+                encolar_emails(
+                    tipo_alerta,
+                    [d.email for d in destinatarios],
+                    asunto,
+                    contenido_html=contenido['contenido_html'],
+                    cantidad_alertas=len(alertas),
+                )
+                resultado['enviado'] = True
+                resultado['encolado'] = True
+                resultado['destinatarios'] = len(destinatarios)
+                resultado['alertas_enviadas'] = len(alertas)
+                return resultado
             
-            for destinatario in destinatarios:
-                historial = HistorialEnvioEmail.objects.create(
+            # Un historial por destinatario, creado en bloque antes del envío
+            historiales = HistorialEnvioEmail.objects.bulk_create([
+                HistorialEnvioEmail(
                     tipo_alerta=tipo_alerta,
                     destinatario=destinatario.email,
                     asunto=asunto,
                     estado='PENDIENTE',
                     cantidad_alertas=len(alertas),
                 )
-                
-                try:
-                    exito = self.email_service.enviar_email(
-                        destinatarios=[destinatario.email],
-                        asunto=asunto,
-                        contenido_html=contenido['contenido_html'],
-                    )
-                    
-                    if exito:
-                        historial.estado = 'ENVIADO'
-                        historial.fecha_envio = timezone.now()
-                        historial.save()
-                        resultado['destinatarios'] += 1
-                    else:
-                        historial.estado = 'ERROR'
-                        historial.error_mensaje = "Error al enviar el correo"
-                        historial.save()
-                        resultado['errores'].append(f"Error al enviar a {destinatario.email}")
-                        
-                except Exception as e:
+                for destinatario in destinatarios
+            ])
+            
+            # Un mensaje por destinatario con el MIME codificado una vez, todos por la misma conexión
+            mensajes = self.email_service.construir_mensajes_individuales(
+                [destinatario.email for destinatario in destinatarios],
+                asunto,
+                contenido['contenido_html'],
+            )
+            errores_envio = self.email_service.enviar_mensajes(mensajes)
+            
+            ahora = timezone.now()
+            for historial, error in zip(historiales, errores_envio):
+                historial.fecha_modificacion = ahora
+                if error is None:
+                    historial.estado = 'ENVIADO'
+                    historial.fecha_envio = ahora
+                    resultado['destinatarios'] += 1
+                else:
                     historial.estado = 'ERROR'
-                    historial.error_mensaje = str(e)
-                    historial.save()
-                    resultado['errores'].append(f"Error al enviar a {destinatario.email}: {str(e)}")
-                    logger.error(f"Error al enviar alerta a {destinatario.email}: {str(e)}", exc_info=True)
+                    historial.error_mensaje = error or "Error al enviar el correo"
+                    resultado['errores'].append(f"Error al enviar a {historial.destinatario}: {error}")
+            HistorialEnvioEmail.objects.bulk_update(
+                historiales, ['estado', 'fecha_envio', 'error_mensaje', 'fecha_modificacion']
+            )
             
             if resultado['destinatarios'] > 0:
                 resultado['enviado'] = True
@@ -307,14 +397,33 @@ class AlertaEmailService:
         fecha_ref = fecha_referencia or timezone.now().date()
         resultados = []
         
-        configuraciones = ConfiguracionAlerta.objects.filter(activo=True)
+        configuraciones = [
+            config for config in ConfiguracionAlerta.objects.filter(activo=True)
+            if config.debe_enviar_hoy(fecha_ref)
+        ]
         
-        for config in configuraciones:
-            if config.debe_enviar_hoy(fecha_ref):
+        # Evaluar en una sola pasada todos los tipos que se envían hoy
+        motor = MotorAlertas(fecha_ref)
+        try:
+            motor.evaluar([config.tipo_alerta for config in configuraciones])
+        except Exception as e:
+            logger.error(f"Error al evaluar alertas programadas: {str(e)}", exc_info=True)
+        
+        # Una sola conexión SMTP para todos los tipos de alerta del envío
+        with ExitStack() as pila:
+            try:
+                pila.enter_context(self.email_service.sesion())
+            except ValueError as e:
+                # Sin contraseña utilizable no hay conexión compartida: cada tipo de alerta sigue
+                # su curso y enviar_mensajes registra el error en su resultado y en el historial
+                logger.error(f"No se pudo abrir la sesión SMTP de alertas programadas: {str(e)}")
+            
+            for config in configuraciones:
                 resultado = self.enviar_alertas_tipo(
                     tipo_alerta=config.tipo_alerta,
                     fecha_referencia=fecha_ref,
-                    forzar_envio=False
+                    forzar_envio=False,
+                    motor=motor
                 )
                 resultados.append(resultado)
         
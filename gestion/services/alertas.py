@@ -2,19 +2,24 @@
 Servicios relacionados con el cálculo y provisión de alertas.
 """
 
+import logging
 from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from django.db import models
 from django.db.models import QuerySet
 from django.utils import timezone
 
-from gestion.models import Contrato, MESES_CHOICES, Poliza, CalculoIPC, CalculoSalarioMinimo, obtener_nombre_tipo_condicion_ipc
+from gestion.models import Contrato, MESES_CHOICES, Poliza, TIPO_CONDICION_IPC_CHOICES
+from gestion.services.cache_solicitud import memoizar_por_solicitud
 from django.db.models import Q
 from gestion.utils_otrosi import get_ultimo_otrosi_que_modifico_campo_hasta_fecha
 from gestion.utils_ipc import obtener_contratos_pendientes_ajuste_ipc
+from gestion.utils_timeline import ContratoTimeline
+
+logger = logging.getLogger(__name__)
 
 _MESES_NUMEROS = {clave: indice + 1 for indice, (clave, _) in enumerate(MESES_CHOICES)}
 
@@ -85,13 +90,19 @@ class AlertaSalarioMinimo:
         return abs(self.meses_restantes)
 
 
-def _obtener_fecha_final_contrato(contrato: Contrato, fecha_referencia: date) -> Optional[date]:
+@memoizar_por_solicitud
+def _obtener_fecha_final_contrato(
+    contrato: Contrato,
+    fecha_referencia: date,
+    timeline: Optional[ContratoTimeline] = None,
+) -> Optional[date]:
     """
     Obtiene la fecha final actualizada de un contrato considerando Otrosí y Renovaciones Automáticas vigentes.
     
     Args:
         contrato: Contrato del cual obtener la fecha final.
         fecha_referencia: Fecha de referencia para evaluar eventos vigentes.
+        timeline: Línea de tiempo precargada del contrato (evita consultas por evento).
     
     Returns:
         Fecha final actualizada o None si no existe.
@@ -100,19 +111,22 @@ def _obtener_fecha_final_contrato(contrato: Contrato, fecha_referencia: date) ->
     from gestion.utils_otrosi import get_otrosi_vigente
     
     # Primero verificar si hay una Renovación Automática vigente (tiene prioridad)
-    renovacion_vigente = RenovacionAutomatica.objects.filter(
-        contrato=contrato,
-        estado='APROBADO',
-        effective_from__lte=fecha_referencia
-    ).filter(
-        Q(effective_to__gte=fecha_referencia) | Q(effective_to__isnull=True)
-    ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
+    if timeline is not None:
+        renovacion_vigente = timeline.renovacion_hasta_fecha(fecha_referencia, solo_vigentes=True)
+    else:
+        renovacion_vigente = RenovacionAutomatica.objects.filter(
+            contrato=contrato,
+            estado='APROBADO',
+            effective_from__lte=fecha_referencia
+        ).filter(
+            Q(effective_to__gte=fecha_referencia) | Q(effective_to__isnull=True)
+        ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
     
     if renovacion_vigente and renovacion_vigente.nueva_fecha_final_actualizada:
         return renovacion_vigente.nueva_fecha_final_actualizada
     
     # Si no hay renovación vigente, verificar Otro Sí vigente
-    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_referencia)
+    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_referencia, timeline=timeline)
     
     if otrosi_vigente_actual:
         # Si tiene effective_to, esa es la fecha final vigente
@@ -124,7 +138,7 @@ def _obtener_fecha_final_contrato(contrato: Contrato, fecha_referencia: date) ->
     
     # Si no hay Otro Sí vigente, usar efecto cadena para obtener fecha final vigente hasta fecha_referencia
     otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nueva_fecha_final_actualizada', fecha_referencia
+        contrato, 'nueva_fecha_final_actualizada', fecha_referencia, timeline=timeline
     )
     if otrosi_modificador and otrosi_modificador.nueva_fecha_final_actualizada:
         return otrosi_modificador.nueva_fecha_final_actualizada
@@ -133,6 +147,836 @@ def _obtener_fecha_final_contrato(contrato: Contrato, fecha_referencia: date) ->
     return contrato.fecha_final_actualizada or contrato.fecha_final_inicial
 
 
+@dataclass(frozen=True)
+class AlertaPolizaRequerida:
+    contrato: Contrato
+    tipo_poliza: str
+    nombre_poliza: str
+    valor_requerido: Optional[Decimal]
+    fecha_fin_requerida: Optional[date]
+    tiene_poliza: bool
+    poliza_vigente: Optional[Poliza]
+    otrosi_modificador: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AlertaTerminacionAnticipada:
+    contrato: Contrato
+    fecha_final_actualizada: date
+    dias_restantes: int
+    dias_terminacion_anticipada: int
+    fecha_limite_terminacion: date
+    otrosi_modificador: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AlertaRenovacionAutomatica:
+    contrato: Contrato
+    fecha_final_actualizada: date
+    dias_restantes: int
+    duracion_inicial_meses: int
+    otrosi_modificador: Optional[str] = None
+
+
+TIPOS_ALERTA = (
+    'VENCIMIENTO_CONTRATOS',
+    'ALERTAS_IPC',
+    'ALERTAS_SALARIO_MINIMO',
+    'POLIZAS_CRITICAS',
+    'PREAVISO_RENOVACION',
+    'POLIZAS_REQUERIDAS',
+    'TERMINACION_ANTICIPADA',
+    'RENOVACION_AUTOMATICA',
+)
+
+# Campo de exigencia de cada tipo de póliza: (campo en OtroSi, campo en Contrato)
+_CAMPOS_EXIGENCIA_POLIZA = {
+    'RCE - Responsabilidad Civil': ('nuevo_exige_poliza_rce', 'exige_poliza_rce'),
+    'Cumplimiento': ('nuevo_exige_poliza_cumplimiento', 'exige_poliza_cumplimiento'),
+    'Poliza de Arrendamiento': ('nuevo_exige_poliza_arrendamiento', 'exige_poliza_arrendamiento'),
+    'Arrendamiento': ('nuevo_exige_poliza_todo_riesgo', 'exige_poliza_todo_riesgo'),
+    'Otra': ('nuevo_exige_poliza_otra_1', 'exige_poliza_otra_1'),
+}
+
+# Reglas de ajuste: tipo de alerta -> (condición, periodicidades, ventana en días)
+_REGLAS_AJUSTE = {
+    'ALERTAS_IPC': ('IPC', ('ANUAL', 'FECHA_ESPECIFICA'), 90),
+    # Ventana de 365 días para alertas de salario mínimo anual
+    'ALERTAS_SALARIO_MINIMO': ('SALARIO_MINIMO', ('ANUAL',), 365),
+}
+
+
+def _orden_color_alerta(color_alerta: str) -> int:
+    if color_alerta == 'danger':
+        return 0
+    if color_alerta == 'warning':
+        return 1
+    return 2
+
+
+def _color_alerta_ajuste(dias_restantes: int) -> str:
+    # Si la fecha ya pasó (dias_restantes negativo), mostrar como crítica
+    if dias_restantes <= 7:
+        return 'danger'
+    if dias_restantes <= 30:
+        return 'warning'
+    return 'success'
+
+
+def _identificador_documento(documento) -> Optional[str]:
+    if hasattr(documento, 'numero_otrosi'):
+        return documento.numero_otrosi
+    if hasattr(documento, 'numero_renovacion'):
+        return documento.numero_renovacion
+    return None
+
+
+def _polizas_de_tipo(polizas, tipo_poliza: str, otrosi_id=None, renovacion_id=None, solo_contrato_base=False):
+    """
+    Filtra en memoria las pólizas precargadas de un contrato (equivalente a
+    contrato.polizas.filter(..., tipo__iexact=tipo_poliza) conservando el orden).
+    """
+    tipo_normalizado = (tipo_poliza or '').lower()
+    resultado = []
+    for poliza in polizas:
+        if (poliza.tipo or '').lower() != tipo_normalizado:
+            continue
+        if solo_contrato_base and (poliza.otrosi_id is not None or poliza.renovacion_automatica_id is not None):
+            continue
+        if otrosi_id is not None and poliza.otrosi_id != otrosi_id:
+            continue
+        if renovacion_id is not None and poliza.renovacion_automatica_id != renovacion_id:
+            continue
+        resultado.append(poliza)
+    return resultado
+
+
+def _buscar_poliza_vigente(polizas, fecha_base: date, fecha_fin_requerida: Optional[date]) -> Optional[Poliza]:
+    """
+    Primera póliza vigente (por fecha efectiva) que cubre la fecha fin requerida.
+    Si la fecha efectiva no la cubre, se acepta la fecha con colchón.
+    """
+    for poliza_candidata in polizas:
+        try:
+            fecha_vencimiento_efectiva = poliza_candidata.obtener_fecha_vencimiento_efectiva(fecha_base)
+            if fecha_vencimiento_efectiva < fecha_base:
+                continue
+            if not fecha_fin_requerida:
+                return poliza_candidata
+            if fecha_vencimiento_efectiva >= fecha_fin_requerida:
+                return poliza_candidata
+            if poliza_candidata.tiene_colchon and poliza_candidata.fecha_vencimiento:
+                if poliza_candidata.fecha_vencimiento >= fecha_fin_requerida:
+                    return poliza_candidata
+        except Exception:
+            # Si hay error al obtener fecha efectiva, continuar con la siguiente póliza
+            continue
+    return None
+
+
+def _buscar_otrosi_por_numero(otrosis, numero: str, comparar_normalizado: bool = False):
+    """
+    Busca en memoria un Otro Sí del contrato por su número: primero exacto (sin distinguir
+    mayúsculas), luego por contenido y, opcionalmente, ignorando espacios y guiones.
+    """
+    numero_minusculas = numero.lower()
+    for otrosi in otrosis:
+        if (otrosi.numero_otrosi or '').lower() == numero_minusculas:
+            return otrosi
+    for otrosi in otrosis:
+        if numero_minusculas in (otrosi.numero_otrosi or '').lower():
+            return otrosi
+    if comparar_normalizado:
+        numero_sin_espacios = numero.replace(' ', '').replace('-', '').upper()
+        for otrosi in otrosis:
+            if str(otrosi.numero_otrosi).replace(' ', '').replace('-', '').upper() == numero_sin_espacios:
+                return otrosi
+    return None
+
+
+class MotorAlertas:
+    """
+    Evalúa todas las reglas de alertas en una sola pasada.
+
+    Carga una vez los contratos vigentes con sus Otro Sí, Renovaciones Automáticas,
+    pólizas y cálculos IPC/Salario Mínimo, construye la línea de tiempo de cada contrato
+    y resuelve su fecha final vigente una sola vez para todas las reglas.
+
+    Uso:
+        motor = MotorAlertas(fecha_referencia)
+        alertas = motor.evaluar()  # {tipo_alerta: [alertas]}
+        alertas_ipc = motor.evaluar(['ALERTAS_IPC'])['ALERTAS_IPC']
+    """
+
+    def __init__(
+        self,
+        fecha_referencia: Optional[date] = None,
+        tipo_contrato_cp: Optional[str] = None,
+        ventana_vencimiento: int = 90,
+        ventana_polizas_criticas: int = 60,
+        ventana_preaviso: int = 60,
+        ventana_renovacion: int = 30,
+    ):
+        self.fecha_base = fecha_referencia or timezone.now().date()
+        # Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR). No aplica a
+        # RENOVACION_AUTOMATICA, que siempre considera todos los contratos.
+        self.tipo_contrato_cp = tipo_contrato_cp
+        self.ventana_vencimiento = ventana_vencimiento
+        self.ventana_polizas_criticas = ventana_polizas_criticas
+        self.ventana_preaviso = ventana_preaviso
+        self.ventana_renovacion = ventana_renovacion
+
+        self._contratos: Optional[List[Contrato]] = None
+        self._contratos_solo_tipo = False
+        self._contratos_por_id: Dict[int, Contrato] = {}
+        self._timelines: Dict[int, ContratoTimeline] = {}
+        self._fechas_finales: Dict[int, Optional[date]] = {}
+        self._polizas_requeridas: Dict[int, dict] = {}
+        self._con_polizas = False
+        self._fechas_calculos_ipc: Optional[Dict[int, set]] = None
+        self._fechas_calculos_sm: Optional[Dict[int, set]] = None
+        self._nombres_condicion: Optional[Dict[str, str]] = None
+        self._resultados: Dict[str, list] = {}
+
+    # ------------------------------------------------------------------
+    # Carga de datos
+    # ------------------------------------------------------------------
+
+    def _consulta_contratos(self, con_polizas: bool):
+        prefetch = ['otrosi', 'renovaciones_automaticas']
+        if con_polizas:
+            prefetch.append('polizas')
+        return Contrato.objects.select_related(
+            'arrendatario', 'proveedor', 'local', 'tipo_servicio'
+        ).prefetch_related(*prefetch)
+
+    def _registrar_contratos(self, contratos: Iterable[Contrato]):
+        contratos = [contrato for contrato in contratos if contrato.pk not in self._contratos_por_id]
+        for contrato in contratos:
+            self._contratos_por_id[contrato.pk] = contrato
+        self._timelines.update(ContratoTimeline.para_contratos(contratos))
+
+    def _cargar_contratos(self, tipos: Iterable[str]):
+        # El filtro por tipo de contrato se aplica por regla porque RENOVACION_AUTOMATICA no lo
+        # usa; si no se evalúa, el filtro va en la consulta y solo se cargan los de ese tipo
+        solo_tipo = bool(self.tipo_contrato_cp) and 'RENOVACION_AUTOMATICA' not in tipos
+        if self._contratos is not None:
+            if self._contratos_solo_tipo and not solo_tipo:
+                # Evaluaciones posteriores del mismo motor reutilizan la carga: se completa con el otro tipo
+                restantes = list(
+                    self._consulta_contratos(self._con_polizas).filter(vigente=True).exclude(
+                        tipo_contrato_cliente_proveedor=self.tipo_contrato_cp
+                    )
+                )
+                self._contratos.extend(restantes)
+                self._registrar_contratos(restantes)
+                self._contratos_solo_tipo = False
+            return
+        self._con_polizas = 'POLIZAS_REQUERIDAS' in tipos or 'POLIZAS_CRITICAS' in tipos
+        filtro = Q(vigente=True)
+        if 'POLIZAS_CRITICAS' in tipos:
+            # Las pólizas críticas pueden pertenecer a contratos no marcados como vigentes:
+            # se cargan en la misma consulta (con sus prefetch) y solo se registran
+            filtro |= Q(pk__in=self._consulta_polizas_candidatas().values('contrato_id'))
+        consulta = self._consulta_contratos(self._con_polizas).filter(filtro)
+        if solo_tipo:
+            consulta = consulta.filter(tipo_contrato_cliente_proveedor=self.tipo_contrato_cp)
+        contratos = list(consulta)
+        self._contratos = [contrato for contrato in contratos if contrato.vigente]
+        self._contratos_solo_tipo = solo_tipo
+        self._registrar_contratos(contratos)
+
+    def _cargar_calculos(self, contratos: List[Contrato]):
+        from gestion.utils_ipc import obtener_fechas_calculos_por_contrato
+
+        if self._fechas_calculos_ipc is None:
+            self._fechas_calculos_ipc, self._fechas_calculos_sm = obtener_fechas_calculos_por_contrato(
+                [contrato.pk for contrato in contratos]
+            )
+
+    def _estados_ajuste_al_dia(self):
+        """
+        ContratoEstadoVigente cuyo próximo ajuste sigue vigente en la fecha base: resueltos
+        en la fecha base, o antes y sin eventos que inicien o terminen hasta ella.
+        """
+        from gestion.models import ContratoEstadoVigente
+
+        return ContratoEstadoVigente.objects.filter(
+            Q(fecha_referencia=self.fecha_base)
+            | Q(fecha_referencia__lt=self.fecha_base, ajuste_vigente_hasta__gte=self.fecha_base)
+        )
+
+    def _contratos_sin_estado_al_dia(self) -> List[Contrato]:
+        """
+        Contratos vigentes sin ContratoEstadoVigente al día para la fecha base
+        (nunca construido o desactualizado por eventos); sus ajustes se evalúan en línea.
+        """
+        sin_estado = Contrato.objects.filter(vigente=True).exclude(
+            pk__in=self._estados_ajuste_al_dia().values('contrato_id')
+        )
+        if self._contratos is not None:
+            ids = set(sin_estado.values_list('pk', flat=True))
+            return [contrato for contrato in self._contratos if contrato.pk in ids]
+
+        contratos = list(self._consulta_contratos(False).filter(pk__in=sin_estado.values('pk')))
+        self._registrar_contratos(contratos)
+        return contratos
+
+    # ------------------------------------------------------------------
+    # Datos por contrato (calculados una sola vez)
+    # ------------------------------------------------------------------
+
+    def timeline(self, contrato: Contrato) -> ContratoTimeline:
+        """Línea de tiempo del contrato (la construye si el contrato no fue precargado)."""
+        timeline = self._timelines.get(contrato.pk)
+        if timeline is None:
+            timeline = ContratoTimeline.para_contrato(contrato)
+            self._timelines[contrato.pk] = timeline
+        return timeline
+
+    def _fecha_final(self, contrato: Contrato) -> Optional[date]:
+        if contrato.pk not in self._fechas_finales:
+            self._fechas_finales[contrato.pk] = _obtener_fecha_final_contrato(
+                contrato, self.fecha_base, timeline=self.timeline(contrato)
+            )
+        return self._fechas_finales[contrato.pk]
+
+    def _obtener_polizas_requeridas(self, contrato: Contrato) -> dict:
+        from gestion.utils_otrosi import get_polizas_requeridas_contrato
+
+        if contrato.pk not in self._polizas_requeridas:
+            self._polizas_requeridas[contrato.pk] = get_polizas_requeridas_contrato(
+                contrato, self.fecha_base, timeline=self.timeline(contrato)
+            )
+        return self._polizas_requeridas[contrato.pk]
+
+    def _polizas_contrato(self, contrato: Contrato) -> list:
+        return list(contrato.polizas.all())
+
+    def _otrosis_contrato(self, contrato: Contrato) -> list:
+        return list(contrato.otrosi.all())
+
+    def _nombre_condicion(self, codigo: str) -> str:
+        if self._nombres_condicion is None:
+            # Todos los tipos activos en una consulta (IPC y Salario Mínimo se usan juntos)
+            from gestion.models import TipoCondicionIPC
+
+            self._nombres_condicion = dict(
+                TipoCondicionIPC.objects.filter(activo=True).values_list('codigo', 'nombre')
+            )
+        if codigo not in self._nombres_condicion:
+            # Mismo respaldo que obtener_nombre_tipo_condicion_ipc para códigos no activos
+            self._nombres_condicion[codigo] = dict(TIPO_CONDICION_IPC_CHOICES).get(codigo, codigo)
+        return self._nombres_condicion[codigo]
+
+    def _modificador(self, contrato: Contrato, campo: str):
+        return get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
+            contrato, campo, self.fecha_base, timeline=self.timeline(contrato)
+        )
+
+    def _contrato_vigente_por_fechas(self, contrato: Contrato) -> bool:
+        """El contrato ya inició y su fecha final vigente no ha pasado."""
+        fecha_final = self._fecha_final(contrato)
+        fecha_inicial = contrato.fecha_inicial_contrato
+        if fecha_inicial and fecha_inicial > self.fecha_base:
+            return False
+        if fecha_final and fecha_final < self.fecha_base:
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Evaluación
+    # ------------------------------------------------------------------
+
+    def evaluar(self, tipos: Optional[Iterable[str]] = None) -> Dict[str, list]:
+        """
+        Evalúa los tipos de alerta indicados (por defecto todos) en una sola pasada.
+
+        Returns:
+            dict {tipo_alerta: lista ordenada de alertas}
+        """
+        tipos = list(tipos) if tipos is not None else list(TIPOS_ALERTA)
+        pendientes = [tipo for tipo in tipos if tipo in TIPOS_ALERTA and tipo not in self._resultados]
+
+        if pendientes:
+            self._evaluar_pendientes(pendientes)
+
+        return {tipo: self._resultados.get(tipo, []) for tipo in tipos}
+
+    def _evaluar_pendientes(self, tipos: List[str]):
+        reglas_contrato = {
+            'VENCIMIENTO_CONTRATOS': self._regla_vencimiento,
+            'PREAVISO_RENOVACION': self._regla_preaviso,
+            'POLIZAS_REQUERIDAS': self._regla_polizas_requeridas,
+            'TERMINACION_ANTICIPADA': self._regla_terminacion_anticipada,
+            'RENOVACION_AUTOMATICA': self._regla_renovacion_automatica,
+        }
+        reglas = [(tipo, reglas_contrato[tipo]) for tipo in tipos if tipo in reglas_contrato]
+        acumulados = {tipo: [] for tipo in tipos}
+
+        if reglas or 'POLIZAS_CRITICAS' in tipos:
+            self._cargar_contratos(tipos)
+
+        tipos_ajuste = [tipo for tipo in tipos if tipo in _REGLAS_AJUSTE]
+        if tipos_ajuste:
+            self._evaluar_ajustes(tipos_ajuste, acumulados)
+
+        for contrato in self._contratos or []:
+            coincide_tipo = (
+                not self.tipo_contrato_cp
+                or contrato.tipo_contrato_cliente_proveedor == self.tipo_contrato_cp
+            )
+            for tipo, regla in reglas:
+                if tipo == 'RENOVACION_AUTOMATICA':
+                    if not contrato.prorroga_automatica:
+                        continue
+                elif not coincide_tipo:
+                    continue
+                try:
+                    regla(contrato, acumulados[tipo])
+                except Exception:
+                    # Un error en un contrato no debe impedir evaluar los demás
+                    logger.debug(
+                        'Error evaluando la alerta %s del contrato %s', tipo, contrato.num_contrato,
+                        exc_info=True,
+                    )
+
+        if 'POLIZAS_CRITICAS' in tipos:
+            acumulados['POLIZAS_CRITICAS'] = self._evaluar_polizas_criticas()
+
+        ordenamientos = {
+            'VENCIMIENTO_CONTRATOS': lambda alertas: [
+                contrato for contrato, _ in sorted(alertas, key=lambda x: (x[1], x[0].num_contrato))
+            ],
+            'PREAVISO_RENOVACION': lambda alertas: [
+                contrato for contrato, _ in sorted(alertas, key=lambda x: (x[1], x[0].num_contrato))
+            ],
+            'ALERTAS_IPC': lambda alertas: sorted(alertas, key=lambda alerta: (
+                _orden_color_alerta(alerta.color_alerta), alerta.meses_restantes, alerta.contrato.num_contrato,
+            )),
+            'ALERTAS_SALARIO_MINIMO': lambda alertas: sorted(alertas, key=lambda alerta: (
+                _orden_color_alerta(alerta.color_alerta), alerta.meses_restantes, alerta.contrato.num_contrato,
+            )),
+            'POLIZAS_REQUERIDAS': lambda alertas: sorted(alertas, key=lambda alerta: (
+                alerta.contrato.num_contrato, alerta.tipo_poliza,
+            )),
+            'TERMINACION_ANTICIPADA': lambda alertas: sorted(alertas, key=lambda alerta: (
+                alerta.dias_restantes, alerta.contrato.num_contrato,
+            )),
+            'RENOVACION_AUTOMATICA': lambda alertas: sorted(alertas, key=lambda alerta: (
+                alerta.dias_restantes, alerta.contrato.num_contrato,
+            )),
+        }
+        for tipo in tipos:
+            ordenar = ordenamientos.get(tipo)
+            self._resultados[tipo] = ordenar(acumulados[tipo]) if ordenar else acumulados[tipo]
+
+    # ------------------------------------------------------------------
+    # Reglas por contrato
+    # ------------------------------------------------------------------
+
+    def _regla_vencimiento(self, contrato: Contrato, alertas: list):
+        fecha_final_actual = self._fecha_final(contrato)
+        fecha_limite = self.fecha_base + timedelta(days=self.ventana_vencimiento)
+        if fecha_final_actual and self.fecha_base <= fecha_final_actual <= fecha_limite:
+            alertas.append((contrato, fecha_final_actual))
+
+    def _regla_preaviso(self, contrato: Contrato, alertas: list):
+        fecha_final_actual = self._fecha_final(contrato)
+        fecha_limite = self.fecha_base + timedelta(days=self.ventana_preaviso)
+        # Usar prórroga automática del contrato (no existe campo en OtroSi para esto)
+        if fecha_final_actual and fecha_final_actual <= fecha_limite and not contrato.prorroga_automatica:
+            alertas.append((contrato, fecha_final_actual))
+
+    def _evaluar_ajustes(self, tipos: List[str], acumulados: Dict[str, list]):
+        """
+        Alertas de IPC / Salario Mínimo.
+
+        Los contratos con ContratoEstadoVigente al día se resuelven con una consulta por
+        rango sobre proxima_fecha_ajuste; los demás se evalúan en línea con el efecto cadena.
+        """
+        # Una sola consulta para todos los tipos; cada estado se asigna al tipo de su condición
+        tipo_por_condicion = {}
+        filtro_rango = Q(pk__in=[])
+        for tipo in tipos:
+            condicion, periodicidades, ventana_dias = _REGLAS_AJUSTE[tipo]
+            tipo_por_condicion[condicion] = tipo
+            filtro_rango |= Q(
+                tipo_ajuste=condicion,
+                periodicidad_ajuste__in=periodicidades,
+                proxima_fecha_ajuste__lte=self.fecha_base + timedelta(days=ventana_dias),
+            )
+        estados = self._estados_ajuste_al_dia().select_related(
+            'contrato__arrendatario', 'contrato__proveedor', 'contrato__local', 'contrato__tipo_servicio'
+        ).filter(filtro_rango, contrato__vigente=True, ajuste_calculado=False)
+        if self.tipo_contrato_cp:
+            estados = estados.filter(contrato__tipo_contrato_cliente_proveedor=self.tipo_contrato_cp)
+        for estado in estados:
+            tipo = tipo_por_condicion[estado.tipo_ajuste]
+            # Reutilizar la instancia ya cargada (con sus prefetch) si existe
+            contrato = self._contratos_por_id.get(estado.contrato_id, estado.contrato)
+            acumulados[tipo].append(self._alerta_ajuste(
+                tipo, contrato, estado.proxima_fecha_ajuste, estado.tipo_ajuste, estado.origen_proxima_fecha_ajuste
+            ))
+
+        pendientes = self._contratos_sin_estado_al_dia()
+        if not pendientes:
+            return
+        self._cargar_calculos(pendientes)
+        for contrato in pendientes:
+            if self.tipo_contrato_cp and contrato.tipo_contrato_cliente_proveedor != self.tipo_contrato_cp:
+                continue
+            for tipo in tipos:
+                try:
+                    alerta = self._datos_ajuste(contrato, tipo)
+                    if alerta is not None:
+                        acumulados[tipo].append(alerta)
+                except Exception:
+                    # Un error en un contrato no debe impedir evaluar los demás
+                    logger.debug(
+                        'Error evaluando la alerta %s del contrato %s', tipo, contrato.num_contrato,
+                        exc_info=True,
+                    )
+
+    def _datos_ajuste(self, contrato: Contrato, tipo: str):
+        """
+        Evalúa en línea la regla común de IPC / Salario Mínimo.
+
+        Returns:
+            None si no aplica alerta, o la AlertaIPC / AlertaSalarioMinimo
+        """
+        from gestion.utils_ipc import resolver_proximo_ajuste
+
+        condicion, periodicidades, ventana_dias = _REGLAS_AJUSTE[tipo]
+        ajuste = resolver_proximo_ajuste(
+            contrato,
+            self.fecha_base,
+            timeline=self.timeline(contrato),
+            fechas_calculos_ipc=self._fechas_calculos_ipc.get(contrato.pk, set()),
+            fechas_calculos_sm=self._fechas_calculos_sm.get(contrato.pk, set()),
+        )
+
+        if ajuste['tipo_condicion_ipc'] != condicion or ajuste['periodicidad_ipc'] not in periodicidades:
+            return None
+
+        fecha_aumento = ajuste['proxima_fecha_ajuste']
+        # Si ya tiene cálculo para esta fecha exacta, no mostrar la alerta
+        if not fecha_aumento or ajuste['ajuste_calculado']:
+            return None
+
+        # Mostrar si la fecha ya pasó o está dentro de la ventana en el futuro
+        if (fecha_aumento - self.fecha_base).days > ventana_dias:
+            return None
+
+        return self._alerta_ajuste(tipo, contrato, fecha_aumento, ajuste['tipo_condicion_ipc'], ajuste['origen'])
+
+    def _alerta_ajuste(self, tipo: str, contrato: Contrato, fecha_aumento: date, tipo_condicion_ipc: str, otrosi_modificador):
+        dias_restantes = (fecha_aumento - self.fecha_base).days
+        # Convertir días a meses usando estándar de 30 días por mes
+        meses_restantes = round(dias_restantes / 30)
+        color_alerta = _color_alerta_ajuste(dias_restantes)
+        fecha_ajuste_display = fecha_aumento.strftime('%d/%m/%Y')
+        condicion_display = self._nombre_condicion(tipo_condicion_ipc) if tipo_condicion_ipc else None
+
+        if tipo == 'ALERTAS_IPC':
+            return AlertaIPC(
+                contrato=contrato,
+                meses_restantes=meses_restantes,
+                color_alerta=color_alerta,
+                mes_ajuste=fecha_ajuste_display,
+                condicion_ipc=condicion_display,
+                otrosi_modificador=otrosi_modificador,
+            )
+        return AlertaSalarioMinimo(
+            contrato=contrato,
+            meses_restantes=meses_restantes,
+            color_alerta=color_alerta,
+            mes_ajuste=fecha_ajuste_display,
+            condicion_salario_minimo=condicion_display,
+            otrosi_modificador=otrosi_modificador,
+        )
+
+    def _requisito_es_del_documento_vigente(self, contrato, documento_vigente, identificador_documento_vigente, otrosi_modificador) -> bool:
+        if not documento_vigente or otrosi_modificador is None:
+            return False
+
+        otrosi_modificador_str = str(otrosi_modificador).strip()
+        if identificador_documento_vigente:
+            identificador_str = str(identificador_documento_vigente).strip()
+            otrosi_mod_normalizado = otrosi_modificador_str.replace(' ', '').replace('-', '').upper()
+            identificador_normalizado = identificador_str.replace(' ', '').replace('-', '').upper()
+            if otrosi_mod_normalizado == identificador_normalizado:
+                return True
+            if otrosi_modificador_str.upper() == identificador_str.upper():
+                return True
+
+        # Si la comparación por string no funcionó, comparar por ID del Otro Sí
+        otrosi_modificador_obj = _buscar_otrosi_por_numero(self._otrosis_contrato(contrato), otrosi_modificador_str)
+        return bool(
+            otrosi_modificador_obj
+            and hasattr(documento_vigente, 'id')
+            and otrosi_modificador_obj.id == documento_vigente.id
+        )
+
+    def _regla_polizas_requeridas(self, contrato: Contrato, alertas: list):
+        from gestion.utils_otrosi import get_otrosi_vigente
+
+        if not self._contrato_vigente_por_fechas(contrato):
+            return
+
+        timeline = self.timeline(contrato)
+        documento_vigente = get_otrosi_vigente(contrato, self.fecha_base, timeline=timeline)
+
+        # Obtener pólizas requeridas aplicando efecto cadena
+        polizas_requeridas = self._obtener_polizas_requeridas(contrato)
+        if not polizas_requeridas:
+            return
+
+        identificador_documento_vigente = None
+        if documento_vigente:
+            identificador = _identificador_documento(documento_vigente)
+            identificador_documento_vigente = str(identificador) if identificador is not None else None
+
+        # Separar requisitos del documento vigente vs contrato base
+        requisitos_del_documento_vigente = {}
+        requisitos_del_contrato_base = {}
+        for tipo_poliza, requisitos in polizas_requeridas.items():
+            if self._requisito_es_del_documento_vigente(
+                contrato, documento_vigente, identificador_documento_vigente, requisitos.get('otrosi_modificador')
+            ):
+                requisitos_del_documento_vigente[tipo_poliza] = requisitos
+            else:
+                requisitos_del_contrato_base[tipo_poliza] = requisitos
+
+        polizas_contrato = self._polizas_contrato(contrato)
+
+        # Requisitos del documento vigente: solo cuentan las pólizas asociadas a ese documento
+        for tipo_poliza, requisitos in requisitos_del_documento_vigente.items():
+            if hasattr(documento_vigente, 'numero_otrosi'):
+                polizas_tipo = _polizas_de_tipo(polizas_contrato, tipo_poliza, otrosi_id=documento_vigente.id)
+            elif hasattr(documento_vigente, 'numero_renovacion'):
+                polizas_tipo = _polizas_de_tipo(polizas_contrato, tipo_poliza, renovacion_id=documento_vigente.id)
+            else:
+                polizas_tipo = []
+
+            fecha_fin_requerida = requisitos.get('fecha_fin_requerida')
+            if _buscar_poliza_vigente(polizas_tipo, self.fecha_base, fecha_fin_requerida) is None:
+                alertas.append(
+                    AlertaPolizaRequerida(
+                        contrato=contrato,
+                        tipo_poliza=tipo_poliza,
+                        nombre_poliza=requisitos.get('nombre', tipo_poliza),
+                        valor_requerido=requisitos.get('valor_requerido'),
+                        fecha_fin_requerida=fecha_fin_requerida,
+                        tiene_poliza=False,
+                        poliza_vigente=None,
+                        otrosi_modificador=identificador_documento_vigente,
+                    )
+                )
+
+        # Requisitos del contrato base (o de un Otro Sí que ya no es el documento vigente)
+        for tipo_poliza, requisitos in requisitos_del_contrato_base.items():
+            fecha_fin_requerida = requisitos.get('fecha_fin_requerida')
+            otrosi_modificador = requisitos.get('otrosi_modificador')
+
+            # Verificar que el contrato realmente exige esta póliza usando efecto cadena
+            campo_exigencia_info = _CAMPOS_EXIGENCIA_POLIZA.get(tipo_poliza)
+            if campo_exigencia_info:
+                campo_otrosi, campo_contrato = campo_exigencia_info
+                otrosi_exigencia = self._modificador(contrato, campo_otrosi)
+                if otrosi_exigencia:
+                    exige_poliza = bool(getattr(otrosi_exigencia, campo_otrosi, False))
+                else:
+                    exige_poliza = bool(getattr(contrato, campo_contrato, False))
+                if not exige_poliza:
+                    continue
+
+            # Si el requisito tiene un otrosi_modificador, buscar pólizas de ese Otro Sí específico;
+            # si no, buscar pólizas del contrato base
+            if otrosi_modificador:
+                otrosi_requisito = _buscar_otrosi_por_numero(
+                    self._otrosis_contrato(contrato), str(otrosi_modificador).strip(), comparar_normalizado=True
+                )
+                if otrosi_requisito:
+                    polizas_tipo = _polizas_de_tipo(polizas_contrato, tipo_poliza, otrosi_id=otrosi_requisito.id)
+                else:
+                    polizas_tipo = []
+            else:
+                polizas_tipo = _polizas_de_tipo(polizas_contrato, tipo_poliza, solo_contrato_base=True)
+
+            if _buscar_poliza_vigente(polizas_tipo, self.fecha_base, fecha_fin_requerida) is not None:
+                continue
+
+            # Determinar qué Otrosí modificó la exigencia de esta póliza
+            otrosi_modificador_numero = None
+            if campo_exigencia_info:
+                otrosi_modificador_numero = obtener_numero_evento(
+                    self._modificador(contrato, campo_exigencia_info[0])
+                )
+
+            alertas.append(
+                AlertaPolizaRequerida(
+                    contrato=contrato,
+                    tipo_poliza=tipo_poliza,
+                    nombre_poliza=requisitos.get('nombre', tipo_poliza),
+                    valor_requerido=requisitos.get('valor_requerido'),
+                    fecha_fin_requerida=fecha_fin_requerida,
+                    tiene_poliza=False,
+                    poliza_vigente=None,
+                    otrosi_modificador=otrosi_modificador_numero,
+                )
+            )
+
+    def _regla_terminacion_anticipada(self, contrato: Contrato, alertas: list):
+        fecha_final_actual = self._fecha_final(contrato)
+        if not fecha_final_actual or not self._contrato_vigente_por_fechas(contrato):
+            return
+
+        # Obtener días de terminación anticipada (no hay campo en OtroSi para esto, usar del contrato)
+        dias_terminacion = contrato.dias_terminacion_anticipada or 0
+        if dias_terminacion <= 0:
+            return
+
+        # El contrato está dentro del período de terminación anticipada si los días
+        # restantes hasta el vencimiento son menores o iguales a los días configurados
+        dias_restantes = (fecha_final_actual - self.fecha_base).days
+        if 0 <= dias_restantes <= dias_terminacion:
+            otrosi_modificador = self._modificador(contrato, 'nueva_fecha_final_actualizada')
+            alertas.append(
+                AlertaTerminacionAnticipada(
+                    contrato=contrato,
+                    fecha_final_actualizada=fecha_final_actual,
+                    dias_restantes=dias_restantes,
+                    dias_terminacion_anticipada=dias_terminacion,
+                    fecha_limite_terminacion=fecha_final_actual - timedelta(days=dias_terminacion),
+                    otrosi_modificador=obtener_numero_evento(otrosi_modificador),
+                )
+            )
+
+    def _regla_renovacion_automatica(self, contrato: Contrato, alertas: list):
+        fecha_final_actual = self._fecha_final(contrato)
+        fecha_limite = self.fecha_base + timedelta(days=self.ventana_renovacion)
+
+        # Si el contrato ya tiene una renovación automática aprobada que lo gestionó,
+        # no debe aparecer en las alertas pendientes
+        renovacion_aprobada = self.timeline(contrato).ultima_renovacion_aprobada()
+        if renovacion_aprobada:
+            if renovacion_aprobada.effective_from and fecha_final_actual:
+                # Renovación futura aprobada para el período siguiente, o ya vigente
+                if renovacion_aprobada.effective_from > fecha_final_actual:
+                    return
+                if renovacion_aprobada.effective_from <= self.fecha_base:
+                    return
+            elif renovacion_aprobada.nueva_fecha_final_actualizada:
+                if renovacion_aprobada.nueva_fecha_final_actualizada > fecha_limite:
+                    return
+
+        if not fecha_final_actual:
+            return
+
+        fecha_inicial = contrato.fecha_inicial_contrato
+        if fecha_inicial and fecha_inicial > self.fecha_base:
+            return
+
+        dias_restantes = max((fecha_final_actual - self.fecha_base).days, 0)
+
+        if fecha_final_actual <= fecha_limite:
+            otrosi_modificador = self._modificador(contrato, 'nueva_fecha_final_actualizada')
+            alertas.append(
+                AlertaRenovacionAutomatica(
+                    contrato=contrato,
+                    fecha_final_actualizada=fecha_final_actual,
+                    dias_restantes=dias_restantes,
+                    duracion_inicial_meses=contrato.duracion_inicial_meses,
+                    otrosi_modificador=obtener_numero_evento(otrosi_modificador),
+                )
+            )
+
+    # ------------------------------------------------------------------
+    # Pólizas críticas (se recorren pólizas, no contratos)
+    # ------------------------------------------------------------------
+
+    def _consulta_polizas_candidatas(self):
+        """
+        Pólizas vencidas o que vencen dentro de la ventana.
+        Nota: El filtro usa fecha_vencimiento, luego se verifica la fecha efectiva (colchón)
+        """
+        polizas = Poliza.objects.filter(
+            fecha_vencimiento__isnull=False,
+            fecha_vencimiento__lte=self.fecha_base + timedelta(days=self.ventana_polizas_criticas),
+        )
+        if self.tipo_contrato_cp:
+            polizas = polizas.filter(contrato__tipo_contrato_cliente_proveedor=self.tipo_contrato_cp)
+        return polizas
+
+    def _evaluar_polizas_criticas(self) -> List[Poliza]:
+        from gestion.utils_otrosi import get_otrosi_vigente
+
+        polizas_candidatas = list(
+            self._consulta_polizas_candidatas()
+            .select_related('otrosi', 'renovacion_automatica')
+            .order_by('fecha_vencimiento')
+        )
+
+        # Contratos no vigentes de pólizas candidatas que no se cargaron con el resto
+        # (evaluaciones posteriores de un motor ya cargado): cargarlos en bloque
+        faltantes = {poliza.contrato_id for poliza in polizas_candidatas} - set(self._contratos_por_id)
+        if faltantes:
+            self._registrar_contratos(self._consulta_contratos(True).filter(pk__in=faltantes))
+
+        polizas_criticas = []
+        for poliza in polizas_candidatas:
+            contrato = self._contratos_por_id.get(poliza.contrato_id)
+            if contrato is None:
+                continue
+            poliza.contrato = contrato
+
+            try:
+                # Solo pólizas de contratos vigentes por fechas (considerando renovaciones y Otrosí)
+                if not self._contrato_vigente_por_fechas(contrato):
+                    continue
+
+                # Si el documento vigente (Otro Sí o Renovación) ya tiene su propia póliza vigente
+                # para este requisito, NO mostrar la del contrato base como crítica
+                documento_vigente = get_otrosi_vigente(contrato, self.fecha_base, timeline=self.timeline(contrato))
+                if documento_vigente:
+                    polizas_requeridas = self._obtener_polizas_requeridas(contrato)
+                    identificador_documento_vigente = _identificador_documento(documento_vigente)
+                    tipo_poliza = poliza.tipo
+                    requisitos = polizas_requeridas.get(tipo_poliza)
+                    if requisitos and requisitos.get('otrosi_modificador') == identificador_documento_vigente:
+                        polizas_contrato = self._polizas_contrato(contrato)
+                        if hasattr(documento_vigente, 'numero_otrosi'):
+                            polizas_documento = _polizas_de_tipo(polizas_contrato, tipo_poliza, otrosi_id=documento_vigente.id)
+                        elif hasattr(documento_vigente, 'numero_renovacion'):
+                            polizas_documento = _polizas_de_tipo(polizas_contrato, tipo_poliza, renovacion_id=documento_vigente.id)
+                        else:
+                            polizas_documento = []
+                        poliza_documento_vigente = polizas_documento[0] if polizas_documento else None
+
+                        if poliza_documento_vigente:
+                            try:
+                                fecha_vencimiento_doc = poliza_documento_vigente.obtener_fecha_vencimiento_efectiva(self.fecha_base)
+                            except AttributeError:
+                                fecha_vencimiento_doc = poliza_documento_vigente.fecha_vencimiento
+                            if fecha_vencimiento_doc >= self.fecha_base:
+                                continue
+
+                # Usar fecha de vencimiento efectiva (considerando colchón si aplica)
+                try:
+                    fecha_vencimiento_efectiva = poliza.obtener_fecha_vencimiento_efectiva(self.fecha_base)
+                except AttributeError:
+                    fecha_vencimiento_efectiva = poliza.fecha_vencimiento
+
+                if (fecha_vencimiento_efectiva - self.fecha_base).days <= self.ventana_polizas_criticas:
+                    polizas_criticas.append(poliza)
+            except Exception:
+                # Un error en un contrato no debe afectar a los demás
+                continue
+
+        return polizas_criticas
+
+
 def obtener_alertas_expiracion_contratos(
     fecha_referencia: Optional[date] = None,
     ventana_dias: int = 90,
@@ -147,34 +991,8 @@ def obtener_alertas_expiracion_contratos(
         ventana_dias: Ventana en días hacia adelante para evaluar vencimientos.
         tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
     """
-    fecha_base = fecha_referencia or timezone.now().date()
-    fecha_limite = fecha_base + timedelta(days=ventana_dias)
-    
-    contratos_vigentes = (
-        Contrato.objects.filter(vigente=True)
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related('otrosi', 'renovaciones_automaticas')
-    )
-    
-    if tipo_contrato_cp:
-        contratos_vigentes = contratos_vigentes.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-    
-    alertas_con_fecha = []
-    for contrato in contratos_vigentes:
-        try:
-            # Obtener la fecha final actualizada usando efecto cadena (considera Otrosí y Renovaciones Automáticas vigentes)
-            fecha_final_actual = _obtener_fecha_final_contrato(contrato, fecha_base)
-            
-            if fecha_final_actual and fecha_base <= fecha_final_actual <= fecha_limite:
-                alertas_con_fecha.append((contrato, fecha_final_actual))
-        except Exception:
-            # Si hay error al obtener la fecha final, continuar con el siguiente contrato
-            continue
-    
-    # Ordenar por fecha final actualizada
-    alertas_con_fecha.sort(key=lambda x: x[1])
-    
-    return [contrato for contrato, _ in alertas_con_fecha]
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp, ventana_vencimiento=ventana_dias)
+    return motor.evaluar(['VENCIMIENTO_CONTRATOS'])['VENCIMIENTO_CONTRATOS']
 
 
 def obtener_alertas_ipc(
@@ -192,191 +1010,8 @@ def obtener_alertas_ipc(
     Returns:
         Lista ordenada de alertas de IPC.
     """
-    fecha_base = fecha_referencia or timezone.now().date()
-    contratos_con_ipc = (
-        Contrato.objects.filter(
-            vigente=True,
-        )
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related('otrosi')
-        .order_by('num_contrato')
-    )
-    
-    if tipo_contrato_cp:
-        contratos_con_ipc = contratos_con_ipc.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-
-    alertas: List[AlertaIPC] = []
-    for contrato in contratos_con_ipc:
-        # Obtener valores actualizados de IPC usando efecto cadena (considera otrosí vigentes hasta fecha_referencia)
-        otrosi_tipo_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nuevo_tipo_condicion_ipc', fecha_base
-        )
-        otrosi_periodicidad = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_periodicidad_ipc', fecha_base
-        )
-        otrosi_fecha_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_aumento_ipc', fecha_base
-        )
-        
-        tipo_condicion_ipc = (
-            otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
-            if otrosi_tipo_ipc and otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
-            else contrato.tipo_condicion_ipc
-        )
-        
-        periodicidad_ipc = (
-            otrosi_periodicidad.nueva_periodicidad_ipc
-            if otrosi_periodicidad and otrosi_periodicidad.nueva_periodicidad_ipc
-            else contrato.periodicidad_ipc
-        )
-        
-        fecha_aumento_ipc = (
-            otrosi_fecha_ipc.nueva_fecha_aumento_ipc
-            if otrosi_fecha_ipc and otrosi_fecha_ipc.nueva_fecha_aumento_ipc
-            else contrato.fecha_aumento_ipc
-        )
-        
-        # Solo procesar si tiene tipo de condición IPC configurado
-        if not tipo_condicion_ipc or tipo_condicion_ipc != 'IPC':
-            continue
-            
-        # Procesar si tiene periodicidad ANUAL o FECHA_ESPECIFICA
-        if periodicidad_ipc not in ['ANUAL', 'FECHA_ESPECIFICA']:
-            continue
-        
-        # Calcular la próxima fecha de aumento usando la función utilitaria
-        # que considera el último cálculo realizado y calcula correctamente
-        from gestion.utils_ipc import calcular_proxima_fecha_aumento
-        fecha_aumento_anual = calcular_proxima_fecha_aumento(contrato, fecha_base)
-        
-        # Si no se puede calcular la fecha, continuar con el siguiente contrato
-        if not fecha_aumento_anual:
-            continue
-        
-        # Verificar si ya tiene cálculo para esta fecha exacta
-        # Los cálculos eliminados se borran físicamente de la base de datos
-        calculo_existente = CalculoIPC.objects.filter(
-            contrato=contrato,
-            fecha_aplicacion=fecha_aumento_anual
-        ).exists()
-        
-        # Si ya tiene cálculo, no mostrar la alerta
-        if calculo_existente:
-            continue
-        
-        # Calcular días restantes hasta el próximo ajuste
-        dias_restantes = (fecha_aumento_anual - fecha_base).days
-        
-        # Convertir días a meses usando estándar de 30 días por mes
-        meses_restantes = round(dias_restantes / 30)
-        
-        # Mostrar alertas si:
-        # 1. La fecha ya pasó (dias_restantes < 0) - siempre mostrar
-        # 2. La fecha está dentro de 3 meses (90 días) en el futuro
-        if dias_restantes > 90:
-            continue
-        
-        # Determinar color de alerta
-        # Si la fecha ya pasó (dias_restantes negativo), mostrar como crítica
-        if dias_restantes < 0:
-            color_alerta = 'danger'
-        elif dias_restantes <= 7:
-            color_alerta = 'danger'
-        elif dias_restantes <= 30:
-            color_alerta = 'warning'
-        else:
-            color_alerta = 'success'
-
-        # Obtener display de la fecha y condición IPC
-        fecha_ajuste_display = fecha_aumento_anual.strftime('%d/%m/%Y')
-        condicion_ipc_display = obtener_nombre_tipo_condicion_ipc(tipo_condicion_ipc) if tipo_condicion_ipc else None
-
-        # Determinar qué Otrosí modificó estos valores (prioridad: fecha > periodicidad > tipo)
-        otrosi_modificador_numero = None
-        if otrosi_fecha_ipc:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_fecha_ipc)
-        elif otrosi_periodicidad:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_periodicidad)
-        elif otrosi_tipo_ipc:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_tipo_ipc)
-        
-        # Si no hay modificador de IPC pero hay una renovación reciente que podría estar causando la alerta,
-        # buscar renovaciones (OtroSi RENEWAL o RenovacionAutomatica) que no modificaron IPC
-        if not otrosi_modificador_numero:
-            try:
-                from gestion.models import OtroSi, RenovacionAutomatica
-                
-                # Buscar último cálculo para comparar con renovaciones
-                ultimo_calculo_ipc = CalculoIPC.objects.filter(
-                    contrato=contrato
-                ).order_by('-fecha_aplicacion', '-fecha_calculo').first()
-                
-                fecha_ultimo_calculo = ultimo_calculo_ipc.fecha_aplicacion if ultimo_calculo_ipc else None
-                
-                # Buscar renovaciones OtroSi tipo RENEWAL que no modificaron IPC
-                renovacion_otrosi = OtroSi.objects.filter(
-                    contrato=contrato,
-                    estado='APROBADO',
-                    tipo='RENEWAL',
-                    effective_from__lte=fecha_base
-                ).exclude(
-                    nuevo_tipo_condicion_ipc__isnull=False
-                ).exclude(
-                    nueva_periodicidad_ipc__isnull=False
-                ).exclude(
-                    nueva_fecha_aumento_ipc__isnull=False
-                ).order_by('-effective_from', '-version').first()
-                
-                # Buscar Renovaciones Automáticas
-                renovacion_automatica = RenovacionAutomatica.objects.filter(
-                    contrato=contrato,
-                    estado='APROBADO',
-                    effective_from__lte=fecha_base
-                ).order_by('-effective_from', '-version').first()
-                
-                # Determinar cuál renovación es más reciente y si es posterior al último cálculo
-                renovacion_relevante = None
-                if renovacion_otrosi and renovacion_automatica:
-                    if (hasattr(renovacion_otrosi, 'effective_from') and renovacion_otrosi.effective_from and
-                        hasattr(renovacion_automatica, 'effective_from') and renovacion_automatica.effective_from):
-                        renovacion_relevante = renovacion_otrosi if renovacion_otrosi.effective_from >= renovacion_automatica.effective_from else renovacion_automatica
-                elif renovacion_otrosi and hasattr(renovacion_otrosi, 'effective_from') and renovacion_otrosi.effective_from:
-                    renovacion_relevante = renovacion_otrosi
-                elif renovacion_automatica and hasattr(renovacion_automatica, 'effective_from') and renovacion_automatica.effective_from:
-                    renovacion_relevante = renovacion_automatica
-                
-                # Si hay renovación relevante y (no hay último cálculo o la renovación es posterior al último cálculo),
-                # usar la renovación como modificador
-                if renovacion_relevante and hasattr(renovacion_relevante, 'effective_from') and renovacion_relevante.effective_from:
-                    if not fecha_ultimo_calculo or renovacion_relevante.effective_from > fecha_ultimo_calculo:
-                        otrosi_modificador_numero = obtener_numero_evento(renovacion_relevante)
-            except Exception:
-                # Si hay algún error al buscar renovaciones, continuar sin modificador
-                pass
-
-        alertas.append(
-            AlertaIPC(
-                contrato=contrato,
-                meses_restantes=meses_restantes,
-                color_alerta=color_alerta,
-                mes_ajuste=fecha_ajuste_display,
-                condicion_ipc=condicion_ipc_display,
-                otrosi_modificador=otrosi_modificador_numero,
-            )
-        )
-
-    return sorted(
-        alertas,
-        key=lambda alerta: (
-            0
-            if alerta.color_alerta == 'danger'
-            else 1
-            if alerta.color_alerta == 'warning'
-            else 2,
-            alerta.meses_restantes,
-            alerta.contrato.num_contrato,
-        ),
-    )
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp)
+    return motor.evaluar(['ALERTAS_IPC'])['ALERTAS_IPC']
 
 
 def obtener_alertas_salario_minimo(
@@ -394,192 +1029,8 @@ def obtener_alertas_salario_minimo(
     Returns:
         Lista ordenada de alertas de Salario Mínimo.
     """
-    fecha_base = fecha_referencia or timezone.now().date()
-    contratos_con_sm = (
-        Contrato.objects.filter(
-            vigente=True,
-        )
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related('otrosi')
-        .order_by('num_contrato')
-    )
-    
-    if tipo_contrato_cp:
-        contratos_con_sm = contratos_con_sm.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-
-    alertas: List[AlertaSalarioMinimo] = []
-    for contrato in contratos_con_sm:
-        # Obtener valores actualizados usando efecto cadena (considera otrosí vigentes hasta fecha_referencia)
-        otrosi_tipo_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nuevo_tipo_condicion_ipc', fecha_base
-        )
-        otrosi_periodicidad = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_periodicidad_ipc', fecha_base
-        )
-        otrosi_fecha_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_aumento_ipc', fecha_base
-        )
-        
-        tipo_condicion_ipc = (
-            otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
-            if otrosi_tipo_ipc and otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
-            else contrato.tipo_condicion_ipc
-        )
-        
-        periodicidad_ipc = (
-            otrosi_periodicidad.nueva_periodicidad_ipc
-            if otrosi_periodicidad and otrosi_periodicidad.nueva_periodicidad_ipc
-            else contrato.periodicidad_ipc
-        )
-        
-        fecha_aumento_ipc = (
-            otrosi_fecha_ipc.nueva_fecha_aumento_ipc
-            if otrosi_fecha_ipc and otrosi_fecha_ipc.nueva_fecha_aumento_ipc
-            else contrato.fecha_aumento_ipc
-        )
-        
-        # Solo procesar si tiene tipo de condición SALARIO_MINIMO configurado
-        if not tipo_condicion_ipc or tipo_condicion_ipc != 'SALARIO_MINIMO':
-            continue
-            
-        # Procesar si tiene periodicidad ANUAL
-        if periodicidad_ipc not in ['ANUAL']:
-            continue
-        
-        # Calcular la próxima fecha de aumento usando la función utilitaria
-        # que considera el último cálculo realizado y calcula correctamente
-        from gestion.utils_ipc import calcular_proxima_fecha_aumento
-        fecha_aumento_anual = calcular_proxima_fecha_aumento(contrato, fecha_base)
-        
-        # Si no se puede calcular la fecha, continuar con el siguiente contrato
-        if not fecha_aumento_anual:
-            continue
-        
-        # Verificar si ya tiene cálculo para esta fecha exacta
-        # Los cálculos eliminados se borran físicamente de la base de datos
-        calculo_existente = CalculoSalarioMinimo.objects.filter(
-            contrato=contrato,
-            fecha_aplicacion=fecha_aumento_anual
-        ).exists()
-        
-        # Si ya tiene cálculo, no mostrar la alerta
-        if calculo_existente:
-            continue
-        
-        # Calcular días restantes hasta el próximo ajuste
-        dias_restantes = (fecha_aumento_anual - fecha_base).days
-        
-        # Convertir días a meses usando estándar de 30 días por mes
-        meses_restantes = round(dias_restantes / 30)
-        
-        # Mostrar alertas si:
-        # 1. La fecha ya pasó (dias_restantes < 0) - siempre mostrar
-        # 2. La fecha está dentro de 1 año (365 días) en el futuro
-        # Nota: Se aumentó de 90 a 365 días para alertas de salario mínimo anual
-        if dias_restantes > 365:
-            continue
-        
-        # Determinar color de alerta
-        # Si la fecha ya pasó (dias_restantes negativo), mostrar como crítica
-        if dias_restantes < 0:
-            color_alerta = 'danger'
-        elif dias_restantes <= 7:
-            color_alerta = 'danger'
-        elif dias_restantes <= 30:
-            color_alerta = 'warning'
-        else:
-            color_alerta = 'success'
-
-        # Obtener display de la fecha y condición
-        fecha_ajuste_display = fecha_aumento_anual.strftime('%d/%m/%Y')
-        condicion_sm_display = obtener_nombre_tipo_condicion_ipc(tipo_condicion_ipc) if tipo_condicion_ipc else None
-
-        # Determinar qué Otrosí modificó estos valores (prioridad: fecha > periodicidad > tipo)
-        otrosi_modificador_numero = None
-        if otrosi_fecha_ipc:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_fecha_ipc)
-        elif otrosi_periodicidad:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_periodicidad)
-        elif otrosi_tipo_ipc:
-            otrosi_modificador_numero = obtener_numero_evento(otrosi_tipo_ipc)
-        
-        # Si no hay modificador pero hay una renovación reciente que podría estar causando la alerta,
-        # buscar renovaciones (OtroSi RENEWAL o RenovacionAutomatica) que no modificaron condiciones
-        if not otrosi_modificador_numero:
-            try:
-                from gestion.models import OtroSi, RenovacionAutomatica
-                
-                # Buscar último cálculo para comparar con renovaciones
-                ultimo_calculo_sm = CalculoSalarioMinimo.objects.filter(
-                    contrato=contrato
-                ).order_by('-fecha_aplicacion', '-fecha_calculo').first()
-                
-                fecha_ultimo_calculo = ultimo_calculo_sm.fecha_aplicacion if ultimo_calculo_sm else None
-                
-                # Buscar renovaciones OtroSi tipo RENEWAL que no modificaron condiciones
-                renovacion_otrosi = OtroSi.objects.filter(
-                    contrato=contrato,
-                    estado='APROBADO',
-                    tipo='RENEWAL',
-                    effective_from__lte=fecha_base
-                ).exclude(
-                    nuevo_tipo_condicion_ipc__isnull=False
-                ).exclude(
-                    nueva_periodicidad_ipc__isnull=False
-                ).exclude(
-                    nueva_fecha_aumento_ipc__isnull=False
-                ).order_by('-effective_from', '-version').first()
-                
-                # Buscar Renovaciones Automáticas
-                renovacion_automatica = RenovacionAutomatica.objects.filter(
-                    contrato=contrato,
-                    estado='APROBADO',
-                    effective_from__lte=fecha_base
-                ).order_by('-effective_from', '-version').first()
-                
-                # Determinar cuál renovación es más reciente y si es posterior al último cálculo
-                renovacion_relevante = None
-                if renovacion_otrosi and renovacion_automatica:
-                    if (hasattr(renovacion_otrosi, 'effective_from') and renovacion_otrosi.effective_from and
-                        hasattr(renovacion_automatica, 'effective_from') and renovacion_automatica.effective_from):
-                        renovacion_relevante = renovacion_otrosi if renovacion_otrosi.effective_from >= renovacion_automatica.effective_from else renovacion_automatica
-                elif renovacion_otrosi and hasattr(renovacion_otrosi, 'effective_from') and renovacion_otrosi.effective_from:
-                    renovacion_relevante = renovacion_otrosi
-                elif renovacion_automatica and hasattr(renovacion_automatica, 'effective_from') and renovacion_automatica.effective_from:
-                    renovacion_relevante = renovacion_automatica
-                
-                # Si hay renovación relevante y (no hay último cálculo o la renovación es posterior al último cálculo),
-                # usar la renovación como modificador
-                if renovacion_relevante and hasattr(renovacion_relevante, 'effective_from') and renovacion_relevante.effective_from:
-                    if not fecha_ultimo_calculo or renovacion_relevante.effective_from > fecha_ultimo_calculo:
-                        otrosi_modificador_numero = obtener_numero_evento(renovacion_relevante)
-            except Exception:
-                # Si hay algún error al buscar renovaciones, continuar sin modificador
-                pass
-
-        alertas.append(
-            AlertaSalarioMinimo(
-                contrato=contrato,
-                meses_restantes=meses_restantes,
-                color_alerta=color_alerta,
-                mes_ajuste=fecha_ajuste_display,
-                condicion_salario_minimo=condicion_sm_display,
-                otrosi_modificador=otrosi_modificador_numero,
-            )
-        )
-
-    return sorted(
-        alertas,
-        key=lambda alerta: (
-            0
-            if alerta.color_alerta == 'danger'
-            else 1
-            if alerta.color_alerta == 'warning'
-            else 2,
-            alerta.meses_restantes,
-            alerta.contrato.num_contrato,
-        ),
-    )
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp)
+    return motor.evaluar(['ALERTAS_SALARIO_MINIMO'])['ALERTAS_SALARIO_MINIMO']
 
 
 def obtener_polizas_criticas(
@@ -596,134 +1047,12 @@ def obtener_polizas_criticas(
         fecha_referencia: Fecha base para evaluar vencimientos.
         ventana_dias: Ventana de evaluación para las vigencias próximas.
         tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
-    
+
     Returns:
         Lista de pólizas críticas ordenadas por fecha de vencimiento.
     """
-    from gestion.utils_otrosi import get_otrosi_vigente
-    
-    fecha_base = fecha_referencia or timezone.now().date()
-    fecha_limite = fecha_base + timedelta(days=ventana_dias)
-    
-    # Obtener todas las pólizas que cumplen los criterios de fecha
-    # Incluir pólizas vencidas o que vencen dentro de la ventana
-    # Nota: El filtro inicial usa fecha_vencimiento, pero luego verificamos fecha_vencimiento_real si tiene colchón
-    polizas_candidatas = (
-        Poliza.objects.filter(
-            fecha_vencimiento__isnull=False,
-            fecha_vencimiento__lte=fecha_limite
-        )
-        .select_related(
-            'contrato', 'contrato__arrendatario', 'contrato__proveedor',
-            'otrosi', 'renovacion_automatica',
-        )
-        .prefetch_related('contrato__otrosi', 'contrato__renovaciones_automaticas')
-        .order_by('fecha_vencimiento')
-    )
-    
-    if tipo_contrato_cp:
-        polizas_candidatas = polizas_candidatas.filter(contrato__tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-    
-    # Filtrar solo las de contratos vigentes (verificado por fechas considerando renovaciones)
-    polizas_criticas = []
-    for poliza in polizas_candidatas:
-        contrato = poliza.contrato
-        
-        try:
-            # Verificar vigencia basándose en fechas, no solo en el campo booleano
-            # Considerar Otrosí y Renovaciones Automáticas que puedan haber modificado la fecha final
-            fecha_final_contrato = _obtener_fecha_final_contrato(contrato, fecha_base)
-            
-            # El contrato está vigente si:
-            # 1. Tiene fecha final y no ha pasado
-            # 2. O no tiene fecha final (contrato indefinido)
-            # 3. Y la fecha inicial ya pasó o es hoy
-            
-            fecha_inicial = contrato.fecha_inicial_contrato
-            
-            if fecha_inicial and fecha_inicial > fecha_base:
-                # El contrato aún no ha iniciado
-                continue
-            
-            # Verificar que el contrato no haya vencido
-            if fecha_final_contrato:
-                # El contrato está vigente solo si la fecha final es mayor o igual a la fecha base
-                if fecha_final_contrato < fecha_base:
-                    # El contrato ya venció
-                    continue
-            # Si no tiene fecha final, se considera vigente (contrato indefinido)
-            
-            # Verificar si hay un documento vigente (Otro Sí o Renovación) que requiere esta póliza
-            # Si el documento vigente ya tiene su propia póliza registrada, NO mostrar la del contrato base como crítica
-            documento_vigente = get_otrosi_vigente(contrato, fecha_base)
-            
-            if documento_vigente:
-                # Obtener pólizas requeridas para verificar si el documento vigente requiere esta póliza
-                from gestion.utils_otrosi import get_polizas_requeridas_contrato
-                polizas_requeridas = get_polizas_requeridas_contrato(contrato, fecha_base)
-                
-                # Obtener identificador del documento vigente
-                identificador_documento_vigente = None
-                if hasattr(documento_vigente, 'numero_otrosi'):
-                    identificador_documento_vigente = documento_vigente.numero_otrosi
-                elif hasattr(documento_vigente, 'numero_renovacion'):
-                    identificador_documento_vigente = documento_vigente.numero_renovacion
-                
-                # Verificar si esta póliza del contrato base está siendo reemplazada por una del documento vigente
-                tipo_poliza = poliza.tipo
-                if tipo_poliza in polizas_requeridas:
-                    requisitos = polizas_requeridas[tipo_poliza]
-                    otrosi_modificador = requisitos.get('otrosi_modificador')
-                    
-                    # Si el requisito viene del documento vigente (no del contrato base)
-                    if otrosi_modificador == identificador_documento_vigente:
-                        # Verificar si el documento vigente ya tiene su póliza registrada
-                        if hasattr(documento_vigente, 'numero_otrosi'):
-                            poliza_documento_vigente = contrato.polizas.filter(
-                                otrosi=documento_vigente,
-                                tipo__iexact=tipo_poliza
-                            ).first()
-                        elif hasattr(documento_vigente, 'numero_renovacion'):
-                            poliza_documento_vigente = contrato.polizas.filter(
-                                renovacion_automatica=documento_vigente,
-                                tipo__iexact=tipo_poliza
-                            ).first()
-                        else:
-                            poliza_documento_vigente = None
-                        
-                        # Si el documento vigente tiene su póliza y está vigente, NO mostrar la del contrato base
-                        if poliza_documento_vigente:
-                            try:
-                                fecha_vencimiento_efectiva_doc = poliza_documento_vigente.obtener_fecha_vencimiento_efectiva(fecha_base)
-                                if fecha_vencimiento_efectiva_doc >= fecha_base:
-                                    # El documento vigente tiene su póliza vigente, NO alertar sobre la del contrato base
-                                    continue
-                            except AttributeError:
-                                # Si no tiene método obtener_fecha_vencimiento_efectiva, usar fecha_vencimiento
-                                if poliza_documento_vigente.fecha_vencimiento >= fecha_base:
-                                    continue
-            
-            # Usar fecha de vencimiento efectiva (considerando colchón si aplica)
-            # Manejar caso donde los campos de colchón aún no existen (migración pendiente)
-            try:
-                fecha_vencimiento_efectiva = poliza.obtener_fecha_vencimiento_efectiva(fecha_base)
-            except AttributeError:
-                # Si los campos de colchón no existen aún, usar fecha_vencimiento normal
-                fecha_vencimiento_efectiva = poliza.fecha_vencimiento
-            
-            # Verificar que la póliza realmente vence dentro de la ventana o ya venció
-            # Esto asegura que solo mostramos pólizas que realmente necesitan atención
-            dias_para_vencer = (fecha_vencimiento_efectiva - fecha_base).days
-            
-            # Incluir pólizas vencidas o que vencen dentro de la ventana
-            if dias_para_vencer <= ventana_dias:
-                polizas_criticas.append(poliza)
-        except Exception:
-            # Si hay algún error al verificar la vigencia, continuar con la siguiente póliza
-            # Esto evita que errores en un contrato afecten a otros
-            continue
-    
-    return polizas_criticas
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp, ventana_polizas_criticas=ventana_dias)
+    return motor.evaluar(['POLIZAS_CRITICAS'])['POLIZAS_CRITICAS']
 
 
 def obtener_alertas_preaviso(
@@ -740,49 +1069,8 @@ def obtener_alertas_preaviso(
         ventana_dias: Ventana máxima para considerar el aviso.
         tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
     """
-    fecha_base = fecha_referencia or timezone.now().date()
-    fecha_limite = fecha_base + timedelta(days=ventana_dias)
-    
-    contratos_vigentes = (
-        Contrato.objects.filter(vigente=True)
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related('otrosi', 'renovaciones_automaticas')
-    )
-    
-    if tipo_contrato_cp:
-        contratos_vigentes = contratos_vigentes.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-    
-    alertas_con_fecha = []
-    for contrato in contratos_vigentes:
-        try:
-            # Obtener la fecha final actualizada usando efecto cadena (considera Otrosí y Renovaciones Automáticas vigentes)
-            fecha_final_actual = _obtener_fecha_final_contrato(contrato, fecha_base)
-            
-            # Usar prórroga automática del contrato (no existe campo en OtroSi para esto)
-            prorroga_automatica = contrato.prorroga_automatica
-            
-            if fecha_final_actual and fecha_final_actual <= fecha_limite and not prorroga_automatica:
-                alertas_con_fecha.append((contrato, fecha_final_actual))
-        except Exception:
-            # Si hay error al obtener la fecha final, continuar con el siguiente contrato
-            continue
-    
-    # Ordenar por fecha final actualizada
-    alertas_con_fecha.sort(key=lambda x: x[1])
-    
-    return [contrato for contrato, _ in alertas_con_fecha]
-
-
-@dataclass(frozen=True)
-class AlertaPolizaRequerida:
-    contrato: Contrato
-    tipo_poliza: str
-    nombre_poliza: str
-    valor_requerido: Optional[Decimal]
-    fecha_fin_requerida: Optional[date]
-    tiene_poliza: bool
-    poliza_vigente: Optional[Poliza]
-    otrosi_modificador: Optional[str] = None
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp, ventana_preaviso=ventana_dias)
+    return motor.evaluar(['PREAVISO_RENOVACION'])['PREAVISO_RENOVACION']
 
 
 def obtener_alertas_polizas_requeridas_no_aportadas(
@@ -792,429 +1080,16 @@ def obtener_alertas_polizas_requeridas_no_aportadas(
     """
     Obtiene alertas de contratos con pólizas requeridas no aportadas o vencidas.
     Aplica el efecto cadena para considerar modificaciones de Otrosí vigentes.
-    
+
     Args:
         fecha_referencia: Fecha base para evaluar los requisitos y vigencias.
         tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
-    
+
     Returns:
         Lista ordenada de alertas de pólizas requeridas no aportadas.
     """
-    from gestion.utils_otrosi import get_polizas_requeridas_contrato
-    from gestion.utils_otrosi import get_ultimo_otrosi_que_modifico_campo_hasta_fecha
-    
-    fecha_base = fecha_referencia or timezone.now().date()
-    
-    contratos_vigentes = (
-        Contrato.objects.filter(vigente=True)
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related(
-            'otrosi',
-            'renovaciones_automaticas',
-            'polizas',
-            'polizas__otrosi',
-            'polizas__renovacion_automatica'
-        )
-    )
-    
-    if tipo_contrato_cp:
-        contratos_vigentes = contratos_vigentes.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-    
-    alertas: List[AlertaPolizaRequerida] = []
-    
-    for contrato in contratos_vigentes:
-        try:
-            # Verificar que el contrato esté vigente por fechas (considerando renovaciones y Otrosí)
-            fecha_final_contrato = _obtener_fecha_final_contrato(contrato, fecha_base)
-            fecha_inicial = contrato.fecha_inicial_contrato
-            
-            if fecha_inicial and fecha_inicial > fecha_base:
-                continue
-            
-            if fecha_final_contrato and fecha_final_contrato < fecha_base:
-                continue
-        except Exception:
-            # Si hay error al verificar la vigencia, continuar con el siguiente contrato
-            continue
-        
-        # Obtener documento vigente (Otro Sí o Renovación Automática) en la fecha de referencia
-        from gestion.utils_otrosi import get_otrosi_vigente
-        from gestion.models import RenovacionAutomatica
-        
-        documento_vigente = get_otrosi_vigente(contrato, fecha_base)
-        
-        # Obtener pólizas requeridas aplicando efecto cadena
-        polizas_requeridas = get_polizas_requeridas_contrato(contrato, fecha_base)
-        
-        if not polizas_requeridas:
-            continue
-        
-        # Determinar qué requisitos verificar y qué pólizas buscar
-        identificador_documento_vigente = None
-        if documento_vigente:
-            if hasattr(documento_vigente, 'numero_otrosi'):
-                identificador_documento_vigente = str(documento_vigente.numero_otrosi)
-            elif hasattr(documento_vigente, 'numero_renovacion'):
-                identificador_documento_vigente = str(documento_vigente.numero_renovacion)
-        
-        # Separar requisitos del documento vigente vs contrato base
-        requisitos_del_documento_vigente = {}
-        requisitos_del_contrato_base = {}
-        
-        for tipo_poliza, requisitos in polizas_requeridas.items():
-            otrosi_modificador = requisitos.get('otrosi_modificador')
-            # Comparar el modificador con el documento vigente
-            # Si hay documento vigente y el otrosi_modificador coincide, el requisito viene del documento vigente
-            asignado_a_documento_vigente = False
-            
-            if documento_vigente and otrosi_modificador is not None:
-                otrosi_modificador_str = str(otrosi_modificador).strip()
-                
-                # Primero intentar comparación por string (más rápido y confiable)
-                if identificador_documento_vigente:
-                    identificador_str = str(identificador_documento_vigente).strip()
-                    # Normalizar ambos strings para comparación
-                    otrosi_mod_normalizado = otrosi_modificador_str.replace(' ', '').replace('-', '').upper()
-                    identificador_normalizado = identificador_str.replace(' ', '').replace('-', '').upper()
-                    
-                    if otrosi_mod_normalizado == identificador_normalizado:
-                        asignado_a_documento_vigente = True
-                    else:
-                        # También comparar sin normalización (por si acaso)
-                        if otrosi_modificador_str.upper() == identificador_str.upper():
-                            asignado_a_documento_vigente = True
-                
-                # Si la comparación por string no funcionó, intentar por ID
-                if not asignado_a_documento_vigente:
-                    from gestion.models import OtroSi
-                    otrosi_modificador_obj = OtroSi.objects.filter(
-                        contrato=contrato,
-                        numero_otrosi__iexact=otrosi_modificador_str
-                    ).first()
-                    
-                    # Si no se encuentra, intentar búsqueda más flexible
-                    if not otrosi_modificador_obj:
-                        otrosi_modificador_obj = OtroSi.objects.filter(
-                            contrato=contrato,
-                            numero_otrosi__icontains=otrosi_modificador_str
-                        ).first()
-                    
-                    # Comparar por ID del objeto (las pólizas se guardan con otrosi_id)
-                    if otrosi_modificador_obj and hasattr(documento_vigente, 'id'):
-                        if otrosi_modificador_obj.id == documento_vigente.id:
-                            asignado_a_documento_vigente = True
-            
-            # Asignar el requisito al diccionario correspondiente
-            if asignado_a_documento_vigente:
-                requisitos_del_documento_vigente[tipo_poliza] = requisitos
-            else:
-                requisitos_del_contrato_base[tipo_poliza] = requisitos
-        
-        # Verificar cada tipo de póliza requerida
-        # Primero verificar requisitos del documento vigente (si existen)
-        if requisitos_del_documento_vigente:
-            # Obtener pólizas del documento vigente
-            if documento_vigente:
-                if hasattr(documento_vigente, 'numero_otrosi'):
-                    # Filtrar pólizas que pertenecen a este Otro Sí específico
-                    # Usar el ID para asegurar que la comparación funcione correctamente
-                    polizas_contrato = contrato.polizas.filter(
-                        otrosi_id=documento_vigente.id
-                    )
-                elif hasattr(documento_vigente, 'numero_renovacion'):
-                    # Filtrar pólizas que pertenecen a esta Renovación específica
-                    # Usar el ID para asegurar que la comparación funcione correctamente
-                    polizas_contrato = contrato.polizas.filter(
-                        renovacion_automatica_id=documento_vigente.id
-                    )
-                else:
-                    polizas_contrato = contrato.polizas.none()
-            else:
-                polizas_contrato = contrato.polizas.none()
-            
-            # Verificar requisitos del documento vigente
-            for tipo_poliza, requisitos in requisitos_del_documento_vigente.items():
-                nombre_poliza = requisitos.get('nombre', tipo_poliza)
-                valor_requerido = requisitos.get('valor_requerido')
-                fecha_fin_requerida = requisitos.get('fecha_fin_requerida')
-                
-                # Buscar póliza vigente del documento vigente
-                # Primero obtener todas las pólizas del documento vigente del tipo requerido
-                # Usar __iexact para comparación case-insensitive
-                polizas_tipo = polizas_contrato.filter(tipo__iexact=tipo_poliza)
-                poliza_vigente = None
-                
-                # Debug: verificar qué pólizas se están buscando
-                # print(f"DEBUG: Buscando pólizas de tipo '{tipo_poliza}' asociadas a documento vigente {identificador_documento_vigente}")
-                # print(f"DEBUG: Total pólizas del documento: {polizas_contrato.count()}, del tipo: {polizas_tipo.count()}")
-                
-                # Verificar cada póliza del tipo requerido para encontrar una vigente
-                for poliza_candidata in polizas_tipo:
-                    try:
-                        fecha_vencimiento_efectiva = poliza_candidata.obtener_fecha_vencimiento_efectiva(fecha_base)
-                        # Verificar que la póliza esté vigente (no vencida) usando fecha efectiva
-                        if fecha_vencimiento_efectiva >= fecha_base:
-                            # Verificar que cubra hasta la fecha requerida si existe
-                            # IMPORTANTE: Si hay fecha_fin_requerida, la póliza debe cubrir hasta esa fecha
-                            # Si la fecha efectiva es menor que la requerida, pero la póliza tiene colchón
-                            # que extiende hasta la fecha requerida, también es válida
-                            if fecha_fin_requerida:
-                                # Verificar si la fecha efectiva cubre el requisito
-                                if fecha_vencimiento_efectiva >= fecha_fin_requerida:
-                                    poliza_vigente = poliza_candidata
-                                    break
-                                # Si no cubre con fecha efectiva, verificar si tiene colchón que la extienda
-                                elif poliza_candidata.tiene_colchon and poliza_candidata.fecha_vencimiento:
-                                    # Si la fecha con colchón cubre el requisito, también es válida
-                                    if poliza_candidata.fecha_vencimiento >= fecha_fin_requerida:
-                                        poliza_vigente = poliza_candidata
-                                        break
-                            else:
-                                # Si no hay fecha fin requerida, cualquier póliza vigente es válida
-                                poliza_vigente = poliza_candidata
-                                break
-                    except Exception:
-                        # Si hay error al obtener fecha efectiva, continuar con la siguiente póliza
-                        continue
-                
-                # Si el documento vigente tiene su póliza vigente, NO generar alerta
-                # Si NO tiene su póliza vigente, generar alerta
-                # IMPORTANTE: Solo buscar pólizas asociadas al documento vigente específico
-                # Si encontramos poliza_vigente en el bucle anterior, significa que cumple todos los requisitos
-                # (fecha efectiva vigente Y cubre fecha_fin_requerida con fecha efectiva o colchón)
-                # Por lo tanto, NO debemos generar alerta
-                if not poliza_vigente:
-                    otrosi_modificador_numero = identificador_documento_vigente
-                    alertas.append(
-                        AlertaPolizaRequerida(
-                            contrato=contrato,
-                            tipo_poliza=tipo_poliza,
-                            nombre_poliza=nombre_poliza,
-                            valor_requerido=valor_requerido,
-                            fecha_fin_requerida=fecha_fin_requerida,
-                            tiene_poliza=False,
-                            poliza_vigente=None,
-                            otrosi_modificador=otrosi_modificador_numero,
-                        )
-                    )
-        
-        # Luego verificar requisitos del contrato base (si existen)
-        if requisitos_del_contrato_base:
-            # Verificar requisitos del contrato base
-            for tipo_poliza, requisitos in requisitos_del_contrato_base.items():
-                nombre_poliza = requisitos.get('nombre', tipo_poliza)
-                valor_requerido = requisitos.get('valor_requerido')
-                fecha_fin_requerida = requisitos.get('fecha_fin_requerida')
-                otrosi_modificador = requisitos.get('otrosi_modificador')
-                
-                # Verificar explícitamente que el contrato realmente exige esta póliza
-                # usando efecto cadena para considerar Otrosí vigentes
-                campo_exigencia_map = {
-                    'RCE - Responsabilidad Civil': ('nuevo_exige_poliza_rce', 'exige_poliza_rce'),
-                    'Cumplimiento': ('nuevo_exige_poliza_cumplimiento', 'exige_poliza_cumplimiento'),
-                    'Poliza de Arrendamiento': ('nuevo_exige_poliza_arrendamiento', 'exige_poliza_arrendamiento'),
-                    'Arrendamiento': ('nuevo_exige_poliza_todo_riesgo', 'exige_poliza_todo_riesgo'),
-                    'Otra': ('nuevo_exige_poliza_otra_1', 'exige_poliza_otra_1'),
-                }
-                
-                campo_exigencia_info = campo_exigencia_map.get(tipo_poliza)
-                if campo_exigencia_info:
-                    campo_otrosi, campo_contrato = campo_exigencia_info
-                    otrosi_exigencia = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                        contrato, campo_otrosi, fecha_base
-                    )
-                    
-                    if otrosi_exigencia:
-                        exige_poliza = bool(getattr(otrosi_exigencia, campo_otrosi, False))
-                    else:
-                        exige_poliza = bool(getattr(contrato, campo_contrato, False))
-                    
-                    # Si el contrato no exige esta póliza, saltar esta alerta
-                    if not exige_poliza:
-                        continue
-                
-                # Determinar qué pólizas buscar según el modificador
-                # Si el requisito tiene un otrosi_modificador, buscar pólizas de ese Otro Sí específico
-                # Si no tiene modificador, buscar pólizas del contrato base
-                poliza_vigente = None
-                
-                if otrosi_modificador:
-                    # Buscar el Otro Sí por su número (normalizar para comparación)
-                    from gestion.models import OtroSi
-                    otrosi_modificador_normalizado = str(otrosi_modificador).strip()
-                    
-                    # Intentar buscar por número exacto primero (case insensitive)
-                    otrosi_requisito = OtroSi.objects.filter(
-                        contrato=contrato,
-                        numero_otrosi__iexact=otrosi_modificador_normalizado
-                    ).first()
-                    
-                    # Si no se encuentra, intentar búsqueda más flexible (contiene)
-                    if not otrosi_requisito:
-                        otrosi_requisito = OtroSi.objects.filter(
-                            contrato=contrato,
-                            numero_otrosi__icontains=otrosi_modificador_normalizado
-                        ).first()
-                    
-                    # Si aún no se encuentra, intentar normalizando espacios y guiones
-                    if not otrosi_requisito:
-                        # Normalizar el número del modificador (quitar espacios y guiones)
-                        otrosi_mod_sin_espacios = otrosi_modificador_normalizado.replace(' ', '').replace('-', '')
-                        # Buscar todos los Otros Sí del contrato y comparar manualmente
-                        todos_otrosi = OtroSi.objects.filter(contrato=contrato)
-                        for otrosi_candidato in todos_otrosi:
-                            otrosi_num_sin_espacios = str(otrosi_candidato.numero_otrosi).replace(' ', '').replace('-', '')
-                            if otrosi_num_sin_espacios.upper() == otrosi_mod_sin_espacios.upper():
-                                otrosi_requisito = otrosi_candidato
-                                break
-                    
-                    if otrosi_requisito:
-                        # Buscar SOLO pólizas asociadas a este Otro Sí específico
-                        # Las pólizas se guardan con otrosi_id cuando se selecciona un Otro Sí como documento origen
-                        polizas_otrosi = contrato.polizas.filter(
-                            otrosi_id=otrosi_requisito.id,
-                            tipo__iexact=tipo_poliza
-                        )
-                        
-                        # Verificar cada póliza asociada al Otro Sí
-                        for poliza_candidata in polizas_otrosi:
-                            try:
-                                fecha_vencimiento_efectiva = poliza_candidata.obtener_fecha_vencimiento_efectiva(fecha_base)
-                                # Verificar que la póliza esté vigente (no vencida) usando fecha efectiva
-                                if fecha_vencimiento_efectiva >= fecha_base:
-                                    # Verificar que cubra hasta la fecha requerida si existe
-                                    if fecha_fin_requerida:
-                                        # Verificar si la fecha efectiva cubre el requisito
-                                        if fecha_vencimiento_efectiva >= fecha_fin_requerida:
-                                            poliza_vigente = poliza_candidata
-                                            break
-                                        # Si no cubre con fecha efectiva, verificar si tiene colchón que la extienda
-                                        elif poliza_candidata.tiene_colchon and poliza_candidata.fecha_vencimiento:
-                                            # Si la fecha con colchón cubre el requisito, también es válida
-                                            if poliza_candidata.fecha_vencimiento >= fecha_fin_requerida:
-                                                poliza_vigente = poliza_candidata
-                                                break
-                                    else:
-                                        # Si no hay fecha fin requerida, cualquier póliza vigente es válida
-                                        poliza_vigente = poliza_candidata
-                                        break
-                            except Exception:
-                                # Si hay error al obtener fecha efectiva, continuar con la siguiente póliza
-                                continue
-                else:
-                    # Buscar pólizas del contrato base
-                    polizas_contrato = contrato.polizas.filter(
-                        otrosi__isnull=True,
-                        renovacion_automatica__isnull=True,
-                        tipo__iexact=tipo_poliza
-                    )
-                    
-                    # Verificar cada póliza del tipo requerido para encontrar una vigente
-                    for poliza_candidata in polizas_contrato:
-                        try:
-                            fecha_vencimiento_efectiva = poliza_candidata.obtener_fecha_vencimiento_efectiva(fecha_base)
-                            # Verificar que la póliza esté vigente (no vencida) usando fecha efectiva
-                            if fecha_vencimiento_efectiva >= fecha_base:
-                                # Verificar que cubra hasta la fecha requerida si existe
-                                if fecha_fin_requerida:
-                                    # Verificar si la fecha efectiva cubre el requisito
-                                    if fecha_vencimiento_efectiva >= fecha_fin_requerida:
-                                        poliza_vigente = poliza_candidata
-                                        break
-                                    # Si no cubre con fecha efectiva, verificar si tiene colchón que la extienda
-                                    elif poliza_candidata.tiene_colchon and poliza_candidata.fecha_vencimiento:
-                                        # Si la fecha con colchón cubre el requisito, también es válida
-                                        if poliza_candidata.fecha_vencimiento >= fecha_fin_requerida:
-                                            poliza_vigente = poliza_candidata
-                                            break
-                                else:
-                                    # Si no hay fecha fin requerida, cualquier póliza vigente es válida
-                                    poliza_vigente = poliza_candidata
-                                    break
-                        except Exception:
-                            # Si hay error al obtener fecha efectiva, continuar con la siguiente póliza
-                            continue
-                
-                # Verificar si la póliza vigente cubre los requisitos
-                tiene_poliza_valida = False
-                poliza_valida = None
-                
-                if poliza_vigente:
-                    fecha_vencimiento_efectiva = poliza_vigente.obtener_fecha_vencimiento_efectiva(fecha_base)
-                    if fecha_fin_requerida:
-                        # Verificar si la fecha efectiva cubre el requisito
-                        if fecha_vencimiento_efectiva >= fecha_fin_requerida:
-                            tiene_poliza_valida = True
-                            poliza_valida = poliza_vigente
-                        # Si no cubre con fecha efectiva, verificar si tiene colchón que la extienda
-                        elif poliza_vigente.tiene_colchon and poliza_vigente.fecha_vencimiento:
-                            if poliza_vigente.fecha_vencimiento >= fecha_fin_requerida:
-                                tiene_poliza_valida = True
-                                poliza_valida = poliza_vigente
-                    else:
-                        # Si no hay fecha fin requerida, cualquier póliza vigente es válida
-                        tiene_poliza_valida = True
-                        poliza_valida = poliza_vigente
-                
-                if not tiene_poliza_valida:
-                    # Determinar qué Otrosí modificó estos requisitos
-                    otrosi_modificador_numero = None
-                    
-                    # Buscar el Otrosí que modificó la exigencia de esta póliza
-                    campo_exigencia_map = {
-                        'RCE - Responsabilidad Civil': 'nuevo_exige_poliza_rce',
-                        'Cumplimiento': 'nuevo_exige_poliza_cumplimiento',
-                        'Poliza de Arrendamiento': 'nuevo_exige_poliza_arrendamiento',
-                        'Arrendamiento': 'nuevo_exige_poliza_todo_riesgo',
-                        'Otra': 'nuevo_exige_poliza_otra_1',
-                    }
-                    
-                    campo_exigencia = campo_exigencia_map.get(tipo_poliza)
-                    if campo_exigencia:
-                        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                            contrato, campo_exigencia, fecha_base
-                        )
-                        otrosi_modificador_numero = obtener_numero_evento(otrosi_modificador)
-                    
-                    alertas.append(
-                        AlertaPolizaRequerida(
-                            contrato=contrato,
-                            tipo_poliza=tipo_poliza,
-                            nombre_poliza=nombre_poliza,
-                            valor_requerido=valor_requerido,
-                            fecha_fin_requerida=fecha_fin_requerida,
-                            tiene_poliza=poliza_vigente is not None,
-                            poliza_vigente=poliza_valida,
-                            otrosi_modificador=otrosi_modificador_numero,
-                        )
-                    )
-    
-    return sorted(
-        alertas,
-        key=lambda alerta: (
-            alerta.contrato.num_contrato,
-            alerta.tipo_poliza,
-        ),
-    )
-
-
-@dataclass(frozen=True)
-class AlertaTerminacionAnticipada:
-    contrato: Contrato
-    fecha_final_actualizada: date
-    dias_restantes: int
-    dias_terminacion_anticipada: int
-    fecha_limite_terminacion: date
-    otrosi_modificador: Optional[str] = None
-
-
-@dataclass(frozen=True)
-class AlertaRenovacionAutomatica:
-    contrato: Contrato
-    fecha_final_actualizada: date
-    dias_restantes: int
-    duracion_inicial_meses: int
-    otrosi_modificador: Optional[str] = None
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp)
+    return motor.evaluar(['POLIZAS_REQUERIDAS'])['POLIZAS_REQUERIDAS']
 
 
 def obtener_alertas_terminacion_anticipada(
@@ -1224,88 +1099,19 @@ def obtener_alertas_terminacion_anticipada(
     """
     Obtiene alertas de contratos que están dentro del período de terminación anticipada.
     Considera la fecha final actualizada y días de terminación del último Otrosí aprobado.
-    
+
     Un contrato está dentro del período de terminación anticipada cuando:
     - Los días restantes hasta el vencimiento son menores o iguales a los días de terminación anticipada configurados.
-    
+
     Args:
         fecha_referencia: Fecha base para evaluar el período de terminación anticipada.
         tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
-    
+
     Returns:
         Lista ordenada de alertas de terminación anticipada.
     """
-    fecha_base = fecha_referencia or timezone.now().date()
-    
-    contratos_vigentes = (
-        Contrato.objects.filter(vigente=True)
-        .select_related('arrendatario', 'proveedor', 'local')
-        .prefetch_related('otrosi', 'renovaciones_automaticas')
-    )
-    
-    if tipo_contrato_cp:
-        contratos_vigentes = contratos_vigentes.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cp)
-    
-    alertas: List[AlertaTerminacionAnticipada] = []
-    
-    for contrato in contratos_vigentes:
-        try:
-            # Obtener la fecha final actualizada usando efecto cadena (considerando renovaciones y Otrosí)
-            fecha_final_actual = _obtener_fecha_final_contrato(contrato, fecha_base)
-            
-            if not fecha_final_actual:
-                continue
-            
-            # Verificar que el contrato esté vigente
-            fecha_inicial = contrato.fecha_inicial_contrato
-            if fecha_inicial and fecha_inicial > fecha_base:
-                continue
-            
-            if fecha_final_actual < fecha_base:
-                continue
-            
-            # Obtener días de terminación anticipada (no hay campo en OtroSi para esto, usar del contrato)
-            dias_terminacion = contrato.dias_terminacion_anticipada or 0
-            
-            if dias_terminacion <= 0:
-                continue
-            
-            # Calcular días restantes hasta el vencimiento
-            dias_restantes = (fecha_final_actual - fecha_base).days
-            
-            # Si los días restantes son menores o iguales a los días de terminación anticipada,
-            # el contrato está dentro del período de terminación anticipada
-            if dias_restantes <= dias_terminacion and dias_restantes >= 0:
-                # Calcular fecha límite para ejercer terminación anticipada
-                fecha_limite_terminacion = fecha_final_actual - timedelta(days=dias_terminacion)
-                
-                # Determinar qué Otrosí o Renovación Automática modificó la fecha final
-                otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                    contrato, 'nueva_fecha_final_actualizada', fecha_base
-                )
-                otrosi_modificador_numero = obtener_numero_evento(otrosi_modificador)
-                
-                alertas.append(
-                    AlertaTerminacionAnticipada(
-                        contrato=contrato,
-                        fecha_final_actualizada=fecha_final_actual,
-                        dias_restantes=dias_restantes,
-                        dias_terminacion_anticipada=dias_terminacion,
-                        fecha_limite_terminacion=fecha_limite_terminacion,
-                        otrosi_modificador=otrosi_modificador_numero,
-                    )
-                )
-        except Exception:
-            # Si hay error al procesar el contrato, continuar con el siguiente
-            continue
-    
-    return sorted(
-        alertas,
-        key=lambda alerta: (
-            alerta.dias_restantes,
-            alerta.contrato.num_contrato,
-        ),
-    )
+    motor = MotorAlertas(fecha_referencia, tipo_contrato_cp=tipo_contrato_cp)
+    return motor.evaluar(['TERMINACION_ANTICIPADA'])['TERMINACION_ANTICIPADA']
 
 
 def obtener_alertas_renovacion_automatica(
@@ -1315,99 +1121,16 @@ def obtener_alertas_renovacion_automatica(
     """
     Obtiene alertas de contratos con prórroga automática que están vencidos o próximos a vencer.
     Estos contratos requieren autorización del usuario para renovar automáticamente.
-    
+
     Excluye contratos que ya tienen renovaciones automáticas aprobadas, ya que estas
     ya fueron gestionadas y extienden el contrato.
-    
+
     Args:
         fecha_referencia: Fecha base para evaluar vencimientos.
         ventana_dias: Ventana en días hacia adelante para considerar contratos próximos a vencer.
-    
+
     Returns:
         Lista ordenada de alertas de renovación automática.
     """
-    from gestion.models import RenovacionAutomatica
-    
-    fecha_base = fecha_referencia or timezone.now().date()
-    fecha_limite = fecha_base + timedelta(days=ventana_dias)
-    
-    contratos_vigentes = (
-        Contrato.objects.filter(
-            vigente=True,
-            prorroga_automatica=True
-        )
-        .select_related('arrendatario', 'proveedor', 'local', 'tipo_servicio')
-        .prefetch_related('otrosi', 'renovaciones_automaticas')
-    )
-    
-    alertas: List[AlertaRenovacionAutomatica] = []
-    
-    for contrato in contratos_vigentes:
-        try:
-            # Obtener la fecha final actual del contrato considerando renovaciones y Otrosí vigentes
-            fecha_final_actual = _obtener_fecha_final_contrato(contrato, fecha_base)
-            
-            # Verificar si el contrato ya tiene una renovación automática aprobada
-            # Si la tiene, significa que ya fue gestionada y no debe aparecer en las alertas pendientes
-            renovacion_aprobada = RenovacionAutomatica.objects.filter(
-                contrato=contrato,
-                estado='APROBADO'
-            ).order_by('-fecha_aprobacion', '-effective_from', '-version').first()
-            
-            # Si existe una renovación aprobada, verificar si ya gestionó este contrato
-            if renovacion_aprobada:
-                # Si la renovación tiene effective_from y es posterior a la fecha final actual,
-                # significa que ya está gestionada para el período siguiente (renovación futura aprobada)
-                if renovacion_aprobada.effective_from and fecha_final_actual:
-                    # Si la renovación inicia después de la fecha final actual, ya está gestionado
-                    if renovacion_aprobada.effective_from > fecha_final_actual:
-                        continue
-                    # Si la renovación ya está vigente (effective_from <= fecha_base), también está gestionado
-                    elif renovacion_aprobada.effective_from <= fecha_base:
-                        continue
-                # Si no tiene effective_from pero tiene nueva_fecha_final_actualizada y está aprobada,
-                # verificar si extiende más allá de la ventana de alerta
-                elif renovacion_aprobada.nueva_fecha_final_actualizada:
-                    if renovacion_aprobada.nueva_fecha_final_actualizada > fecha_limite:
-                        continue
-            
-            
-            if not fecha_final_actual:
-                continue
-            
-            fecha_inicial = contrato.fecha_inicial_contrato
-            if fecha_inicial and fecha_inicial > fecha_base:
-                continue
-            
-            if fecha_final_actual < fecha_base:
-                dias_restantes = 0
-            else:
-                dias_restantes = (fecha_final_actual - fecha_base).days
-            
-            if fecha_final_actual <= fecha_limite:
-                otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                    contrato, 'nueva_fecha_final_actualizada', fecha_base
-                )
-                otrosi_modificador_numero = obtener_numero_evento(otrosi_modificador)
-                
-                alertas.append(
-                    AlertaRenovacionAutomatica(
-                        contrato=contrato,
-                        fecha_final_actualizada=fecha_final_actual,
-                        dias_restantes=dias_restantes,
-                        duracion_inicial_meses=contrato.duracion_inicial_meses,
-                        otrosi_modificador=otrosi_modificador_numero,
-                    )
-                )
-        except Exception:
-            # Si hay error al procesar el contrato, continuar con el siguiente
-            continue
-    
-    return sorted(
-        alertas,
-        key=lambda alerta: (
-            alerta.dias_restantes,
-            alerta.contrato.num_contrato,
-        ),
-    )
-
+    motor = MotorAlertas(fecha_referencia, ventana_renovacion=ventana_dias)
+    return motor.evaluar(['RENOVACION_AUTOMATICA'])['RENOVACION_AUTOMATICA']
@@ -0,0 +1,285 @@
+"""
+Backups incrementales de SQLite con almacén de bloques direccionado por contenido.
+
+La imagen de la base (obtenida con copiar_sqlite_en_linea) se parte en bloques de tamaño fijo,
+múltiplo del tamaño de página: SQLite modifica las páginas en su sitio, así que entre dos backups
+solo cambian los bloques con páginas escritas. Cada bloque se guarda comprimido en
+backups/chunks/<sha256>.gz una sola vez, y cada backup es un manifiesto
+backup_inc_<fecha>_<hora>.json con la lista ordenada de bloques.
+
+La retención sigue siendo por antigüedad de los manifiestos (backup_database --keep-days);
+después, recolectar_bloques elimina los bloques que ya no referencia ningún manifiesto.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from gestion.services.backup_local import (
+    copiar_sqlite_en_linea,
+    nivel_compresion,
+    sha256_archivo,
+)
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_BLOQUES = 'chunks'
+PATRON_MANIFIESTO = 'backup_inc_*.json'
+
+# Los bloques más recientes que esto no se recolectan aunque nadie los referencie todavía
+# (un backup en curso los escribe antes que su manifiesto)
+GRACIA_RECOLECCION = timedelta(hours=1)
+
+
+def _tamano_bloque() -> int:
+    # Múltiplo de 64 KiB, el tamaño de página máximo de SQLite, para que un bloque nunca parta una página
+    kib = max(64, getattr(settings, 'BACKUP_BLOQUE_KB', 256))
+    return (kib // 64) * 64 * 1024
+
+
+def ruta_bloque(backup_dir: Path, sha256: str) -> Path:
+    return backup_dir / DIRECTORIO_BLOQUES / f'{sha256}.gz'
+
+
+def _guardar_bloque(destino: Path, datos: bytes):
+    temporal = destino.with_name(destino.name + '.tmp')
+    with open(temporal, 'wb') as archivo:
+        archivo.write(gzip.compress(datos, compresslevel=nivel_compresion(), mtime=0))
+    os.replace(temporal, destino)
+
+
+def backup_incremental(origen: Path, manifiesto: Path) -> Dict:
+    """
+    Copia la base `origen` en caliente y guarda en el almacén solo los bloques que no estaban.
+    Escribe `manifiesto` y retorna su descripción, con `nuevos` = rutas de los bloques creados.
+    """
+    backup_dir = manifiesto.parent
+    (backup_dir / DIRECTORIO_BLOQUES).mkdir(parents=True, exist_ok=True)
+    tamano_bloque = _tamano_bloque()
+    temporal = manifiesto.with_suffix('.sqlite3.tmp')
+    try:
+        progreso = copiar_sqlite_en_linea(origen, temporal)
+        sha_imagen = hashlib.sha256()
+        bloques, nuevos = [], []
+        bytes_nuevos = 0
+        with open(temporal, 'rb') as imagen:
+            for datos in iter(lambda: imagen.read(tamano_bloque), b''):
+                sha_imagen.update(datos)
+                sha = hashlib.sha256(datos).hexdigest()
+                bloques.append(sha)
+                destino = ruta_bloque(backup_dir, sha)
+                if not destino.exists():
+                    _guardar_bloque(destino, datos)
+                    nuevos.append(destino)
+                    bytes_nuevos += destino.stat().st_size
+                else:
+                    # Marca el bloque como en uso para que la recolección no lo tome por huérfano
+                    os.utime(destino)
+        bytes_imagen = temporal.stat().st_size
+    finally:
+        temporal.unlink(missing_ok=True)
+
+    contenido = {
+        'formato': 'incremental',
+        'version': 1,
+        'fecha': timezone.localtime(timezone.now()).isoformat(),
+        'bytes': bytes_imagen,
+        'sha256': sha_imagen.hexdigest(),
+        'paginas': progreso['paginas'],
+        'tamano_bloque': tamano_bloque,
+        'bloques': bloques,
+    }
+    temporal_manifiesto = manifiesto.with_name(manifiesto.name + '.tmp')
+    with open(temporal_manifiesto, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, indent=1)
+    os.replace(temporal_manifiesto, manifiesto)
+
+    return {
+        'archivo': manifiesto.name,
+        'tipo': 'incremental',
+        'bytes': manifiesto.stat().st_size,
+        'bytes_base': bytes_imagen,
+        'bloques': len(bloques),
+        'bloques_nuevos': len(nuevos),
+        'bytes_nuevos': bytes_nuevos,
+        'nuevos': nuevos,
+    }
+
+
+def leer_manifiesto(ruta: Path) -> Dict:
+    with open(ruta, encoding='utf-8') as archivo:
+        contenido = json.load(archivo)
+    if contenido.get('formato') != 'incremental':
+        raise ValueError(f'{ruta.name} no es un manifiesto de backup incremental')
+    return contenido
+
+
+def recolectar_bloques(backup_dir: Path, gracia: timedelta = GRACIA_RECOLECCION) -> Dict:
+    """
+    Cuenta las referencias de cada bloque en los manifiestos existentes y elimina los bloques
+    sin referencias. Si un manifiesto no se puede leer no se elimina nada (podría referenciar
+    cualquier bloque).
+    """
+    directorio = backup_dir / DIRECTORIO_BLOQUES
+    resultado = {'referenciados': 0, 'eliminados': 0, 'bytes_liberados': 0}
+    if not directorio.exists():
+        return resultado
+
+    referencias = Counter()
+    for manifiesto in backup_dir.glob(PATRON_MANIFIESTO):
+        try:
+            referencias.update(leer_manifiesto(manifiesto)['bloques'])
+        except Exception as e:
+            logger.error(f"No se pudo leer {manifiesto}; se omite la recolección de bloques: {str(e)}")
+            return resultado
+    resultado['referenciados'] = len(referencias)
+
+    limite = (timezone.now() - gracia).timestamp()
+    for bloque in directorio.glob('*.gz'):
+        sha = bloque.name[:-len('.gz')]
+        try:
+            estado = bloque.stat()
+            if referencias[sha] == 0 and estado.st_mtime < limite:
+                bloque.unlink()
+                resultado['eliminados'] += 1
+                resultado['bytes_liberados'] += estado.st_size
+        except OSError as e:
+            logger.warning(f"No se pudo eliminar el bloque {bloque}: {str(e)}")
+    return resultado
+
+
+def _leer_bloque(backup_dir: Path, sha: str) -> bytes:
+    datos = gzip.decompress(ruta_bloque(backup_dir, sha).read_bytes())
+    if hashlib.sha256(datos).hexdigest() != sha:
+        raise ValueError(f'El bloque {sha} está dañado (el SHA-256 no coincide)')
+    return datos
+
+
+def _reconstruir_incremental(manifiesto: Path, destino: Path, workers: int) -> str:
+    """Escribe la imagen de la base en `destino` y retorna su SHA-256."""
+    contenido = leer_manifiesto(manifiesto)
+    backup_dir = manifiesto.parent
+    faltantes = [sha for sha in set(contenido['bloques']) if not ruta_bloque(backup_dir, sha).exists()]
+    if faltantes:
+        raise ValueError(f'Faltan {len(faltantes)} bloques del backup en {backup_dir / DIRECTORIO_BLOQUES}')
+
+    sha_imagen = hashlib.sha256()
+    bloques = contenido['bloques']
+    ventana = workers * 4
+    with open(destino, 'wb') as salida, ThreadPoolExecutor(max_workers=workers) as executor:
+        # La descompresión (zlib) libera el GIL: los bloques se leen en paralelo y se escriben en orden
+        for inicio in range(0, len(bloques), ventana):
+            for datos in executor.map(lambda sha: _leer_bloque(backup_dir, sha), bloques[inicio:inicio + ventana]):
+                sha_imagen.update(datos)
+                salida.write(datos)
+
+    if sha_imagen.hexdigest() != contenido['sha256']:
+        raise ValueError('La base reconstruida no coincide con el SHA-256 del manifiesto')
+    return contenido['sha256']
+
+
+def _sha_esperado_completo(archivo: Path) -> Optional[str]:
+    """SHA-256 de la base según el manifiesto de backup_database que acompaña a `archivo`, si existe."""
+    nombre = archivo.name
+    if not nombre.startswith('backup_db_'):
+        return None
+    sello = nombre[len('backup_db_'):].split('.')[0]
+    manifiesto = archivo.with_name(f'backup_{sello}.manifest.json')
+    if not manifiesto.exists():
+        return None
+    with open(manifiesto, encoding='utf-8') as f:
+        for descripcion in json.load(f).get('archivos', []):
+            if descripcion.get('archivo') == nombre:
+                return descripcion.get('sha256_sin_comprimir') or descripcion.get('sha256')
+    return None
+
+
+def _reconstruir_completo(archivo: Path, destino: Path) -> Optional[str]:
+    """Descomprime (o copia) un backup backup_db_*.sqlite3[.gz] y lo verifica con su manifiesto."""
+    if archivo.suffix == '.gz':
+        with gzip.open(archivo, 'rb') as entrada, open(destino, 'wb') as salida:
+            shutil.copyfileobj(entrada, salida, 1024 * 1024)
+    else:
+        shutil.copyfile(archivo, destino)
+
+    esperado = _sha_esperado_completo(archivo)
+    if esperado and sha256_archivo(destino) != esperado:
+        raise ValueError(f'{archivo.name} no coincide con el SHA-256 de su manifiesto')
+    return esperado
+
+
+def es_backup_restaurable(archivo: Path) -> bool:
+    nombre = archivo.name
+    return (
+        (nombre.startswith('backup_inc_') and nombre.endswith('.json'))
+        or (nombre.startswith('backup_db_') and nombre.endswith(('.sqlite3', '.sqlite3.gz')))
+    )
+
+
+def listar_backups_restaurables(backup_dir: Path) -> List[Path]:
+    """Backups que restore_backup puede restaurar, del más reciente al más antiguo."""
+    if not backup_dir.exists():
+        return []
+    return sorted(
+        (archivo for archivo in backup_dir.glob('backup_*') if es_backup_restaurable(archivo)),
+        key=lambda archivo: archivo.stat().st_mtime,
+        reverse=True,
+    )
+
+
+def restaurar_backup(archivo: Path, destino: Path, workers: int = 4) -> Dict:
+    """
+    Reconstruye la base a partir de un backup incremental (manifiesto) o completo y la deja en
+    `destino`. La base reconstruida se verifica (SHA-256 y PRAGMA integrity_check) antes de
+    reemplazar `destino`; la base anterior se conserva como <destino>.antes_de_restaurar.
+    """
+    if not es_backup_restaurable(archivo):
+        raise ValueError(f'{archivo.name} no es un backup SQLite restaurable')
+    for sufijo in ('-journal', '-wal'):
+        if destino.with_name(destino.name + sufijo).exists():
+            raise ValueError(
+                f'Existe {destino.name}{sufijo}: la base está en uso o no se cerró bien. '
+                f'Detenga la aplicación antes de restaurar.'
+            )
+
+    temporal = destino.with_name(destino.name + '.restaurando')
+    try:
+        if archivo.name.startswith('backup_inc_'):
+            sha = _reconstruir_incremental(archivo, temporal, max(1, workers))
+        else:
+            sha = _reconstruir_completo(archivo, temporal)
+
+        conexion = sqlite3.connect(temporal)
+        try:
+            integridad = conexion.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conexion.close()
+        if integridad != 'ok':
+            raise ValueError(f'La base restaurada no superó la verificación de integridad: {integridad}')
+
+        anterior = None
+        if destino.exists():
+            anterior = destino.with_name(destino.name + '.antes_de_restaurar')
+            os.replace(destino, anterior)
+        os.replace(temporal, destino)
+    finally:
+        temporal.unlink(missing_ok=True)
+
+    return {
+        'archivo': archivo.name,
+        'destino': str(destino),
+        'bytes': destino.stat().st_size,
+        'sha256': sha,
+        'anterior': str(anterior) if anterior else None,
+    }
@@ -0,0 +1,301 @@
+"""
+Generación de los archivos de backup locales (comando backup_database).
+
+  - SQLite: copia en caliente con la API de backup de SQLite (sqlite3.Connection.backup) en
+    pasos de BACKUP_SQLITE_PAGINAS_POR_PASO páginas. Entre paso y paso el archivo queda libre
+    para las escrituras de la aplicación y, si alguna escritura cambia páginas ya copiadas,
+    SQLite reinicia la copia: el resultado es siempre una imagen consistente de la base, a
+    diferencia de copiar el archivo mientras se escribe. Si los reinicios se repiten, la copia
+    se hace en un solo paso.
+  - JSON: equivalente a dumpdata --natural-foreign --natural-primary, pero escrito modelo por
+    modelo en lotes de TAMANO_LOTE_JSON registros, sin cargar toda la base en memoria.
+
+Ambos se comprimen en streaming con gzip (loaddata lee los .json.gz directamente) y se
+describen en un manifiesto con el SHA-256 de cada archivo.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Registros por consulta al volcar un modelo a JSON
+TAMANO_LOTE_JSON = 2000
+
+# Bloque de lectura al comprimir y calcular hashes
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class _EscrituraConHash:
+    """Archivo de salida que calcula el SHA-256 y el tamaño de lo que se escribe en disco."""
+
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self.hash = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, datos):
+        self.hash.update(datos)
+        self.bytes += len(datos)
+        return self._archivo.write(datos)
+
+    def flush(self):
+        self._archivo.flush()
+
+
+class _TextoUTF8:
+    """Escritura de texto sobre un flujo binario, con un búfer para no comprimir cadenas sueltas."""
+
+    def __init__(self, binario, tamano_bufer: int = 256 * 1024):
+        self._binario = binario
+        self._partes = []
+        self._pendiente = 0
+        self._tamano_bufer = tamano_bufer
+
+    def write(self, texto: str):
+        self._partes.append(texto)
+        self._pendiente += len(texto)
+        if self._pendiente >= self._tamano_bufer:
+            self.flush()
+
+    def flush(self):
+        if self._partes:
+            self._binario.write(''.join(self._partes).encode('utf-8'))
+            self._partes = []
+            self._pendiente = 0
+
+
+def backup_comprimido_por_defecto() -> bool:
+    return getattr(settings, 'BACKUP_COMPRIMIR', True)
+
+
+def nivel_compresion() -> int:
+    return min(9, max(1, getattr(settings, 'BACKUP_NIVEL_COMPRESION', 6)))
+
+
+def sha256_archivo(ruta: Path) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _describir(ruta: Path, tipo: str, comprimido: bool, sha256: Optional[str] = None, **extra) -> Dict:
+    datos = {
+        'archivo': ruta.name,
+        'tipo': tipo,
+        'comprimido': comprimido,
+        'bytes': ruta.stat().st_size,
+        'sha256': sha256 or sha256_archivo(ruta),
+    }
+    datos.update(extra)
+    return datos
+
+
+class _CopiaReiniciada(Exception):
+    """La copia por pasos se reinició demasiadas veces por escrituras concurrentes."""
+
+
+def _copiar_por_pasos(fuente, destino: Path, paginas_por_paso: int, max_reinicios: int) -> Dict:
+    progreso = {'pasos': 0, 'paginas': 0, 'reinicios': 0, 'restantes': None}
+
+    def _registrar_progreso(status, restantes, total):
+        # Si otra conexión escribe en la base, SQLite vuelve a empezar: quedan más páginas que antes
+        if progreso['restantes'] is not None and restantes > progreso['restantes']:
+            progreso['reinicios'] += 1
+            if progreso['reinicios'] > max_reinicios:
+                raise _CopiaReiniciada()
+        progreso['pasos'] += 1
+        progreso['paginas'] = total
+        progreso['restantes'] = restantes
+
+    copia = sqlite3.connect(destino)
+    try:
+        fuente.backup(copia, pages=paginas_por_paso, progress=_registrar_progreso)
+    finally:
+        copia.close()
+    del progreso['restantes']
+    return progreso
+
+
+def copiar_sqlite_en_linea(origen: Path, destino: Path, paginas_por_paso: Optional[int] = None) -> Dict:
+    """
+    Copia la base SQLite `origen` en `destino` con la API de backup, por pasos, y verifica la
+    copia con PRAGMA quick_check. Retorna los pasos realizados y las páginas copiadas.
+
+    Con escrituras continuas la copia por pasos podría reiniciarse sin fin: tras
+    BACKUP_SQLITE_MAX_REINICIOS reinicios se copia en un solo paso, que bloquea las escrituras
+    solo lo que tarda la copia local (las conexiones de Django esperan hasta su timeout).
+    """
+    paginas_por_paso = paginas_por_paso or getattr(settings, 'BACKUP_SQLITE_PAGINAS_POR_PASO', 1024)
+    max_reinicios = getattr(settings, 'BACKUP_SQLITE_MAX_REINICIOS', 3)
+
+    fuente = sqlite3.connect(f'{Path(origen).resolve().as_uri()}?mode=ro', uri=True, timeout=30)
+    try:
+        try:
+            progreso = _copiar_por_pasos(fuente, destino, paginas_por_paso, max_reinicios)
+        except _CopiaReiniciada:
+            logger.warning(
+                f"La copia de {origen} se reinició más de {max_reinicios} veces por escrituras "
+                f"concurrentes; se copia en un solo paso"
+            )
+            progreso = _copiar_por_pasos(fuente, destino, -1, max_reinicios)
+            progreso['reinicios'] = max_reinicios + 1
+
+        copia = sqlite3.connect(destino)
+        try:
+            resultado = copia.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            copia.close()
+    finally:
+        fuente.close()
+
+    if resultado != 'ok':
+        raise ValueError(f'La copia de la base de datos no superó la verificación de integridad: {resultado}')
+    return progreso
+
+
+def comprimir_archivo(origen: Path, destino: Path) -> str:
+    """Comprime `origen` en `destino` con gzip en streaming y retorna el SHA-256 del .gz."""
+    with open(destino, 'wb') as salida:
+        con_hash = _EscrituraConHash(salida)
+        with gzip.GzipFile(filename=origen.name, mode='wb', fileobj=con_hash,
+                           compresslevel=nivel_compresion(), mtime=0) as comprimido:
+            with open(origen, 'rb') as entrada:
+                shutil.copyfileobj(entrada, comprimido, TAMANO_BLOQUE)
+    return con_hash.hash.hexdigest()
+
+
+def backup_sqlite(origen: Path, destino_base: Path, comprimir: bool = True) -> Dict:
+    """
+    Genera `destino_base` (.sqlite3) o `destino_base`.gz a partir de la base en uso.
+    Retorna la descripción del archivo para el manifiesto (incluye el SHA-256 sin comprimir,
+    que es el de la base que se obtiene al restaurar).
+    """
+    temporal = destino_base.with_name(destino_base.name + '.tmp')
+    try:
+        progreso = copiar_sqlite_en_linea(origen, temporal)
+        sha_base = sha256_archivo(temporal)
+        bytes_base = temporal.stat().st_size
+        if not comprimir:
+            os.replace(temporal, destino_base)
+            return _describir(destino_base, 'sqlite', False, sha_base,
+                             paginas=progreso['paginas'], reinicios=progreso['reinicios'])
+
+        destino = destino_base.with_name(destino_base.name + '.gz')
+        sha_gz = comprimir_archivo(temporal, destino)
+        return _describir(
+            destino, 'sqlite', True, sha_gz,
+            paginas=progreso['paginas'],
+            reinicios=progreso['reinicios'],
+            bytes_sin_comprimir=bytes_base,
+            sha256_sin_comprimir=sha_base,
+        )
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def _modelos_a_volcar() -> List:
+    """Modelos en el orden que usa dumpdata con claves naturales (dependencias primero)."""
+    from django.apps import apps
+    from django.core import serializers
+    from django.db import router, DEFAULT_DB_ALIAS
+
+    app_list = {
+        app_config: None
+        for app_config in apps.get_app_configs()
+        if app_config.models_module is not None
+    }
+    return [
+        model for model in serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+        if not model._meta.proxy
+        and model._meta.can_migrate(DEFAULT_DB_ALIAS)
+        and router.allow_migrate_model(DEFAULT_DB_ALIAS, model)
+    ]
+
+
+def _escribir_json(salida, tamano_lote: int) -> int:
+    """Escribe el arreglo JSON de todos los modelos en `salida` (texto) y retorna los registros."""
+    from django.core import serializers
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    serializador = serializers.get_serializer('python')()
+    total = 0
+    salida.write('[')
+    for model in _modelos_a_volcar():
+        queryset = model._default_manager.order_by(model._meta.pk.name)
+        lote = []
+        for objeto in queryset.iterator(chunk_size=tamano_lote):
+            lote.append(objeto)
+            if len(lote) >= tamano_lote:
+                total += _escribir_lote(salida, serializador, lote, total, DjangoJSONEncoder)
+                lote = []
+        if lote:
+            total += _escribir_lote(salida, serializador, lote, total, DjangoJSONEncoder)
+    salida.write('\n]\n')
+    return total
+
+
+def _escribir_lote(salida, serializador, objetos, escritos_antes, encoder) -> int:
+    registros = serializador.serialize(
+        objetos,
+        use_natural_foreign_keys=True,
+        use_natural_primary_keys=True,
+    )
+    for indice, registro in enumerate(registros):
+        salida.write(',\n' if escritos_antes or indice else '\n')
+        salida.write(json.dumps(registro, cls=encoder, ensure_ascii=False))
+    return len(registros)
+
+
+def backup_json(destino_base: Path, comprimir: bool = True, tamano_lote: int = TAMANO_LOTE_JSON) -> Dict:
+    """
+    Genera `destino_base` (.json) o `destino_base`.gz con el volcado de todos los modelos.
+    El archivo se escribe con otro nombre y se renombra al terminar.
+    """
+    destino = destino_base.with_name(destino_base.name + '.gz') if comprimir else destino_base
+    temporal = destino.with_name(destino.name + '.tmp')
+    try:
+        with open(temporal, 'wb') as binario:
+            con_hash = _EscrituraConHash(binario)
+            if comprimir:
+                flujo = gzip.GzipFile(filename=destino_base.name, mode='wb', fileobj=con_hash,
+                                      compresslevel=nivel_compresion(), mtime=0)
+            else:
+                flujo = con_hash
+            try:
+                texto = _TextoUTF8(flujo)
+                registros = _escribir_json(texto, tamano_lote)
+                texto.flush()
+            finally:
+                if comprimir:
+                    flujo.close()
+        os.replace(temporal, destino)
+        return _describir(destino, 'json', comprimir, con_hash.hash.hexdigest(), registros=registros)
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def escribir_manifiesto(ruta: Path, archivos: List[Dict]) -> Path:
+    """Escribe el manifiesto del backup (archivos, tamaños y SHA-256)."""
+    from django.db import connection
+
+    manifiesto = {
+        'fecha': timezone.localtime(timezone.now()).isoformat(),
+        'motor': connection.vendor,
+        'archivos': archivos,
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+    return ruta
+
@@ -1,15 +1,37 @@
 """
 Servicio para envío remoto de backups a diferentes destinos.
 Soporta: OneDrive, Google Drive, servidor remoto (SFTP/SCP), AWS S3, y más.
+
+BACKUP_REMOTE_DESTINATION admite varios destinos separados por coma. Cada par
+(destino, archivo) es una transferencia independiente que se ejecuta en un pool de
+BACKUP_REMOTE_WORKERS hilos, y cada copia se verifica con el SHA-256 del archivo local:
+  - Destinos de directorio (OneDrive, Google Drive, copia local): se copia por bloques de
+    BACKUP_REMOTE_BLOQUE_MB a <archivo>.parcial, registrando lo copiado en
+    <archivo>.parcial.json. Si la copia se interrumpe, el siguiente envío continúa desde ahí.
+  - SFTP: `put -a` de sftp reanuda los archivos incompletos; la verificación usa sha256sum remoto.
+  - S3: el SHA-256 viaja como metadato del objeto; los archivos ya subidos no se repiten.
 """
+import json
 import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from django.conf import settings
 from django.core.mail import send_mail
+from django.utils.html import linebreaks
 from django.core.mail.backends.smtp import EmailBackend
+from gestion.services.backup_incremental import DIRECTORIO_BLOQUES
+from gestion.services.backup_local import sha256_archivo
+
+# Destinos que son un directorio (carpetas sincronizadas o montadas): clave de la ruta y nombre
+DESTINOS_DIRECTORIO = {
+    'onedrive': ('onedrive_path', 'OneDrive'),
+    'google_drive': ('google_drive_path', 'Google Drive'),
+    'local_copy': ('local_copy_path', 'copia local'),
+}
+ALIAS_DESTINO = {'scp': 'sftp', 'aws': 's3'}
 
 
 class BackupRemoteService:
@@ -23,14 +45,18 @@ class BackupRemoteService:
             config: Diccionario con configuración. Si es None, lee de variables de entorno.
         """
         self.config = config or self._load_config_from_env()
+        self._base_dir = None
     
     def _load_config_from_env(self) -> Dict[str, Any]:
         """Carga configuración desde variables de entorno"""
         return {
             'enabled': os.environ.get('BACKUP_REMOTE_ENABLED', 'False') == 'True',
             'destination': os.environ.get('BACKUP_REMOTE_DESTINATION', 'onedrive'),
+            'workers': int(os.environ.get('BACKUP_REMOTE_WORKERS', '4')),
+            'block_mb': int(os.environ.get('BACKUP_REMOTE_BLOQUE_MB', '8')),
             'onedrive_path': os.environ.get('BACKUP_ONEDRIVE_PATH', ''),
             'google_drive_path': os.environ.get('BACKUP_GOOGLE_DRIVE_PATH', ''),
+            'local_copy_path': os.environ.get('BACKUP_LOCAL_COPY_PATH', ''),
             'sftp_host': os.environ.get('BACKUP_SFTP_HOST', ''),
             'sftp_user': os.environ.get('BACKUP_SFTP_USER', ''),
             'sftp_password': os.environ.get('BACKUP_SFTP_PASSWORD', ''),
@@ -44,18 +70,23 @@ class BackupRemoteService:
             'email_recipients': os.environ.get('BACKUP_EMAIL_RECIPIENTS', '').split(',') if os.environ.get('BACKUP_EMAIL_RECIPIENTS') else [],
         }
     
-    def send_backup(self, backup_files: List[Path], success_callback=None, error_callback=None) -> Dict[str, Any]:
+    def send_backup(self, backup_files: List[Path], success_callback=None, error_callback=None,
+                    base_dir: Optional[Path] = None) -> Dict[str, Any]:
         """
-        Envía backups a la ubicación remota configurada.
+        Envía backups a las ubicaciones remotas configuradas, en paralelo.
         
         Args:
             backup_files: Lista de archivos de backup a enviar
             success_callback: Función a llamar en caso de éxito
             error_callback: Función a llamar en caso de error
+            base_dir: Directorio local de backups. Los archivos en subdirectorios (bloques de
+                los backups incrementales) conservan su ruta relativa en el destino.
             
         Returns:
-            Dict con resultado de la operación
+            Dict con resultado de la operación (con varios destinos, el detalle de cada uno
+            queda en 'destinos')
         """
+        self._base_dir = Path(base_dir) if base_dir else None
         if not self.config.get('enabled'):
             return {
                 'success': False,
@@ -63,24 +94,8 @@ class BackupRemoteService:
                 'skipped': True
             }
         
-        destination = self.config.get('destination', 'onedrive').lower()
-        
         try:
-            if destination == 'onedrive':
-                result = self._send_to_onedrive(backup_files)
-            elif destination == 'google_drive':
-                result = self._send_to_google_drive(backup_files)
-            elif destination == 'sftp' or destination == 'scp':
-                result = self._send_to_sftp(backup_files)
-            elif destination == 's3' or destination == 'aws':
-                result = self._send_to_s3(backup_files)
-            elif destination == 'local_copy':
-                result = self._send_to_local_copy(backup_files)
-            else:
-                result = {
-                    'success': False,
-                    'message': f'Destino no soportado: {destination}'
-                }
+            result = self._enviar_a_destinos([Path(backup_file) for backup_file in backup_files])
             
             if result.get('success') and success_callback:
                 success_callback(result)
@@ -104,269 +119,316 @@ class BackupRemoteService:
                 self._send_notification(error_result, backup_files)
             return error_result
     
-    def _send_to_onedrive(self, backup_files: List[Path]) -> Dict[str, Any]:
-        """Envía backups a OneDrive usando copia directa"""
-        onedrive_path = self.config.get('onedrive_path')
-        
-        if not onedrive_path:
-            return {
-                'success': False,
-                'message': 'Ruta de OneDrive no configurada'
-            }
-        
-        onedrive_dir = Path(onedrive_path)
-        if not onedrive_dir.exists():
-            return {
-                'success': False,
-                'message': f'Directorio de OneDrive no existe: {onedrive_path}'
-            }
-        
-        backup_dir = onedrive_dir / 'backups' / 'contratos'
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        
-        copied_files = []
-        for backup_file in backup_files:
+    def _destinos(self) -> List[str]:
+        """Destinos configurados (separados por coma), sin repetir"""
+        destinos = []
+        for destino in str(self.config.get('destination', 'onedrive')).split(','):
+            destino = destino.strip().lower()
+            destino = ALIAS_DESTINO.get(destino, destino)
+            if destino and destino not in destinos:
+                destinos.append(destino)
+        return destinos
+    
+    def _enviar_a_destinos(self, backup_files: List[Path]) -> Dict[str, Any]:
+        """Reparte todas las transferencias (destino, archivo) en un pool de hilos"""
+        resultados = {}
+        preparados = {}
+        for destino in self._destinos():
             try:
-                dest_file = backup_dir / backup_file.name
-                shutil.copy2(backup_file, dest_file)
-                copied_files.append(str(dest_file))
-            except Exception as e:
-                return {
-                    'success': False,
-                    'message': f'Error copiando {backup_file.name}: {str(e)}'
-                }
+                preparados[destino] = self._preparar_destino(destino)
+            except ValueError as e:
+                resultados[destino] = {'success': False, 'message': str(e)}
+        
+        workers = max(1, self.config.get('workers', 4))
+        if preparados:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup-remoto') as executor:
+                # El SHA-256 local se calcula una vez por archivo y sirve para todos los destinos
+                hashes = dict(zip(backup_files, executor.map(sha256_archivo, backup_files)))
+                futuros = [
+                    (destino, backup_file, executor.submit(self._enviar_archivo, preparados[destino], backup_file, hashes[backup_file]))
+                    for destino in preparados
+                    for backup_file in backup_files
+                ]
+                for destino, contexto in preparados.items():
+                    resultados[destino] = self._resumir_destino(
+                        contexto,
+                        [(backup_file, futuro) for destino_futuro, backup_file, futuro in futuros if destino_futuro == destino],
+                    )
         
+        ordenados = [resultados[destino] for destino in self._destinos()]
+        if len(ordenados) == 1:
+            return ordenados[0]
         return {
-            'success': True,
-            'message': f'Backups copiados a OneDrive: {len(copied_files)} archivos',
-            'files': copied_files,
-            'destination': str(backup_dir)
+            'success': all(resultado.get('success') for resultado in ordenados),
+            'message': '; '.join(resultado.get('message', '') for resultado in ordenados),
+            'files': [archivo for resultado in ordenados for archivo in resultado.get('files', [])],
+            'destination': ', '.join(resultado['destination'] for resultado in ordenados if resultado.get('destination')),
+            'destinos': resultados,
         }
     
-    def _send_to_google_drive(self, backup_files: List[Path]) -> Dict[str, Any]:
-        """Envía backups a Google Drive usando rclone o copia directa"""
-        google_drive_path = self.config.get('google_drive_path')
-        
-        if not google_drive_path:
-            return {
-                'success': False,
-                'message': 'Ruta de Google Drive no configurada'
-            }
+    def _resumir_destino(self, contexto: Dict[str, Any], transferencias) -> Dict[str, Any]:
+        enviados, omitidos, errores = [], 0, []
+        for backup_file, futuro in transferencias:
+            try:
+                ruta_remota, copiado = futuro.result()
+                if copiado:
+                    enviados.append(ruta_remota)
+                else:
+                    omitidos += 1
+            except Exception as e:
+                errores.append(f'{backup_file.name}: {str(e)}')
         
-        google_drive_dir = Path(google_drive_path)
-        if not google_drive_dir.exists():
+        if errores:
             return {
                 'success': False,
-                'message': f'Directorio de Google Drive no existe: {google_drive_path}'
+                'message': f'Error enviando a {contexto["nombre"]}: {len(errores)} archivo(s) con error. {errores[0]}',
+                'files': enviados,
+                'errors': errores,
+                'destination': contexto['descripcion'],
             }
-        
-        backup_dir = google_drive_dir / 'backups' / 'contratos'
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        
-        copied_files = []
-        for backup_file in backup_files:
-            try:
-                dest_file = backup_dir / backup_file.name
-                shutil.copy2(backup_file, dest_file)
-                copied_files.append(str(dest_file))
-            except Exception as e:
-                return {
-                    'success': False,
-                    'message': f'Error copiando {backup_file.name}: {str(e)}'
-                }
-        
+        mensaje = f'Backups enviados a {contexto["nombre"]}: {len(enviados)} archivos'
+        if omitidos:
+            mensaje += f' ({omitidos} ya estaban en el destino)'
         return {
             'success': True,
-            'message': f'Backups copiados a Google Drive: {len(copied_files)} archivos',
-            'files': copied_files,
-            'destination': str(backup_dir)
+            'message': mensaje,
+            'files': enviados,
+            'destination': contexto['descripcion'],
         }
     
-    def _send_to_sftp(self, backup_files: List[Path]) -> Dict[str, Any]:
-        """Envía backups a servidor remoto usando SFTP/SCP"""
-        host = self.config.get('sftp_host')
-        user = self.config.get('sftp_user')
-        password = self.config.get('sftp_password')
-        remote_path = self.config.get('sftp_path', '/backups/contratos')
-        port = self.config.get('sftp_port', 22)
+    # ------------------------------------------------------------------
+    # Preparación de cada destino (configuración y herramientas)
+    # ------------------------------------------------------------------
+    
+    def _preparar_destino(self, destino: str) -> Dict[str, Any]:
+        """Valida la configuración del destino. Lanza ValueError con el motivo si no se puede usar."""
+        if destino in DESTINOS_DIRECTORIO:
+            clave, nombre = DESTINOS_DIRECTORIO[destino]
+            ruta = self.config.get(clave)
+            if not ruta:
+                raise ValueError(f'Ruta de {nombre} no configurada')
+            if destino == 'local_copy':
+                backup_dir = Path(ruta)
+            else:
+                if not Path(ruta).exists():
+                    raise ValueError(f'Directorio de {nombre} no existe: {ruta}')
+                backup_dir = Path(ruta) / 'backups' / 'contratos'
+            backup_dir.mkdir(parents=True, exist_ok=True)
+            return {'tipo': 'directorio', 'nombre': nombre, 'directorio': backup_dir, 'descripcion': str(backup_dir)}
         
-        if not all([host, user]):
+        if destino == 'sftp':
+            host = self.config.get('sftp_host')
+            user = self.config.get('sftp_user')
+            if not all([host, user]):
+                raise ValueError('Configuración SFTP incompleta (host y usuario requeridos)')
+            password = self.config.get('sftp_password')
+            if password and not self._check_command('sshpass'):
+                raise ValueError('sshpass no está instalado. Instala con: sudo apt install sshpass')
+            remote_path = self.config.get('sftp_path', '/backups/contratos')
             return {
-                'success': False,
-                'message': 'Configuración SFTP incompleta (host y usuario requeridos)'
+                'tipo': 'sftp',
+                'nombre': 'SFTP',
+                'host': host,
+                'user': user,
+                'port': str(self.config.get('sftp_port', 22)),
+                'password': password,
+                'remote_path': remote_path,
+                'descripcion': f'{user}@{host}:{remote_path}',
             }
         
-        try:
-            if password:
-                sshpass_available = self._check_command('sshpass')
-                if not sshpass_available:
-                    return {
-                        'success': False,
-                        'message': 'sshpass no está instalado. Instala con: sudo apt install sshpass'
-                    }
-            
-            copied_files = []
-            for backup_file in backup_files:
-                try:
-                    if password:
-                        cmd = [
-                            'sshpass', '-p', password,
-                            'scp', '-P', str(port), '-o', 'StrictHostKeyChecking=no',
-                            str(backup_file),
-                            f'{user}@{host}:{remote_path}/'
-                        ]
-                    else:
-                        cmd = [
-                            'scp', '-P', str(port), '-o', 'StrictHostKeyChecking=no',
-                            str(backup_file),
-                            f'{user}@{host}:{remote_path}/'
-                        ]
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=300
-                    )
-                    
-                    if result.returncode != 0:
-                        return {
-                            'success': False,
-                            'message': f'Error en SCP: {result.stderr}'
-                        }
-                    
-                    copied_files.append(f'{host}:{remote_path}/{backup_file.name}')
-                    
-                except subprocess.TimeoutExpired:
-                    return {
-                        'success': False,
-                        'message': f'Timeout enviando {backup_file.name}'
-                    }
-                except Exception as e:
-                    return {
-                        'success': False,
-                        'message': f'Error enviando {backup_file.name}: {str(e)}'
-                    }
-            
+        if destino == 's3':
+            bucket = self.config.get('aws_s3_bucket')
+            access_key = self.config.get('aws_access_key')
+            secret_key = self.config.get('aws_secret_key')
+            region = self.config.get('aws_region', 'us-east-1')
+            if not all([bucket, access_key, secret_key]):
+                raise ValueError('Configuración AWS S3 incompleta')
+            if not self._check_command('aws'):
+                raise ValueError('AWS CLI no está instalado. Instala con: pip install awscli')
+            # Credenciales solo para los procesos de aws, sin tocar el entorno del proceso
+            entorno = dict(os.environ, AWS_ACCESS_KEY_ID=access_key, AWS_SECRET_ACCESS_KEY=secret_key,
+                           AWS_DEFAULT_REGION=region)
             return {
-                'success': True,
-                'message': f'Backups enviados por SFTP: {len(copied_files)} archivos',
-                'files': copied_files,
-                'destination': f'{user}@{host}:{remote_path}'
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f'Error en envío SFTP: {str(e)}'
+                'tipo': 's3',
+                'nombre': 'S3',
+                'bucket': bucket,
+                'region': region,
+                'entorno': entorno,
+                'descripcion': f's3://{bucket}/backups/contratos',
             }
+        
+        raise ValueError(f'Destino no soportado: {destino}')
+    
+    # ------------------------------------------------------------------
+    # Transferencia de un archivo
+    # ------------------------------------------------------------------
     
-    def _send_to_s3(self, backup_files: List[Path]) -> Dict[str, Any]:
-        """Envía backups a AWS S3"""
-        bucket = self.config.get('aws_s3_bucket')
-        access_key = self.config.get('aws_access_key')
-        secret_key = self.config.get('aws_secret_key')
-        region = self.config.get('aws_region', 'us-east-1')
+    def _enviar_archivo(self, contexto: Dict[str, Any], backup_file: Path, sha256: str):
+        """Envía un archivo a un destino. Retorna (ruta remota, copiado); copiado=False si ya estaba."""
+        if contexto['tipo'] == 'directorio':
+            dest_file = contexto['directorio'] / self._ruta_relativa(backup_file)
+            return str(dest_file), self._copiar_reanudable(backup_file, dest_file, sha256)
+        if contexto['tipo'] == 'sftp':
+            return self._subir_sftp(contexto, backup_file, sha256)
+        return self._subir_s3(contexto, backup_file, sha256)
+    
+    def _ruta_relativa(self, backup_file: Path) -> str:
+        """Ruta del archivo en el destino: relativa a base_dir si está dentro, o solo el nombre"""
+        if self._base_dir:
+            try:
+                return backup_file.relative_to(self._base_dir).as_posix()
+            except ValueError:
+                pass
+        return backup_file.name
+    
+    def _copiar_reanudable(self, backup_file: Path, dest_file: Path, sha256: str) -> bool:
+        """
+        Copia `backup_file` a `dest_file` por bloques, con punto de control, y verifica el SHA-256
+        de la copia antes de darle su nombre final. Retorna False si el destino ya tenía el archivo.
+        """
+        tamano = backup_file.stat().st_size
+        if dest_file.exists() and dest_file.stat().st_size == tamano:
+            # Los bloques de los backups incrementales se nombran por su contenido
+            if dest_file.parent.name == DIRECTORIO_BLOQUES or sha256_archivo(dest_file) == sha256:
+                return False
         
-        if not all([bucket, access_key, secret_key]):
-            return {
-                'success': False,
-                'message': 'Configuración AWS S3 incompleta'
-            }
+        dest_file.parent.mkdir(parents=True, exist_ok=True)
+        parcial = dest_file.with_name(dest_file.name + '.parcial')
+        punto_control = dest_file.with_name(dest_file.name + '.parcial.json')
         
-        aws_cli_available = self._check_command('aws')
-        if not aws_cli_available:
-            return {
-                'success': False,
-                'message': 'AWS CLI no está instalado. Instala con: pip install awscli'
-            }
+        copiados = 0
+        if parcial.exists() and punto_control.exists():
+            try:
+                with open(punto_control, encoding='utf-8') as f:
+                    control = json.load(f)
+                # Solo se reanuda si el archivo local es el mismo que se estaba copiando
+                if control.get('sha256') == sha256 and control.get('bytes', 0) <= parcial.stat().st_size:
+                    copiados = control['bytes']
+            except (ValueError, KeyError, OSError):
+                copiados = 0
         
-        try:
-            os.environ['AWS_ACCESS_KEY_ID'] = access_key
-            os.environ['AWS_SECRET_ACCESS_KEY'] = secret_key
-            os.environ['AWS_DEFAULT_REGION'] = region
-            
-            uploaded_files = []
-            for backup_file in backup_files:
-                try:
-                    s3_key = f'backups/contratos/{backup_file.name}'
-                    cmd = [
-                        'aws', 's3', 'cp',
-                        str(backup_file),
-                        f's3://{bucket}/{s3_key}',
-                        '--region', region
-                    ]
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=600
-                    )
-                    
-                    if result.returncode != 0:
-                        return {
-                            'success': False,
-                            'message': f'Error subiendo a S3: {result.stderr}'
-                        }
-                    
-                    uploaded_files.append(f's3://{bucket}/{s3_key}')
-                    
-                except subprocess.TimeoutExpired:
-                    return {
-                        'success': False,
-                        'message': f'Timeout subiendo {backup_file.name}'
-                    }
-                except Exception as e:
-                    return {
-                        'success': False,
-                        'message': f'Error subiendo {backup_file.name}: {str(e)}'
-                    }
-            
-            return {
-                'success': True,
-                'message': f'Backups subidos a S3: {len(uploaded_files)} archivos',
-                'files': uploaded_files,
-                'destination': f's3://{bucket}/backups/contratos'
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f'Error en envío S3: {str(e)}'
-            }
+        tamano_bloque = max(1, self.config.get('block_mb', 8)) * 1024 * 1024
+        with open(backup_file, 'rb') as origen, open(parcial, 'r+b' if copiados else 'wb') as destino:
+            origen.seek(copiados)
+            destino.seek(copiados)
+            destino.truncate()
+            for bloque in iter(lambda: origen.read(tamano_bloque), b''):
+                destino.write(bloque)
+                destino.flush()
+                os.fsync(destino.fileno())
+                copiados += len(bloque)
+                self._guardar_punto_control(punto_control, sha256, copiados)
+        
+        if sha256_archivo(parcial) != sha256:
+            parcial.unlink(missing_ok=True)
+            punto_control.unlink(missing_ok=True)
+            raise ValueError('la copia no coincide con el SHA-256 del original')
+        os.replace(parcial, dest_file)
+        punto_control.unlink(missing_ok=True)
+        shutil.copystat(backup_file, dest_file)
+        return True
+    
+    def _guardar_punto_control(self, punto_control: Path, sha256: str, copiados: int):
+        temporal = punto_control.with_name(punto_control.name + '.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'sha256': sha256, 'bytes': copiados}, f)
+        os.replace(temporal, punto_control)
+    
+    def _comando_ssh(self, contexto: Dict[str, Any], comando: List[str]) -> List[str]:
+        """Antepone sshpass cuando la autenticación es por contraseña"""
+        if contexto['password']:
+            return ['sshpass', '-p', contexto['password']] + comando
+        return comando
     
-    def _send_to_local_copy(self, backup_files: List[Path]) -> Dict[str, Any]:
-        """Copia backups a otra ubicación local (útil para sincronización con servicios de nube)"""
-        local_path = self.config.get('local_copy_path', '')
+    def _subir_sftp(self, contexto: Dict[str, Any], backup_file: Path, sha256: str):
+        ruta_relativa = self._ruta_relativa(backup_file)
+        remote_path = contexto['remote_path']
+        remoto = f'{remote_path}/{ruta_relativa}'
+        servidor = f'{contexto["user"]}@{contexto["host"]}'
+        opciones = ['-o', 'StrictHostKeyChecking=no']
+        if contexto['password']:
+            # sftp -b desactiva la autenticación interactiva que usa sshpass
+            opciones += ['-o', 'BatchMode=no']
         
-        if not local_path:
-            return {
-                'success': False,
-                'message': 'Ruta de copia local no configurada'
-            }
+        # "-mkdir" ignora el error si el directorio ya existe; "put -a" reanuda una subida incompleta
+        lote = ''.join(
+            f'-mkdir "{remote_path}/{Path(*Path(ruta_relativa).parts[:i]).as_posix()}"\n'
+            for i in range(1, len(Path(ruta_relativa).parts))
+        ) + f'put -a "{backup_file}" "{remoto}"\n'
         
-        backup_dir = Path(local_path)
-        backup_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            result = subprocess.run(
+                self._comando_ssh(contexto, ['sftp', '-P', contexto['port'], *opciones, '-b', '-', servidor]),
+                input=lote,
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+        except subprocess.TimeoutExpired:
+            raise ValueError('timeout (el siguiente envío continúa la subida)')
+        if result.returncode != 0:
+            raise ValueError(f'Error en SFTP: {result.stderr.strip()}')
         
-        copied_files = []
-        for backup_file in backup_files:
-            try:
-                dest_file = backup_dir / backup_file.name
-                shutil.copy2(backup_file, dest_file)
-                copied_files.append(str(dest_file))
-            except Exception as e:
-                return {
-                    'success': False,
-                    'message': f'Error copiando {backup_file.name}: {str(e)}'
-                }
+        result = subprocess.run(
+            self._comando_ssh(contexto, ['ssh', '-p', contexto['port'], *opciones, servidor, 'sha256sum', remoto]),
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+        if result.returncode != 0 or result.stdout.split()[:1] != [sha256]:
+            # Una copia dañada no se puede reanudar: eliminarla para que el próximo envío empiece de cero
+            subprocess.run(
+                self._comando_ssh(contexto, ['ssh', '-p', contexto['port'], *opciones, servidor, 'rm', '-f', remoto]),
+                capture_output=True,
+                timeout=60
+            )
+            raise ValueError('la copia remota no coincide con el SHA-256 del original')
+        return f'{contexto["host"]}:{remoto}', True
+    
+    def _metadatos_s3(self, contexto: Dict[str, Any], s3_key: str) -> Optional[Dict[str, Any]]:
+        result = subprocess.run(
+            ['aws', 's3api', 'head-object', '--bucket', contexto['bucket'], '--key', s3_key,
+             '--region', contexto['region']],
+            capture_output=True,
+            text=True,
+            timeout=60,
+            env=contexto['entorno']
+        )
+        if result.returncode != 0:
+            return None
+        return json.loads(result.stdout)
+    
+    def _subir_s3(self, contexto: Dict[str, Any], backup_file: Path, sha256: str):
+        s3_key = f'backups/contratos/{self._ruta_relativa(backup_file)}'
+        url = f's3://{contexto["bucket"]}/{s3_key}'
+        tamano = backup_file.stat().st_size
         
-        return {
-            'success': True,
-            'message': f'Backups copiados localmente: {len(copied_files)} archivos',
-            'files': copied_files,
-            'destination': str(backup_dir)
-        }
+        def _coincide(metadatos):
+            return (
+                metadatos is not None
+                and metadatos.get('ContentLength') == tamano
+                and metadatos.get('Metadata', {}).get('sha256') == sha256
+            )
+        
+        if _coincide(self._metadatos_s3(contexto, s3_key)):
+            return url, False
+        
+        try:
+            result = subprocess.run(
+                ['aws', 's3', 'cp', str(backup_file), url, '--region', contexto['region'],
+                 '--metadata', f'sha256={sha256}'],
+                capture_output=True,
+                text=True,
+                timeout=600,
+                env=contexto['entorno']
+            )
+        except subprocess.TimeoutExpired:
+            raise ValueError('timeout subiendo a S3')
+        if result.returncode != 0:
+            raise ValueError(f'Error subiendo a S3: {result.stderr.strip()}')
+        if not _coincide(self._metadatos_s3(contexto, s3_key)):
+            raise ValueError('el objeto en S3 no coincide con el tamaño o el SHA-256 del original')
+        return url, True
     
     def _check_command(self, command: str) -> bool:
         """Verifica si un comando está disponible en el sistema"""
@@ -410,6 +472,21 @@ class BackupRemoteService:
             
             message = '\n'.join(message_lines)
             
+            from gestion.models import ConfiguracionEmail
+            from gestion.services.cola_email import cola_email_activa, encolar_emails, procesar_lote
+            
+            if cola_email_activa() and ConfiguracionEmail.get_activa():
+                # Primer intento inmediato; si falla, la cola lo reintenta más tarde
+                encolados = encolar_emails(
+                    'NOTIFICACION_BACKUP',
+                    recipients,
+                    subject,
+                    contenido_html=linebreaks(message),
+                    contenido_texto=message,
+                )
+                procesar_lote([historial.pk for historial in encolados])
+                return
+            
             send_mail(
                 subject=subject,
                 message=message,
@@ -419,20 +496,3 @@ class BackupRemoteService:
             )
         except Exception as e:
             pass
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,417 @@
+"""
+Índice de búsqueda de texto completo de contratos.
+
+Cada contrato tiene un documento con su número, los terceros (razón social y NIT, también
+sin puntos ni guiones), el local y el tipo de contrato/servicio:
+
+  - SQLite: tabla virtual FTS5 (rowid = id del contrato), ordenada por bm25.
+  - PostgreSQL: tabla con un tsvector ponderado (índice GIN) y, si la extensión pg_trgm
+    está disponible, búsqueda por trigramas para coincidencias parciales o con errores.
+
+Los documentos se generan con un INSERT ... SELECT sobre las tablas del contrato, de modo
+que la migración, las señales y rebuild_search_index comparten el mismo SQL. Con otros
+motores, o si el índice no existe, la búsqueda recurre a icontains.
+"""
+import logging
+import re
+import time
+
+from django.db import connection as conexion_por_defecto, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLA_INDICE = 'gestion_busqueda_contrato'
+LIMITE_AUTOCOMPLETAR = 10
+LIMITE_MAXIMO_AUTOCOMPLETAR = 50
+
+# Columnas del documento, en el orden de _SQL_DOCUMENTOS. Las de COLUMNAS_RESULTADO se
+# muestran en el autocompletado; `claves` solo se busca (NIT sin puntuación y CLIENTE/PROVEEDOR)
+COLUMNAS_RESULTADO = ('num_contrato', 'tercero', 'nit', 'local_nombre', 'tipo')
+COLUMNAS = COLUMNAS_RESULTADO + ('claves',)
+
+# Peso de cada columna en bm25 (SQLite); en PostgreSQL se usan los pesos A-D de setweight
+PESOS_BM25 = (10.0, 3.0, 5.0, 2.0, 1.0, 3.0)
+
+
+def _sin_puntuacion(columna):
+    return f"REPLACE(REPLACE(REPLACE(COALESCE({columna}, ''), '.', ''), '-', ''), ' ', '')"
+
+
+_SQL_DOCUMENTOS = f"""
+    SELECT
+        c.id,
+        c.num_contrato,
+        TRIM(COALESCE(a.razon_social, '') || ' ' || COALESCE(p.razon_social, '')),
+        TRIM(COALESCE(a.nit, '') || ' ' || COALESCE(p.nit, '')),
+        COALESCE(l.nombre_comercial_stand, ''),
+        TRIM(COALESCE(tc.nombre, '') || ' ' || COALESCE(ts.nombre, '')),
+        TRIM(
+            {_sin_puntuacion('a.nit')} || ' ' || {_sin_puntuacion('p.nit')} || ' '
+            || COALESCE(c.tipo_contrato_cliente_proveedor, '')
+        )
+    FROM gestion_contrato c
+    LEFT JOIN gestion_tercero a ON a.id = c.arrendatario_id
+    LEFT JOIN gestion_tercero p ON p.id = c.proveedor_id
+    LEFT JOIN gestion_local l ON l.id = c.local_id
+    LEFT JOIN gestion_tipocontrato tc ON tc.id = c.tipo_contrato_id
+    LEFT JOIN gestion_tiposervicio ts ON ts.id = c.tipo_servicio_id
+"""
+
+
+def _terminos(texto):
+    """Palabras de la búsqueda (letras, dígitos y los separadores internos de NIT y números)."""
+    return re.findall(r'\w+(?:[.\-/]\w+)*', texto or '')
+
+
+class _IndiceSQLite:
+    def crear(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_INDICE} USING fts5("
+            f"{', '.join(COLUMNAS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    def eliminar_tabla(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_INDICE}')
+
+    def indexar(self, cursor, condicion, params):
+        where = f' WHERE {condicion}' if condicion else ''
+        cursor.execute(
+            f'DELETE FROM {TABLA_INDICE} WHERE rowid IN (SELECT c.id FROM gestion_contrato c{where})'
+            if condicion else f'DELETE FROM {TABLA_INDICE}',
+            params,
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLA_INDICE} (rowid, {', '.join(COLUMNAS)}) {_SQL_DOCUMENTOS}{where}",
+            params,
+        )
+        return cursor.rowcount
+
+    def eliminar(self, cursor, contrato_ids):
+        marcadores = ', '.join(['%s'] * len(contrato_ids))
+        cursor.execute(f'DELETE FROM {TABLA_INDICE} WHERE rowid IN ({marcadores})', list(contrato_ids))
+
+    def consulta(self, texto):
+        """Expresión MATCH: todas las palabras, cada una como prefijo ("900.123"* busca la frase 900 123*)."""
+        terminos = _terminos(texto)
+        if not terminos:
+            return None
+        return ' '.join('"{}"*'.format(termino.replace('"', '""')) for termino in terminos)
+
+    def sql_ids(self, consulta):
+        return f'SELECT rowid FROM {TABLA_INDICE} WHERE {TABLA_INDICE} MATCH %s', [consulta]
+
+    def buscar(self, cursor, consulta, limite):
+        pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+        cursor.execute(
+            f"SELECT rowid, {', '.join(COLUMNAS_RESULTADO)} FROM {TABLA_INDICE} "
+            f"WHERE {TABLA_INDICE} MATCH %s ORDER BY bm25({TABLA_INDICE}, {pesos}) LIMIT %s",
+            [consulta, limite],
+        )
+        return cursor.fetchall()
+
+
+class _IndicePostgres:
+    _texto = "(num_contrato || ' ' || nit || ' ' || tercero || ' ' || local_nombre)"
+
+    def __init__(self):
+        self._trigramas = None
+
+    def crear(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLA_INDICE} ('
+            f'contrato_id bigint PRIMARY KEY, '
+            f"{', '.join(f'{columna} text NOT NULL' for columna in COLUMNAS)}, "
+            f'documento tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLA_INDICE}_documento ON {TABLA_INDICE} USING gin (documento)'
+        )
+        try:
+            # Crear la extensión requiere privilegios; sin ella la búsqueda usa solo el tsvector
+            with transaction.atomic(using=cursor.db.alias):
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {TABLA_INDICE}_trigramas ON {TABLA_INDICE} '
+                    f'USING gin ({self._texto} gin_trgm_ops)'
+                )
+        except Exception as e:
+            logger.warning(f"No se pudo habilitar pg_trgm para la búsqueda de contratos: {str(e)}")
+        self._trigramas = None
+
+    def eliminar_tabla(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_INDICE}')
+
+    def indexar(self, cursor, condicion, params):
+        where = f' WHERE {condicion}' if condicion else ''
+        if not condicion:
+            cursor.execute(f'TRUNCATE {TABLA_INDICE}')
+        columnas = ', '.join(COLUMNAS)
+        cursor.execute(
+            f"INSERT INTO {TABLA_INDICE} (contrato_id, {columnas}, documento) "
+            f"SELECT d.*, "
+            f"setweight(to_tsvector('simple', d.num_contrato), 'A') || "
+            f"setweight(to_tsvector('simple', d.nit), 'A') || "
+            f"setweight(to_tsvector('simple', d.tercero), 'B') || "
+            f"setweight(to_tsvector('simple', d.local_nombre), 'C') || "
+            f"setweight(to_tsvector('simple', d.tipo), 'D') || "
+            f"setweight(to_tsvector('simple', d.claves), 'B') "
+            f"FROM ({_SQL_DOCUMENTOS}{where}) AS d (contrato_id, {columnas}) "
+            f"ON CONFLICT (contrato_id) DO UPDATE SET "
+            f"{', '.join(f'{columna} = EXCLUDED.{columna}' for columna in COLUMNAS)}, "
+            f"documento = EXCLUDED.documento",
+            params,
+        )
+        return cursor.rowcount
+
+    def eliminar(self, cursor, contrato_ids):
+        cursor.execute(f'DELETE FROM {TABLA_INDICE} WHERE contrato_id = ANY(%s)', [list(contrato_ids)])
+
+    def _trigramas_disponibles(self, cursor):
+        if self._trigramas is None:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            self._trigramas = cursor.fetchone() is not None
+        return self._trigramas
+
+    def consulta(self, texto):
+        """to_tsquery con todas las palabras como prefijo, más el texto original para trigramas."""
+        palabras = [palabra for termino in _terminos(texto) for palabra in re.findall(r'\w+', termino)]
+        if not palabras:
+            return None
+        return ' & '.join(f'{palabra}:*' for palabra in palabras), ' '.join(_terminos(texto))
+
+    def _condicion(self, cursor):
+        condicion = "documento @@ to_tsquery('simple', %s)"
+        if self._trigramas_disponibles(cursor):
+            condicion = f'({condicion} OR {self._texto} %% %s)'
+        return condicion
+
+    def _parametros(self, cursor, consulta):
+        tsquery, texto = consulta
+        return [tsquery, texto] if self._trigramas_disponibles(cursor) else [tsquery]
+
+    def sql_ids(self, consulta):
+        with conexion_por_defecto.cursor() as cursor:
+            condicion = self._condicion(cursor)
+            params = self._parametros(cursor, consulta)
+        return f'SELECT contrato_id FROM {TABLA_INDICE} WHERE {condicion}', params
+
+    def buscar(self, cursor, consulta, limite):
+        tsquery, texto = consulta
+        orden = "ts_rank(documento, to_tsquery('simple', %s))"
+        params_orden = [tsquery]
+        if self._trigramas_disponibles(cursor):
+            orden = f'{orden} + similarity({self._texto}, %s)'
+            params_orden.append(texto)
+        cursor.execute(
+            f"SELECT contrato_id, {', '.join(COLUMNAS_RESULTADO)} FROM {TABLA_INDICE} "
+            f"WHERE {self._condicion(cursor)} ORDER BY {orden} DESC LIMIT %s",
+            self._parametros(cursor, consulta) + params_orden + [limite],
+        )
+        return cursor.fetchall()
+
+
+_INDICES = {
+    'sqlite': _IndiceSQLite(),
+    'postgresql': _IndicePostgres(),
+}
+
+# Alias de conexión en los que ya se comprobó que la tabla del índice existe y está completa
+_indices_verificados = set()
+# Alias cuyo índice tenía menos documentos que contratos -> momento de la última comprobación
+_indices_incompletos = {}
+# Segundos entre comprobaciones de un índice incompleto (mientras tanto se usa icontains)
+INTERVALO_RECOMPROBACION_INDICE = 60
+
+
+def _indice(conexion):
+    return _INDICES.get(conexion.vendor)
+
+
+def _indice_completo(conexion):
+    """
+    El índice tiene un documento por contrato. No lo tiene, p. ej., si la base se cargó con
+    loaddata antes de que las señales indexaran los registros: buscar en él no encontraría nada.
+    """
+    with conexion.cursor() as cursor:
+        cursor.execute(f'SELECT (SELECT COUNT(*) FROM {TABLA_INDICE}) >= (SELECT COUNT(*) FROM gestion_contrato)')
+        return bool(cursor.fetchone()[0])
+
+
+def _tabla_indice_creada(conexion):
+    """El motor tiene índice de búsqueda y su tabla ya fue creada (migración aplicada)."""
+    if _indice(conexion) is None:
+        return False
+    return conexion.alias in _indices_verificados or TABLA_INDICE in conexion.introspection.table_names()
+
+
+def indice_disponible(conexion=None):
+    """
+    Indica si la búsqueda puede usar el índice: el motor lo tiene, su tabla ya fue creada y
+    cubre todos los contratos. Un índice incompleto se vuelve a comprobar cada
+    INTERVALO_RECOMPROBACION_INDICE segundos; mientras tanto la búsqueda usa icontains.
+    """
+    conexion = conexion or conexion_por_defecto
+    if _indice(conexion) is None:
+        return False
+    if conexion.alias in _indices_verificados:
+        return True
+
+    comprobado = _indices_incompletos.get(conexion.alias)
+    if comprobado is not None and time.monotonic() - comprobado < INTERVALO_RECOMPROBACION_INDICE:
+        return False
+    if not _tabla_indice_creada(conexion):
+        return False
+    if not _indice_completo(conexion):
+        if comprobado is None:
+            logger.warning(
+                'El índice de búsqueda de contratos está incompleto; se usa icontains hasta '
+                'reconstruirlo con python manage.py rebuild_search_index'
+            )
+        _indices_incompletos[conexion.alias] = time.monotonic()
+        return False
+
+    _indices_incompletos.pop(conexion.alias, None)
+    _indices_verificados.add(conexion.alias)
+    return True
+
+
+def crear_indice(conexion=None):
+    """Crea la estructura del índice. Retorna False si el motor no tiene índice de búsqueda."""
+    conexion = conexion or conexion_por_defecto
+    indice = _indice(conexion)
+    if indice is None:
+        return False
+    with conexion.cursor() as cursor:
+        indice.crear(cursor)
+    return True
+
+
+def eliminar_indice(conexion=None):
+    conexion = conexion or conexion_por_defecto
+    indice = _indice(conexion)
+    if indice is not None:
+        with conexion.cursor() as cursor:
+            indice.eliminar_tabla(cursor)
+    _indices_verificados.discard(conexion.alias)
+
+
+def reconstruir_indice(conexion=None):
+    """Vuelve a generar los documentos de todos los contratos. Retorna los contratos indexados."""
+    conexion = conexion or conexion_por_defecto
+    indice = _indice(conexion)
+    if indice is None:
+        return 0
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        indexados = indice.indexar(cursor, '', [])
+    _indices_incompletos.pop(conexion.alias, None)
+    return indexados
+
+
+def _reindexar(condicion, params):
+    # Se escribe aunque el índice esté incompleto: así se completa tras un loaddata
+    if not _tabla_indice_creada(conexion_por_defecto):
+        return
+    with transaction.atomic(), conexion_por_defecto.cursor() as cursor:
+        _indice(conexion_por_defecto).indexar(cursor, condicion, params)
+
+
+def _eliminar(contrato_ids):
+    if not _tabla_indice_creada(conexion_por_defecto):
+        return
+    with conexion_por_defecto.cursor() as cursor:
+        _indice(conexion_por_defecto).eliminar(cursor, contrato_ids)
+
+
+def _programar(funcion, descripcion):
+    def _ejecutar():
+        try:
+            funcion()
+        except Exception as exc:
+            logger.error('Error actualizando el índice de búsqueda (%s): %s', descripcion, exc, exc_info=True)
+
+    transaction.on_commit(_ejecutar)
+
+
+def programar_reindexacion_contrato(contrato_id):
+    """Regenera el documento del contrato cuando la transacción actual confirme."""
+    if contrato_id:
+        _programar(lambda: _reindexar('c.id = %s', [contrato_id]), f'contrato {contrato_id}')
+
+
+def programar_reindexacion_relacionados(campos, pk):
+    """
+    Regenera los documentos de los contratos cuyo campo (ej: 'local_id') apunta a `pk`;
+    se usa al renombrar un tercero, local o tipo.
+    """
+    if not pk:
+        return
+    condicion = ' OR '.join(f'c.{campo} = %s' for campo in campos)
+    _programar(lambda: _reindexar(condicion, [pk] * len(campos)), f"{', '.join(campos)} = {pk}")
+
+
+def programar_eliminacion_contrato(contrato_id):
+    if contrato_id:
+        _programar(lambda: _eliminar([contrato_id]), f'contrato {contrato_id}')
+
+
+def filtrar_por_busqueda(queryset, texto):
+    """
+    Filtra un queryset de Contrato por el texto buscado (número, tercero, NIT, local o tipo).
+    El filtro es una subconsulta sobre el índice, así que se combina con los demás filtros y
+    con la paginación en la misma consulta.
+    """
+    from django.db.models import Q
+    from django.db.models.expressions import RawSQL
+
+    if indice_disponible():
+        indice = _indice(conexion_por_defecto)
+        consulta = indice.consulta(texto)
+        if consulta is None:
+            return queryset.none()
+        sql, params = indice.sql_ids(consulta)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+    return queryset.filter(
+        Q(num_contrato__icontains=texto) |
+        Q(arrendatario__razon_social__icontains=texto) |
+        Q(arrendatario__nit__icontains=texto) |
+        Q(proveedor__razon_social__icontains=texto) |
+        Q(proveedor__nit__icontains=texto) |
+        Q(local__nombre_comercial_stand__icontains=texto) |
+        Q(tipo_contrato__nombre__icontains=texto) |
+        Q(tipo_servicio__nombre__icontains=texto)
+    )
+
+
+def buscar_contratos(texto, limite=LIMITE_AUTOCOMPLETAR):
+    """
+    Los `limite` contratos que mejor coinciden con el texto, ordenados por relevancia.
+    Cada resultado es un dict con 'id' y COLUMNAS_RESULTADO.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO_AUTOCOMPLETAR))
+    if indice_disponible():
+        indice = _indice(conexion_por_defecto)
+        consulta = indice.consulta(texto)
+        if consulta is None:
+            return []
+        with conexion_por_defecto.cursor() as cursor:
+            filas = indice.buscar(cursor, consulta, limite)
+        return [dict(zip(('id',) + COLUMNAS_RESULTADO, fila)) for fila in filas]
+
+    from gestion.models import Contrato
+
+    contratos = filtrar_por_busqueda(
+        Contrato.objects.select_related('arrendatario', 'proveedor', 'local', 'tipo_contrato', 'tipo_servicio'),
+        texto,
+    ).order_by('num_contrato')[:limite]
+    return [
+        {
+            'id': contrato.pk,
+            'num_contrato': contrato.num_contrato,
+            'tercero': contrato.obtener_nombre_tercero(),
+            'nit': getattr(contrato.obtener_tercero(), 'nit', '') or '',
+            'local_nombre': contrato.local.nombre_comercial_stand if contrato.local else '',
+            'tipo': str(contrato.tipo_contrato or contrato.tipo_servicio or ''),
+        }
+        for contrato in contratos
+    ]
@@ -0,0 +1,275 @@
+"""
+Caché diaria de las alertas calculadas por MotorAlertas.
+
+Las alertas solo dependen de la fecha de referencia y de los datos de contratos,
+Otro Sí, renovaciones, pólizas y cálculos IPC/Salario Mínimo. Se guardan por
+(fecha_referencia, tipo_contrato_cp) como identificadores más los campos de
+presentación, y se invalidan desde las señales de esos modelos (ver signals.py).
+Las secciones del dashboard que se cargan por separado tienen además su propia
+entrada con solo sus tipos de alerta.
+
+El backend se configura con el alias de caché 'alertas' en settings (locmem,
+archivo o tabla de base de datos). Si el alias no existe se usa la caché 'default'.
+"""
+import dataclasses
+import logging
+import uuid
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import transaction
+from django.utils import timezone
+
+from gestion.services.metricas_rendimiento import registrar_acceso_cache
+
+logger = logging.getLogger(__name__)
+
+ALIAS_CACHE_ALERTAS = 'alertas'
+
+_CLAVE_VERSION = 'alertas:version'
+
+# Tipos cuyas alertas son directamente instancias de modelo (no dataclasses)
+_TIPOS_CONTRATO = ('VENCIMIENTO_CONTRATOS', 'PREAVISO_RENOVACION')
+_TIPOS_POLIZA = ('POLIZAS_CRITICAS',)
+
+
+def _obtener_cache():
+    try:
+        return caches[ALIAS_CACHE_ALERTAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _version_actual(cache) -> str:
+    """
+    Versión vigente de la caché. Invalidar consiste en cambiarla, de modo que las
+    entradas anteriores dejan de leerse y expiran solas.
+    """
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def _clave(version: str, fecha_referencia: date, tipo_contrato_cp: Optional[str], seccion: str = '') -> str:
+    clave = f'alertas:{version}:{fecha_referencia.isoformat()}:{tipo_contrato_cp or "TODOS"}'
+    return f'{clave}:{seccion}' if seccion else clave
+
+
+def invalidar_cache_alertas():
+    """Descarta todas las alertas guardadas (para todas las fechas y filtros)."""
+    try:
+        _obtener_cache().set(_CLAVE_VERSION, uuid.uuid4().hex, None)
+    except Exception as exc:
+        logger.error('Error invalidando la caché de alertas: %s', exc, exc_info=True)
+
+
+def programar_invalidacion_cache_alertas():
+    """
+    Invalida la caché cuando la transacción actual confirme, para que un cálculo
+    concurrente no vuelva a guardar datos anteriores a la escritura.
+    """
+    transaction.on_commit(invalidar_cache_alertas)
+
+
+# ----------------------------------------------------------------------
+# Serialización: identificadores + campos de presentación
+# ----------------------------------------------------------------------
+
+def _serializar_alerta(tipo: str, alerta):
+    from gestion.models import Contrato, Poliza
+
+    if tipo in _TIPOS_CONTRATO or tipo in _TIPOS_POLIZA:
+        return alerta.pk
+
+    datos = {}
+    for campo in dataclasses.fields(alerta):
+        valor = getattr(alerta, campo.name)
+        if isinstance(valor, (Contrato, Poliza)):
+            valor = valor.pk
+        datos[campo.name] = valor
+    return datos
+
+
+def _serializar(alertas_por_tipo: Dict[str, list]) -> Dict[str, list]:
+    return {
+        tipo: [_serializar_alerta(tipo, alerta) for alerta in alertas]
+        for tipo, alertas in alertas_por_tipo.items()
+    }
+
+
+def _clases_alerta():
+    from gestion.services.alertas import (
+        AlertaIPC,
+        AlertaPolizaRequerida,
+        AlertaRenovacionAutomatica,
+        AlertaSalarioMinimo,
+        AlertaTerminacionAnticipada,
+    )
+
+    return {
+        'ALERTAS_IPC': AlertaIPC,
+        'ALERTAS_SALARIO_MINIMO': AlertaSalarioMinimo,
+        'POLIZAS_REQUERIDAS': AlertaPolizaRequerida,
+        'TERMINACION_ANTICIPADA': AlertaTerminacionAnticipada,
+        'RENOVACION_AUTOMATICA': AlertaRenovacionAutomatica,
+    }
+
+
+def _deserializar(datos: Dict[str, list], tipos: Iterable[str]) -> Dict[str, list]:
+    """
+    Reconstruye las alertas cargando en bloque los contratos y pólizas referenciados.
+    Las alertas cuyo contrato o póliza ya no existe se omiten.
+    """
+    from gestion.models import Contrato, Poliza
+
+    tipos = list(tipos)
+    clases = _clases_alerta()
+
+    polizas_ids = set()
+    contratos_ids = set()
+    for tipo in tipos:
+        for registro in datos.get(tipo, []):
+            if tipo in _TIPOS_POLIZA:
+                polizas_ids.add(registro)
+            elif tipo in _TIPOS_CONTRATO:
+                contratos_ids.add(registro)
+            else:
+                contratos_ids.add(registro['contrato'])
+                if registro.get('poliza_vigente'):
+                    polizas_ids.add(registro['poliza_vigente'])
+
+    polizas = {}
+    if polizas_ids:
+        polizas = Poliza.objects.select_related('otrosi', 'renovacion_automatica').in_bulk(polizas_ids)
+        contratos_ids.update(poliza.contrato_id for poliza in polizas.values())
+
+    contratos = {}
+    if contratos_ids:
+        contratos = Contrato.objects.select_related(
+            'arrendatario', 'proveedor', 'local', 'tipo_servicio'
+        ).in_bulk(contratos_ids)
+
+    for poliza in polizas.values():
+        if poliza.contrato_id in contratos:
+            poliza.contrato = contratos[poliza.contrato_id]
+
+    resultado = {}
+    for tipo in tipos:
+        alertas = []
+        for registro in datos.get(tipo, []):
+            if tipo in _TIPOS_POLIZA:
+                poliza = polizas.get(registro)
+                if poliza is not None and poliza.contrato_id in contratos:
+                    alertas.append(poliza)
+            elif tipo in _TIPOS_CONTRATO:
+                if registro in contratos:
+                    alertas.append(contratos[registro])
+            else:
+                contrato = contratos.get(registro['contrato'])
+                if contrato is None:
+                    continue
+                campos = dict(registro, contrato=contrato)
+                if 'poliza_vigente' in campos and campos['poliza_vigente'] is not None:
+                    campos['poliza_vigente'] = polizas.get(campos['poliza_vigente'])
+                alertas.append(clases[tipo](**campos))
+        resultado[tipo] = alertas
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------
+
+def obtener_alertas_cacheadas(
+    fecha_referencia: Optional[date] = None,
+    tipo_contrato_cp: Optional[str] = None,
+    tipos: Optional[Iterable[str]] = None,
+) -> Dict[str, List]:
+    """
+    Retorna las alertas {tipo_alerta: lista} con las ventanas por defecto de MotorAlertas.
+
+    En un fallo de caché se evalúan los ocho tipos en una sola pasada y se guardan
+    juntos; las lecturas posteriores del mismo día solo cargan los objetos referenciados.
+
+    Args:
+        fecha_referencia: Fecha base (por defecto hoy).
+        tipo_contrato_cp: Filtro opcional por tipo de contrato (CLIENTE/PROVEEDOR).
+        tipos: Tipos de alerta a retornar (por defecto todos).
+    """
+    from gestion.services.alertas import MotorAlertas, TIPOS_ALERTA
+
+    fecha_base = fecha_referencia or timezone.now().date()
+    tipos = list(tipos) if tipos is not None else list(TIPOS_ALERTA)
+
+    cache = None
+    clave = None
+    try:
+        cache = _obtener_cache()
+        clave = _clave(_version_actual(cache), fecha_base, tipo_contrato_cp)
+        datos = cache.get(clave)
+        if datos is not None:
+            registrar_acceso_cache('alertas', True)
+            return _deserializar(datos, tipos)
+    except Exception as exc:
+        # Una caché caída no debe impedir mostrar las alertas
+        logger.error('Error leyendo la caché de alertas: %s', exc, exc_info=True)
+        cache = None
+
+    registrar_acceso_cache('alertas', False)
+    alertas_por_tipo = MotorAlertas(fecha_base, tipo_contrato_cp=tipo_contrato_cp).evaluar()
+
+    if cache is not None:
+        try:
+            cache.set(clave, _serializar(alertas_por_tipo))
+        except Exception as exc:
+            logger.error('Error guardando la caché de alertas: %s', exc, exc_info=True)
+
+    return {tipo: alertas_por_tipo.get(tipo, []) for tipo in tipos}
+
+
+def obtener_alertas_seccion_cacheadas(
+    seccion: str,
+    tipos: Iterable[str],
+    fecha_referencia: Optional[date] = None,
+    tipo_contrato_cp: Optional[str] = None,
+) -> Dict[str, List]:
+    """
+    Alertas de una sección del dashboard, con su propia entrada de caché.
+
+    Se usa la entrada de la sección o, si no existe, la de los ocho tipos juntos. En un
+    fallo de ambas solo se evalúan los tipos de la sección: una sección lenta no hace
+    esperar a las demás, que se piden en paralelo.
+    """
+    from gestion.services.alertas import MotorAlertas
+
+    fecha_base = fecha_referencia or timezone.now().date()
+    tipos = list(tipos)
+
+    cache = None
+    clave = None
+    try:
+        cache = _obtener_cache()
+        version = _version_actual(cache)
+        clave = _clave(version, fecha_base, tipo_contrato_cp, seccion)
+        for clave_lectura in (clave, _clave(version, fecha_base, tipo_contrato_cp)):
+            datos = cache.get(clave_lectura)
+            if datos is not None:
+                registrar_acceso_cache('alertas', True)
+                return _deserializar(datos, tipos)
+    except Exception as exc:
+        logger.error('Error leyendo la caché de alertas (sección %s): %s', seccion, exc, exc_info=True)
+        cache = None
+
+    registrar_acceso_cache('alertas', False)
+    alertas_por_tipo = MotorAlertas(fecha_base, tipo_contrato_cp=tipo_contrato_cp).evaluar(tipos)
+
+    if cache is not None:
+        try:
+            cache.set(clave, _serializar(alertas_por_tipo))
+        except Exception as exc:
+            logger.error('Error guardando la caché de alertas (sección %s): %s', seccion, exc, exc_info=True)
+
+    return alertas_por_tipo
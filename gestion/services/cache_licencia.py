@@ -0,0 +1,108 @@
+"""
+Caché de proceso del estado de la licencia principal (ClienteLicense).
+
+La comparten LicenseCheckMiddleware, el context processor license_status y los template
+tags de licencia, de modo que una petición no vuelve a consultar la licencia en cada uno.
+Las entradas duran LICENCIA_CACHE_TTL segundos y se invalidan al guardar o eliminar una
+ClienteLicense (ver signals.py). Cada proceso tiene su propia copia: los demás procesos
+ven los cambios como máximo al vencer el TTL.
+
+La reverificación remota (LicenseManager, llamada HTTP de hasta 25 s) se ejecuta en un
+hilo en segundo plano; ninguna petición espera por ella.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from gestion.services.metricas_rendimiento import registrar_acceso_cache
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_licencia_cacheada = None
+_cacheada_en = None
+# Se incrementa al invalidar: una lectura iniciada antes no reemplaza la caché con datos viejos
+_generacion = 0
+
+_hilo_reverificacion = None
+_ultima_reverificacion = None
+
+
+def _ttl() -> float:
+    return getattr(settings, 'LICENCIA_CACHE_TTL', 60)
+
+
+def obtener_licencia_principal():
+    """
+    Licencia principal de la organización (o None si no hay). La instancia es compartida
+    entre peticiones: solo debe leerse. Los métodos dependientes de la fecha
+    (is_expired, obtener_estado_detallado) se evalúan en cada llamada.
+    """
+    global _licencia_cacheada, _cacheada_en
+
+    with _lock:
+        if _cacheada_en is not None and time.monotonic() - _cacheada_en < _ttl():
+            registrar_acceso_cache('licencia', True)
+            return _licencia_cacheada
+        generacion = _generacion
+    registrar_acceso_cache('licencia', False)
+
+    from gestion.models import ClienteLicense
+
+    licencia = ClienteLicense.objects.filter(is_primary=True).first()
+    with _lock:
+        if generacion == _generacion:
+            _licencia_cacheada = licencia
+            _cacheada_en = time.monotonic()
+    return licencia
+
+
+def invalidar_cache_licencia():
+    global _licencia_cacheada, _cacheada_en, _generacion
+
+    with _lock:
+        _licencia_cacheada = None
+        _cacheada_en = None
+        _generacion += 1
+
+
+def programar_invalidacion_cache_licencia():
+    """Invalida la caché al confirmar la transacción actual (y de inmediato si no hay)."""
+    invalidar_cache_licencia()
+    transaction.on_commit(invalidar_cache_licencia)
+
+
+def _reverificar():
+    try:
+        from gestion.license_manager import LicenseManager
+
+        valida, mensaje, _datos = LicenseManager.verificar_licencia_cliente(None, forzar_verificacion=True)
+        logger.info(f"Licencia reverificada en segundo plano: {'válida' if valida else mensaje}")
+    except Exception as e:
+        logger.error(f"Error al reverificar la licencia en segundo plano: {str(e)}", exc_info=True)
+    finally:
+        invalidar_cache_licencia()
+        connection.close()
+
+
+def solicitar_reverificacion() -> bool:
+    """
+    Lanza la verificación remota de la licencia en un hilo, salvo que ya haya una en curso
+    o que la última haya empezado hace menos de LICENCIA_REVERIFICACION_INTERVALO segundos.
+    El resultado queda guardado en ClienteLicense y las peticiones siguientes lo leen.
+    """
+    global _hilo_reverificacion, _ultima_reverificacion
+
+    intervalo = getattr(settings, 'LICENCIA_REVERIFICACION_INTERVALO', 300)
+    with _lock:
+        if _hilo_reverificacion is not None and _hilo_reverificacion.is_alive():
+            return False
+        if _ultima_reverificacion is not None and time.monotonic() - _ultima_reverificacion < intervalo:
+            return False
+        _ultima_reverificacion = time.monotonic()
+        _hilo_reverificacion = threading.Thread(target=_reverificar, name='reverificacion-licencia', daemon=True)
+        _hilo_reverificacion.start()
+    return True
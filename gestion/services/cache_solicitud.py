@@ -0,0 +1,93 @@
+"""
+Memoización por solicitud de las consultas de efecto cadena.
+
+Una misma solicitud (detalle_contrato, calcular_ipc...) pregunta varias veces lo mismo sobre un
+contrato: el último evento que modificó un campo (a una fecha o en toda la historia), el Otro Sí
+vigente, las pólizas requeridas o la fecha final. Las funciones decoradas con @memoizar_por_solicitud guardan su
+resultado por (función, contrato, argumentos) mientras haya una caché activa:
+
+  - en cada petición HTTP, instalada por CacheSolicitudMiddleware
+  - en comandos de gestión y tareas, con `with cache_por_solicitud(): ...`
+
+Fuera de esos contextos las funciones se ejecutan sin memoizar. La caché vive en un ContextVar,
+de modo que cada hilo o tarea tiene la suya. Las entradas de un contrato se descartan al guardar
+o eliminar el contrato, sus Otro Sí o sus Renovaciones Automáticas (ver signals.py).
+
+Los resultados se comparten entre llamadas: quien los reciba no debe modificarlos.
+"""
+import functools
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from gestion.services.metricas_rendimiento import registrar_acceso_cache
+
+_cache_solicitud = ContextVar('cache_solicitud', default=None)
+
+
+@contextmanager
+def cache_por_solicitud():
+    """
+    Activa la memoización dentro del bloque y la descarta al salir. Si ya hay una caché
+    activa (p. ej. un comando llamado desde una vista) se reutiliza.
+    """
+    if _cache_solicitud.get() is not None:
+        yield
+        return
+
+    token = _cache_solicitud.set({})
+    try:
+        yield
+    finally:
+        _cache_solicitud.reset(token)
+
+
+def invalidar_cache_solicitud(contrato_id=None):
+    """Descarta las entradas del contrato indicado (o todas) de la caché activa, si la hay."""
+    cache = _cache_solicitud.get()
+    if cache is None:
+        return
+    if contrato_id is None:
+        cache.clear()
+    else:
+        cache.pop(contrato_id, None)
+
+
+def memoizar_por_solicitud(funcion):
+    """
+    Decorador para funciones cuyo primer argumento es el contrato. No memoiza las llamadas
+    que reciben un `timeline` (ya se resuelven en memoria) ni las de contratos sin guardar.
+    """
+    firma = inspect.signature(funcion)
+    nombre = f'{funcion.__module__}.{funcion.__qualname__}'
+
+    @functools.wraps(funcion)
+    def envoltura(contrato, *args, **kwargs):
+        cache = _cache_solicitud.get()
+        if cache is None or getattr(contrato, 'pk', None) is None:
+            return funcion(contrato, *args, **kwargs)
+
+        argumentos = firma.bind(contrato, *args, **kwargs)
+        argumentos.apply_defaults()
+        if argumentos.arguments.get('timeline') is not None:
+            return funcion(contrato, *args, **kwargs)
+
+        clave = (nombre,) + tuple(
+            valor for parametro, valor in list(argumentos.arguments.items())[1:]
+            if parametro != 'timeline'
+        )
+        try:
+            entradas = cache.setdefault(contrato.pk, {})
+            if clave in entradas:
+                registrar_acceso_cache('solicitud', True)
+                return entradas[clave]
+        except TypeError:
+            # Argumentos no hashables: se ejecuta sin memoizar
+            return funcion(contrato, *args, **kwargs)
+
+        registrar_acceso_cache('solicitud', False)
+        resultado = funcion(contrato, *args, **kwargs)
+        entradas[clave] = resultado
+        return resultado
+
+    return envoltura
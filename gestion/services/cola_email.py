@@ -0,0 +1,207 @@
+"""
+Cola de salida de correos sobre HistorialEnvioEmail.
+
+Encolar es un INSERT: los registros PENDIENTE guardan el contenido del correo y los envía
+el comando procesar_cola_email (o enviar_alertas_email al terminar) con un pool de hilos.
+Cada hilo toma un lote, lo envía por una sola conexión SMTP y registra el resultado:
+  - ENVIADO: se borra el contenido para no acumular el HTML de cada alerta.
+  - Error: vuelve a PENDIENTE con espera exponencial (EMAIL_COLA_REINTENTO_BASE_SEGUNDOS,
+    duplicada en cada intento hasta EMAIL_COLA_REINTENTO_MAX_SEGUNDOS).
+  - Tras EMAIL_COLA_MAX_INTENTOS errores queda DESCARTADO (no se reintenta más).
+Las conexiones simultáneas a un mismo servidor SMTP se limitan con EMAIL_COLA_MAX_POR_HOST.
+"""
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Correos que un hilo envía por la misma conexión SMTP antes de tomar otro lote
+TAMANO_LOTE_COLA = 20
+
+_semaforos_host = {}
+_semaforos_lock = threading.Lock()
+
+
+def cola_email_activa() -> bool:
+    return getattr(settings, 'EMAIL_COLA_ASINCRONA', False)
+
+
+def encolar_emails(tipo, destinatarios, asunto, contenido_html, contenido_texto=None, cantidad_alertas=0):
+    """
+    Registra un correo PENDIENTE por destinatario (un solo INSERT) y retorna los registros.
+    Cada destinatario recibe su propio mensaje, como en el envío directo.
+    """
+    from gestion.models import HistorialEnvioEmail
+
+    ahora = timezone.now()
+    return HistorialEnvioEmail.objects.bulk_create([
+        HistorialEnvioEmail(
+            tipo_alerta=tipo,
+            destinatario=destinatario,
+            asunto=asunto,
+            estado='PENDIENTE',
+            cantidad_alertas=cantidad_alertas,
+            contenido_html=contenido_html,
+            contenido_texto=contenido_texto,
+            proximo_intento=ahora,
+        )
+        for destinatario in destinatarios
+    ])
+
+
+def calcular_espera_reintento(intentos) -> timedelta:
+    """Espera antes del siguiente intento: base * 2^(intentos-1), con tope y 10% de variación."""
+    base = getattr(settings, 'EMAIL_COLA_REINTENTO_BASE_SEGUNDOS', 60)
+    maximo = getattr(settings, 'EMAIL_COLA_REINTENTO_MAX_SEGUNDOS', 3600)
+    segundos = base * 2 ** max(0, intentos - 1) * random.uniform(0.9, 1.1)
+    return timedelta(seconds=min(maximo, segundos))
+
+
+def _semaforo_host(configuracion) -> threading.BoundedSemaphore:
+    clave = f'{configuracion.email_host}:{configuracion.email_port}'
+    with _semaforos_lock:
+        if clave not in _semaforos_host:
+            _semaforos_host[clave] = threading.BoundedSemaphore(
+                max(1, getattr(settings, 'EMAIL_COLA_MAX_POR_HOST', 2))
+            )
+        return _semaforos_host[clave]
+
+
+def pendientes_listos(limite, ahora=None):
+    """Ids de los correos PENDIENTE cuyo próximo intento ya llegó, los más antiguos primero."""
+    from gestion.models import HistorialEnvioEmail
+
+    ahora = ahora or timezone.now()
+    return list(
+        HistorialEnvioEmail.objects.filter(estado='PENDIENTE', contenido_html__isnull=False)
+        .filter(Q(proximo_intento__isnull=True) | Q(proximo_intento__lte=ahora))
+        .order_by('proximo_intento', 'pk')
+        .values_list('pk', flat=True)[:limite]
+    )
+
+
+def procesar_lote(ids) -> dict:
+    """
+    Envía un lote de correos de la cola. El paso PENDIENTE -> EN_PROCESO es un UPDATE
+    condicional por registro, de modo que hilos y comandos concurrentes nunca envían el
+    mismo correo. Retorna los totales del lote.
+    """
+    from gestion.models import HistorialEnvioEmail
+    from gestion.services.email_service import EmailService
+
+    totales = {'enviados': 0, 'reintentos': 0, 'descartados': 0}
+    tomados = [
+        pk for pk in ids
+        if HistorialEnvioEmail.objects.filter(pk=pk, estado='PENDIENTE').update(
+            estado='EN_PROCESO',
+            fecha_modificacion=timezone.now(),
+        )
+    ]
+    if not tomados:
+        return totales
+
+    # Los correos con el mismo contenido (una alerta para varios destinatarios) comparten MIME
+    grupos = {}
+    for historial in HistorialEnvioEmail.objects.filter(pk__in=tomados).order_by('pk'):
+        clave = (historial.asunto, historial.contenido_html or '', historial.contenido_texto)
+        grupos.setdefault(clave, []).append(historial)
+    historiales = [historial for grupo in grupos.values() for historial in grupo]
+    try:
+        servicio = EmailService()
+        mensajes = []
+        for (asunto, contenido_html, contenido_texto), grupo in grupos.items():
+            mensajes.extend(servicio.construir_mensajes_individuales(
+                [historial.destinatario for historial in grupo],
+                asunto,
+                contenido_html,
+                contenido_texto,
+            ))
+        with _semaforo_host(servicio.configuracion):
+            errores = servicio.enviar_mensajes(mensajes)
+    except Exception as e:
+        # Sin configuración de email (o mensaje inválido): todo el lote cuenta como intento fallido
+        logger.error(f"Error al preparar el envío de la cola de correo: {str(e)}", exc_info=True)
+        errores = [str(e)] * len(historiales)
+
+    ahora = timezone.now()
+    max_intentos = max(1, getattr(settings, 'EMAIL_COLA_MAX_INTENTOS', 5))
+    for historial, error in zip(historiales, errores):
+        historial.fecha_modificacion = ahora
+        if error is None:
+            historial.estado = 'ENVIADO'
+            historial.fecha_envio = ahora
+            historial.error_mensaje = None
+            historial.contenido_html = None
+            historial.contenido_texto = None
+            totales['enviados'] += 1
+            continue
+
+        historial.intentos += 1
+        historial.error_mensaje = error or "Error al enviar el correo"
+        if historial.intentos >= max_intentos:
+            historial.estado = 'DESCARTADO'
+            totales['descartados'] += 1
+            logger.error(
+                f"Correo {historial.pk} a {historial.destinatario} descartado tras {historial.intentos} intentos: {error}"
+            )
+        else:
+            historial.estado = 'PENDIENTE'
+            historial.proximo_intento = ahora + calcular_espera_reintento(historial.intentos)
+            totales['reintentos'] += 1
+
+    HistorialEnvioEmail.objects.bulk_update(
+        historiales,
+        ['estado', 'fecha_envio', 'error_mensaje', 'contenido_html', 'contenido_texto',
+         'intentos', 'proximo_intento', 'fecha_modificacion'],
+    )
+    return totales
+
+
+def _procesar_lote_en_hilo(ids) -> dict:
+    """Procesa un lote en un hilo del pool y libera su conexión a la base de datos."""
+    try:
+        return procesar_lote(ids)
+    finally:
+        connection.close()
+
+
+def drenar_cola(workers=None, tamano_lote=TAMANO_LOTE_COLA) -> dict:
+    """
+    Envía todos los correos listos de la cola con `workers` hilos y retorna los totales.
+    Los que fallan quedan programados para más tarde y no se reintentan en esta llamada.
+    """
+    workers = max(1, workers or getattr(settings, 'EMAIL_COLA_WORKERS', 4))
+    totales = {'enviados': 0, 'reintentos': 0, 'descartados': 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cola-email') as executor:
+        while True:
+            ids = pendientes_listos(workers * tamano_lote)
+            if not ids:
+                break
+            lotes = [ids[i:i + tamano_lote] for i in range(0, len(ids), tamano_lote)]
+            # Los correos fallidos quedan con próximo intento futuro: el ciclo termina
+            for resultado in executor.map(_procesar_lote_en_hilo, lotes):
+                for clave, valor in resultado.items():
+                    totales[clave] += valor
+    return totales
+
+
+def recuperar_envios_interrumpidos(minutos=30) -> int:
+    """
+    Devuelve a PENDIENTE los correos EN_PROCESO desde hace más de `minutos` (el proceso que los
+    enviaba se detuvo). Un correo interrumpido justo después de salir puede enviarse dos veces.
+    """
+    from gestion.models import HistorialEnvioEmail
+
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return HistorialEnvioEmail.objects.filter(estado='EN_PROCESO', fecha_modificacion__lt=limite).update(
+        estado='PENDIENTE',
+        proximo_intento=timezone.now(),
+    )
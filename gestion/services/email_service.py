@@ -2,19 +2,39 @@
 Servicio para envío de correos electrónicos.
 """
 
-from django.core.mail import EmailMultiAlternatives
-from django.conf import settings
+from contextlib import contextmanager
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.mail.utils import DNS_NAME
+from email.utils import make_msgid
 from django.template.loader import render_to_string
-from django.utils import timezone
 from typing import List, Optional, Dict, Any
 import logging
 import smtplib
 
-from gestion.models import ConfiguracionEmail, HistorialEnvioEmail
+from gestion.models import ConfiguracionEmail
 
 logger = logging.getLogger(__name__)
 
 
+class _MensajeMIMECompartido(EmailMessage):
+    """
+    Mensaje para un solo destinatario que reutiliza el MIME ya codificado de otro mensaje:
+    al enviarlo solo se reemplazan las cabeceras To y Message-ID. Los mensajes que comparten
+    MIME deben enviarse uno tras otro (enviar_mensajes lo hace así).
+    """
+    
+    def __init__(self, mime, from_email: str, destinatario: str):
+        super().__init__(from_email=from_email, to=[destinatario])
+        self._mime = mime
+    
+    def message(self):
+        del self._mime['To']
+        self._mime['To'] = self.to[0]
+        del self._mime['Message-ID']
+        self._mime['Message-ID'] = make_msgid(domain=DNS_NAME)
+        return self._mime
+
+
 class EmailService:
     """Servicio para envío de correos electrónicos"""
     
@@ -28,24 +48,56 @@ class EmailService:
         self.configuracion = configuracion or ConfiguracionEmail.get_activa()
         if not self.configuracion:
             raise ValueError("No hay configuración de email activa")
+        self._password = None
+        self._conexion = None
+    
+    def _obtener_password(self) -> str:
+        """Desencripta la contraseña de email una sola vez por instancia del servicio"""
+        if self._password is None:
+            try:
+                self._password = self.configuracion.get_password()
+            except Exception as e:
+                logger.error(f"Error desencriptando contraseña de email: {e}", exc_info=True)
+                raise ValueError("No se pudo desencriptar la contraseña de email. Verifique la configuración de ENCRYPTION_KEY.")
+        return self._password
+    
+    def obtener_conexion(self):
+        """
+        Crea una conexión SMTP con la configuración de email, sin modificar la configuración
+        global de Django. La conexión se abre al enviar el primer mensaje.
+        """
+        return get_connection(
+            backend='django.core.mail.backends.smtp.EmailBackend',
+            host=self.configuracion.email_host,
+            port=self.configuracion.email_port,
+            username=self.configuracion.email_host_user,
+            password=self._obtener_password(),
+            use_tls=self.configuracion.email_use_tls,
+            use_ssl=self.configuracion.email_use_ssl,
+            fail_silently=False,
+        )
     
-    def _configurar_django_email(self):
-        """Configura Django para usar la configuración de email"""
-        settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-        settings.EMAIL_HOST = self.configuracion.email_host
-        settings.EMAIL_PORT = self.configuracion.email_port
-        settings.EMAIL_USE_TLS = self.configuracion.email_use_tls
-        settings.EMAIL_USE_SSL = self.configuracion.email_use_ssl
-        settings.EMAIL_HOST_USER = self.configuracion.email_host_user
-        # Desencriptar contraseña antes de usar
+    @contextmanager
+    def sesion(self):
+        """
+        Mantiene abierta una única conexión SMTP mientras dure el bloque: todos los envíos
+        hechos dentro reutilizan la misma conexión (un solo saludo SMTP/TLS y autenticación).
+        Las sesiones anidadas reutilizan la conexión de la sesión exterior.
+        """
+        if self._conexion is not None:
+            yield self._conexion
+            return
+        
+        self._conexion = self.obtener_conexion()
         try:
-            settings.EMAIL_HOST_PASSWORD = self.configuracion.get_password()
-        except Exception as e:
-            logger.error(f"Error desencriptando contraseña de email: {e}", exc_info=True)
-            raise ValueError("No se pudo desencriptar la contraseña de email. Verifique la configuración de ENCRYPTION_KEY.")
-        settings.DEFAULT_FROM_EMAIL = self.configuracion.email_from
+            yield self._conexion
+        finally:
+            try:
+                self._conexion.close()
+            finally:
+                self._conexion = None
     
-    def enviar_email(
+    def construir_email(
         self,
         destinatarios: List[str],
         asunto: str,
@@ -54,53 +106,54 @@ class EmailService:
         adjuntos: Optional[List] = None,
         cc: Optional[List[str]] = None,
         bcc: Optional[List[str]] = None,
-    ) -> bool:
-        """
-        Envía un correo electrónico.
+    ) -> EmailMultiAlternatives:
+        """Construye el mensaje con el remitente de la configuración activa"""
+        nombre_remitente = self.configuracion.nombre_remitente or "Sistema de Gestión de Contratos"
+        from_email = f"{nombre_remitente} <{self.configuracion.email_from}>"
         
-        Args:
-            destinatarios: Lista de emails destinatarios
-            asunto: Asunto del correo
-            contenido_html: Contenido HTML del correo
-            contenido_texto: Contenido en texto plano (opcional)
-            adjuntos: Lista de archivos adjuntos (opcional)
-            cc: Lista de emails en copia (opcional)
-            bcc: Lista de emails en copia oculta (opcional)
+        email = EmailMultiAlternatives(
+            subject=asunto,
+            body=contenido_texto or contenido_html,
+            from_email=from_email,
+            to=destinatarios,
+            cc=cc or [],
+            bcc=bcc or [],
+        )
         
-        Returns:
-            True si el envío fue exitoso, False en caso contrario
+        email.attach_alternative(contenido_html, "text/html")
+        
+        if adjuntos:
+            for adjunto in adjuntos:
+                email.attach(*adjunto)
+        return email
+    
+    def construir_mensajes_individuales(
+        self,
+        destinatarios: List[str],
+        asunto: str,
+        contenido_html: str,
+        contenido_texto: Optional[str] = None,
+    ) -> List[EmailMessage]:
+        """
+        Un mensaje por destinatario (nadie ve las direcciones de los demás) con el mismo
+        contenido: el cuerpo se codifica en MIME una sola vez y se reutiliza en todos.
         """
         if not destinatarios:
-            logger.warning("No hay destinatarios para enviar el correo")
-            return False
+            return []
         
-        try:
-            self._configurar_django_email()
-            
-            nombre_remitente = self.configuracion.nombre_remitente or "Sistema de Gestión de Contratos"
-            from_email = f"{nombre_remitente} <{self.configuracion.email_from}>"
-            
-            email = EmailMultiAlternatives(
-                subject=asunto,
-                body=contenido_texto or contenido_html,
-                from_email=from_email,
-                to=destinatarios,
-                cc=cc or [],
-                bcc=bcc or [],
-            )
-            
-            email.attach_alternative(contenido_html, "text/html")
-            
-            if adjuntos:
-                for adjunto in adjuntos:
-                    email.attach(*adjunto)
-            
-            email.send()
-            logger.info(f"Correo enviado exitosamente a {', '.join(destinatarios)}")
-            return True
-            
-        except smtplib.SMTPAuthenticationError as e:
-            error_msg = str(e)
+        plantilla = self.construir_email(
+            destinatarios=destinatarios[:1],
+            asunto=asunto,
+            contenido_html=contenido_html,
+            contenido_texto=contenido_texto,
+        )
+        mime = plantilla.message()
+        return [_MensajeMIMECompartido(mime, plantilla.from_email, destinatario) for destinatario in destinatarios]
+    
+    def _describir_error(self, error: Exception) -> str:
+        """Registra el error de envío y retorna un mensaje para el historial"""
+        error_msg = str(error)
+        if isinstance(error, smtplib.SMTPAuthenticationError):
             if '5.7.9' in error_msg or 'contraseña específica de la aplicación' in error_msg.lower() or 'app password' in error_msg.lower() or 'InvalidSecondFactor' in error_msg:
                 mensaje_detallado = (
                     "ERROR DE AUTENTICACIÓN CON GMAIL:\n"
@@ -115,19 +168,118 @@ class EmailService:
                     f"Email configurado: {self.configuracion.email_host_user}\n"
                     f"Error original: {error_msg}"
                 )
-                logger.error(mensaje_detallado)
             else:
                 mensaje_detallado = (
                     f"Error de autenticación SMTP: {error_msg}\n"
                     f"Verifica que las credenciales sean correctas.\n"
                     f"Email configurado: {self.configuracion.email_host_user}"
                 )
-                logger.error(mensaje_detallado)
+            logger.error(mensaje_detallado)
+            return mensaje_detallado
+        
+        logger.error(f"Error al enviar correo: {error_msg}", exc_info=True)
+        return error_msg
+    
+    def enviar_mensajes(self, mensajes: List[EmailMessage]) -> List[Optional[str]]:
+        """
+        Envía varios mensajes por una sola conexión SMTP (la de la sesión activa, o una
+        nueva que se cierra al terminar).
+        
+        Returns:
+            Lista paralela a `mensajes`: None si el mensaje se envió, o el mensaje de error
+        """
+        if not mensajes:
+            return []
+        
+        try:
+            with self.sesion() as conexion:
+                try:
+                    conexion.open()
+                except Exception as e:
+                    # Sin conexión (o sin autenticación) ningún mensaje del lote puede salir
+                    error = self._describir_error(e)
+                    conexion.close()
+                    return [error] * len(mensajes)
+                
+                resultados = []
+                reconectada = False
+                for posicion, mensaje in enumerate(mensajes):
+                    try:
+                        conexion.send_messages([mensaje])
+                        resultados.append(None)
+                        logger.info(f"Correo enviado exitosamente a {', '.join(mensaje.to)}")
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        # Rechazo de este mensaje: la conexión sigue sirviendo para los demás
+                        resultados.append(self._describir_error(e))
+                    except Exception as e:
+                        # La conexión pudo quedar inutilizable: se reabre una sola vez por lote.
+                        # Si no se puede (o vuelve a fallar) el resto del lote se marca como fallido
+                        # en lugar de abrir una conexión nueva por cada mensaje.
+                        resultados.append(self._describir_error(e))
+                        conexion.close()
+                        pendientes = len(mensajes) - posicion - 1
+                        if not pendientes:
+                            break
+                        if reconectada:
+                            resultados.extend([resultados[-1]] * pendientes)
+                            break
+                        try:
+                            conexion.open()
+                            reconectada = True
+                        except Exception as error_reconexion:
+                            error = self._describir_error(error_reconexion)
+                            conexion.close()
+                            resultados.extend([error] * pendientes)
+                            break
+                return resultados
+        except ValueError as e:
+            logger.error(str(e))
+            return [str(e)] * len(mensajes)
+    
+    def enviar_email(
+        self,
+        destinatarios: List[str],
+        asunto: str,
+        contenido_html: str,
+        contenido_texto: Optional[str] = None,
+        adjuntos: Optional[List] = None,
+        cc: Optional[List[str]] = None,
+        bcc: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        Envía un correo electrónico.
+        
+        Args:
+            destinatarios: Lista de emails destinatarios
+            asunto: Asunto del correo
+            contenido_html: Contenido HTML del correo
+            contenido_texto: Contenido en texto plano (opcional)
+            adjuntos: Lista de archivos adjuntos (opcional)
+            cc: Lista de emails en copia (opcional)
+            bcc: Lista de emails en copia oculta (opcional)
+        
+        Returns:
+            True si el envío fue exitoso, False en caso contrario
+        """
+        if not destinatarios:
+            logger.warning("No hay destinatarios para enviar el correo")
             return False
+        
+        try:
+            email = self.construir_email(
+                destinatarios=destinatarios,
+                asunto=asunto,
+                contenido_html=contenido_html,
+                contenido_texto=contenido_texto,
+                adjuntos=adjuntos,
+                cc=cc,
+                bcc=bcc,
+            )
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Error al enviar correo: {error_msg}", exc_info=True)
+            logger.error(f"Error al construir el correo: {str(e)}", exc_info=True)
             return False
+        
+        return self.enviar_mensajes([email])[0] is None
     
     def enviar_email_template(
         self,
@@ -0,0 +1,254 @@
+"""
+Mantenimiento de la tabla desnormalizada ContratoEstadoVigente.
+
+Resuelve el efecto cadena (Contrato + Otro Sí + Renovaciones Automáticas + cálculos
+IPC/Salario Mínimo) una sola vez por contrato y lo persiste, de modo que listados,
+dashboard y alertas puedan filtrar y ordenar en SQL.
+"""
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_REBUILD = 500
+
+# Campo del snapshot -> clave de la vista vigente (get_vista_vigente_contrato)
+CAMPOS_VISTA = {
+    'valor_canon': 'valor_canon',
+    'canon_minimo_garantizado': 'canon_minimo_garantizado',
+    'porcentaje_ventas': 'porcentaje_ventas',
+    'modalidad_pago': 'modalidad_pago',
+    'tipo_condicion_ipc': 'tipo_condicion_ipc',
+    'periodicidad_ipc': 'periodicidad_ipc',
+    'fecha_aumento_ipc': 'fecha_aumento_ipc',
+}
+
+# Campo del snapshot -> campo del contrato base (si la vista no está disponible)
+CAMPOS_CONTRATO_BASE = {
+    'valor_canon': 'valor_canon_fijo',
+    'canon_minimo_garantizado': 'canon_minimo_garantizado',
+    'porcentaje_ventas': 'porcentaje_ventas',
+    'modalidad_pago': 'modalidad_pago',
+    'tipo_condicion_ipc': 'tipo_condicion_ipc',
+    'periodicidad_ipc': 'periodicidad_ipc',
+    'fecha_aumento_ipc': 'fecha_aumento_ipc',
+}
+
+CAMPOS_ACTUALIZABLES = [
+    'fecha_referencia',
+    'vigente',
+    'fecha_final_vigente',
+    'origen_fecha_final',
+    'valor_canon',
+    'origen_valor_canon',
+    'canon_minimo_garantizado',
+    'origen_canon_minimo_garantizado',
+    'porcentaje_ventas',
+    'origen_porcentaje_ventas',
+    'modalidad_pago',
+    'origen_modalidad_pago',
+    'tipo_condicion_ipc',
+    'origen_tipo_condicion_ipc',
+    'periodicidad_ipc',
+    'origen_periodicidad_ipc',
+    'fecha_aumento_ipc',
+    'origen_fecha_aumento_ipc',
+    'tipo_ajuste',
+    'periodicidad_ajuste',
+    'proxima_fecha_ajuste',
+    'origen_proxima_fecha_ajuste',
+    'ajuste_calculado',
+    'ajuste_vigente_hasta',
+    'fecha_actualizacion',
+]
+
+
+def _origen_modificacion(modificacion):
+    """
+    Documento que fijó el valor según campos_modificados de la vista vigente.
+    None significa que el valor proviene del contrato base.
+    """
+    if not modificacion:
+        return None
+    if modificacion.get('calculo'):
+        return modificacion.get('tipo_calculo') or 'Cálculo'
+    return modificacion.get('otrosi')
+
+
+def construir_estado_vigente(
+    contrato,
+    fecha_referencia=None,
+    timeline=None,
+    ultimo_calculo_aplicado=None,
+    usar_calculo_precargado=False,
+    fechas_calculos_ipc=None,
+    fechas_calculos_sm=None,
+):
+    """
+    Construye (sin guardar) el ContratoEstadoVigente de un contrato.
+
+    Args:
+        timeline: ContratoTimeline opcional para resolver los eventos sin consultas
+        ultimo_calculo_aplicado: Cálculo IPC/Salario Mínimo precargado
+        usar_calculo_precargado: Indica que ultimo_calculo_aplicado ya fue consultado (aunque sea None)
+        fechas_calculos_ipc, fechas_calculos_sm: Fechas de aplicación de los cálculos precargadas
+    """
+    from gestion.models import ContratoEstadoVigente
+    from gestion.utils_ipc import resolver_proximo_ajuste
+    from gestion.utils_otrosi import get_vista_vigente_contrato
+    from gestion.utils_timeline import ContratoTimeline
+    from gestion.views.utils import _estado_vigente_contrato, _obtener_fecha_final_contrato
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    if timeline is None:
+        timeline = ContratoTimeline.para_contrato(contrato)
+
+    kwargs_vista = {'timeline': timeline}
+    if usar_calculo_precargado:
+        kwargs_vista['ultimo_calculo_aplicado'] = ultimo_calculo_aplicado
+    vista = get_vista_vigente_contrato(contrato, fecha_referencia, **kwargs_vista)
+    modificaciones = vista.get('campos_modificados') or {}
+
+    estado = ContratoEstadoVigente(
+        contrato=contrato,
+        fecha_referencia=fecha_referencia,
+        vigente=_estado_vigente_contrato(contrato, fecha_referencia, timeline=timeline),
+        fecha_final_vigente=_obtener_fecha_final_contrato(contrato, fecha_referencia, timeline=timeline),
+        origen_fecha_final=_origen_modificacion(modificaciones.get('fecha_final_actualizada')),
+    )
+
+    for campo, clave_vista in CAMPOS_VISTA.items():
+        if vista.get('vista_disponible'):
+            valor = vista.get(clave_vista)
+        else:
+            valor = getattr(contrato, CAMPOS_CONTRATO_BASE[campo], None)
+        setattr(estado, campo, valor)
+        setattr(estado, f'origen_{campo}', _origen_modificacion(modificaciones.get(clave_vista)))
+
+    ajuste = resolver_proximo_ajuste(
+        contrato,
+        fecha_referencia,
+        timeline=timeline,
+        fechas_calculos_ipc=fechas_calculos_ipc,
+        fechas_calculos_sm=fechas_calculos_sm,
+    )
+    estado.tipo_ajuste = ajuste['tipo_condicion_ipc']
+    estado.periodicidad_ajuste = ajuste['periodicidad_ipc']
+    estado.proxima_fecha_ajuste = ajuste['proxima_fecha_ajuste']
+    estado.origen_proxima_fecha_ajuste = ajuste['origen']
+    estado.ajuste_calculado = ajuste['ajuste_calculado']
+    # Los cálculos no dependen de la fecha: el ajuste solo cambia cuando un evento inicia o termina
+    proximo_cambio = timeline.proximo_cambio(fecha_referencia)
+    estado.ajuste_vigente_hasta = proximo_cambio - timedelta(days=1) if proximo_cambio else date.max
+
+    return estado
+
+
+def calcular_estados_vigentes(contratos, fecha_referencia=None):
+    """
+    Construye (sin guardar) los estados vigentes de un lote de contratos con un número
+    constante de consultas.
+
+    Args:
+        contratos: QuerySet o lista de instancias de Contrato, o lista de IDs
+    """
+    from gestion.models import Contrato
+    from gestion.utils_ipc import (
+        obtener_fechas_calculos_por_contrato,
+        obtener_ultimos_calculos_aplicados_hasta_fecha,
+    )
+    from gestion.utils_timeline import ContratoTimeline
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+
+    contratos = list(contratos)
+    if contratos and not isinstance(contratos[0], Contrato):
+        contratos_por_id = Contrato.objects.in_bulk(contratos)
+        contratos = [contratos_por_id[contrato_id] for contrato_id in contratos if contrato_id in contratos_por_id]
+
+    timelines = ContratoTimeline.para_contratos(contratos)
+    contratos_ids = [contrato.pk for contrato in contratos]
+    calculos = obtener_ultimos_calculos_aplicados_hasta_fecha(contratos_ids, fecha_referencia)
+    fechas_ipc, fechas_sm = obtener_fechas_calculos_por_contrato(contratos_ids)
+
+    estados = []
+    for contrato in contratos:
+        try:
+            estados.append(construir_estado_vigente(
+                contrato,
+                fecha_referencia,
+                timeline=timelines.get(contrato.pk),
+                ultimo_calculo_aplicado=calculos.get(contrato.pk),
+                usar_calculo_precargado=True,
+                fechas_calculos_ipc=fechas_ipc.get(contrato.pk, set()),
+                fechas_calculos_sm=fechas_sm.get(contrato.pk, set()),
+            ))
+        except Exception as exc:
+            logger.error(
+                'Error calculando estado vigente del contrato %s: %s',
+                contrato.num_contrato, exc, exc_info=True
+            )
+    return estados
+
+
+def guardar_estados_vigentes(estados):
+    """Inserta o actualiza los estados vigentes en bloque. Retorna la cantidad guardada."""
+    from gestion.models import ContratoEstadoVigente
+    from django.utils import timezone
+
+    if not estados:
+        return 0
+
+    ahora = timezone.now()
+    for estado in estados:
+        estado.fecha_actualizacion = ahora
+
+    ContratoEstadoVigente.objects.bulk_create(
+        estados,
+        batch_size=TAMANO_LOTE_REBUILD,
+        update_conflicts=True,
+        unique_fields=['contrato'],
+        update_fields=CAMPOS_ACTUALIZABLES,
+    )
+    return len(estados)
+
+
+def reconstruir_estado_vigente(contrato_id, fecha_referencia=None):
+    """
+    Recalcula y guarda el estado vigente de un contrato.
+    Si el contrato ya no existe, elimina su estado.
+    """
+    from gestion.models import Contrato, ContratoEstadoVigente
+
+    contrato = Contrato.objects.filter(pk=contrato_id).first()
+    if contrato is None:
+        ContratoEstadoVigente.objects.filter(contrato_id=contrato_id).delete()
+        return None
+
+    estado = construir_estado_vigente(contrato, fecha_referencia)
+    guardar_estados_vigentes([estado])
+    return estado
+
+
+def programar_reconstruccion_estado_vigente(contrato_id):
+    """
+    Programa la reconstrucción del estado vigente para cuando la transacción actual
+    confirme, de modo que se lean los datos ya guardados (o eliminados).
+    """
+    if not contrato_id:
+        return
+
+    def _reconstruir():
+        try:
+            reconstruir_estado_vigente(contrato_id)
+        except Exception as exc:
+            logger.error(
+                'Error reconstruyendo estado vigente del contrato %s: %s',
+                contrato_id, exc, exc_info=True
+            )
+
+    transaction.on_commit(_reconstruir)
@@ -2,15 +2,22 @@
 Servicios para la construcción de archivos de exportación.
 """
 
+import csv
+from copy import copy
 from dataclasses import dataclass
+from datetime import date
 from io import BytesIO
-from typing import Sequence
+from itertools import chain, islice
+from tempfile import SpooledTemporaryFile
+from typing import Iterable, Iterator, Sequence
 
 from django.utils import timezone
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 
 
 def formatear_numero_con_puntos(valor):
@@ -39,6 +46,18 @@ PALETA_AVENIDA = {
 
 FORMATO_NUMERICO = '#.##0'
 
+# Motor streaming: registros usados para estimar anchos, bytes del archivo en memoria antes de pasar a disco
+# y tamaño de lote al recorrer querysets
+TAMANO_MUESTRA_ANCHOS = 500
+TAMANO_MAXIMO_MEMORIA_EXPORTACION = 8 * 1024 * 1024
+TAMANO_LOTE_EXPORTACION = 500
+
+# Formatos de texto plano: delimitador y content type
+FORMATOS_TEXTO = {
+    'csv': (',', 'text/csv; charset=utf-8'),
+    'tsv': ('\t', 'text/tab-separated-values; charset=utf-8'),
+}
+
 
 def limpiar_nombre_hoja_excel(nombre: str) -> str:
     """
@@ -188,6 +207,49 @@ class ExportacionVaciaError(Exception):
     """Se lanza cuando no hay información para exportar."""
 
 
+def _normalizar_registro(registro: Sequence, columnas: Sequence[ColumnaExportacion]) -> list:
+    """
+    Convierte los valores de un registro al formato de exportación: numéricos como
+    enteros y valores vacíos como "N/A".
+    """
+    num_columnas = len(columnas)
+    num_valores = len(registro)
+
+    # Validar que el registro tenga el mismo número de valores que columnas
+    if num_valores != num_columnas:
+        raise ValueError(
+            f'El registro tiene {num_valores} valores pero se esperaban {num_columnas} columnas. '
+            f'Registro: {registro[:5]}...'
+        )
+
+    registro_procesado = []
+    for indice, valor in enumerate(registro):
+        col_config = columnas[indice]
+        # Si es numérico y el valor es None o vacío, convertir a "N/A"
+        if col_config.es_numerica:
+            # Si el valor es un string (como porcentajes o texto), no tratarlo como numérico
+            if isinstance(valor, str):
+                registro_procesado.append(valor)
+            elif valor is None:
+                registro_procesado.append('N/A')
+            else:
+                try:
+                    # Convertir a entero (sin decimales)
+                    valor_numerico = float(valor)
+                    valor_entero = int(round(valor_numerico))
+                    # Guardar como número (no como texto) para que Excel pueda aplicar formato
+                    registro_procesado.append(valor_entero)
+                except (ValueError, TypeError):
+                    registro_procesado.append('N/A')
+        else:
+            # Para campos no numéricos, None o vacío se convierte a "N/A"
+            if valor is None or valor == '' or (isinstance(valor, str) and valor.strip() == ''):
+                registro_procesado.append('N/A')
+            else:
+                registro_procesado.append(valor)
+    return registro_procesado
+
+
 def generar_excel_corporativo(
     nombre_hoja: str,
     columnas: Sequence[ColumnaExportacion],
@@ -206,46 +268,8 @@ def generar_excel_corporativo(
     hoja.title = limpiar_nombre_hoja_excel(nombre_hoja)
 
     hoja.append([columna.titulo for columna in columnas])
-    num_columnas = len(columnas)
-    
     for registro in registros:
-        registro_procesado = []
-        num_valores = len(registro)
-        
-        # Validar que el registro tenga el mismo número de valores que columnas
-        if num_valores != num_columnas:
-            raise ValueError(
-                f'El registro tiene {num_valores} valores pero se esperaban {num_columnas} columnas. '
-                f'Registro: {registro[:5]}...'
-            )
-        
-        for indice, valor in enumerate(registro):
-            if indice >= num_columnas:
-                break
-            col_config = columnas[indice]
-            # Si es numérico y el valor es None o vacío, convertir a "N/A"
-            if col_config.es_numerica:
-                # Si el valor es un string (como porcentajes o texto), no tratarlo como numérico
-                if isinstance(valor, str):
-                    registro_procesado.append(valor)
-                elif valor is None:
-                    registro_procesado.append('N/A')
-                else:
-                    try:
-                        # Convertir a entero (sin decimales)
-                        valor_numerico = float(valor)
-                        valor_entero = int(round(valor_numerico))
-                        # Guardar como número (no como texto) para que Excel pueda aplicar formato
-                        registro_procesado.append(valor_entero)
-                    except (ValueError, TypeError):
-                        registro_procesado.append('N/A')
-            else:
-                # Para campos no numéricos, None o vacío se convierte a "N/A"
-                if valor is None or valor == '' or (isinstance(valor, str) and valor.strip() == ''):
-                    registro_procesado.append('N/A')
-                else:
-                    registro_procesado.append(valor)
-        hoja.append(registro_procesado)
+        hoja.append(_normalizar_registro(registro, columnas))
 
     ultima_fila_datos = len(registros) + 1
     formateador.aplicar(hoja, ultima_fila_datos)
@@ -269,6 +293,217 @@ def generar_excel_corporativo(
     return buffer.getvalue()
 
 
+class EscritorExcelCorporativo:
+    """
+    Escribe el formato corporativo fila por fila sobre una hoja en modo write-only.
+
+    Los estilos se resuelven una sola vez por combinación (columna, fila par/impar,
+    valor numérico) y se copian a cada celda, en lugar de recorrer la hoja completa
+    al final como FormateadorExcelCorporativo.
+    """
+
+    def __init__(self, hoja, columnas: Sequence[ColumnaExportacion]) -> None:
+        self.hoja = hoja
+        self.columnas = columnas
+        self._formateador = FormateadorExcelCorporativo(columnas)
+        self._estilos = {}
+        self._fila_actual = 0
+
+    def escribir_encabezados(self, muestra: Sequence[Sequence]) -> None:
+        """
+        Configura la hoja y escribe los encabezados. En modo write-only los anchos se
+        fijan antes de la primera fila, por eso se estiman con una muestra de registros.
+        """
+        self.hoja.sheet_view.showGridLines = False
+        self.hoja.freeze_panes = 'A2'
+        self.hoja.row_dimensions[1].height = 24
+
+        filas_muestra = [[self._valor_celda(indice, valor) for indice, valor in enumerate(fila)] for fila in muestra]
+        for indice, configuracion in enumerate(self.columnas, start=1):
+            if configuracion.ancho is not None:
+                ancho = configuracion.ancho
+            else:
+                ancho = self._estimar_ancho_columna(indice - 1, filas_muestra)
+            self.hoja.column_dimensions[get_column_letter(indice)].width = max(ancho, 12)
+
+        encabezado_font = Font(name='Arial', size=9, color=PALETA_AVENIDA['blanco'], bold=True)
+        encabezado_fill = PatternFill(fill_type='solid', start_color=PALETA_AVENIDA['oscuro'], end_color=PALETA_AVENIDA['oscuro'])
+        celdas = []
+        for configuracion in self.columnas:
+            celda = WriteOnlyCell(self.hoja, value=str(configuracion.titulo).strip())
+            celda.font = encabezado_font
+            celda.fill = encabezado_fill
+            celda.alignment = Alignment(horizontal='center', vertical='center')
+            celda.border = self._formateador._bordes_celda
+            celdas.append(celda)
+        self.hoja.append(celdas)
+        self._fila_actual = 1
+
+    def escribir_fila(self, registro: Sequence) -> None:
+        """Escribe un registro ya normalizado con _normalizar_registro."""
+        self._fila_actual += 1
+        es_par = self._fila_actual % 2 == 0
+        celdas = []
+        for indice, valor in enumerate(registro):
+            valor = self._valor_celda(indice, valor)
+            es_numero = self.columnas[indice].es_numerica and isinstance(valor, int)
+            celda = WriteOnlyCell(self.hoja, value=valor)
+            # Las fechas traen su formato al asignar el valor; se conserva en el estilo cacheado
+            formato = '#,##0' if es_numero else celda.number_format
+            celda._style = copy(self._estilo(indice, es_par, es_numero, formato))
+            celdas.append(celda)
+        self.hoja.append(celdas)
+
+    def escribir_pie(self) -> None:
+        self.hoja.append([])
+        ahora_local = timezone.localtime(timezone.now())
+        celda_info = WriteOnlyCell(self.hoja, value=f'Generado el {ahora_local.strftime("%Y-%m-%d %H:%M:%S")}')
+        celda_info.alignment = Alignment(horizontal='right', vertical='center')
+        celda_info.font = Font(name='Arial', size=9, italic=True, color=PALETA_AVENIDA['oscuro'])
+        self.hoja.append([celda_info])
+        fila_informativa = self._fila_actual + 2
+        self.hoja.merged_cells.add(CellRange(
+            min_col=1, min_row=fila_informativa, max_col=len(self.columnas), max_row=fila_informativa
+        ))
+
+    def _valor_celda(self, indice: int, valor):
+        """Mismas conversiones numéricas que FormateadorExcelCorporativo._formatear_cuerpo."""
+        configuracion = self.columnas[indice]
+        if not configuracion.es_numerica or valor is None or valor == 'N/A':
+            return valor
+        if isinstance(valor, (int, float)):
+            return int(round(float(valor)))
+        if isinstance(valor, str) and valor.replace('.', '').replace(',', '').isdigit():
+            return int(float(valor.replace(',', '.')))
+        return valor
+
+    def _estilo(self, indice: int, es_par: bool, es_numero: bool, formato: str):
+        clave = (indice, es_par, es_numero, formato)
+        estilo = self._estilos.get(clave)
+        if estilo is None:
+            color = PALETA_AVENIDA['claro'] if es_par else PALETA_AVENIDA['blanco']
+            plantilla = WriteOnlyCell(self.hoja)
+            plantilla.fill = PatternFill(fill_type='solid', start_color=color, end_color=color)
+            plantilla.border = self._formateador._bordes_celda
+            plantilla.font = Font(name='Arial', size=9)
+            plantilla.number_format = formato
+            if es_numero:
+                plantilla.alignment = Alignment(horizontal='right', vertical='center')
+            else:
+                plantilla.alignment = FormateadorExcelCorporativo._resolver_alineacion(self.columnas[indice].alineacion)
+            estilo = plantilla._style
+            self._estilos[clave] = estilo
+        return estilo
+
+    def _estimar_ancho_columna(self, indice: int, filas_muestra: Sequence[Sequence]) -> int:
+        valores = [self.columnas[indice].titulo] + [fila[indice] for fila in filas_muestra]
+        max_largo = 0
+        for valor in valores:
+            if valor is None:
+                representacion = ''
+            elif isinstance(valor, (int, float)):
+                representacion = FormateadorExcelCorporativo._formatear_numero_para_ancho(valor)
+            else:
+                representacion = str(valor)
+            max_largo = max(max_largo, len(representacion))
+        return max_largo + 2
+
+
+def generar_excel_corporativo_streaming(
+    nombre_hoja: str,
+    columnas: Sequence[ColumnaExportacion],
+    registros: Iterable[Sequence],
+    tamano_muestra: int = TAMANO_MUESTRA_ANCHOS,
+):
+    """
+    Variante de generar_excel_corporativo para exportaciones grandes.
+
+    Consume los registros de un iterable (puede ser un generador), escribe cada fila
+    con su formato en modo write-only y guarda el libro en un archivo temporal que
+    solo pasa a disco si supera TAMANO_MAXIMO_MEMORIA_EXPORTACION. Los anchos de las
+    columnas sin ancho fijo se estiman con los primeros tamano_muestra registros.
+
+    Returns:
+        SpooledTemporaryFile posicionado al inicio; quien lo recibe debe cerrarlo
+        (FileResponse lo cierra al terminar de enviarlo).
+    """
+    iterador = iter(registros)
+    muestra = [_normalizar_registro(registro, columnas) for registro in islice(iterador, tamano_muestra)]
+    if not muestra:
+        raise ExportacionVaciaError('No hay información disponible para exportar.')
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(limpiar_nombre_hoja_excel(nombre_hoja))
+    escritor = EscritorExcelCorporativo(hoja, columnas)
+
+    escritor.escribir_encabezados(muestra)
+    for registro in muestra:
+        escritor.escribir_fila(registro)
+    del muestra
+    for registro in iterador:
+        escritor.escribir_fila(_normalizar_registro(registro, columnas))
+    escritor.escribir_pie()
+
+    archivo = SpooledTemporaryFile(max_size=TAMANO_MAXIMO_MEMORIA_EXPORTACION)
+    try:
+        libro.save(archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
+
+
+class _LineaTexto:
+    """Pseudo-archivo para csv.writer: devuelve cada línea escrita en lugar de acumularla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def generar_exportacion_texto(
+    columnas: Sequence[ColumnaExportacion],
+    registros: Iterable[Sequence],
+    formato: str = 'csv',
+) -> Iterator[str]:
+    """
+    Exportación sin formato (CSV/TSV) para integraciones: mismas columnas y registros que
+    el Excel, con los valores originales (vacíos como celda vacía y fechas ISO).
+
+    Lanza ExportacionVaciaError antes de producir la primera línea si no hay registros;
+    después las líneas se generan a medida que se consumen los registros.
+    """
+    delimitador, _ = FORMATOS_TEXTO[formato]
+    iterador = iter(registros)
+    primero = next(iterador, None)
+    if primero is None:
+        raise ExportacionVaciaError('No hay información disponible para exportar.')
+
+    escritor = csv.writer(_LineaTexto(), delimiter=delimitador, lineterminator='\n')
+
+    def _lineas():
+        yield escritor.writerow([columna.titulo for columna in columnas])
+        for registro in chain((primero,), iterador):
+            if len(registro) != len(columnas):
+                raise ValueError(
+                    f'El registro tiene {len(registro)} valores pero se esperaban {len(columnas)} columnas. '
+                    f'Registro: {registro[:5]}...'
+                )
+            yield escritor.writerow([_valor_texto(valor) for valor in registro])
+
+    return _lineas()
+
+
 def generar_excel_informes_ventas(informes_queryset=None):
     """
     Genera un archivo Excel detallado con los informes de ventas especificados.
@@ -278,18 +513,37 @@ def generar_excel_informes_ventas(informes_queryset=None):
         informes_queryset: QuerySet opcional de InformeVentas. Si no se proporciona, 
                           se obtienen todos los informes.
     """
+    nombre_hoja, columnas, registros = preparar_exportacion_informes_ventas(informes_queryset)
+    return generar_excel_corporativo(
+        nombre_hoja=nombre_hoja,
+        columnas=columnas,
+        registros=list(registros),
+    )
+
+
+def preparar_exportacion_informes_ventas(informes_queryset=None):
+    """
+    Prepara la exportación de informes de ventas para cualquiera de los motores Excel.
+
+    Returns:
+        tuple (nombre_hoja, columnas, registros); registros es un generador que recorre
+        los informes por lotes sin cargarlos todos en memoria.
+    """
+    from django.db.models import Prefetch
     from gestion.models import InformeVentas, CalculoFacturacionVentas
     
-    # Obtener los informes con relaciones optimizadas
     if informes_queryset is None:
-        informes = InformeVentas.objects.select_related(
-            'contrato', 'contrato__arrendatario', 'contrato__local', 'contrato__tipo_contrato'
-        ).prefetch_related('calculos_facturacion').order_by('-año', '-mes', 'contrato__num_contrato')
-    else:
-        # Si se proporciona un queryset, asegurar que tenga las relaciones optimizadas
-        informes = informes_queryset.select_related(
-            'contrato', 'contrato__arrendatario', 'contrato__local', 'contrato__tipo_contrato'
-        ).prefetch_related('calculos_facturacion').order_by('-año', '-mes', 'contrato__num_contrato')
+        informes_queryset = InformeVentas.objects.all()
+    # El último cálculo de cada informe se precarga ordenado (evita una consulta por informe)
+    informes = informes_queryset.select_related(
+        'contrato', 'contrato__arrendatario', 'contrato__local', 'contrato__tipo_contrato'
+    ).prefetch_related(
+        Prefetch(
+            'calculos_facturacion',
+            queryset=CalculoFacturacionVentas.objects.select_related('otrosi_referencia').order_by('-fecha_calculo'),
+            to_attr='calculos_ordenados',
+        )
+    ).order_by('-año', '-mes', 'contrato__num_contrato')
     
     def formatear_moneda_excel(valor):
         """Formatea un valor decimal como número entero para Excel"""
@@ -338,84 +592,88 @@ def generar_excel_informes_ventas(informes_queryset=None):
         ColumnaExportacion('Observaciones Cálculo', ancho=30),
     ]
     
-    registros = []
-    
-    for informe in informes:
-        # Obtener el último cálculo asociado (si existe)
-        calculo = informe.calculos_facturacion.order_by('-fecha_calculo').first()
-        
-        # Información básica del informe
-        registro = [
-            informe.contrato.num_contrato,
-            informe.contrato.arrendatario.razon_social,
-            informe.contrato.arrendatario.nit,
-            informe.contrato.local.nombre_comercial_stand,
-            informe.contrato.tipo_contrato.nombre if informe.contrato.tipo_contrato else 'N/A',
-            informe.get_mes_display(),
-            informe.año,
-            informe.get_estado_display(),
-            informe.fecha_entrega.strftime('%d/%m/%Y') if informe.fecha_entrega else 'N/A',
-            informe.dias_vencido() if informe.esta_vencido() else 0,
-            informe.observaciones or 'N/A',
-            informe.registrado_por or 'N/A',
-                timezone.localtime(informe.fecha_registro).strftime('%d/%m/%Y %H:%M') if informe.fecha_registro else 'N/A',
-            
-            # Información del contrato
-            informe.contrato.modalidad_pago or 'N/A',
-            formatear_moneda_excel(informe.contrato.valor_canon_fijo),
-            formatear_moneda_excel(informe.contrato.canon_minimo_garantizado),
-            f'{informe.contrato.porcentaje_ventas}%' if informe.contrato.porcentaje_ventas else 'N/A',
-            informe.contrato.dia_limite_reporte_ventas or 'N/A',
-        ]
-        
-        # Información del cálculo (si existe)
-        # Total de columnas de cálculo: 14
-        if calculo:
-            registro.extend([
-                'Sí',  # 1. Tiene Cálculo
-                formatear_moneda_excel(calculo.ventas_totales) if calculo.ventas_totales is not None else 'N/A',  # 2. Ventas Totales
-                formatear_moneda_excel(calculo.devoluciones) if calculo.devoluciones is not None else 'N/A',  # 3. Devoluciones
-                formatear_moneda_excel(calculo.base_neta) if calculo.base_neta is not None else 'N/A',  # 4. Base Neta
-                f'{calculo.porcentaje_ventas_vigente}%' if calculo.porcentaje_ventas_vigente is not None else 'N/A',  # 5. Porcentaje Vigente (%)
-                formatear_moneda_excel(calculo.valor_calculado_porcentaje) if calculo.valor_calculado_porcentaje is not None else 'N/A',  # 6. Valor Calculado (Base × %)
-                formatear_moneda_excel(calculo.canon_minimo_garantizado_vigente) if calculo.canon_minimo_garantizado_vigente is not None else 'N/A',  # 7. Canon Mínimo Vigente
-                formatear_moneda_excel(calculo.excedente_sobre_minimo) if calculo.excedente_sobre_minimo is not None else 'N/A',  # 8. Excedente sobre Mínimo
-                'Sí' if calculo.aplica_variable else 'No',  # 9. Aplica Variable
-                formatear_moneda_excel(calculo.valor_a_facturar_variable) if calculo.valor_a_facturar_variable is not None else 'N/A',  # 10. Valor a Facturar Variable
-                calculo.otrosi_referencia.numero_otrosi if calculo.otrosi_referencia else 'N/A',  # 11. Otro Sí Referencia
-                calculo.calculado_por or 'N/A',  # 12. Calculado Por
-                timezone.localtime(calculo.fecha_calculo).strftime('%d/%m/%Y %H:%M') if calculo.fecha_calculo else 'N/A',  # 13. Fecha Cálculo (zona horaria Colombia)
-                calculo.observaciones or 'N/A',  # 14. Observaciones Cálculo
-            ])
-        else:
-            # Cuando no hay cálculo, agregar exactamente 14 valores 'N/A'
-            registro.extend([
-                'No',  # 1. Tiene Cálculo
-                'N/A',  # 2. Ventas Totales
-                'N/A',  # 3. Devoluciones
-                'N/A',  # 4. Base Neta
-                'N/A',  # 5. Porcentaje Vigente (%)
-                'N/A',  # 6. Valor Calculado (Base × %)
-                'N/A',  # 7. Canon Mínimo Vigente
-                'N/A',  # 8. Excedente sobre Mínimo
-                'N/A',  # 9. Aplica Variable
-                'N/A',  # 10. Valor a Facturar Variable
-                'N/A',  # 11. Otro Sí Referencia
-                'N/A',  # 12. Calculado Por
-                'N/A',  # 13. Fecha Cálculo
-                'N/A',  # 14. Observaciones Cálculo
-            ])
-        
-        registros.append(registro)
-    
+    def _registros():
+        for informe in informes.iterator(chunk_size=TAMANO_LOTE_EXPORTACION):
+            yield _registro_informe_ventas(informe, formatear_moneda_excel)
+
     ahora_local = timezone.localtime(timezone.now())
     nombre_hoja = f'Informes Ventas {ahora_local.strftime("%Y%m%d")}'
+
+    return nombre_hoja, columnas, _registros()
+
+
+def _registro_informe_ventas(informe, formatear_moneda_excel):
+    """Fila de exportación de un informe de ventas (con su último cálculo precargado)."""
+    # Obtener el último cálculo asociado (si existe)
+    calculos = getattr(informe, 'calculos_ordenados', None)
+    if calculos is None:
+        calculo = informe.calculos_facturacion.order_by('-fecha_calculo').first()
+    else:
+        calculo = calculos[0] if calculos else None
+
+    # Información básica del informe
+    registro = [
+        informe.contrato.num_contrato,
+        informe.contrato.arrendatario.razon_social,
+        informe.contrato.arrendatario.nit,
+        informe.contrato.local.nombre_comercial_stand,
+        informe.contrato.tipo_contrato.nombre if informe.contrato.tipo_contrato else 'N/A',
+        informe.get_mes_display(),
+        informe.año,
+        informe.get_estado_display(),
+        informe.fecha_entrega.strftime('%d/%m/%Y') if informe.fecha_entrega else 'N/A',
+        informe.dias_vencido() if informe.esta_vencido() else 0,
+        informe.observaciones or 'N/A',
+        informe.registrado_por or 'N/A',
+        timezone.localtime(informe.fecha_registro).strftime('%d/%m/%Y %H:%M') if informe.fecha_registro else 'N/A',
+        
+        # Información del contrato
+        informe.contrato.modalidad_pago or 'N/A',
+        formatear_moneda_excel(informe.contrato.valor_canon_fijo),
+        formatear_moneda_excel(informe.contrato.canon_minimo_garantizado),
+        f'{informe.contrato.porcentaje_ventas}%' if informe.contrato.porcentaje_ventas else 'N/A',
+        informe.contrato.dia_limite_reporte_ventas or 'N/A',
+    ]
     
-    return generar_excel_corporativo(
-        nombre_hoja=nombre_hoja,
-        columnas=columnas,
-        registros=registros,
-    )
+    # Información del cálculo (si existe)
+    # Total de columnas de cálculo: 14
+    if calculo:
+        registro.extend([
+            'Sí',  # 1. Tiene Cálculo
+            formatear_moneda_excel(calculo.ventas_totales) if calculo.ventas_totales is not None else 'N/A',  # 2. Ventas Totales
+            formatear_moneda_excel(calculo.devoluciones) if calculo.devoluciones is not None else 'N/A',  # 3. Devoluciones
+            formatear_moneda_excel(calculo.base_neta) if calculo.base_neta is not None else 'N/A',  # 4. Base Neta
+            f'{calculo.porcentaje_ventas_vigente}%' if calculo.porcentaje_ventas_vigente is not None else 'N/A',  # 5. Porcentaje Vigente (%)
+            formatear_moneda_excel(calculo.valor_calculado_porcentaje) if calculo.valor_calculado_porcentaje is not None else 'N/A',  # 6. Valor Calculado (Base × %)
+            formatear_moneda_excel(calculo.canon_minimo_garantizado_vigente) if calculo.canon_minimo_garantizado_vigente is not None else 'N/A',  # 7. Canon Mínimo Vigente
+            formatear_moneda_excel(calculo.excedente_sobre_minimo) if calculo.excedente_sobre_minimo is not None else 'N/A',  # 8. Excedente sobre Mínimo
+            'Sí' if calculo.aplica_variable else 'No',  # 9. Aplica Variable
+            formatear_moneda_excel(calculo.valor_a_facturar_variable) if calculo.valor_a_facturar_variable is not None else 'N/A',  # 10. Valor a Facturar Variable
+            calculo.otrosi_referencia.numero_otrosi if calculo.otrosi_referencia else 'N/A',  # 11. Otro Sí Referencia
+            calculo.calculado_por or 'N/A',  # 12. Calculado Por
+            timezone.localtime(calculo.fecha_calculo).strftime('%d/%m/%Y %H:%M') if calculo.fecha_calculo else 'N/A',  # 13. Fecha Cálculo (zona horaria Colombia)
+            calculo.observaciones or 'N/A',  # 14. Observaciones Cálculo
+        ])
+    else:
+        # Cuando no hay cálculo, agregar exactamente 14 valores 'N/A'
+        registro.extend([
+            'No',  # 1. Tiene Cálculo
+            'N/A',  # 2. Ventas Totales
+            'N/A',  # 3. Devoluciones
+            'N/A',  # 4. Base Neta
+            'N/A',  # 5. Porcentaje Vigente (%)
+            'N/A',  # 6. Valor Calculado (Base × %)
+            'N/A',  # 7. Canon Mínimo Vigente
+            'N/A',  # 8. Excedente sobre Mínimo
+            'N/A',  # 9. Aplica Variable
+            'N/A',  # 10. Valor a Facturar Variable
+            'N/A',  # 11. Otro Sí Referencia
+            'N/A',  # 12. Calculado Por
+            'N/A',  # 13. Fecha Cálculo
+            'N/A',  # 14. Observaciones Cálculo
+        ])
+
+    return registro
 
 
 def generar_excel_calculo_facturacion(calculo):
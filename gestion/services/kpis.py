@@ -0,0 +1,46 @@
+"""
+Indicadores del portafolio de contratos (contadores del encabezado del dashboard).
+
+La vigencia y la modalidad de pago vigente de cada contrato se resuelven con subconsultas
+(gestion/services/vigencia_sql.py) y los contadores con agregación condicional, en una sola
+consulta: el costo no crece con los Otro Sí y Renovaciones de cada contrato.
+"""
+from datetime import date
+
+from django.db.models import Count, Q
+
+MODALIDADES_KPI = {
+    'contratos_fijos': 'Fijo',
+    'contratos_variables': 'Variable Puro',
+    'contratos_hibridos': 'Hibrido (Min Garantizado)',
+}
+
+
+def obtener_kpis_portafolio(fecha_referencia=None):
+    """
+    Contadores del portafolio en fecha_referencia (hoy por defecto).
+
+    Returns:
+        dict con total_contratos, contratos_vigentes, contratos_vencidos (todo contrato no
+        vigente, como en el dashboard), total_polizas y, entre los vigentes, contratos_fijos,
+        contratos_variables y contratos_hibridos según la modalidad de pago vigente
+    """
+    from gestion.models import Contrato, Poliza
+    from gestion.services.vigencia_sql import anotar_modalidad_vigente, anotar_vigencia
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+
+    contratos = anotar_modalidad_vigente(anotar_vigencia(Contrato.objects.all(), fecha_referencia), fecha_referencia)
+    vigente = Q(vigente_bd=True)
+    kpis = contratos.aggregate(
+        total_contratos=Count('pk'),
+        contratos_vigentes=Count('pk', filter=vigente),
+        **{
+            clave: Count('pk', filter=vigente & Q(modalidad_vigente_bd=modalidad))
+            for clave, modalidad in MODALIDADES_KPI.items()
+        },
+    )
+    kpis['contratos_vencidos'] = kpis['total_contratos'] - kpis['contratos_vigentes']
+    kpis['total_polizas'] = Poliza.objects.count()
+    return kpis
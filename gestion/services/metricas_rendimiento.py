@@ -0,0 +1,150 @@
+"""
+Métricas de rendimiento por petición.
+
+MetricasRendimientoMiddleware mide cada petición muestreada (ver RENDIMIENTO_MUESTREO):
+
+  - tiempo total y tiempo en base de datos
+  - número de consultas y consultas duplicadas: misma huella SQL (texto con los valores
+    reemplazados por marcadores y las listas IN colapsadas) ejecutada más de una vez, el
+    síntoma de un N+1
+  - aciertos y fallos de las cachés de la aplicación (alertas, licencia, memoización por
+    petición), que las registran con registrar_acceso_cache()
+
+Los resultados salen en la cabecera Server-Timing y en una línea de log estructurada
+('gestion.services.metricas_rendimiento'). Si la vista tiene presupuesto de consultas
+(PRESUPUESTO_CONSULTAS, por nombre de URL) y lo excede, se registra una advertencia o, con
+PRESUPUESTO_CONSULTAS_ESTRICTO (pruebas), se lanza PresupuestoConsultasExcedido.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_metricas_actuales = ContextVar('metricas_rendimiento', default=None)
+
+_RE_LISTA_IN = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_RE_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+class PresupuestoConsultasExcedido(Exception):
+    """Una vista ejecutó más consultas que las permitidas en PRESUPUESTO_CONSULTAS."""
+
+
+def huella_sql(sql: str) -> str:
+    """Texto de la consulta sin valores literales, para agrupar las que solo cambian de parámetros."""
+    sql = _RE_CADENA.sub('?', sql)
+    sql = _RE_NUMERO.sub('?', sql)
+    return _RE_LISTA_IN.sub('IN (...)', sql)
+
+
+@dataclass
+class MetricasSolicitud:
+    inicio: float = field(default_factory=time.perf_counter)
+    tiempo_total: float = 0.0
+    tiempo_bd: float = 0.0
+    consultas: int = 0
+    huellas: Counter = field(default_factory=Counter)
+    aciertos_cache: Counter = field(default_factory=Counter)
+    fallos_cache: Counter = field(default_factory=Counter)
+
+    @property
+    def consultas_duplicadas(self) -> int:
+        return sum(veces - 1 for veces in self.huellas.values() if veces > 1)
+
+    def consulta_mas_repetida(self):
+        """(huella, veces) de la consulta duplicada más frecuente, o None."""
+        if not self.huellas:
+            return None
+        huella, veces = self.huellas.most_common(1)[0]
+        return (huella, veces) if veces > 1 else None
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper de Django: se instala en todas las conexiones mientras dure la medición
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_bd += time.perf_counter() - inicio
+            self.consultas += 1
+            self.huellas[huella_sql(sql)] += 1
+
+
+@contextmanager
+def medir_rendimiento():
+    """Mide las consultas y accesos a caché del bloque. Devuelve la MetricasSolicitud."""
+    metricas = MetricasSolicitud()
+    token = _metricas_actuales.set(metricas)
+    try:
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(metricas))
+            yield metricas
+    finally:
+        metricas.tiempo_total = time.perf_counter() - metricas.inicio
+        _metricas_actuales.reset(token)
+
+
+def registrar_acceso_cache(nombre: str, acierto: bool):
+    """Cuenta un acierto o fallo de la caché `nombre` en la petición medida, si la hay."""
+    metricas = _metricas_actuales.get()
+    if metricas is None:
+        return
+    if acierto:
+        metricas.aciertos_cache[nombre] += 1
+    else:
+        metricas.fallos_cache[nombre] += 1
+
+
+def cabecera_server_timing(metricas: MetricasSolicitud) -> str:
+    aciertos = sum(metricas.aciertos_cache.values())
+    accesos = aciertos + sum(metricas.fallos_cache.values())
+    return ', '.join([
+        f'total;dur={metricas.tiempo_total * 1000:.1f}',
+        f'db;dur={metricas.tiempo_bd * 1000:.1f};desc="{metricas.consultas} consultas"',
+        f'dup;desc="{metricas.consultas_duplicadas} duplicadas"',
+        f'cache;desc="{aciertos}/{accesos} aciertos"',
+    ])
+
+
+def registrar_metricas(metricas: MetricasSolicitud, vista: Optional[str], metodo: str, ruta: str, estado: int):
+    """Línea de log estructurada con las métricas (los valores van también en `extra`)."""
+    datos = {
+        'vista': vista or '-',
+        'metodo': metodo,
+        'ruta': ruta,
+        'estado': estado,
+        'total_ms': round(metricas.tiempo_total * 1000, 1),
+        'bd_ms': round(metricas.tiempo_bd * 1000, 1),
+        'consultas': metricas.consultas,
+        'duplicadas': metricas.consultas_duplicadas,
+        'cache_aciertos': sum(metricas.aciertos_cache.values()),
+        'cache_fallos': sum(metricas.fallos_cache.values()),
+    }
+    logger.info(
+        'rendimiento ' + ' '.join(f'{clave}={valor}' for clave, valor in datos.items()),
+        extra={'metricas_rendimiento': datos},
+    )
+
+
+def verificar_presupuesto(metricas: MetricasSolicitud, vista: Optional[str], presupuestos: dict, estricto: bool):
+    """Advierte (o lanza PresupuestoConsultasExcedido si `estricto`) si la vista excede su presupuesto."""
+    limite = presupuestos.get(vista) if vista else None
+    if limite is None or metricas.consultas <= limite:
+        return
+
+    mensaje = f'La vista {vista} ejecutó {metricas.consultas} consultas (presupuesto: {limite})'
+    repetida = metricas.consulta_mas_repetida()
+    if repetida:
+        mensaje += f'; la más repetida ({repetida[1]} veces): {repetida[0][:300]}'
+    if estricto:
+        raise PresupuestoConsultasExcedido(mensaje)
+    logger.warning(mensaje)
@@ -0,0 +1,283 @@
+"""
+Programador interno de tareas periódicas (comando run_scheduler).
+
+Reemplaza las entradas de cron de enviar_alertas_email y backup_database:
+  - Alertas por correo: a la hora_envio de cada ConfiguracionAlerta que corresponde al día,
+    evalúa en una sola pasada de MotorAlertas todos los tipos de ese horario y los despacha
+    en paralelo. Un tipo con envíos registrados hoy en HistorialEnvioEmail no se vuelve a
+    enviar, de modo que reiniciar el programador nunca duplica correos.
+  - Reconstrucción del estado vigente (rebuild_estado_vigente): una vez al día a
+    PROGRAMADOR_HORA_ESTADO_VIGENTE y, en todo caso, antes del primer envío de alertas del día,
+    para que MotorAlertas resuelva los ajustes IPC / Salario Mínimo con la consulta por rango.
+    Se omite si todos los contratos ya tienen el estado resuelto a la fecha de hoy.
+  - Backup de la base de datos: una vez al día a PROGRAMADOR_HORA_BACKUP, salvo que ya exista
+    un backup con la fecha de hoy.
+  - Reverificación de la licencia: cuando la última verificación tiene más de
+    PROGRAMADOR_LICENCIA_HORAS horas.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Estados de HistorialEnvioEmail que cuentan como "ya enviado hoy" (ERROR no se envió)
+ESTADOS_ENVIO_REGISTRADO = ('PENDIENTE', 'EN_PROCESO', 'ENVIADO', 'DESCARTADO')
+
+# Tiempo máximo de espera entre revisiones, para detectar cambios de configuración
+ESPERA_MAXIMA = timedelta(seconds=60)
+
+
+def _hora_backup() -> Optional[time]:
+    valor = getattr(settings, 'PROGRAMADOR_HORA_BACKUP', '02:00')
+    if not valor:
+        return None
+    return datetime.strptime(valor, '%H:%M').time()
+
+
+def _hora_estado_vigente() -> Optional[time]:
+    valor = getattr(settings, 'PROGRAMADOR_HORA_ESTADO_VIGENTE', '01:00')
+    if not valor:
+        return None
+    return datetime.strptime(valor, '%H:%M').time()
+
+
+def _en_hora_local(fecha, hora: time) -> datetime:
+    return timezone.make_aware(datetime.combine(fecha, hora), timezone.get_current_timezone())
+
+
+def _despachar_tipo(tipo_alerta, fecha, motor) -> Dict:
+    """Envía (o encola) un tipo de alerta en un hilo del pool y libera su conexión."""
+    from gestion.services.alerta_email_service import AlertaEmailService
+
+    try:
+        # Un servicio por hilo: la conexión SMTP de EmailService no se comparte entre hilos
+        return AlertaEmailService().enviar_alertas_tipo(
+            tipo_alerta=tipo_alerta,
+            fecha_referencia=fecha,
+            forzar_envio=True,
+            motor=motor,
+        )
+    except Exception as e:
+        logger.error(f"Error al despachar las alertas de tipo {tipo_alerta}: {str(e)}", exc_info=True)
+        return {'tipo_alerta': tipo_alerta, 'enviado': False, 'errores': [str(e)]}
+    finally:
+        connection.close()
+
+
+class Programador:
+    """
+    Decide qué tareas tocan en un instante y las ejecuta. No guarda estado propio en disco:
+    la deduplicación se apoya en HistorialEnvioEmail, ContratoEstadoVigente.fecha_referencia,
+    los archivos de backup y ClienteLicense.last_verification.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_retraso: timedelta = timedelta(hours=2),
+                 backup: bool = True, licencia: bool = True, estado_vigente: bool = True):
+        self.workers = max(1, workers or getattr(settings, 'EMAIL_COLA_WORKERS', 4))
+        # Horarios vencidos hace más de max_retraso (p. ej. al arrancar por la tarde) se omiten
+        self.max_retraso = max_retraso
+        self.backup = backup and _hora_backup() is not None
+        self.licencia = licencia and getattr(settings, 'PROGRAMADOR_LICENCIA_HORAS', 12) > 0
+        self.estado_vigente = estado_vigente and _hora_estado_vigente() is not None
+        self._alertas_despachadas = set()
+        self._backup_fallido = None
+        self._estado_vigente_al_dia = None
+        self._estado_vigente_fallido = None
+
+    # ------------------------------------------------------------------
+    # Alertas por correo
+    # ------------------------------------------------------------------
+
+    def _configuraciones_del_dia(self, fecha):
+        from gestion.models import ConfiguracionAlerta
+
+        return [
+            config for config in ConfiguracionAlerta.objects.filter(activo=True)
+            if config.debe_enviar_hoy(fecha)
+        ]
+
+    def alertas_pendientes(self, ahora: datetime) -> List[str]:
+        """Tipos de alerta cuyo horario de hoy ya llegó y que todavía no se enviaron."""
+        from gestion.models import HistorialEnvioEmail
+
+        local = timezone.localtime(ahora)
+        fecha = local.date()
+        candidatos = [
+            config.tipo_alerta for config in self._configuraciones_del_dia(fecha)
+            if (fecha, config.tipo_alerta) not in self._alertas_despachadas
+            and timedelta(0) <= local - _en_hora_local(fecha, config.hora_envio) <= self.max_retraso
+        ]
+        if not candidatos:
+            return []
+
+        inicio_dia = _en_hora_local(fecha, time.min)
+        enviados = set(
+            HistorialEnvioEmail.objects.filter(
+                tipo_alerta__in=candidatos,
+                estado__in=ESTADOS_ENVIO_REGISTRADO,
+                fecha_creacion__gte=inicio_dia,
+            ).values_list('tipo_alerta', flat=True)
+        )
+        for tipo in enviados:
+            self._alertas_despachadas.add((fecha, tipo))
+        return [tipo for tipo in candidatos if tipo not in enviados]
+
+    def despachar_alertas(self, tipos: List[str], fecha) -> List[Dict]:
+        """Evalúa todos los tipos en una sola pasada y los envía en paralelo."""
+        from gestion.services.alertas import MotorAlertas
+        from gestion.services.cola_email import cola_email_activa, drenar_cola
+
+        motor = MotorAlertas(fecha)
+        motor.evaluar(tipos)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tipos)), thread_name_prefix='alertas') as executor:
+            resultados = list(executor.map(lambda tipo: _despachar_tipo(tipo, fecha, motor), tipos))
+        for tipo in tipos:
+            self._alertas_despachadas.add((fecha, tipo))
+
+        if cola_email_activa():
+            drenar_cola(workers=self.workers)
+        return resultados
+
+    # ------------------------------------------------------------------
+    # Estado vigente
+    # ------------------------------------------------------------------
+
+    def estado_vigente_pendiente(self, ahora: datetime, hay_alertas: bool = False) -> bool:
+        """
+        Toca reconstruir si ya pasó PROGRAMADOR_HORA_ESTADO_VIGENTE o hay alertas por enviar,
+        y algún contrato no tiene el estado resuelto a la fecha de hoy.
+        """
+        from gestion.models import Contrato
+
+        if not self.estado_vigente:
+            return False
+        local = timezone.localtime(ahora)
+        fecha = local.date()
+        if fecha in (self._estado_vigente_al_dia, self._estado_vigente_fallido):
+            return False
+        if not hay_alertas and local < _en_hora_local(fecha, _hora_estado_vigente()):
+            return False
+        if not Contrato.objects.exclude(estado_vigente__fecha_referencia=fecha).exists():
+            self._estado_vigente_al_dia = fecha
+            return False
+        return True
+
+    def reconstruir_estado_vigente(self, ahora: datetime):
+        from django.core.management import call_command
+
+        fecha = timezone.localtime(ahora).date()
+        try:
+            call_command('rebuild_estado_vigente', fecha=fecha.isoformat(), workers=self.workers, stdout=StringIO())
+            self._estado_vigente_al_dia = fecha
+        except Exception as e:
+            # Las alertas siguen funcionando (evalúan en línea); se reintenta al día siguiente
+            self._estado_vigente_fallido = fecha
+            logger.error(f"Error al reconstruir el estado vigente: {str(e)}", exc_info=True)
+
+    # ------------------------------------------------------------------
+    # Backup y licencia
+    # ------------------------------------------------------------------
+
+    def _directorio_backups(self) -> Path:
+        return Path(settings.BASE_DIR) / 'backups'
+
+    def backup_pendiente(self, ahora: datetime) -> bool:
+        if not self.backup:
+            return False
+        local = timezone.localtime(ahora)
+        fecha = local.date()
+        if self._backup_fallido == fecha:
+            return False
+        if not timedelta(0) <= local - _en_hora_local(fecha, _hora_backup()) <= self.max_retraso:
+            return False
+        marca = fecha.strftime('%Y%m%d')
+        return not any(self._directorio_backups().glob(f'backup_*{marca}_*'))
+
+    def ejecutar_backup(self, ahora: datetime):
+        from django.core.management import call_command
+
+        try:
+            call_command('backup_database')
+        except Exception as e:
+            # No reintentar en cada ciclo: el siguiente intento es el día siguiente
+            self._backup_fallido = timezone.localtime(ahora).date()
+            logger.error(f"Error en el backup programado: {str(e)}", exc_info=True)
+
+    def licencia_pendiente(self, ahora: datetime) -> bool:
+        from gestion.models import ClienteLicense
+
+        if not self.licencia:
+            return False
+        licencia = ClienteLicense.objects.filter(is_primary=True).only('last_verification').first()
+        if licencia is None:
+            return False
+        if licencia.last_verification is None:
+            return True
+        return ahora - licencia.last_verification >= timedelta(hours=getattr(settings, 'PROGRAMADOR_LICENCIA_HORAS', 12))
+
+    def reverificar_licencia(self):
+        from gestion.license_manager import LicenseManager
+        from gestion.models import ClienteLicense
+
+        try:
+            valida, mensaje, _datos = LicenseManager.verificar_licencia_cliente(None, forzar_verificacion=True)
+            logger.info(f"Licencia reverificada por el programador: {'válida' if valida else mensaje}")
+        except Exception as e:
+            logger.error(f"Error al reverificar la licencia: {str(e)}", exc_info=True)
+        # Aunque Firebase no responda, esperar el intervalo completo antes de reintentar
+        ClienteLicense.objects.filter(is_primary=True).update(last_verification=timezone.now())
+
+    # ------------------------------------------------------------------
+    # Ciclo
+    # ------------------------------------------------------------------
+
+    def ejecutar_pendientes(self, ahora: Optional[datetime] = None) -> List[str]:
+        """Ejecuta todas las tareas que tocan en `ahora` y retorna una descripción de cada una."""
+        ahora = ahora or timezone.now()
+        ejecutadas = []
+
+        tipos = self.alertas_pendientes(ahora)
+        # Antes de las alertas, para que el primer envío del día use el estado recién resuelto
+        if self.estado_vigente_pendiente(ahora, hay_alertas=bool(tipos)):
+            self.reconstruir_estado_vigente(ahora)
+            ejecutadas.append('reconstrucción del estado vigente')
+
+        if tipos:
+            resultados = self.despachar_alertas(tipos, timezone.localtime(ahora).date())
+            destinatarios = sum(resultado.get('destinatarios', 0) for resultado in resultados)
+            ejecutadas.append(f"alertas {', '.join(tipos)} ({destinatarios} destinatario(s))")
+
+        if self.backup_pendiente(ahora):
+            self.ejecutar_backup(ahora)
+            ejecutadas.append('backup de la base de datos')
+
+        if self.licencia_pendiente(ahora):
+            self.reverificar_licencia()
+            ejecutadas.append('reverificación de la licencia')
+
+        return ejecutadas
+
+    def proxima_revision(self, ahora: Optional[datetime] = None) -> datetime:
+        """Próximo horario configurado (alertas, estado vigente o backup) a partir de `ahora`, como máximo en ESPERA_MAXIMA."""
+        ahora = ahora or timezone.now()
+        local = timezone.localtime(ahora)
+        limite = ahora + ESPERA_MAXIMA
+
+        horas = [config.hora_envio for config in self._configuraciones_del_dia(local.date())]
+        if self.estado_vigente:
+            horas.append(_hora_estado_vigente())
+        if self.backup:
+            horas.append(_hora_backup())
+        proximos = [
+            momento for momento in (_en_hora_local(local.date(), hora) for hora in horas)
+            if momento > ahora
+        ]
+        return min(proximos + [limite])
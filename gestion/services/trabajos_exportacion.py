@@ -0,0 +1,296 @@
+"""
+Trabajos de exportación en segundo plano (ExportJob).
+
+Los trabajos se registran en la base de datos y se ejecutan en un pool de hilos del propio
+proceso web (EXPORTACIONES_WORKER='hilos') o con el comando procesar_exportaciones
+(EXPORTACIONES_WORKER='comando'). Solo se usan la base de datos y el sistema de archivos local.
+"""
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas filas escritas se actualiza el progreso del trabajo
+INTERVALO_PROGRESO_FILAS = 200
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def exportaciones_asincronas_activas() -> bool:
+    return getattr(settings, 'EXPORTACIONES_ASINCRONAS', False)
+
+
+def _preparar_contratos(parametros):
+    from gestion.forms import FiltroExportacionContratosForm
+    from gestion.views.contratos import _preparar_exportacion_contratos
+
+    form = FiltroExportacionContratosForm(parametros)
+    if not form.is_valid():
+        raise ValueError(f'Filtros de exportación inválidos: {form.errors.as_text()}')
+    columnas, registros, total = _preparar_exportacion_contratos(form.cleaned_data)
+    return 'Contratos', columnas, registros, total, 'contratos_exportados'
+
+
+def _preparar_informes_ventas(parametros):
+    from gestion.services.exportes import preparar_exportacion_informes_ventas
+    from gestion.views.informes_ventas import _filtrar_informes_exportacion
+
+    informes = _filtrar_informes_exportacion(parametros)
+    nombre_hoja, columnas, registros = preparar_exportacion_informes_ventas(informes_queryset=informes)
+    return nombre_hoja, columnas, registros, informes.count(), 'informes_ventas'
+
+
+# Cada preparador recibe los parámetros guardados en el trabajo y retorna
+# (nombre_hoja, columnas, registros, total_filas, nombre_base_archivo)
+PREPARADORES_EXPORTACION = {
+    'CONTRATOS': _preparar_contratos,
+    'INFORMES_VENTAS': _preparar_informes_ventas,
+}
+
+
+def _directorio_exportaciones() -> Path:
+    directorio = Path(getattr(settings, 'EXPORTACIONES_DIR', Path(settings.BASE_DIR) / 'exportaciones'))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, getattr(settings, 'EXPORTACIONES_WORKERS', 2)),
+                thread_name_prefix='exportaciones',
+            )
+        return _pool
+
+
+def _ejecutar_en_hilo(trabajo_id):
+    """Ejecuta un trabajo en un hilo del pool y libera su conexión a la base de datos."""
+    try:
+        ejecutar_trabajo(trabajo_id)
+    finally:
+        connection.close()
+
+
+def encolar_exportacion(tipo, parametros, usuario=None):
+    """
+    Registra un trabajo de exportación. parametros puede ser request.GET/request.POST:
+    se guarda una copia sin el token CSRF para reconstruir los filtros en el worker.
+    Con EXPORTACIONES_WORKER='hilos' el trabajo se envía al pool al confirmar la transacción.
+    """
+    from gestion.models import ExportJob
+
+    if tipo not in PREPARADORES_EXPORTACION:
+        raise ValueError(f'Tipo de exportación no soportado: {tipo}')
+
+    en_hilos = getattr(settings, 'EXPORTACIONES_WORKER', 'hilos') == 'hilos'
+    try:
+        limpiar_exportaciones_expiradas()
+        if en_hilos:
+            # Sin procesar_exportaciones nadie más recupera los trabajos de un proceso reiniciado
+            reenviar_trabajos_perdidos()
+    except Exception as e:
+        logger.warning(f"No se pudieron limpiar o recuperar las exportaciones: {str(e)}")
+
+    datos = {clave: valor for clave, valor in parametros.items() if clave != 'csrfmiddlewaretoken'}
+    trabajo = ExportJob.objects.create(tipo=tipo, parametros=datos, solicitado_por=usuario or None)
+
+    if en_hilos:
+        transaction.on_commit(lambda: _obtener_pool().submit(_ejecutar_en_hilo, trabajo.pk))
+    return trabajo
+
+
+def _minutos_interrumpido() -> int:
+    return getattr(settings, 'EXPORTACIONES_MINUTOS_INTERRUMPIDO', 30)
+
+
+def reenviar_trabajos_perdidos(minutos=None) -> int:
+    """
+    Modo 'hilos': devuelve a la cola los trabajos interrumpidos y envía al pool los PENDIENTE
+    con más de `minutos` de antigüedad (se perdieron al reiniciarse el proceso web). Si alguno
+    sigue en la cola del pool no pasa nada: ejecutar_trabajo solo lo toma una vez.
+    """
+    from gestion.models import ExportJob
+
+    minutos = _minutos_interrumpido() if minutos is None else minutos
+    recuperar_trabajos_interrumpidos(minutos)
+    limite = timezone.now() - timedelta(minutes=minutos)
+    perdidos = list(
+        ExportJob.objects.filter(estado='PENDIENTE', fecha_creacion__lt=limite)
+        .order_by('fecha_creacion')
+        .values_list('pk', flat=True)
+    )
+    pool = _obtener_pool()
+    for trabajo_id in perdidos:
+        pool.submit(_ejecutar_en_hilo, trabajo_id)
+    if perdidos:
+        logger.warning(f"{len(perdidos)} trabajos de exportación pendientes reenviados al pool")
+    return len(perdidos)
+
+
+class _SeguimientoProgreso:
+    """Cuenta las filas que consume el motor de exportación y publica el avance del trabajo."""
+
+    def __init__(self, trabajo_id, total_filas):
+        self.trabajo_id = trabajo_id
+        self.total_filas = total_filas
+        self.filas = 0
+
+    def recorrer(self, registros):
+        from gestion.models import ExportJob
+
+        for registro in registros:
+            self.filas += 1
+            yield registro
+            if self.filas % INTERVALO_PROGRESO_FILAS == 0:
+                progreso = min(99, self.filas * 100 // self.total_filas) if self.total_filas else 0
+                try:
+                    ExportJob.objects.filter(pk=self.trabajo_id).update(
+                        filas_procesadas=self.filas,
+                        progreso=progreso,
+                    )
+                except OperationalError as e:
+                    # SQLite en WAL: con la lectura de los registros aún abierta, escribir falla de
+                    # inmediato si otra conexión escribió entretanto. El progreso es solo informativo
+                    logger.debug(f"Progreso del trabajo de exportación {self.trabajo_id} no actualizado: {str(e)}")
+
+
+def ejecutar_trabajo(trabajo_id) -> bool:
+    """
+    Ejecuta un trabajo pendiente. El paso PENDIENTE -> EN_PROCESO es un UPDATE condicional,
+    de modo que hilos y comandos concurrentes nunca procesan el mismo trabajo.
+    Retorna False si el trabajo ya había sido tomado por otro worker.
+    """
+    from gestion.models import ExportJob
+    from gestion.services.exportes import ExportacionVaciaError, generar_excel_corporativo_streaming
+
+    tomado = ExportJob.objects.filter(pk=trabajo_id, estado='PENDIENTE').update(
+        estado='EN_PROCESO',
+        fecha_inicio=timezone.now(),
+        progreso=0,
+        filas_procesadas=0,
+    )
+    if not tomado:
+        return False
+
+    trabajo = ExportJob.objects.get(pk=trabajo_id)
+    ruta_temporal = None
+    error = None
+    try:
+        nombre_hoja, columnas, registros, total_filas, nombre_base = PREPARADORES_EXPORTACION[trabajo.tipo](trabajo.parametros)
+        ExportJob.objects.filter(pk=trabajo_id).update(total_filas=total_filas)
+
+        seguimiento = _SeguimientoProgreso(trabajo_id, total_filas)
+        archivo = generar_excel_corporativo_streaming(nombre_hoja, columnas, seguimiento.recorrer(registros))
+
+        marca_tiempo = timezone.localtime(timezone.now()).strftime('%Y%m%d_%H%M%S')
+        nombre_archivo = f'{nombre_base}_{marca_tiempo}.xlsx'
+        ruta = _directorio_exportaciones() / f'{trabajo_id}_{nombre_archivo}'
+        ruta_temporal = ruta.with_suffix('.tmp')
+        with archivo, open(ruta_temporal, 'wb') as destino:
+            shutil.copyfileobj(archivo, destino)
+        os.replace(ruta_temporal, ruta)
+
+        fecha_fin = timezone.now()
+        ExportJob.objects.filter(pk=trabajo_id).update(
+            estado='COMPLETADO',
+            progreso=100,
+            filas_procesadas=seguimiento.filas,
+            ruta_archivo=str(ruta),
+            nombre_archivo=nombre_archivo,
+            fecha_fin=fecha_fin,
+            expira_en=fecha_fin + timedelta(hours=getattr(settings, 'EXPORTACIONES_TTL_HORAS', 24)),
+        )
+    except ExportacionVaciaError as e:
+        error = str(e)
+    except Exception as e:
+        logger.error(f"Error al ejecutar el trabajo de exportación {trabajo_id}: {str(e)}", exc_info=True)
+        error = f'Error al generar el archivo: {str(e)}'
+    finally:
+        if ruta_temporal is not None and ruta_temporal.exists():
+            ruta_temporal.unlink()
+
+    if error is not None:
+        # Fuera del except: la traza ya no retiene el cursor de lectura abierto, que en SQLite
+        # impediría escribir y dejaría el trabajo EN_PROCESO
+        _marcar_error(trabajo_id, error)
+    return True
+
+
+def _marcar_error(trabajo_id, mensaje):
+    from gestion.models import ExportJob
+
+    ExportJob.objects.filter(pk=trabajo_id).update(
+        estado='ERROR',
+        mensaje_error=mensaje,
+        fecha_fin=timezone.now(),
+    )
+
+
+def recuperar_trabajos_interrumpidos(minutos=30) -> int:
+    """
+    Devuelve a PENDIENTE los trabajos EN_PROCESO que llevan más de `minutos` sin terminar
+    (el proceso que los ejecutaba se reinició o fue detenido).
+    """
+    from gestion.models import ExportJob
+
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ExportJob.objects.filter(estado='EN_PROCESO', fecha_inicio__lt=limite).update(
+        estado='PENDIENTE',
+        fecha_inicio=None,
+        progreso=0,
+        filas_procesadas=0,
+    )
+
+
+def limpiar_exportaciones_expiradas(ahora=None) -> int:
+    """Elimina del disco los archivos cuyo TTL venció y marca sus trabajos como EXPIRADO."""
+    from gestion.models import ExportJob
+
+    ahora = ahora or timezone.now()
+    expirados = ExportJob.objects.filter(estado='COMPLETADO', expira_en__lte=ahora)
+    cantidad = 0
+    for trabajo in expirados.only('pk', 'ruta_archivo'):
+        if trabajo.ruta_archivo:
+            try:
+                Path(trabajo.ruta_archivo).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar el archivo de exportación {trabajo.ruta_archivo}: {str(e)}")
+                continue
+        cantidad += ExportJob.objects.filter(pk=trabajo.pk, estado='COMPLETADO').update(
+            estado='EXPIRADO',
+            ruta_archivo=None,
+        )
+    return cantidad
+
+
+def serializar_trabajo(trabajo) -> dict:
+    """Estado del trabajo para la consulta periódica de la interfaz."""
+    from django.urls import reverse
+
+    return {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'tipo_display': trabajo.get_tipo_display(),
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'progreso': trabajo.progreso,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'total_filas': trabajo.total_filas,
+        'mensaje_error': trabajo.mensaje_error,
+        'finalizado': trabajo.finalizado,
+        'nombre_archivo': trabajo.nombre_archivo,
+        'expira_en': timezone.localtime(trabajo.expira_en).strftime('%d/%m/%Y %H:%M') if trabajo.expira_en else None,
+        'url_descarga': reverse('gestion:descargar_exportacion', args=[trabajo.pk]) if trabajo.estado == 'COMPLETADO' else None,
+    }
@@ -0,0 +1,220 @@
+"""
+Fecha final y vigencia de los contratos resueltas en SQL.
+
+Reproduce con subconsultas correlacionadas la lógica de _obtener_fecha_final_contrato y
+_estado_vigente_contrato (gestion/views/utils.py) para que los listados puedan filtrar y
+ordenar por vigencia en la base de datos, sin cargar los contratos ni sus eventos en memoria:
+
+  1. Renovación Automática aprobada más reciente con effective_from <= fecha: si tiene
+     nueva_fecha_final_actualizada, esa es la fecha final.
+  2. Otro Sí vigente en la fecha (o, si no hay, Renovación Automática vigente): su
+     effective_to o, en su defecto, su nueva_fecha_final_actualizada.
+  3. Efecto cadena: el último Otro Sí vigente o Renovación que modificó la fecha final
+     (la renovación prevalece si empezó en la misma fecha o después).
+  4. fecha_final_inicial del contrato.
+
+También resuelve la modalidad de pago vigente (efecto cadena sobre nueva_modalidad_pago) e
+incluye la paginación por cursor (keyset) sobre (fecha_inicial_contrato, id).
+"""
+from datetime import date
+
+from django.db.models import BooleanField, Case, CharField, DateField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+TAMANO_PAGINA_CONTRATOS = 50
+
+
+def _eventos_aprobados(modelo, fecha_referencia, solo_vigentes=False, con_fecha_final=False):
+    eventos = modelo.objects.filter(
+        contrato=OuterRef('pk'),
+        estado='APROBADO',
+        effective_from__lte=fecha_referencia,
+    )
+    if solo_vigentes:
+        eventos = eventos.filter(Q(effective_to__isnull=True) | Q(effective_to__gte=fecha_referencia))
+    if con_fecha_final:
+        eventos = eventos.filter(nueva_fecha_final_actualizada__isnull=False)
+    return eventos
+
+
+def _ultimo(eventos, campo, orden=None):
+    """Subconsulta con `campo` del primer evento según `orden` (por defecto el orden de get_otrosi_vigente)."""
+    if orden is None:
+        orden = (
+            F('effective_from').desc(),
+            F('fecha_aprobacion').desc(nulls_last=True),
+            F('version').desc(),
+            F('pk').desc(),
+        )
+    return Subquery(eventos.order_by(*orden).values(campo)[:1])
+
+
+def _orden_cadena():
+    """Orden del efecto cadena (get_ultimo_otrosi_que_modifico_campo_hasta_fecha)."""
+    return (
+        F('effective_from').desc(),
+        Coalesce('fecha_aprobacion', Value(timezone.now())).desc(),
+        F('version').asc(),
+        F('pk').desc(),
+    )
+
+
+def anotar_vigencia(queryset, fecha_referencia=None):
+    """
+    Anota cada contrato con:
+      - fecha_final_vigente_bd: fecha final vigente en fecha_referencia
+      - vigente_bd: mismo criterio que _estado_vigente_contrato
+      - vencido_bd: fecha_final_vigente_bd < fecha_referencia (_es_contrato_vencido)
+    """
+    from gestion.models import OtroSi, RenovacionAutomatica
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+
+    orden_cadena = _orden_cadena()
+    renovaciones = _eventos_aprobados(RenovacionAutomatica, fecha_referencia)
+    otrosis_vigentes = _eventos_aprobados(OtroSi, fecha_referencia, solo_vigentes=True)
+    renovaciones_vigentes = _eventos_aprobados(RenovacionAutomatica, fecha_referencia, solo_vigentes=True)
+    otrosis_cadena = _eventos_aprobados(OtroSi, fecha_referencia, solo_vigentes=True, con_fecha_final=True)
+    renovaciones_cadena = _eventos_aprobados(RenovacionAutomatica, fecha_referencia, con_fecha_final=True)
+
+    queryset = queryset.alias(
+        _ra_fecha_final=_ultimo(renovaciones, 'nueva_fecha_final_actualizada'),
+        _os_vigente=_ultimo(otrosis_vigentes, 'pk'),
+        _os_hasta=_ultimo(otrosis_vigentes, 'effective_to'),
+        _os_fecha_final=_ultimo(otrosis_vigentes, 'nueva_fecha_final_actualizada'),
+        _ra_vigente=_ultimo(renovaciones_vigentes, 'pk'),
+        _ra_vigente_hasta=_ultimo(renovaciones_vigentes, 'effective_to'),
+        _ra_vigente_fecha_final=_ultimo(renovaciones_vigentes, 'nueva_fecha_final_actualizada'),
+        _os_cadena_desde=_ultimo(otrosis_cadena, 'effective_from', orden_cadena),
+        _os_cadena_fecha_final=_ultimo(otrosis_cadena, 'nueva_fecha_final_actualizada', orden_cadena),
+        _ra_cadena_desde=_ultimo(renovaciones_cadena, 'effective_from'),
+        _ra_cadena_fecha_final=_ultimo(renovaciones_cadena, 'nueva_fecha_final_actualizada'),
+    ).alias(
+        _fecha_final_cadena=Case(
+            When(
+                Q(_ra_cadena_desde__isnull=False) & (
+                    Q(_os_cadena_desde__isnull=True) | Q(_ra_cadena_desde__gte=F('_os_cadena_desde'))
+                ),
+                then=F('_ra_cadena_fecha_final'),
+            ),
+            default=Coalesce('_os_cadena_fecha_final', 'fecha_final_inicial'),
+            output_field=DateField(),
+        ),
+        _fecha_final_evento_vigente=Case(
+            When(_os_vigente__isnull=False, then=Coalesce('_os_hasta', '_os_fecha_final')),
+            When(_ra_vigente__isnull=False, then=Coalesce('_ra_vigente_hasta', '_ra_vigente_fecha_final')),
+            default=None,
+            output_field=DateField(),
+        ),
+    )
+    fecha_final = Coalesce(
+        '_ra_fecha_final', '_fecha_final_evento_vigente', '_fecha_final_cadena', output_field=DateField()
+    )
+    return queryset.annotate(fecha_final_vigente_bd=fecha_final).annotate(
+        vigente_bd=Case(
+            # Otro Sí vigente: vigente salvo que su nueva fecha final ya haya pasado
+            When(
+                _os_vigente__isnull=False,
+                then=Case(
+                    When(Q(_os_hasta__isnull=True) & Q(_os_fecha_final__lt=fecha_referencia), then=Value(False)),
+                    default=Value(True),
+                ),
+            ),
+            When(
+                _ra_vigente__isnull=False,
+                then=Case(
+                    When(
+                        Q(_ra_vigente_hasta__isnull=True) & Q(_ra_vigente_fecha_final__lt=fecha_referencia),
+                        then=Value(False),
+                    ),
+                    default=Value(True),
+                ),
+            ),
+            When(vigente=True, fecha_final_vigente_bd__gte=fecha_referencia, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+        vencido_bd=Case(
+            When(fecha_final_vigente_bd__lt=fecha_referencia, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def anotar_modalidad_vigente(queryset, fecha_referencia=None):
+    """
+    Anota cada contrato con modalidad_vigente_bd: la nueva_modalidad_pago del último Otro Sí
+    vigente que la modificó hasta fecha_referencia o, si ninguno, la modalidad_pago del contrato.
+    Las Renovaciones Automáticas no modifican la modalidad de pago.
+    """
+    from gestion.models import OtroSi
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+
+    otrosis_modalidad = _eventos_aprobados(OtroSi, fecha_referencia, solo_vigentes=True).filter(
+        nueva_modalidad_pago__isnull=False,
+    ).exclude(nueva_modalidad_pago='')
+    return queryset.annotate(
+        modalidad_vigente_bd=Coalesce(
+            _ultimo(otrosis_modalidad, 'nueva_modalidad_pago', _orden_cadena()),
+            'modalidad_pago',
+            output_field=CharField(),
+        ),
+    )
+
+
+def codificar_cursor(contrato):
+    return f'{contrato.fecha_inicial_contrato.isoformat()}_{contrato.pk}'
+
+
+def decodificar_cursor(cursor):
+    """Retorna (fecha_inicial_contrato, id) o None si el cursor no es válido."""
+    try:
+        fecha, pk = (cursor or '').split('_', 1)
+        return date.fromisoformat(fecha), int(pk)
+    except ValueError:
+        return None
+
+
+def paginar_por_cursor(queryset, despues=None, antes=None, tamano=TAMANO_PAGINA_CONTRATOS):
+    """
+    Página de contratos en orden (-fecha_inicial_contrato, -id) posterior al cursor `despues`
+    o anterior al cursor `antes`. Cada página es una consulta con LIMIT sobre el índice
+    (fecha_inicial_contrato, id): su costo no depende de cuántas páginas la preceden.
+
+    Returns:
+        dict con 'contratos', 'cursor_siguiente' y 'cursor_anterior' (None si no hay más)
+    """
+    cursor_despues = decodificar_cursor(despues)
+    cursor_antes = None if cursor_despues else decodificar_cursor(antes)
+
+    if cursor_antes:
+        fecha, pk = cursor_antes
+        pagina = list(
+            queryset.filter(
+                Q(fecha_inicial_contrato__gt=fecha) | Q(fecha_inicial_contrato=fecha, pk__gt=pk)
+            ).order_by('fecha_inicial_contrato', 'pk')[:tamano + 1]
+        )
+        hay_anteriores = len(pagina) > tamano
+        contratos = list(reversed(pagina[:tamano]))
+        hay_siguientes = True
+    else:
+        if cursor_despues:
+            fecha, pk = cursor_despues
+            queryset = queryset.filter(
+                Q(fecha_inicial_contrato__lt=fecha) | Q(fecha_inicial_contrato=fecha, pk__lt=pk)
+            )
+        pagina = list(queryset.order_by('-fecha_inicial_contrato', '-pk')[:tamano + 1])
+        hay_siguientes = len(pagina) > tamano
+        contratos = pagina[:tamano]
+        hay_anteriores = cursor_despues is not None
+
+    return {
+        'contratos': contratos,
+        'cursor_siguiente': codificar_cursor(contratos[-1]) if contratos and hay_siguientes else None,
+        'cursor_anterior': codificar_cursor(contratos[0]) if contratos and hay_anteriores else None,
+    }
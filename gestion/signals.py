@@ -1,9 +1,33 @@
 """
 Señales para el sistema de gestión de contratos.
 """
-from django.db.models.signals import pre_delete
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from gestion.models import OtroSi, RenovacionAutomatica, Poliza
+from gestion.models import (
+    CalculoIPC,
+    CalculoSalarioMinimo,
+    ClienteLicense,
+    Contrato,
+    Local,
+    OtroSi,
+    Poliza,
+    RenovacionAutomatica,
+    Tercero,
+    TipoCondicionIPC,
+    TipoContrato,
+    TipoServicio,
+)
+from gestion.services.busqueda import (
+    programar_eliminacion_contrato,
+    programar_reindexacion_contrato,
+    programar_reindexacion_relacionados,
+)
+from gestion.services.cache_alertas import programar_invalidacion_cache_alertas
+from gestion.services.cache_licencia import programar_invalidacion_cache_licencia
+from gestion.services.cache_solicitud import invalidar_cache_solicitud
+from gestion.services.estado_vigente import programar_reconstruccion_estado_vigente
 
 
 @receiver(pre_delete, sender=OtroSi)
@@ -46,3 +70,142 @@ def eliminar_polizas_renovacion(sender, instance, **kwargs):
         except ImportError:
             pass
         instance.polizas.all().delete()
+
+
+@receiver(post_save, sender=OtroSi)
+@receiver(post_save, sender=RenovacionAutomatica)
+@receiver(post_save, sender=CalculoIPC)
+@receiver(post_save, sender=CalculoSalarioMinimo)
+def actualizar_estado_vigente_por_evento(sender, instance, raw=False, **kwargs):
+    """
+    Al crear, aprobar, editar o anular un evento del contrato (Otro Sí, Renovación
+    Automática o cálculo IPC/Salario Mínimo), reconstruir su estado vigente.
+    """
+    if raw:
+        return
+    programar_reconstruccion_estado_vigente(instance.contrato_id)
+
+
+@receiver(post_delete, sender=OtroSi)
+@receiver(post_delete, sender=RenovacionAutomatica)
+@receiver(post_delete, sender=CalculoIPC)
+@receiver(post_delete, sender=CalculoSalarioMinimo)
+def actualizar_estado_vigente_por_eliminacion(sender, instance, **kwargs):
+    """
+    Después de eliminar un evento del contrato, reconstruir su estado vigente.
+    Se usa post_delete (y no los pre_delete anteriores) para que el evento ya no se considere.
+    """
+    programar_reconstruccion_estado_vigente(instance.contrato_id)
+
+
+@receiver(post_save, sender=Contrato)
+def actualizar_estado_vigente_contrato(sender, instance, raw=False, **kwargs):
+    """Al editar el contrato base, reconstruir su estado vigente."""
+    if raw:
+        return
+    programar_reconstruccion_estado_vigente(instance.pk)
+
+
+@receiver(post_save, sender=Contrato)
+@receiver(post_save, sender=OtroSi)
+@receiver(post_save, sender=RenovacionAutomatica)
+@receiver(post_save, sender=Poliza)
+@receiver(post_save, sender=CalculoIPC)
+@receiver(post_save, sender=CalculoSalarioMinimo)
+@receiver(post_save, sender=TipoCondicionIPC)
+def invalidar_alertas_por_cambio(sender, instance, raw=False, **kwargs):
+    """Cualquier escritura que afecte las alertas invalida la caché de alertas calculadas."""
+    if raw:
+        return
+    programar_invalidacion_cache_alertas()
+
+
+@receiver(post_delete, sender=Contrato)
+@receiver(post_delete, sender=OtroSi)
+@receiver(post_delete, sender=RenovacionAutomatica)
+@receiver(post_delete, sender=Poliza)
+@receiver(post_delete, sender=CalculoIPC)
+@receiver(post_delete, sender=CalculoSalarioMinimo)
+@receiver(post_delete, sender=TipoCondicionIPC)
+def invalidar_alertas_por_eliminacion(sender, instance, **kwargs):
+    """Después de eliminar un registro que afecta las alertas, invalidar la caché."""
+    programar_invalidacion_cache_alertas()
+
+
+@receiver(post_save, sender=Contrato)
+@receiver(post_save, sender=OtroSi)
+@receiver(post_save, sender=RenovacionAutomatica)
+@receiver(post_delete, sender=Contrato)
+@receiver(post_delete, sender=OtroSi)
+@receiver(post_delete, sender=RenovacionAutomatica)
+def invalidar_cache_solicitud_por_evento(sender, instance, **kwargs):
+    """
+    Descarta de inmediato (no en on_commit) lo memoizado en la petición actual para el
+    contrato: las lecturas siguientes dentro de la misma transacción deben ver el cambio.
+    """
+    invalidar_cache_solicitud(instance.pk if sender is Contrato else instance.contrato_id)
+
+
+@receiver(post_save, sender=ClienteLicense)
+def invalidar_licencia_por_cambio(sender, instance, raw=False, **kwargs):
+    """Al actualizar la licencia (login, reverificación, admin) descartar el estado en caché."""
+    if raw:
+        return
+    programar_invalidacion_cache_licencia()
+
+
+@receiver(post_delete, sender=ClienteLicense)
+def invalidar_licencia_por_eliminacion(sender, instance, **kwargs):
+    """Después de eliminar una licencia, descartar el estado en caché."""
+    programar_invalidacion_cache_licencia()
+
+
+@receiver(post_save, sender=Contrato)
+def indexar_contrato_para_busqueda(sender, instance, raw=False, **kwargs):
+    """
+    Al crear o editar un contrato, regenerar su documento en el índice de búsqueda. También
+    con loaddata (raw): el documento se genera al confirmar, con terceros y locales ya cargados.
+    """
+    programar_reindexacion_contrato(instance.pk)
+
+
+@receiver(post_delete, sender=Contrato)
+def quitar_contrato_de_busqueda(sender, instance, **kwargs):
+    """Después de eliminar un contrato, quitarlo del índice de búsqueda."""
+    programar_eliminacion_contrato(instance.pk)
+
+
+# Modelo relacionado -> campos del contrato que lo referencian
+CAMPOS_BUSQUEDA_RELACIONADOS = {
+    Tercero: ('arrendatario_id', 'proveedor_id'),
+    Local: ('local_id',),
+    TipoContrato: ('tipo_contrato_id',),
+    TipoServicio: ('tipo_servicio_id',),
+}
+
+
+@receiver(post_save, sender=Tercero)
+@receiver(post_save, sender=Local)
+@receiver(post_save, sender=TipoContrato)
+@receiver(post_save, sender=TipoServicio)
+def reindexar_contratos_relacionados(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Al editar un tercero, local o tipo, regenerar los documentos de sus contratos
+    (un registro recién creado todavía no tiene contratos).
+    """
+    if raw or created:
+        return
+    programar_reindexacion_relacionados(CAMPOS_BUSQUEDA_RELACIONADOS[sender], instance.pk)
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """
+    Activa el modo WAL en cada conexión SQLite (SQLITE_WAL): los hilos de exportación leen
+    durante minutos mientras las peticiones guardan la sesión, y con el journal por defecto
+    una lectura abierta bloquea cualquier escritura.
+    """
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_WAL', False):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
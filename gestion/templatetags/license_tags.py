@@ -18,9 +18,12 @@ def get_license_status(user):
         dict con información de la licencia o None
     """
     try:
-        from gestion.models import ClienteLicense
+        from gestion.services.cache_licencia import obtener_licencia_principal
         
-        cliente_license = ClienteLicense.objects.get(usuario=user)
+        # La licencia es única para la organización (compartida por todos los usuarios)
+        cliente_license = obtener_licencia_principal()
+        if cliente_license is None:
+            return None
         
         # Calcular días restantes
         dias_restantes = None
@@ -75,9 +78,12 @@ def get_license_status_simple(user):
     Versión simplificada que solo retorna el estado básico
     """
     try:
-        from gestion.models import ClienteLicense
+        from gestion.services.cache_licencia import obtener_licencia_principal
         
-        cliente_license = ClienteLicense.objects.get(usuario=user)
+        # La licencia es única para la organización (compartida por todos los usuarios)
+        cliente_license = obtener_licencia_principal()
+        if cliente_license is None:
+            return {'status': 'none', 'icon': 'fa-question-circle', 'color': 'secondary'}
         
         if cliente_license.is_expired():
             return {'status': 'expired', 'icon': 'fa-exclamation-triangle', 'color': 'danger'}
@@ -0,0 +1,160 @@
+"""
+Pruebas del envío de alertas programadas contra un servidor SMTP local (aiosmtpd).
+Requiere aiosmtpd (pip install aiosmtpd). Ejecutar con: python manage.py test gestion.tests.test_email_service
+"""
+import os
+import socket
+from datetime import timedelta
+from unittest import mock
+
+from aiosmtpd.controller import Controller
+from cryptography.fernet import Fernet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gestion.models import (
+    ConfiguracionAlerta,
+    ConfiguracionEmail,
+    Contrato,
+    DestinatarioAlerta,
+    HistorialEnvioEmail,
+)
+from gestion.services.alerta_email_service import AlertaEmailService
+from gestion.utils_encryption import encrypt_value
+
+
+class _BuzonSMTP:
+    """Handler de aiosmtpd que cuenta las sesiones SMTP (saludos EHLO/HELO) y los comandos DATA"""
+
+    def __init__(self, cortes=0):
+        self.sesiones = 0
+        self.mensajes = []
+        # Cantidad de mensajes ante los que el servidor corta la conexión sin responder
+        self.cortes = cortes
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        self.sesiones += 1
+        return responses
+
+    async def handle_HELO(self, server, session, envelope, hostname):
+        session.host_name = hostname
+        self.sesiones += 1
+        return '250 {}'.format(server.hostname)
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.cortes:
+            self.cortes -= 1
+            server.transport.close()
+            return '421 Service not available, closing transmission channel'
+        self.mensajes.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+def _puerto_libre():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Envío directo: con la cola activa las alertas solo se encolan
+@override_settings(EMAIL_COLA_ASINCRONA=False)
+class EnvioAlertasProgramadasTests(TestCase):
+    DESTINATARIOS_POR_TIPO = {
+        'VENCIMIENTO_CONTRATOS': ['juridica@example.com', 'gerencia@example.com', 'cartera@example.com'],
+        'PREAVISO_RENOVACION': ['comercial@example.com', 'gerencia@example.com'],
+    }
+
+    def setUp(self):
+        # Clave Fernet propia de la prueba: la del entorno puede no ser una clave válida
+        entorno = mock.patch.dict(os.environ, {'ENCRYPTION_KEY': Fernet.generate_key().decode()})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+        self.buzon = _BuzonSMTP()
+        self.controlador = Controller(self.buzon, hostname='127.0.0.1', port=_puerto_libre())
+        self.controlador.start()
+        self.addCleanup(self.controlador.stop)
+
+        self.configuracion_email = ConfiguracionEmail.objects.create(
+            nombre='SMTP local',
+            email_host='127.0.0.1',
+            email_port=self.controlador.port,
+            email_use_tls=False,
+            email_use_ssl=False,
+            email_host_user='',
+            email_host_password=encrypt_value('clave-de-prueba'),
+            email_from='alertas@example.com',
+            activo=True,
+        )
+
+        # Contrato que vence en 20 días sin prórroga: genera alertas de vencimiento y de preaviso
+        hoy = timezone.now().date()
+        Contrato.objects.create(
+            num_contrato='PRUEBA-SMTP-001',
+            tipo_contrato_cliente_proveedor='CLIENTE',
+            objeto_destinacion='Local comercial',
+            nit_concedente='900000000',
+            rep_legal_concedente='Representante',
+            fecha_firma=hoy - timedelta(days=365),
+            fecha_inicial_contrato=hoy - timedelta(days=345),
+            fecha_final_inicial=hoy + timedelta(days=20),
+            prorroga_automatica=False,
+            vigente=True,
+        )
+
+        for tipo_alerta, correos in self.DESTINATARIOS_POR_TIPO.items():
+            configuracion, _ = ConfiguracionAlerta.objects.update_or_create(
+                tipo_alerta=tipo_alerta,
+                defaults={'activo': True, 'frecuencia': 'DIARIO', 'solo_criticas': False},
+            )
+            DestinatarioAlerta.objects.bulk_create([
+                DestinatarioAlerta(configuracion_alerta=configuracion, email=correo, nombre=correo, activo=True)
+                for correo in correos
+            ])
+        ConfiguracionAlerta.objects.exclude(tipo_alerta__in=self.DESTINATARIOS_POR_TIPO).update(activo=False)
+
+    def test_una_sesion_smtp_para_todas_las_alertas(self):
+        resultados = AlertaEmailService().enviar_todas_alertas_programadas()
+
+        total_destinatarios = sum(len(correos) for correos in self.DESTINATARIOS_POR_TIPO.values())
+        self.assertEqual(len(resultados), len(self.DESTINATARIOS_POR_TIPO))
+        self.assertTrue(all(resultado['enviado'] for resultado in resultados), resultados)
+        self.assertEqual(self.buzon.sesiones, 1)
+        self.assertEqual(len(self.buzon.mensajes), total_destinatarios)
+        self.assertEqual(
+            sorted(correo for mensaje in self.buzon.mensajes for correo in mensaje.rcpt_tos),
+            sorted(correo for correos in self.DESTINATARIOS_POR_TIPO.values() for correo in correos),
+        )
+        self.assertEqual(HistorialEnvioEmail.objects.filter(estado='ENVIADO').count(), total_destinatarios)
+
+    def test_contrasena_ilegible_registra_error_por_configuracion(self):
+        ConfiguracionEmail.objects.filter(pk=self.configuracion_email.pk).update(
+            email_host_password='no-es-un-token-fernet'
+        )
+
+        with self.assertLogs('gestion', level='ERROR'):
+            resultados = AlertaEmailService().enviar_todas_alertas_programadas()
+
+        self.assertEqual(len(resultados), len(self.DESTINATARIOS_POR_TIPO))
+        for resultado in resultados:
+            self.assertFalse(resultado['enviado'])
+            self.assertTrue(resultado['errores'])
+        self.assertEqual(self.buzon.sesiones, 0)
+        self.assertEqual(
+            HistorialEnvioEmail.objects.filter(estado='ERROR').count(),
+            sum(len(correos) for correos in self.DESTINATARIOS_POR_TIPO.values()),
+        )
+
+    def test_conexion_cortada_se_reabre_una_sola_vez(self):
+        self.buzon.cortes = 1
+
+        with self.assertLogs('gestion', level='ERROR'):
+            AlertaEmailService().enviar_todas_alertas_programadas()
+
+        total_destinatarios = sum(len(correos) for correos in self.DESTINATARIOS_POR_TIPO.values())
+        # La sesión inicial y una única reconexión para el resto de mensajes
+        self.assertEqual(self.buzon.sesiones, 2)
+        self.assertEqual(len(self.buzon.mensajes), total_destinatarios - 1)
+        self.assertEqual(HistorialEnvioEmail.objects.filter(estado='ERROR').count(), 1)
+        self.assertEqual(HistorialEnvioEmail.objects.filter(estado='ENVIADO').count(), total_destinatarios - 1)
@@ -5,6 +5,8 @@ app_name = 'gestion'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/kpis/', views.kpis_portafolio_api, name='kpis_portafolio_api'),
+    path('dashboard/secciones/<slug:seccion>/', views.dashboard_fragmento, name='dashboard_fragmento'),
     path('exportaciones/', views.exportaciones, name='exportaciones'),
     path('exportaciones/contratos/', views.exportar_contratos, name='exportar_contratos'),
     path('exportaciones/alertas-vencimiento/', views.exportar_alertas_vencimiento, name='exportar_alertas_vencimiento'),
@@ -14,8 +16,12 @@ urlpatterns = [
     path('exportaciones/alertas-salario-minimo/', views.exportar_alertas_salario_minimo, name='exportar_alertas_salario_minimo'),
     path('exportaciones/alertas-polizas-requeridas/', views.exportar_alertas_polizas_requeridas, name='exportar_alertas_polizas_requeridas'),
     path('exportaciones/alertas-terminacion/', views.exportar_alertas_terminacion, name='exportar_alertas_terminacion'),
+    path('exportaciones/trabajos/<int:trabajo_id>/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/trabajos/<int:trabajo_id>/estado/', views.estado_exportacion_api, name='estado_exportacion_api'),
+    path('exportaciones/trabajos/<int:trabajo_id>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
     path('contratos/', views.lista_contratos, name='lista_contratos'),
     path('contratos/nuevo/', views.nuevo_contrato, name='nuevo_contrato'),
+    path('contratos/autocompletar/', views.autocompletar_contratos, name='autocompletar_contratos'),
     path('contratos/<int:contrato_id>/', views.detalle_contrato, name='detalle_contrato'),
     path('contratos/<int:contrato_id>/editar/', views.editar_contrato, name='editar_contrato'),
     path('contratos/<int:contrato_id>/eliminar/', views.eliminar_contrato, name='eliminar_contrato'),
@@ -7,6 +7,7 @@ from django.db.models import Q
 
 from gestion.models import Contrato, IPCHistorico, CalculoIPC, OtroSi
 from gestion.utils_otrosi import (
+    _NO_PRECARGADO,
     get_ultimo_otrosi_que_modifico_campo_hasta_fecha,
     get_otrosi_vigente,
 )
@@ -325,7 +326,7 @@ def obtener_ultimo_calculo_ipc_aplicado(contrato):
     ).order_by('-fecha_aplicacion', '-fecha_calculo').first()
 
 
-def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
+def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None, timeline=None, fecha_ultimo_calculo=_NO_PRECARGADO):
     """
     Calcula la próxima fecha de aumento IPC/Salario Mínimo para un contrato.
     
@@ -339,19 +340,21 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
     Args:
         contrato: Instancia del modelo Contrato
         fecha_referencia: date opcional, por defecto usa date.today()
+        timeline: ContratoTimeline opcional; resuelve Otro Sí y renovaciones en memoria.
+        fecha_ultimo_calculo: Fecha de aplicación del último cálculo (IPC o Salario Mínimo)
+                              ya precargada (puede ser None). Si no se indica, se consulta.
     
     Returns:
         date con la próxima fecha de aumento o None si no se puede calcular
     """
     from gestion.utils_otrosi import get_ultimo_otrosi_que_modifico_campo_hasta_fecha
-    from gestion.models import CalculoSalarioMinimo, OtroSi
     
     if fecha_referencia is None:
         fecha_referencia = date.today()
     
     # Obtener periodicidad considerando otrosí
     otrosi_periodicidad = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nueva_periodicidad_ipc', fecha_referencia
+        contrato, 'nueva_periodicidad_ipc', fecha_referencia, timeline=timeline
     )
     if otrosi_periodicidad and otrosi_periodicidad.nueva_periodicidad_ipc:
         periodicidad = otrosi_periodicidad.nueva_periodicidad_ipc
@@ -361,60 +364,16 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
     # Si es ANUAL
     if periodicidad == 'ANUAL':
         # Obtener último cálculo realizado (IPC o Salario Mínimo)
-        ultimo_ipc = CalculoIPC.objects.filter(
-            contrato=contrato
-        ).order_by('-fecha_aplicacion', '-fecha_calculo').first()
-        
-        ultimo_salario = CalculoSalarioMinimo.objects.filter(
-            contrato=contrato
-        ).order_by('-fecha_aplicacion', '-fecha_calculo').first()
-        
-        # Determinar cuál es el último cálculo más reciente
-        ultimo_calculo = None
-        if ultimo_ipc and ultimo_salario:
-            ultimo_calculo = ultimo_ipc if ultimo_ipc.fecha_aplicacion >= ultimo_salario.fecha_aplicacion else ultimo_salario
-        elif ultimo_ipc:
-            ultimo_calculo = ultimo_ipc
-        elif ultimo_salario:
-            ultimo_calculo = ultimo_salario
+        if fecha_ultimo_calculo is _NO_PRECARGADO:
+            fecha_ultimo_calculo = _obtener_fecha_ultimo_calculo(contrato)
         
         # Buscar renovaciones (OtroSi tipo RENEWAL o RenovacionAutomatica) que NO modificaron condiciones IPC
         # y que puedan reiniciar el ciclo de ajustes
         renovacion_relevante = None
-        if ultimo_calculo:
-            # Buscar OtroSi de tipo RENEWAL aprobadas posteriores al último cálculo
-            renovaciones_otrosi = OtroSi.objects.filter(
-                contrato=contrato,
-                estado='APROBADO',
-                tipo='RENEWAL',
-                effective_from__gt=ultimo_calculo.fecha_aplicacion,
-                effective_from__lte=fecha_referencia
-            ).exclude(
-                # Excluir renovaciones que modificaron condiciones IPC
-                nuevo_tipo_condicion_ipc__isnull=False
-            ).exclude(
-                nueva_periodicidad_ipc__isnull=False
-            ).exclude(
-                nueva_fecha_aumento_ipc__isnull=False
-            ).order_by('-effective_from', '-version').first()
-            
-            # Buscar Renovaciones Automáticas aprobadas posteriores al último cálculo
-            # (RenovacionAutomatica no tiene campos IPC, así que siempre mantiene condiciones del contrato)
-            from gestion.models import RenovacionAutomatica
-            renovaciones_automaticas = RenovacionAutomatica.objects.filter(
-                contrato=contrato,
-                estado='APROBADO',
-                effective_from__gt=ultimo_calculo.fecha_aplicacion,
-                effective_from__lte=fecha_referencia
-            ).order_by('-effective_from', '-version').first()
-            
-            # Determinar cuál renovación es más reciente
-            if renovaciones_otrosi and renovaciones_automaticas:
-                renovacion_relevante = renovaciones_otrosi if renovaciones_otrosi.effective_from >= renovaciones_automaticas.effective_from else renovaciones_automaticas
-            elif renovaciones_otrosi:
-                renovacion_relevante = renovaciones_otrosi
-            elif renovaciones_automaticas:
-                renovacion_relevante = renovaciones_automaticas
+        if fecha_ultimo_calculo:
+            renovacion_relevante = _obtener_renovacion_sin_cambios_ipc(
+                contrato, fecha_referencia, posterior_a=fecha_ultimo_calculo, timeline=timeline
+            )
         
         # Si hay renovación relevante (posterior al último cálculo y sin modificar IPC),
         # usar su fecha de inicio como base para calcular el próximo ajuste
@@ -428,45 +387,18 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
             return fecha_proxima
         
         # Si hay último cálculo, calcular desde su fecha de aplicación + 1 año
-        if ultimo_calculo:
-            fecha_ultimo_ajuste = ultimo_calculo.fecha_aplicacion
+        if fecha_ultimo_calculo:
             fecha_proxima = date(
-                fecha_ultimo_ajuste.year + 1,
-                fecha_ultimo_ajuste.month,
-                fecha_ultimo_ajuste.day
+                fecha_ultimo_calculo.year + 1,
+                fecha_ultimo_calculo.month,
+                fecha_ultimo_calculo.day
             )
             return fecha_proxima
         
         # Si no hay cálculos, buscar renovaciones recientes que puedan servir como base
-        renovacion_base_otrosi = OtroSi.objects.filter(
-            contrato=contrato,
-            estado='APROBADO',
-            tipo='RENEWAL',
-            effective_from__lte=fecha_referencia
-        ).exclude(
-            nuevo_tipo_condicion_ipc__isnull=False
-        ).exclude(
-            nueva_periodicidad_ipc__isnull=False
-        ).exclude(
-            nueva_fecha_aumento_ipc__isnull=False
-        ).order_by('-effective_from', '-version').first()
-        
-        # Buscar Renovaciones Automáticas
-        from gestion.models import RenovacionAutomatica
-        renovacion_base_automatica = RenovacionAutomatica.objects.filter(
-            contrato=contrato,
-            estado='APROBADO',
-            effective_from__lte=fecha_referencia
-        ).order_by('-effective_from', '-version').first()
-        
-        # Determinar cuál renovación es más reciente
-        renovacion_base = None
-        if renovacion_base_otrosi and renovacion_base_automatica:
-            renovacion_base = renovacion_base_otrosi if renovacion_base_otrosi.effective_from >= renovacion_base_automatica.effective_from else renovacion_base_automatica
-        elif renovacion_base_otrosi:
-            renovacion_base = renovacion_base_otrosi
-        elif renovacion_base_automatica:
-            renovacion_base = renovacion_base_automatica
+        renovacion_base = _obtener_renovacion_sin_cambios_ipc(
+            contrato, fecha_referencia, timeline=timeline
+        )
         
         if renovacion_base:
             fecha_base_renovacion = renovacion_base.effective_from
@@ -480,7 +412,7 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
         # Si no hay cálculos ni renovaciones, calcular desde fecha base o fecha inicial
         # Obtener fecha de aumento considerando otrosí
         otrosi_fecha_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_aumento_ipc', fecha_referencia
+            contrato, 'nueva_fecha_aumento_ipc', fecha_referencia, timeline=timeline
         )
         if otrosi_fecha_ipc and otrosi_fecha_ipc.nueva_fecha_aumento_ipc:
             fecha_base = otrosi_fecha_ipc.nueva_fecha_aumento_ipc
@@ -509,7 +441,7 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
     elif periodicidad == 'FECHA_ESPECIFICA':
         # Obtener fecha de aumento considerando otrosí
         otrosi_fecha_ipc = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_aumento_ipc', fecha_referencia
+            contrato, 'nueva_fecha_aumento_ipc', fecha_referencia, timeline=timeline
         )
         if otrosi_fecha_ipc and otrosi_fecha_ipc.nueva_fecha_aumento_ipc:
             fecha_base = otrosi_fecha_ipc.nueva_fecha_aumento_ipc
@@ -522,6 +454,169 @@ def calcular_proxima_fecha_aumento(contrato, fecha_referencia=None):
     return None
 
 
+def _obtener_fecha_ultimo_calculo(contrato):
+    """
+    Fecha de aplicación del último cálculo (IPC o Salario Mínimo) del contrato, o None.
+    Los cálculos eliminados se borran físicamente de la base de datos.
+    """
+    from gestion.models import CalculoSalarioMinimo
+    
+    fechas = [
+        modelo.objects.filter(contrato=contrato)
+        .order_by('-fecha_aplicacion', '-fecha_calculo')
+        .values_list('fecha_aplicacion', flat=True)
+        .first()
+        for modelo in (CalculoIPC, CalculoSalarioMinimo)
+    ]
+    fechas = [fecha for fecha in fechas if fecha]
+    return max(fechas) if fechas else None
+
+
+def _obtener_renovacion_sin_cambios_ipc(contrato, fecha_referencia, posterior_a=None, timeline=None):
+    """
+    Renovación más reciente (Otro Sí RENEWAL que no modificó condiciones IPC o
+    Renovación Automática) con inicio hasta fecha_referencia y, opcionalmente, posterior a posterior_a.
+    """
+    from gestion.models import RenovacionAutomatica
+    
+    if timeline is not None:
+        return timeline.ultima_renovacion_sin_cambios_ipc(fecha_referencia, posterior_a=posterior_a)
+    
+    renovaciones_otrosi = OtroSi.objects.filter(
+        contrato=contrato,
+        estado='APROBADO',
+        tipo='RENEWAL',
+        effective_from__lte=fecha_referencia
+    ).exclude(
+        # Excluir renovaciones que modificaron condiciones IPC
+        nuevo_tipo_condicion_ipc__isnull=False
+    ).exclude(
+        nueva_periodicidad_ipc__isnull=False
+    ).exclude(
+        nueva_fecha_aumento_ipc__isnull=False
+    )
+    # RenovacionAutomatica no tiene campos IPC, así que siempre mantiene condiciones del contrato
+    renovaciones_automaticas = RenovacionAutomatica.objects.filter(
+        contrato=contrato,
+        estado='APROBADO',
+        effective_from__lte=fecha_referencia
+    )
+    if posterior_a is not None:
+        renovaciones_otrosi = renovaciones_otrosi.filter(effective_from__gt=posterior_a)
+        renovaciones_automaticas = renovaciones_automaticas.filter(effective_from__gt=posterior_a)
+    
+    renovacion_otrosi = renovaciones_otrosi.order_by('-effective_from', '-version').first()
+    renovacion_automatica = renovaciones_automaticas.order_by('-effective_from', '-version').first()
+    
+    # Determinar cuál renovación es más reciente
+    if renovacion_otrosi and renovacion_automatica:
+        return renovacion_otrosi if renovacion_otrosi.effective_from >= renovacion_automatica.effective_from else renovacion_automatica
+    return renovacion_otrosi or renovacion_automatica
+
+
+def resolver_proximo_ajuste(contrato, fecha_referencia=None, timeline=None, fechas_calculos_ipc=None, fechas_calculos_sm=None):
+    """
+    Resuelve el próximo ajuste (IPC o Salario Mínimo) de un contrato tal como lo evalúan
+    las alertas: condición y periodicidad vigentes por efecto cadena, próxima fecha de
+    aumento, si ya existe el cálculo para esa fecha y el evento que la determinó.
+
+    Args:
+        contrato: Instancia del modelo Contrato
+        fecha_referencia: date opcional, por defecto usa date.today()
+        timeline: ContratoTimeline opcional; resuelve Otro Sí y renovaciones en memoria.
+        fechas_calculos_ipc: Fechas de aplicación de los CalculoIPC del contrato ya precargadas.
+                             Si no se indican, se consultan (igual para fechas_calculos_sm).
+
+    Returns:
+        dict con:
+            - tipo_condicion_ipc: str con la condición vigente (IPC / SALARIO_MINIMO)
+            - periodicidad_ipc: str con la periodicidad vigente
+            - proxima_fecha_ajuste: date o None
+            - ajuste_calculado: bool, ya existe un cálculo de la condición vigente para esa fecha
+            - origen: número del Otro Sí / Renovación que determinó la fecha (None: contrato base o último cálculo)
+    """
+    from gestion.models import CalculoSalarioMinimo
+    from gestion.services.alertas import obtener_numero_evento
+
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    if fechas_calculos_ipc is None:
+        fechas_calculos_ipc = set(
+            CalculoIPC.objects.filter(contrato=contrato).values_list('fecha_aplicacion', flat=True)
+        )
+    if fechas_calculos_sm is None:
+        fechas_calculos_sm = set(
+            CalculoSalarioMinimo.objects.filter(contrato=contrato).values_list('fecha_aplicacion', flat=True)
+        )
+
+    def _modificador(campo):
+        return get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
+            contrato, campo, fecha_referencia, timeline=timeline
+        )
+
+    otrosi_tipo_ipc = _modificador('nuevo_tipo_condicion_ipc')
+    otrosi_periodicidad = _modificador('nueva_periodicidad_ipc')
+    otrosi_fecha_ipc = _modificador('nueva_fecha_aumento_ipc')
+
+    tipo_condicion_ipc = (
+        otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
+        if otrosi_tipo_ipc and otrosi_tipo_ipc.nuevo_tipo_condicion_ipc
+        else contrato.tipo_condicion_ipc
+    )
+    periodicidad_ipc = (
+        otrosi_periodicidad.nueva_periodicidad_ipc
+        if otrosi_periodicidad and otrosi_periodicidad.nueva_periodicidad_ipc
+        else contrato.periodicidad_ipc
+    )
+
+    fechas_todas = list(fechas_calculos_ipc) + list(fechas_calculos_sm)
+    proxima_fecha_ajuste = calcular_proxima_fecha_aumento(
+        contrato,
+        fecha_referencia,
+        timeline=timeline,
+        fecha_ultimo_calculo=max(fechas_todas) if fechas_todas else None,
+    )
+
+    # Solo cuentan los cálculos de la condición vigente
+    if tipo_condicion_ipc == 'IPC':
+        fechas_condicion = fechas_calculos_ipc
+    elif tipo_condicion_ipc == 'SALARIO_MINIMO':
+        fechas_condicion = fechas_calculos_sm
+    else:
+        fechas_condicion = ()
+
+    # Evento que determinó la fecha (prioridad: fecha > periodicidad > tipo)
+    origen = None
+    if otrosi_fecha_ipc:
+        origen = obtener_numero_evento(otrosi_fecha_ipc)
+    elif otrosi_periodicidad:
+        origen = obtener_numero_evento(otrosi_periodicidad)
+    elif otrosi_tipo_ipc:
+        origen = obtener_numero_evento(otrosi_tipo_ipc)
+
+    # Si no hay modificador pero hay una renovación que no modificó condiciones IPC
+    # y es posterior al último cálculo, la renovación es el origen
+    if not origen:
+        try:
+            fecha_ultimo_calculo = max(fechas_condicion) if fechas_condicion else None
+            renovacion_relevante = _obtener_renovacion_sin_cambios_ipc(
+                contrato, fecha_referencia, timeline=timeline
+            )
+            if renovacion_relevante and renovacion_relevante.effective_from:
+                if not fecha_ultimo_calculo or renovacion_relevante.effective_from > fecha_ultimo_calculo:
+                    origen = obtener_numero_evento(renovacion_relevante)
+        except Exception:
+            pass
+
+    return {
+        'tipo_condicion_ipc': tipo_condicion_ipc,
+        'periodicidad_ipc': periodicidad_ipc,
+        'proxima_fecha_ajuste': proxima_fecha_ajuste,
+        'ajuste_calculado': bool(proxima_fecha_ajuste and proxima_fecha_ajuste in fechas_condicion),
+        'origen': origen,
+    }
+
+
 def obtener_ultimo_calculo_ajuste(contrato):
     """
     Obtiene el último cálculo de ajuste (IPC o Salario Mínimo) para un contrato.
@@ -604,6 +699,82 @@ def obtener_ultimo_calculo_aplicado_hasta_fecha(contrato, fecha_referencia=None)
     return None
 
 
+def obtener_ultimos_calculos_aplicados_hasta_fecha(contratos_ids, fecha_referencia=None):
+    """
+    Versión por lote de obtener_ultimo_calculo_aplicado_hasta_fecha.
+    Resuelve el último cálculo (IPC o Salario Mínimo) aplicado de varios contratos con dos consultas.
+    
+    Args:
+        contratos_ids: Iterable de IDs de contratos
+        fecha_referencia: date opcional, por defecto usa date.today()
+    
+    Returns:
+        dict {contrato_id: CalculoIPC o CalculoSalarioMinimo}; los contratos sin cálculo no aparecen
+    """
+    from gestion.models import CalculoSalarioMinimo
+    
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    
+    contratos_ids = list(contratos_ids)
+    ultimos_ipc = {}
+    ultimos_salario = {}
+    
+    for inicio in range(0, len(contratos_ids), 900):
+        lote = contratos_ids[inicio:inicio + 900]
+        for modelo, destino, relacion in (
+            (CalculoIPC, ultimos_ipc, 'ipc_historico'),
+            (CalculoSalarioMinimo, ultimos_salario, 'salario_minimo_historico'),
+        ):
+            calculos = modelo.objects.filter(
+                contrato_id__in=lote,
+                estado='APLICADO',
+                fecha_aplicacion__lte=fecha_referencia
+            ).select_related(relacion).order_by('contrato_id', '-fecha_aplicacion', '-fecha_calculo')
+            for calculo in calculos:
+                # El primero de cada contrato es el más reciente
+                destino.setdefault(calculo.contrato_id, calculo)
+    
+    resultado = {}
+    for contrato_id in set(ultimos_ipc) | set(ultimos_salario):
+        ultimo_ipc = ultimos_ipc.get(contrato_id)
+        ultimo_salario = ultimos_salario.get(contrato_id)
+        # Misma regla de desempate que obtener_ultimo_calculo_aplicado_hasta_fecha
+        if ultimo_ipc and ultimo_salario:
+            if ultimo_ipc.fecha_aplicacion >= ultimo_salario.fecha_aplicacion:
+                resultado[contrato_id] = ultimo_ipc
+            else:
+                resultado[contrato_id] = ultimo_salario
+        else:
+            resultado[contrato_id] = ultimo_ipc or ultimo_salario
+
+    return resultado
+
+
+def obtener_fechas_calculos_por_contrato(contratos_ids):
+    """
+    Fechas de aplicación de los cálculos (cualquier estado) de varios contratos con dos consultas.
+
+    Returns:
+        tuple (fechas_ipc, fechas_salario_minimo), cada una dict {contrato_id: set(date)}
+    """
+    from gestion.models import CalculoSalarioMinimo
+
+    contratos_ids = list(contratos_ids)
+    fechas_ipc = {}
+    fechas_salario = {}
+
+    for inicio in range(0, len(contratos_ids), 900):
+        lote = contratos_ids[inicio:inicio + 900]
+        for modelo, destino in ((CalculoIPC, fechas_ipc), (CalculoSalarioMinimo, fechas_salario)):
+            for contrato_id, fecha_aplicacion in modelo.objects.filter(
+                contrato_id__in=lote
+            ).values_list('contrato_id', 'fecha_aplicacion'):
+                destino.setdefault(contrato_id, set()).add(fecha_aplicacion)
+
+    return fechas_ipc, fechas_salario
+
+
 def verificar_otrosi_vigente_para_fecha(contrato, fecha_aplicacion):
     """
     Verifica si existe un Otro Sí vigente que modifica el canon para el año de aplicación.
@@ -1,10 +1,16 @@
 """
 Utilidades para gestión de Otrosí y vistas vigentes de contratos
 """
+import re
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from django.db.models import Q
 
+from gestion.services.cache_solicitud import memoizar_por_solicitud
+
+# Marca para distinguir "no precargado" de un valor precargado None
+_NO_PRECARGADO = object()
+
 
 def _obtener_numero_evento(evento):
     """Retorna el número del evento (Otro Sí o Renovación Automática)."""
@@ -50,7 +56,7 @@ def _obtener_label_evento(evento):
     return str(evento)
 
 
-def es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
+def es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia, timeline=None):
     """
     Determina si una fecha está fuera de la vigencia del contrato.
     Retorna True si la fecha es anterior al inicio o posterior a la fecha final del contrato.
@@ -65,7 +71,7 @@ def es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
         
         try:
             from gestion.views.utils import _obtener_fecha_final_contrato
-            fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia)
+            fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia, timeline=timeline)
             if fecha_final and fecha_referencia > fecha_final:
                 return True
         except Exception:
@@ -80,7 +86,7 @@ def es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
         return False
 
 
-def tiene_otrosi_posteriores(otrosi):
+def tiene_otrosi_posteriores(otrosi, otrosis_contrato=None):
     """
     Verifica si hay Otros Sí posteriores al Otro Sí dado.
     
@@ -89,6 +95,8 @@ def tiene_otrosi_posteriores(otrosi):
     
     Args:
         otrosi: Instancia del modelo OtroSi
+        otrosis_contrato: Otros Sí del contrato ya cargados (opcional); evita una consulta
+                          por elemento cuando se evalúa toda la lista del contrato.
         
     Returns:
         bool: True si hay Otros Sí posteriores, False en caso contrario
@@ -104,9 +112,15 @@ def tiene_otrosi_posteriores(otrosi):
         return False
     
     # Buscar Otros Sí del mismo contrato con número mayor
-    otrosi_posteriores = otrosi.contrato.otrosi.filter(
-        numero_otrosi__regex=r'^OS-\d+$'
-    ).exclude(id=otrosi.id)
+    if otrosis_contrato is not None:
+        otrosi_posteriores = [
+            otro for otro in otrosis_contrato
+            if otro.id != otrosi.id and re.match(r'^OS-\d+$', otro.numero_otrosi or '')
+        ]
+    else:
+        otrosi_posteriores = otrosi.contrato.otrosi.filter(
+            numero_otrosi__regex=r'^OS-\d+$'
+        ).exclude(id=otrosi.id)
     
     for otro in otrosi_posteriores:
         try:
@@ -137,7 +151,8 @@ def get_ultimo_otrosi_aprobado(contrato):
     return ultimo_otrosi
 
 
-def get_ultimo_otrosi_que_modifico_campo(contrato, campo_nombre):
+@memoizar_por_solicitud
+def get_ultimo_otrosi_que_modifico_campo(contrato, campo_nombre, timeline=None):
     """
     Obtiene el último Otrosí o Renovación Automática aprobado que modificó un campo específico.
     
@@ -147,6 +162,7 @@ def get_ultimo_otrosi_que_modifico_campo(contrato, campo_nombre):
     Args:
         contrato: Instancia del modelo Contrato
         campo_nombre: Nombre del campo en el modelo OtroSi/RenovacionAutomatica (ej: 'nuevo_valor_canon')
+        timeline: ContratoTimeline opcional del contrato; si se indica, se resuelve en memoria sin consultas.
     
     Returns:
         OtroSi, RenovacionAutomatica o None si ningún evento modificó ese campo
@@ -154,6 +170,9 @@ def get_ultimo_otrosi_que_modifico_campo(contrato, campo_nombre):
     from .models import OtroSi, RenovacionAutomatica
     from django.utils import timezone
     
+    if timeline is not None:
+        return timeline.ultimo_evento_con_valor(campo_nombre)
+    
     # Obtener todos los Otros Sí aprobados ordenados por fecha de aprobación descendente
     otrosis_aprobados = OtroSi.objects.filter(
         contrato=contrato,
@@ -196,7 +215,33 @@ def get_ultimo_otrosi_que_modifico_campo(contrato, campo_nombre):
     return None
 
 
-def get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, campo_nombre, fecha_referencia, permitir_futuros=False):
+def _valor_modifica_campo(valor):
+    """
+    Indica si el valor de un campo nuevo_* de un evento representa una modificación.
+    
+    - Booleanos: siempre (True o False son valores válidos)
+    - Strings: si no están vacíos
+    - Numéricos: si son diferentes de 0 (0 indica que no se modificó)
+    - Otros tipos (date): si no son None
+    """
+    if valor is None:
+        return False
+    if isinstance(valor, bool):
+        return True
+    if isinstance(valor, str):
+        return valor.strip() != ''
+    if isinstance(valor, (Decimal, int, float)):
+        try:
+            # Para campos financieros, 0 generalmente significa que no se modificó
+            return Decimal(str(valor)) != Decimal('0')
+        except (ValueError, TypeError, ArithmeticError):
+            # Si no se puede convertir a Decimal, tratar como valor válido
+            return True
+    return True
+
+
+@memoizar_por_solicitud
+def get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, campo_nombre, fecha_referencia, permitir_futuros=False, timeline=None):
     """
     Obtiene el último Otrosí o Renovación Automática aprobado que modificó un campo específico hasta una fecha de referencia.
     
@@ -209,6 +254,7 @@ def get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, campo_nombre, fec
         fecha_referencia: Fecha hasta la cual buscar (datetime.date)
         permitir_futuros: Si es True, considera también eventos con effective_from en el futuro.
                          Útil para gestionar pólizas antes del inicio del contrato.
+        timeline: ContratoTimeline opcional del contrato; si se indica, se resuelve en memoria sin consultas.
     
     Returns:
         OtroSi, RenovacionAutomatica o None si ningún evento modificó ese campo hasta esa fecha
@@ -219,6 +265,9 @@ def get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, campo_nombre, fec
     if fecha_referencia is None:
         fecha_referencia = date.today()
     
+    if timeline is not None:
+        return timeline.ultimo_evento_que_modifico_campo(campo_nombre, fecha_referencia)
+    
     # Obtener eventos de ambos tipos
     eventos = []
     
@@ -284,35 +333,15 @@ def get_ultimo_otrosi_que_modifico_campo_hasta_fecha(contrato, campo_nombre, fec
         if not es_vigente:
             continue
         
-        valor = getattr(evento, campo_nombre, None)
         # Verificar si el campo tiene un valor válido
-        if valor is not None:
-            # Para booleanos, siempre retornar (True o False son valores válidos)
-            if isinstance(valor, bool):
-                return evento
-            # Para strings, verificar que no esté vacío
-            elif isinstance(valor, str) and valor.strip() != '':
-                return evento
-            # Para Decimal, verificar que no sea 0 (0 puede indicar que no se modificó)
-            elif isinstance(valor, (Decimal, int, float)):
-                # Convertir a Decimal para comparación
-                try:
-                    valor_decimal = Decimal(str(valor)) if valor is not None else None
-                    # Para campos financieros, 0 generalmente significa que no se modificó
-                    # Solo retornar si el valor es diferente de 0
-                    if valor_decimal is not None and valor_decimal != Decimal('0'):
-                        return evento
-                except (ValueError, TypeError):
-                    # Si no se puede convertir a Decimal, tratar como valor válido
-                    return evento
-            # Para otros tipos (date), si no es None, es válido
-            elif not isinstance(valor, str):
-                return evento
+        if _valor_modifica_campo(getattr(evento, campo_nombre, None)):
+            return evento
     
     return None
 
 
-def get_otrosi_vigente(contrato, fecha_referencia=None):
+@memoizar_por_solicitud
+def get_otrosi_vigente(contrato, fecha_referencia=None, timeline=None):
     """
     Obtiene el Otrosí o Renovación Automática vigente para un contrato en una fecha dada.
     
@@ -322,10 +351,15 @@ def get_otrosi_vigente(contrato, fecha_referencia=None):
     - effective_to >= fecha_referencia (o null)
     - Mayor versión en caso de empate
     - Prioriza OtroSi sobre RenovacionAutomatica si ambos están vigentes
+    
+    Si se indica un ContratoTimeline, se resuelve en memoria sin consultas.
     """
     if fecha_referencia is None:
         fecha_referencia = date.today()
     
+    if timeline is not None:
+        return timeline.otrosi_vigente(fecha_referencia)
+    
     # Importar aquí para evitar circular import
     from .models import OtroSi, RenovacionAutomatica
     
@@ -354,13 +388,18 @@ def get_otrosi_vigente(contrato, fecha_referencia=None):
     return renovaciones_vigentes.first()
 
 
-def get_vista_vigente_contrato(contrato, fecha_referencia=None):
+def get_vista_vigente_contrato(contrato, fecha_referencia=None, timeline=None, ultimo_calculo_aplicado=_NO_PRECARGADO):
     """
     Obtiene la "vista vigente" del contrato aplicando el efecto cadena.
     
     Para cada campo, busca el último Otro Sí que lo modificó hasta la fecha de referencia.
     Si ningún Otro Sí lo modificó, usa el valor del contrato base.
     
+    Args:
+        timeline: ContratoTimeline opcional; resuelve los eventos en memoria sin consultas.
+        ultimo_calculo_aplicado: Cálculo IPC/Salario Mínimo ya precargado (puede ser None).
+                                 Si no se indica, se consulta.
+    
     Retorna un diccionario con:
     - Los valores del contrato base o del último Otro Sí que los modificó hasta la fecha
     - Metadata adicional de qué fue modificado y por qué Otro Sí
@@ -368,10 +407,10 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
     if fecha_referencia is None:
         fecha_referencia = date.today()
 
-    if es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
+    if es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia, timeline=timeline):
         fecha_inicio = getattr(contrato, 'fecha_inicial_contrato', None)
         from gestion.views.utils import _obtener_fecha_final_contrato
-        fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia)
+        fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia, timeline=timeline)
         
         mensaje = None
         if fecha_inicio and fecha_referencia < fecha_inicio:
@@ -457,7 +496,7 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
             # Buscar el último Otro Sí que modificó este campo antes de la fecha del Otro Sí actual
             try:
                 otrosi_anterior = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                    contrato, campo_otrosi, fecha_anterior
+                    contrato, campo_otrosi, fecha_anterior, timeline=timeline
                 )
                 
                 if otrosi_anterior and otrosi_anterior.id != otrosi_modificador.id:
@@ -509,7 +548,7 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
         valor_contrato = getattr(contrato, campo_contrato, None)
         
         otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, campo_otrosi, fecha_referencia
+            contrato, campo_otrosi, fecha_referencia, timeline=timeline
         )
         
         if otrosi_modificador:
@@ -533,7 +572,7 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
     
     # Vista base del contrato
     try:
-        otrosi_vigente = get_otrosi_vigente(contrato, fecha_referencia)
+        otrosi_vigente = get_otrosi_vigente(contrato, fecha_referencia, timeline=timeline)
     except Exception:
         otrosi_vigente = None
     
@@ -676,13 +715,14 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
             pass
     
     # Considerar cálculos de IPC o Salario Mínimo aplicados hasta la fecha de referencia
-    ultimo_calculo_aplicado = None
-    try:
-        from gestion.utils_ipc import obtener_ultimo_calculo_aplicado_hasta_fecha
-        ultimo_calculo_aplicado = obtener_ultimo_calculo_aplicado_hasta_fecha(contrato, fecha_referencia)
-    except Exception:
-        # Si hay error al obtener el cálculo, continuar sin aplicar cálculos
-        pass
+    if ultimo_calculo_aplicado is _NO_PRECARGADO:
+        ultimo_calculo_aplicado = None
+        try:
+            from gestion.utils_ipc import obtener_ultimo_calculo_aplicado_hasta_fecha
+            ultimo_calculo_aplicado = obtener_ultimo_calculo_aplicado_hasta_fecha(contrato, fecha_referencia)
+        except Exception:
+            # Si hay error al obtener el cálculo, continuar sin aplicar cálculos
+            pass
     
     if ultimo_calculo_aplicado and hasattr(ultimo_calculo_aplicado, 'nuevo_canon') and ultimo_calculo_aplicado.nuevo_canon:
         # Determinar qué campo actualizar según el tipo de contrato
@@ -1092,6 +1132,63 @@ def get_vista_vigente_contrato(contrato, fecha_referencia=None):
     return vista
 
 
+def get_vistas_vigentes_contratos(contratos, fecha_referencia=None, incluir_polizas=False):
+    """
+    Versión por lote de get_vista_vigente_contrato.
+    
+    Resuelve la vista vigente (canon, modalidad, % ventas, fecha final, condiciones IPC y,
+    opcionalmente, pólizas requeridas) de N contratos con un número fijo de consultas:
+    los eventos aprobados se cargan en un ContratoTimeline por contrato y los últimos
+    cálculos IPC/Salario Mínimo aplicados se precargan en bloque.
+    
+    Args:
+        contratos: QuerySet o lista de instancias de Contrato, o lista de IDs
+        fecha_referencia: Fecha de referencia (por defecto: hoy)
+        incluir_polizas: Si es True, agrega 'polizas_requeridas' a cada vista disponible
+    
+    Returns:
+        dict {contrato_id: vista} en el mismo orden de los contratos recibidos
+    """
+    from .models import Contrato
+    from .utils_ipc import obtener_ultimos_calculos_aplicados_hasta_fecha
+    from .utils_timeline import ContratoTimeline
+    
+    if fecha_referencia is None:
+        fecha_referencia = date.today()
+    
+    contratos = list(contratos)
+    if contratos and not isinstance(contratos[0], Contrato):
+        contratos_por_id = Contrato.objects.select_related(
+            'arrendatario', 'proveedor', 'local', 'tipo_contrato', 'tipo_servicio'
+        ).in_bulk(contratos)
+        contratos = [contratos_por_id[contrato_id] for contrato_id in contratos if contrato_id in contratos_por_id]
+    
+    timelines = ContratoTimeline.para_contratos(contratos)
+    calculos = obtener_ultimos_calculos_aplicados_hasta_fecha(
+        [contrato.pk for contrato in contratos], fecha_referencia
+    )
+    
+    vistas = {}
+    for contrato in contratos:
+        timeline = timelines.get(contrato.pk)
+        vista = get_vista_vigente_contrato(
+            contrato,
+            fecha_referencia,
+            timeline=timeline,
+            ultimo_calculo_aplicado=calculos.get(contrato.pk),
+        )
+        if incluir_polizas and vista.get('vista_disponible'):
+            try:
+                vista['polizas_requeridas'] = get_polizas_requeridas_contrato(
+                    contrato, fecha_referencia, timeline=timeline
+                )
+            except Exception:
+                vista['polizas_requeridas'] = {}
+        vistas[contrato.pk] = vista
+    
+    return vistas
+
+
 def get_polizas_vigentes(contrato, fecha_referencia=None):
     """
     Obtiene las pólizas vigentes para un contrato, considerando Otrosí.
@@ -1131,7 +1228,8 @@ def get_polizas_vigentes(contrato, fecha_referencia=None):
     )
 
 
-def get_polizas_requeridas_contrato(contrato, fecha_referencia=None, permitir_fuera_vigencia=False):
+@memoizar_por_solicitud
+def get_polizas_requeridas_contrato(contrato, fecha_referencia=None, permitir_fuera_vigencia=False, timeline=None):
     """
     Obtiene las pólizas requeridas aplicando el efecto cadena.
     
@@ -1144,13 +1242,14 @@ def get_polizas_requeridas_contrato(contrato, fecha_referencia=None, permitir_fu
         permitir_fuera_vigencia: Si es True, permite obtener requisitos incluso si el contrato
                                  aún no ha iniciado o ya venció. Útil para gestionar pólizas
                                  antes del inicio del contrato.
+        timeline: ContratoTimeline opcional; resuelve los eventos en memoria sin consultas.
     
     Retorna un diccionario con la configuración de cada tipo de póliza.
     """
     if fecha_referencia is None:
         fecha_referencia = date.today()
 
-    if not permitir_fuera_vigencia and es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
+    if not permitir_fuera_vigencia and es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia, timeline=timeline):
         return {}
     
     # Si permitir_fuera_vigencia es True, considerar también Otros Sí aprobados con fechas futuras
@@ -1162,7 +1261,7 @@ def get_polizas_requeridas_contrato(contrato, fecha_referencia=None, permitir_fu
         # Solo buscar eventos que sean vigentes en la fecha de referencia
         # No permitir eventos futuros para asegurar que respetamos el estado histórico
         otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, campo_otrosi, fecha_referencia, permitir_futuros=False
+            contrato, campo_otrosi, fecha_referencia, permitir_futuros=False, timeline=timeline
         )
         
         if otrosi_modificador:
@@ -1212,7 +1311,7 @@ def get_polizas_requeridas_contrato(contrato, fecha_referencia=None, permitir_fu
         # Solo buscar eventos que sean vigentes en la fecha de referencia
         # No permitir eventos futuros para asegurar que respetamos el estado histórico
         otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, campo_otrosi, fecha_referencia, permitir_futuros=False
+            contrato, campo_otrosi, fecha_referencia, permitir_futuros=False, timeline=timeline
         )
         
         if otrosi_modificador:
@@ -1613,7 +1712,7 @@ def validar_solapamiento_vigencias(contrato, effective_from, effective_to=None,
     return True, None
 
 
-def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
+def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año, timeline=None):
     """
     Obtiene los valores vigentes necesarios para el cálculo de facturación por ventas
     para un mes y año específicos.
@@ -1622,6 +1721,7 @@ def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
         contrato: Instancia del modelo Contrato
         mes: Mes (1-12)
         año: Año
+        timeline: ContratoTimeline opcional; resuelve los eventos en memoria sin consultas.
     
     Returns:
         dict con:
@@ -1638,12 +1738,12 @@ def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
     
     otrosi_referencia = None
 
-    if es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia):
+    if es_fecha_fuera_vigencia_contrato(contrato, fecha_referencia, timeline=timeline):
         return None
     
     # Obtener modalidad vigente usando efecto cadena
     otrosi_modalidad = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nueva_modalidad_pago', fecha_referencia
+        contrato, 'nueva_modalidad_pago', fecha_referencia, timeline=timeline
     )
     if otrosi_modalidad and otrosi_modalidad.nueva_modalidad_pago:
         modalidad = otrosi_modalidad.nueva_modalidad_pago
@@ -1656,7 +1756,7 @@ def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
     
     # Obtener porcentaje vigente
     otrosi_porcentaje = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nuevo_porcentaje_ventas', fecha_referencia
+        contrato, 'nuevo_porcentaje_ventas', fecha_referencia, timeline=timeline
     )
     if otrosi_porcentaje and otrosi_porcentaje.nuevo_porcentaje_ventas is not None:
         porcentaje_ventas = Decimal(str(otrosi_porcentaje.nuevo_porcentaje_ventas))
@@ -1672,7 +1772,7 @@ def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
     canon_minimo_garantizado = None
     if modalidad == 'Hibrido (Min Garantizado)':
         otrosi_canon_min = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nuevo_canon_minimo_garantizado', fecha_referencia
+            contrato, 'nuevo_canon_minimo_garantizado', fecha_referencia, timeline=timeline
         )
         if otrosi_canon_min and otrosi_canon_min.nuevo_canon_minimo_garantizado is not None:
             canon_minimo_garantizado = Decimal(str(otrosi_canon_min.nuevo_canon_minimo_garantizado))
@@ -1681,7 +1781,7 @@ def obtener_valores_vigentes_facturacion_ventas(contrato, mes, año):
             canon_minimo_garantizado = Decimal(str(contrato.canon_minimo_garantizado))
     
     otrosi_canon_fijo = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nuevo_valor_canon', fecha_referencia
+        contrato, 'nuevo_valor_canon', fecha_referencia, timeline=timeline
     )
     if otrosi_canon_fijo and otrosi_canon_fijo.nuevo_valor_canon is not None:
         canon_fijo = Decimal(str(otrosi_canon_fijo.nuevo_valor_canon))
@@ -0,0 +1,342 @@
+"""
+Línea de tiempo en memoria de los eventos aprobados (Otro Sí y Renovaciones Automáticas) de un contrato.
+
+Permite resolver el efecto cadena ("valor del campo X en la fecha D y qué evento lo fijó")
+sin ejecutar consultas por cada campo: los eventos se cargan una sola vez por contrato
+(o por lote de contratos) y se consultan con búsqueda binaria sobre effective_from.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from gestion.utils_otrosi import _valor_modifica_campo
+
+# SQLite limita la cantidad de parámetros por consulta
+_TAMANO_LOTE_IDS = 900
+
+
+def _clave_orden_bd(evento):
+    """
+    Reproduce order_by('-effective_from', '-fecha_aprobacion', '-version') en orden ascendente.
+    Las fechas de aprobación nulas quedan al final del orden descendente (igual que en SQLite).
+    """
+    fecha_aprobacion = evento.fecha_aprobacion
+    return (
+        evento.effective_from,
+        fecha_aprobacion is not None,
+        fecha_aprobacion,
+        evento.version,
+        evento.pk or 0,
+    )
+
+
+def _clave_efecto_cadena(evento, es_renovacion, ahora):
+    """
+    Reproduce en orden ascendente el ordenamiento usado por
+    get_ultimo_otrosi_que_modifico_campo_hasta_fecha (effective_from, fecha_aprobacion, -version).
+    En empate exacto el Otro Sí queda por delante de la Renovación Automática.
+    """
+    return (
+        evento.effective_from,
+        evento.fecha_aprobacion or ahora,
+        -evento.version,
+        0 if es_renovacion else 1,
+    )
+
+
+def _es_vigente_en(evento, fecha_referencia):
+    return evento.effective_to is None or evento.effective_to >= fecha_referencia
+
+
+def _eventos_precargados(contrato, relacion):
+    """Retorna los eventos de la relación si el llamador ya hizo prefetch_related, o None."""
+    cache = getattr(contrato, '_prefetched_objects_cache', None) or {}
+    if relacion in cache:
+        return list(cache[relacion])
+    return None
+
+
+class ContratoTimeline:
+    """
+    Eventos aprobados de un contrato ordenados cronológicamente.
+
+    Uso:
+        timeline = ContratoTimeline.para_contrato(contrato)
+        valor, evento = timeline.valor_campo('nuevo_valor_canon', fecha, contrato.valor_canon_fijo)
+
+        timelines = ContratoTimeline.para_contratos(contratos)  # {contrato_id: ContratoTimeline}
+    """
+
+    def __init__(self, contrato, otrosis, renovaciones):
+        self.contrato = contrato
+        ahora = timezone.now()
+
+        otrosis = [evento for evento in otrosis if evento.estado == 'APROBADO']
+        renovaciones = [evento for evento in renovaciones if evento.estado == 'APROBADO']
+
+        self._otrosis = sorted(otrosis, key=_clave_orden_bd)
+        self._inicios_otrosis = [evento.effective_from for evento in self._otrosis]
+        self._renovaciones = sorted(renovaciones, key=_clave_orden_bd)
+        self._inicios_renovaciones = [evento.effective_from for evento in self._renovaciones]
+
+        eventos = [(_clave_efecto_cadena(evento, False, ahora), evento) for evento in otrosis]
+        eventos += [(_clave_efecto_cadena(evento, True, ahora), evento) for evento in renovaciones]
+        eventos.sort(key=lambda item: item[0])
+        self._eventos = [evento for _, evento in eventos]
+
+        # Índices por campo: solo los eventos que modificaron el campo, en el mismo orden
+        self._indices_campo = {}
+
+    @classmethod
+    def para_contrato(cls, contrato):
+        """
+        Construye la línea de tiempo de un contrato.
+        Reutiliza prefetch_related('otrosi', 'renovaciones_automaticas') si el llamador lo hizo.
+        """
+        from gestion.models import OtroSi, RenovacionAutomatica
+
+        otrosis = _eventos_precargados(contrato, 'otrosi')
+        if otrosis is None:
+            otrosis = list(OtroSi.objects.filter(contrato=contrato, estado='APROBADO'))
+        renovaciones = _eventos_precargados(contrato, 'renovaciones_automaticas')
+        if renovaciones is None:
+            renovaciones = list(RenovacionAutomatica.objects.filter(contrato=contrato, estado='APROBADO'))
+        return cls(contrato, otrosis, renovaciones)
+
+    @classmethod
+    def para_contratos(cls, contratos):
+        """
+        Construye las líneas de tiempo de un lote de contratos con un número constante de consultas.
+
+        Returns:
+            dict {contrato_id: ContratoTimeline}
+        """
+        from gestion.models import OtroSi, RenovacionAutomatica
+
+        contratos = [contrato for contrato in contratos if contrato.pk]
+        otrosis_por_contrato = {}
+        renovaciones_por_contrato = {}
+        ids_sin_otrosis = []
+        ids_sin_renovaciones = []
+
+        for contrato in contratos:
+            otrosis = _eventos_precargados(contrato, 'otrosi')
+            if otrosis is None:
+                ids_sin_otrosis.append(contrato.pk)
+            else:
+                otrosis_por_contrato[contrato.pk] = otrosis
+            renovaciones = _eventos_precargados(contrato, 'renovaciones_automaticas')
+            if renovaciones is None:
+                ids_sin_renovaciones.append(contrato.pk)
+            else:
+                renovaciones_por_contrato[contrato.pk] = renovaciones
+
+        for modelo, ids, destino in (
+            (OtroSi, ids_sin_otrosis, otrosis_por_contrato),
+            (RenovacionAutomatica, ids_sin_renovaciones, renovaciones_por_contrato),
+        ):
+            for inicio in range(0, len(ids), _TAMANO_LOTE_IDS):
+                lote = ids[inicio:inicio + _TAMANO_LOTE_IDS]
+                for evento in modelo.objects.filter(contrato_id__in=lote, estado='APROBADO'):
+                    destino.setdefault(evento.contrato_id, []).append(evento)
+
+        timelines = {}
+        for contrato in contratos:
+            otrosis = otrosis_por_contrato.get(contrato.pk, [])
+            renovaciones = renovaciones_por_contrato.get(contrato.pk, [])
+            # Evita consultas adicionales al acceder a evento.contrato
+            for evento in otrosis + renovaciones:
+                evento.contrato = contrato
+            timelines[contrato.pk] = cls(contrato, otrosis, renovaciones)
+        return timelines
+
+    @property
+    def eventos(self):
+        """Eventos aprobados (Otro Sí y Renovaciones) en orden cronológico ascendente."""
+        return list(self._eventos)
+
+    def proximo_cambio(self, fecha_referencia=None):
+        """
+        Primera fecha posterior a fecha_referencia en que un evento entra en vigencia
+        (effective_from) o deja de estarlo (día siguiente a effective_to).
+        Hasta el día anterior el efecto cadena se resuelve igual que en fecha_referencia.
+
+        Returns:
+            date o None si ningún evento cambia después de fecha_referencia.
+        """
+        if fecha_referencia is None:
+            fecha_referencia = date.today()
+
+        cambios = []
+        for evento in self._eventos:
+            if evento.effective_from and evento.effective_from > fecha_referencia:
+                cambios.append(evento.effective_from)
+            if evento.effective_to and evento.effective_to >= fecha_referencia:
+                cambios.append(evento.effective_to + timedelta(days=1))
+        return min(cambios) if cambios else None
+
+    def _indice_campo(self, campo_nombre):
+        indice = self._indices_campo.get(campo_nombre)
+        if indice is None:
+            eventos = [
+                evento for evento in self._eventos
+                if _valor_modifica_campo(getattr(evento, campo_nombre, None))
+            ]
+            indice = (eventos, [evento.effective_from for evento in eventos])
+            self._indices_campo[campo_nombre] = indice
+        return indice
+
+    def ultimo_evento_que_modifico_campo(self, campo_nombre, fecha_referencia=None):
+        """
+        Equivalente en memoria de get_ultimo_otrosi_que_modifico_campo_hasta_fecha.
+
+        Returns:
+            OtroSi, RenovacionAutomatica o None si ningún evento vigente modificó el campo.
+        """
+        if fecha_referencia is None:
+            fecha_referencia = date.today()
+
+        eventos, inicios = self._indice_campo(campo_nombre)
+        posicion = bisect_right(inicios, fecha_referencia)
+        for indice in range(posicion - 1, -1, -1):
+            evento = eventos[indice]
+            if _es_vigente_en(evento, fecha_referencia):
+                return evento
+        return None
+
+    def ultimo_evento_con_valor(self, campo_nombre):
+        """
+        Equivalente en memoria de get_ultimo_otrosi_que_modifico_campo: último evento aprobado,
+        sin límite de fecha, con un valor no nulo ni vacío en el campo.
+        """
+        for evento in reversed(self._eventos):
+            valor = getattr(evento, campo_nombre, None)
+            if valor is None:
+                continue
+            if isinstance(valor, str) and valor.strip() == '':
+                continue
+            return evento
+        return None
+
+    def valor_campo(self, campo_nombre, fecha_referencia=None, valor_base=None):
+        """
+        Valor del campo en la fecha de referencia y el evento que lo fijó.
+
+        Args:
+            campo_nombre: Nombre del campo en OtroSi/RenovacionAutomatica (ej: 'nuevo_valor_canon')
+            fecha_referencia: Fecha de consulta (por defecto hoy)
+            valor_base: Valor a retornar si ningún evento modificó el campo (valor del contrato)
+
+        Returns:
+            tuple (valor, evento); evento es None cuando aplica el valor base.
+        """
+        evento = self.ultimo_evento_que_modifico_campo(campo_nombre, fecha_referencia)
+        if evento is None:
+            return valor_base, None
+        return getattr(evento, campo_nombre), evento
+
+    @staticmethod
+    def _ultimo_hasta_fecha(eventos, inicios, fecha_referencia, solo_vigentes=False, campo_nombre=None):
+        posicion = bisect_right(inicios, fecha_referencia)
+        for indice in range(posicion - 1, -1, -1):
+            evento = eventos[indice]
+            if solo_vigentes and not _es_vigente_en(evento, fecha_referencia):
+                continue
+            if campo_nombre and getattr(evento, campo_nombre, None) is None:
+                continue
+            return evento
+        return None
+
+    def otrosi_vigente(self, fecha_referencia=None):
+        """
+        Equivalente en memoria de get_otrosi_vigente: prioriza el Otro Sí vigente
+        y, si no hay, retorna la Renovación Automática vigente.
+        """
+        if fecha_referencia is None:
+            fecha_referencia = date.today()
+
+        otrosi = self._ultimo_hasta_fecha(
+            self._otrosis, self._inicios_otrosis, fecha_referencia, solo_vigentes=True
+        )
+        if otrosi:
+            return otrosi
+        return self.renovacion_hasta_fecha(fecha_referencia, solo_vigentes=True)
+
+    def renovacion_hasta_fecha(self, fecha_referencia=None, solo_vigentes=False, campo_nombre=None):
+        """
+        Última Renovación Automática con effective_from <= fecha_referencia.
+
+        Args:
+            solo_vigentes: Exige además effective_to >= fecha_referencia (o nulo)
+            campo_nombre: Exige que el campo indicado no sea nulo
+        """
+        if fecha_referencia is None:
+            fecha_referencia = date.today()
+
+        return self._ultimo_hasta_fecha(
+            self._renovaciones,
+            self._inicios_renovaciones,
+            fecha_referencia,
+            solo_vigentes=solo_vigentes,
+            campo_nombre=campo_nombre,
+        )
+
+    def ultima_renovacion_aprobada(self):
+        """
+        Equivalente en memoria de
+        RenovacionAutomatica.objects.filter(estado='APROBADO').order_by('-fecha_aprobacion', '-effective_from', '-version').first()
+        """
+        if not self._renovaciones:
+            return None
+        return max(
+            self._renovaciones,
+            key=lambda evento: (
+                evento.fecha_aprobacion is not None,
+                evento.fecha_aprobacion,
+                evento.effective_from,
+                evento.version,
+            ),
+        )
+
+    def ultima_renovacion_sin_cambios_ipc(self, fecha_referencia=None, posterior_a=None):
+        """
+        Renovación más reciente (Otro Sí tipo RENEWAL que no modificó condiciones IPC,
+        o Renovación Automática) con effective_from <= fecha_referencia.
+        Ante empate de fechas prevalece el Otro Sí, igual que calcular_proxima_fecha_aumento.
+
+        Args:
+            posterior_a: Si se indica, exige effective_from > posterior_a
+        """
+        if fecha_referencia is None:
+            fecha_referencia = date.today()
+
+        def _candidata(eventos, condicion=None):
+            mejor = None
+            for evento in eventos:
+                if evento.effective_from > fecha_referencia:
+                    continue
+                if posterior_a is not None and evento.effective_from <= posterior_a:
+                    continue
+                if condicion is not None and not condicion(evento):
+                    continue
+                if mejor is None or (evento.effective_from, evento.version) > (mejor.effective_from, mejor.version):
+                    mejor = evento
+            return mejor
+
+        renovacion_otrosi = _candidata(
+            self._otrosis,
+            lambda evento: (
+                evento.tipo == 'RENEWAL'
+                and evento.nuevo_tipo_condicion_ipc is None
+                and evento.nueva_periodicidad_ipc is None
+                and evento.nueva_fecha_aumento_ipc is None
+            ),
+        )
+        renovacion_automatica = _candidata(self._renovaciones)
+
+        if renovacion_otrosi and renovacion_automatica:
+            if renovacion_otrosi.effective_from >= renovacion_automatica.effective_from:
+                return renovacion_otrosi
+            return renovacion_automatica
+        return renovacion_otrosi or renovacion_automatica
@@ -1,5 +1,7 @@
 from gestion.views.dashboard import (
     dashboard,
+    dashboard_fragmento,
+    kpis_portafolio_api,
     exportaciones,
     exportar_alertas_ipc,
     exportar_alertas_salario_minimo,
@@ -9,10 +11,16 @@ from gestion.views.dashboard import (
     exportar_alertas_polizas_requeridas,
     exportar_alertas_terminacion,
 )
+from gestion.views.trabajos_exportacion import (
+    estado_exportacion,
+    estado_exportacion_api,
+    descargar_exportacion,
+)
 from gestion.views.contratos import (
     nuevo_contrato,
     editar_contrato,
     lista_contratos,
+    autocompletar_contratos,
     detalle_contrato,
     eliminar_contrato,
     vista_vigente_contrato,
@@ -140,6 +148,8 @@ from gestion.views.clausulas import (
 
 __all__ = [
     'dashboard',
+    'dashboard_fragmento',
+    'kpis_portafolio_api',
     'exportaciones',
     'exportar_alertas_ipc',
     'exportar_alertas_vencimiento',
@@ -147,6 +157,9 @@ __all__ = [
     'exportar_alertas_preaviso',
     'exportar_alertas_polizas_requeridas',
     'exportar_alertas_terminacion',
+    'estado_exportacion',
+    'estado_exportacion_api',
+    'descargar_exportacion',
     'nuevo_contrato',
     'editar_contrato',
     'lista_contratos',
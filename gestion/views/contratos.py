@@ -2,7 +2,9 @@ from datetime import date
 
 from django.contrib import messages
 from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 
 from gestion.decorators import admin_required, login_required_custom
@@ -19,23 +21,28 @@ from gestion.models import (
 from gestion.services.exportes import (
     ColumnaExportacion,
     ExportacionVaciaError,
-    generar_excel_corporativo,
 )
+from gestion.services.busqueda import LIMITE_AUTOCOMPLETAR, buscar_contratos, filtrar_por_busqueda
+from gestion.services.trabajos_exportacion import encolar_exportacion, exportaciones_asincronas_activas
+from gestion.services.vigencia_sql import anotar_vigencia, paginar_por_cursor
 from gestion.utils_otrosi import (
     get_ultimo_otrosi_que_modifico_campo,
     get_ultimo_otrosi_que_modifico_campo_hasta_fecha,
     get_vista_vigente_contrato,
+    get_vistas_vigentes_contratos,
     get_ultimo_otrosi_aprobado,
     get_otrosi_vigente,
 )
 from gestion.utils_ipc import obtener_ultimo_calculo_ipc_aplicado, obtener_ultimo_calculo_aplicado_hasta_fecha
+from gestion.utils_timeline import ContratoTimeline
 from .utils import (
     obtener_configuracion_empresa,
     registrar_seguimientos_contrato_desde_formulario,
     _construir_requisitos_poliza,
     _obtener_fecha_final_contrato,
     _es_contrato_vencido,
-    _respuesta_archivo_excel,
+    _formato_exportacion,
+    _respuesta_excel_corporativo,
 )
 
 @login_required_custom
@@ -207,116 +214,121 @@ def lista_contratos(request):
             contratos = contratos.filter(tipo_servicio=tipo_servicio)
         
         if buscar:
-            contratos = contratos.filter(
-                Q(arrendatario__razon_social__icontains=buscar) |
-                Q(arrendatario__nit__icontains=buscar) |
-                Q(proveedor__razon_social__icontains=buscar) |
-                Q(proveedor__nit__icontains=buscar)
-            )
+            contratos = filtrar_por_busqueda(contratos, buscar)
     elif tipo_filtro_activo:
         contratos = contratos.filter(tipo_contrato_cliente_proveedor=tipo_filtro_activo)
     
-    contratos_con_estado = []
+    # Fecha final y vigencia se resuelven en SQL: el filtro y el orden no cargan todos los contratos
+    contratos = anotar_vigencia(contratos, fecha_actual)
+    if estado_vigencia == 'vigentes':
+        contratos = contratos.filter(vigente_bd=True)
+    elif estado_vigencia == 'vencidos':
+        contratos = contratos.filter(vigente_bd=False)
+    
+    pagina = paginar_por_cursor(
+        contratos,
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+    )
     
-    for contrato in contratos:
-        # Verificar si hay un Otro Sí o Renovación Automática vigente primero
-        otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual)
+    # El evento que fijó la fecha final (badge) solo se resuelve para los contratos de la página
+    contratos_pagina = pagina['contratos']
+    timelines = ContratoTimeline.para_contratos(contratos_pagina)
+    
+    contratos_con_estado = []
+    for contrato in contratos_pagina:
+        timeline = timelines.get(contrato.pk)
         
-        # Obtener la fecha final vigente considerando el Otro Sí vigente
-        fecha_final_vigente = _obtener_fecha_final_contrato(contrato, fecha_actual)
+        # Si hay un Otro Sí o Renovación Automática vigente, ese es el evento del badge
+        evento_fecha_final = get_otrosi_vigente(contrato, fecha_actual, timeline=timeline)
+        if not evento_fecha_final:
+            # Si no hay Otro Sí vigente, buscar el último que modificó la fecha
+            evento_fecha_final = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
+                contrato,
+                'nueva_fecha_final_actualizada',
+                fecha_actual,
+                timeline=timeline,
+            )
         
-        # Determinar qué evento modificó la fecha final para mostrar en el badge
         evento_fecha_final_info = None
-        if otrosi_vigente_actual:
-            # Si hay un Otro Sí vigente, usar ese para el badge
-            if hasattr(otrosi_vigente_actual, 'numero_otrosi'):
+        if evento_fecha_final:
+            if hasattr(evento_fecha_final, 'numero_otrosi'):
                 evento_fecha_final_info = {
                     'tipo': 'OS',
-                    'numero': getattr(otrosi_vigente_actual, 'numero_otrosi', 'N/A')
+                    'numero': getattr(evento_fecha_final, 'numero_otrosi', 'N/A')
                 }
-            elif hasattr(otrosi_vigente_actual, 'numero_renovacion'):
+            elif hasattr(evento_fecha_final, 'numero_renovacion'):
                 evento_fecha_final_info = {
                     'tipo': 'RA',
-                    'numero': getattr(otrosi_vigente_actual, 'numero_renovacion', 'N/A')
+                    'numero': getattr(evento_fecha_final, 'numero_renovacion', 'N/A')
                 }
-        else:
-            # Si no hay Otro Sí vigente, buscar el último que modificó la fecha
-            evento_fecha_final = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                contrato,
-                'nueva_fecha_final_actualizada',
-                fecha_actual
-            )
-            if evento_fecha_final:
-                if hasattr(evento_fecha_final, 'numero_otrosi'):
-                    evento_fecha_final_info = {
-                        'tipo': 'OS',
-                        'numero': getattr(evento_fecha_final, 'numero_otrosi', 'N/A')
-                    }
-                elif hasattr(evento_fecha_final, 'numero_renovacion'):
-                    evento_fecha_final_info = {
-                        'tipo': 'RA',
-                        'numero': getattr(evento_fecha_final, 'numero_renovacion', 'N/A')
-                    }
-        
-        estado_vigente = False
-        es_vencido = _es_contrato_vencido(contrato, fecha_actual)
-        
-        # Si hay un Otro Sí vigente, verificar su effective_to
-        if otrosi_vigente_actual:
-            if otrosi_vigente_actual.effective_to:
-                # Si tiene effective_to, verificar que la fecha actual esté dentro del rango
-                estado_vigente = otrosi_vigente_actual.effective_from <= fecha_actual <= otrosi_vigente_actual.effective_to
-            else:
-                # Si no tiene effective_to pero tiene nueva_fecha_final_actualizada, usar esa
-                if otrosi_vigente_actual.nueva_fecha_final_actualizada:
-                    estado_vigente = otrosi_vigente_actual.nueva_fecha_final_actualizada >= fecha_actual
-                else:
-                    # Si no tiene ninguna fecha, considerar vigente si está dentro del rango effective_from
-                    estado_vigente = otrosi_vigente_actual.effective_from <= fecha_actual
-        elif contrato.vigente:
-            # Si no hay Otro Sí vigente pero el contrato está marcado como vigente
-            if fecha_final_vigente:
-                estado_vigente = fecha_final_vigente >= fecha_actual
-            else:
-                estado_vigente = True
-        
-        if estado_vigencia == 'vigentes' and not estado_vigente:
-            continue
-        if estado_vigencia == 'vencidos' and estado_vigente:
-            continue
         
         contratos_con_estado.append({
             'contrato': contrato,
-            'estado_vigente': estado_vigente,
-            'es_vencido': es_vencido,
-            'fecha_final_vigente': fecha_final_vigente,
+            'estado_vigente': contrato.vigente_bd,
+            'es_vencido': contrato.vencido_bd,
+            'fecha_final_vigente': contrato.fecha_final_vigente_bd,
             'evento_fecha_final': evento_fecha_final_info,
         })
     
+    # Sin filtro de vigencia el total es un COUNT simple; con filtro exigiría resolver todos los contratos
+    total_contratos = contratos.count() if estado_vigencia == 'todos' else None
+    
+    # Parámetros de filtro para los enlaces de paginación (sin los cursores)
+    parametros = request.GET.copy()
+    parametros.pop('despues', None)
+    parametros.pop('antes', None)
+    
     context = {
         'contratos_con_estado': contratos_con_estado,
         'filtro_form': filtro_form,
-        'total_contratos': len(contratos_con_estado),
+        'total_contratos': total_contratos,
         'tipo_filtro_activo': tipo_filtro_activo,
+        'cursor_siguiente': pagina['cursor_siguiente'],
+        'cursor_anterior': pagina['cursor_anterior'],
+        'parametros_filtro': parametros.urlencode(),
     }
     return render(request, 'gestion/contratos/lista.html', context)
 
 
 
 
+@login_required_custom
+def autocompletar_contratos(request):
+    """
+    Vista AJAX de autocompletado: los contratos que mejor coinciden con `q` (número, tercero,
+    NIT, local o tipo), ordenados por relevancia. `limite` acota la cantidad de resultados.
+    """
+    texto = request.GET.get('q', '').strip()
+    try:
+        limite = int(request.GET.get('limite', LIMITE_AUTOCOMPLETAR))
+    except ValueError:
+        limite = LIMITE_AUTOCOMPLETAR
+
+    if len(texto) < 2:
+        return JsonResponse({'resultados': []})
+
+    resultados = buscar_contratos(texto, limite)
+    for resultado in resultados:
+        resultado['url'] = reverse('gestion:detalle_contrato', args=[resultado['id']])
+    return JsonResponse({'resultados': resultados})
+
+
 @login_required_custom
 def detalle_contrato(request, contrato_id):
     """Vista para ver el detalle de un contrato"""
     contrato = get_object_or_404(Contrato, id=contrato_id)
+    # Línea de tiempo única: los badges y valores vigentes se resuelven en memoria
+    timeline = ContratoTimeline.para_contrato(contrato)
     requerimientos_poliza = contrato.requerimientos_poliza.all()
     polizas = contrato.polizas.all()
     polizas = contrato.polizas.all()
-    otrosi = contrato.otrosi.all()
+    otrosi = list(contrato.otrosi.all())
     # Agregar información de restricciones de eliminación
     from gestion.utils_otrosi import tiene_otrosi_posteriores
     otrosi_lista = []
     for otrosi_item in otrosi:
-        otrosi_item.tiene_posteriores = tiene_otrosi_posteriores(otrosi_item)
+        otrosi_item.tiene_posteriores = tiene_otrosi_posteriores(otrosi_item, otrosis_contrato=otrosi)
         otrosi_lista.append(otrosi_item)
     otrosi = otrosi_lista
     seguimientos_contrato = contrato.seguimientos.order_by('-fecha_registro')
@@ -333,7 +345,7 @@ def detalle_contrato(request, contrato_id):
     estado_vigente = False
     
     # Obtener el Otro Sí vigente en la fecha actual (no solo el último aprobado)
-    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual)
+    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual, timeline=timeline)
     
     if otrosi_vigente_actual:
         # Hay un Otro Sí vigente, verificar su effective_to primero
@@ -357,7 +369,7 @@ def detalle_contrato(request, contrato_id):
     
     def obtener_valor_y_otrosi(campo_otrosi, campo_contrato):
         """Obtiene valor y el Otro Sí que lo modificó"""
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi)
+        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi, timeline=timeline)
         if otrosi_modificador:
             valor_otrosi = getattr(otrosi_modificador, campo_otrosi, None)
             if valor_otrosi is not None and valor_otrosi != '':
@@ -367,7 +379,7 @@ def detalle_contrato(request, contrato_id):
     
     def obtener_fecha_poliza(campo_otrosi, campo_contrato):
         """Obtiene fecha del último otrosí que modificó este campo, sino del contrato"""
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi)
+        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi, timeline=timeline)
         if otrosi_modificador:
             fecha_otrosi = getattr(otrosi_modificador, campo_otrosi, None)
             if fecha_otrosi:
@@ -376,7 +388,7 @@ def detalle_contrato(request, contrato_id):
     
     def obtener_valor_poliza(campo_otrosi, campo_contrato):
         """Obtiene valor numérico o string del último otrosí que modificó este campo, sino del contrato"""
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi)
+        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi, timeline=timeline)
         if otrosi_modificador:
             valor_otrosi = getattr(otrosi_modificador, campo_otrosi, None)
             if valor_otrosi is not None and valor_otrosi != '':
@@ -385,7 +397,7 @@ def detalle_contrato(request, contrato_id):
     
     def obtener_bool_poliza(campo_otrosi, campo_contrato):
         """Obtiene valor booleano del último otrosí que modificó este campo, sino del contrato"""
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi)
+        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi, timeline=timeline)
         if otrosi_modificador:
             valor_otrosi = getattr(otrosi_modificador, campo_otrosi, None)
             if valor_otrosi is not None:
@@ -394,7 +406,7 @@ def detalle_contrato(request, contrato_id):
     
     def obtener_valor_ipc(campo_otrosi, campo_contrato):
         """Obtiene valor IPC del último otrosí que modificó este campo, sino del contrato"""
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi)
+        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo(contrato, campo_otrosi, timeline=timeline)
         if otrosi_modificador:
             valor_otrosi = getattr(otrosi_modificador, campo_otrosi, None)
             if valor_otrosi is not None and valor_otrosi != '':
@@ -403,7 +415,7 @@ def detalle_contrato(request, contrato_id):
     
     # Fecha Final Actualizada: Si hay un Otro Sí vigente con effective_to, usar ese valor
     # Si no, usar nueva_fecha_final_actualizada del último Otro Sí que la modificó, sino del contrato
-    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual)
+    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual, timeline=timeline)
     fecha_final_actualizada = None
     otrosi_modificador_fecha_final = None
     
@@ -421,7 +433,7 @@ def detalle_contrato(request, contrato_id):
     if not fecha_final_actualizada:
         fecha_final_actualizada = obtener_fecha_poliza('nueva_fecha_final_actualizada', 'fecha_final_actualizada')
         if fecha_final_actualizada:
-            otrosi_modificador_fecha_final = get_ultimo_otrosi_que_modifico_campo(contrato, 'nueva_fecha_final_actualizada')
+            otrosi_modificador_fecha_final = get_ultimo_otrosi_que_modifico_campo(contrato, 'nueva_fecha_final_actualizada', timeline=timeline)
     
     if not fecha_final_actualizada:
         fecha_final_actualizada = contrato.fecha_final_inicial
@@ -586,6 +598,9 @@ def detalle_contrato(request, contrato_id):
     if otrosi_modificador_fecha_final:
         otrosi_modificadores['nueva_fecha_final_actualizada'] = otrosi_modificador_fecha_final
     
+    # Vistas vigentes por fecha: varios badges suelen apuntar al mismo Otro Sí
+    vistas_anteriores = {}
+    
     def obtener_valor_vigente_antes_de_otrosi(otrosi_mod, campo_contrato):
         """
         Obtiene el valor vigente del contrato ANTES de que se aplicara el Otro Sí.
@@ -599,7 +614,10 @@ def detalle_contrato(request, contrato_id):
         fecha_anterior = otrosi_mod.effective_from - timedelta(days=1)
         
         # Obtener la vista vigente del contrato en esa fecha anterior
-        vista_anterior = get_vista_vigente_contrato(contrato, fecha_anterior)
+        vista_anterior = vistas_anteriores.get(fecha_anterior)
+        if vista_anterior is None:
+            vista_anterior = get_vista_vigente_contrato(contrato, fecha_anterior, timeline=timeline)
+            vistas_anteriores[fecha_anterior] = vista_anterior
         
         # Mapear el campo del contrato al campo en la vista vigente
         mapeo_campos_vista = {
@@ -704,7 +722,7 @@ def detalle_contrato(request, contrato_id):
     for campo in campos_para_badge:
         # No sobrescribir si ya existe (como para nueva_fecha_final_actualizada que ya se calculó arriba)
         if campo not in otrosi_modificadores:
-            otrosi_mod = get_ultimo_otrosi_que_modifico_campo(contrato, campo)
+            otrosi_mod = get_ultimo_otrosi_que_modifico_campo(contrato, campo, timeline=timeline)
             if otrosi_mod:
                 # Solo agregar si el campo fue realmente modificado (valor diferente del contrato base)
                 campo_contrato = mapeo_campos.get(campo)
@@ -1052,6 +1070,331 @@ def vista_vigente_contrato(request, contrato_id):
     }
     return render(request, 'gestion/contratos/vista_vigente.html', context)
 
+
+def _preparar_exportacion_contratos(filtros, fecha_actual=None):
+    """
+    Construye la exportación de contratos a partir del cleaned_data de FiltroExportacionContratosForm.
+    La usan la vista (descarga directa) y los trabajos de exportación en segundo plano.
+    Lanza ExportacionVaciaError si ningún contrato coincide con los filtros.
+
+    Returns:
+        tuple (columnas, registros, total); registros es un generador de filas.
+    """
+    if fecha_actual is None:
+        fecha_actual = timezone.now().date()
+
+    queryset = Contrato.objects.select_related(
+        'arrendatario', 'proveedor', 'local', 'tipo_contrato', 'tipo_servicio'
+    ).prefetch_related('otrosi', 'renovaciones_automaticas').all()
+    
+    estado = filtros.get('estado')
+    tipo_contrato_cliente_proveedor = filtros.get('tipo_contrato_cliente_proveedor')
+    tipo_contrato = filtros.get('tipo_contrato')
+    fecha_inicio_desde = filtros.get('fecha_inicio_desde')
+    fecha_inicio_hasta = filtros.get('fecha_inicio_hasta')
+    fecha_final_desde = filtros.get('fecha_final_desde')
+    fecha_final_hasta = filtros.get('fecha_final_hasta')
+    arrendatario = filtros.get('arrendatario')
+    local = filtros.get('local')
+    modalidad_pago = filtros.get('modalidad_pago')
+    prorroga_automatica = filtros.get('prorroga_automatica')
+    
+    if tipo_contrato_cliente_proveedor:
+        queryset = queryset.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cliente_proveedor)
+    
+    if tipo_contrato:
+        queryset = queryset.filter(tipo_contrato=tipo_contrato)
+    
+    if fecha_inicio_desde:
+        queryset = queryset.filter(fecha_inicial_contrato__gte=fecha_inicio_desde)
+    
+    if fecha_inicio_hasta:
+        queryset = queryset.filter(fecha_inicial_contrato__lte=fecha_inicio_hasta)
+    
+    if fecha_final_desde:
+        queryset = queryset.filter(
+            Q(fecha_final_actualizada__gte=fecha_final_desde) |
+            Q(fecha_final_actualizada__isnull=True, fecha_final_inicial__gte=fecha_final_desde)
+        )
+    
+    if fecha_final_hasta:
+        queryset = queryset.filter(
+            Q(fecha_final_actualizada__lte=fecha_final_hasta) |
+            Q(fecha_final_actualizada__isnull=True, fecha_final_inicial__lte=fecha_final_hasta)
+        )
+    
+    if arrendatario:
+        queryset = queryset.filter(arrendatario=arrendatario)
+    
+    if local:
+        queryset = queryset.filter(local=local)
+    
+    if modalidad_pago:
+        queryset = queryset.filter(modalidad_pago=modalidad_pago)
+    
+    if prorroga_automatica:
+        if prorroga_automatica == 'si':
+            queryset = queryset.filter(prorroga_automatica=True)
+        elif prorroga_automatica == 'no':
+            queryset = queryset.filter(prorroga_automatica=False)
+    
+    contratos_lista = list(queryset)
+    timelines = ContratoTimeline.para_contratos(contratos_lista)
+    
+    if estado:
+        contratos_filtrados = []
+        for contrato in contratos_lista:
+            es_vencido = _es_contrato_vencido(contrato, fecha_actual, timeline=timelines.get(contrato.pk))
+            if estado == 'vigentes' and not es_vencido:
+                contratos_filtrados.append(contrato)
+            elif estado == 'vencidos' and es_vencido:
+                contratos_filtrados.append(contrato)
+        contratos_lista = contratos_filtrados
+    
+    if not contratos_lista:
+        raise ExportacionVaciaError('No hay contratos que coincidan con los filtros seleccionados.')
+    
+    # Condiciones vigentes (efecto cadena) de todos los contratos en un número fijo de consultas;
+    # los contratos fuera de vigencia no tienen vista y exportan los valores del contrato base
+    vistas = get_vistas_vigentes_contratos(contratos_lista, fecha_actual)
+    nombres_opciones = {
+        campo: dict(Contrato._meta.get_field(campo).flatchoices)
+        for campo in ('modalidad_pago', 'tipo_condicion_ipc', 'periodicidad_ipc')
+    }
+    
+    def _nombre_opcion(campo, valor):
+        return nombres_opciones[campo].get(valor, valor) if valor else None
+    
+    columnas = [
+        ColumnaExportacion('Número Contrato', ancho=22),
+        ColumnaExportacion('Tipo Contrato (Cliente/Proveedor)', ancho=30),
+        ColumnaExportacion('Tipo Contrato (Cliente)', ancho=25),
+        ColumnaExportacion('Tipo Servicio (Proveedor)', ancho=25),
+        ColumnaExportacion('Tercero', ancho=35),
+        ColumnaExportacion('NIT Tercero', ancho=18),
+        ColumnaExportacion('Local', ancho=30),
+        ColumnaExportacion('Ubicación Local', ancho=30),
+        ColumnaExportacion('Área (m²)', ancho=15, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Objeto y Destinación', ancho=40),
+        ColumnaExportacion('Fecha Firma', ancho=18, alineacion='center'),
+        ColumnaExportacion('Fecha Inicial', ancho=18, alineacion='center'),
+        ColumnaExportacion('Fecha Final Inicial', ancho=20, alineacion='center'),
+        ColumnaExportacion('Fecha Final Actualizada', ancho=22, alineacion='center'),
+        ColumnaExportacion('Duración Inicial (Meses)', ancho=22, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Estado', ancho=15),
+        ColumnaExportacion('Prórroga Automática', ancho=20),
+        ColumnaExportacion('Días Preaviso', ancho=18, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Terminación Anticipada (Días)', ancho=28, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Modalidad Pago', ancho=25),
+        ColumnaExportacion('Canon Fijo', ancho=18, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Canon Mínimo Garantizado / Valor Mensual', ancho=35, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('% Ventas', ancho=15, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Reporta Ventas', ancho=18),
+        ColumnaExportacion('Día Límite Reporte Ventas', ancho=28, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Cobra Servicios Públicos', ancho=28),
+        ColumnaExportacion('Tiene Cláusula SARLAFT', ancho=25),
+        ColumnaExportacion('Tiene Cláusula Protección de Datos', ancho=35),
+        ColumnaExportacion('Interés Mora', ancho=25),
+        ColumnaExportacion('Tipo Condición IPC', ancho=25),
+        ColumnaExportacion('Puntos Adicionales IPC', ancho=25, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Periodicidad IPC', ancho=20),
+        ColumnaExportacion('Mes Aumento IPC', ancho=20),
+        ColumnaExportacion('Tiene Periodo Gracia', ancho=22),
+        ColumnaExportacion('Fecha Inicio Periodo Gracia', ancho=30, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Periodo Gracia', ancho=28, alineacion='center'),
+        ColumnaExportacion('Condición Gracia', ancho=35),
+        ColumnaExportacion('Exige Póliza RCE', ancho=20),
+        ColumnaExportacion('Valor Asegurado RCE', ancho=25, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('PLO RCE', ancho=18, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Patronal RCE', ancho=18, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Gastos Médicos RCE', ancho=22, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Vehículos RCE', ancho=18, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Contratistas RCE', ancho=20, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Perjuicios Extrapatrimoniales RCE', ancho=35, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Daño Moral RCE', ancho=20, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Lucro Cesante RCE', ancho=22, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Meses Vigencia RCE', ancho=22, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Fecha Inicio Vigencia RCE', ancho=28, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Vigencia RCE', ancho=25, alineacion='center'),
+        ColumnaExportacion('Exige Póliza Cumplimiento', ancho=30),
+        ColumnaExportacion('Valor Asegurado Cumplimiento', ancho=32, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Remuneraciones Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Servicios Públicos Cumplimiento', ancho=35, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('IVA Cumplimiento', ancho=25, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Cuota Admin Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Meses Vigencia Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Fecha Inicio Vigencia Cumplimiento', ancho=35, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Vigencia Cumplimiento', ancho=32, alineacion='center'),
+        ColumnaExportacion('Exige Póliza Arrendamiento', ancho=32),
+        ColumnaExportacion('Valor Asegurado Arrendamiento', ancho=35, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Remuneraciones Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Servicios Públicos Arrendamiento', ancho=38, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('IVA Arrendamiento', ancho=28, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Cuota Admin Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Meses Vigencia Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Fecha Inicio Vigencia Arrendamiento', ancho=38, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Vigencia Arrendamiento', ancho=35, alineacion='center'),
+        ColumnaExportacion('Exige Póliza Todo Riesgo', ancho=28),
+        ColumnaExportacion('Valor Asegurado Todo Riesgo', ancho=32, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Meses Vigencia Todo Riesgo', ancho=30, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Fecha Inicio Vigencia Todo Riesgo', ancho=35, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Vigencia Todo Riesgo', ancho=32, alineacion='center'),
+        ColumnaExportacion('Exige Otras Pólizas', ancho=22),
+        ColumnaExportacion('Nombre Otras Pólizas', ancho=28),
+        ColumnaExportacion('Valor Asegurado Otras Pólizas', ancho=32, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Meses Vigencia Otras Pólizas', ancho=30, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Fecha Inicio Vigencia Otras Pólizas', ancho=38, alineacion='center'),
+        ColumnaExportacion('Fecha Fin Vigencia Otras Pólizas', ancho=35, alineacion='center'),
+        ColumnaExportacion('Cláusula Penal Incumplimiento', ancho=32, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Penalidad Terminación Anticipada', ancho=35, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('Multa Mora No Restitución', ancho=28, es_numerica=True, alineacion='right'),
+        ColumnaExportacion('NIT', ancho=20),
+        ColumnaExportacion('Representante Legal', ancho=35),
+        ColumnaExportacion('Marca Comercial', ancho=25),
+        ColumnaExportacion('Supervisor Concedente', ancho=28),
+        ColumnaExportacion('Supervisor Contraparte', ancho=30),
+        ColumnaExportacion('Otrosí Modificador Fecha Final', ancho=35),
+    ]
+    
+    def _registros():
+        # Generador: el motor de exportación escribe cada fila sin acumularlas
+        for contrato in contratos_lista:
+            timeline = timelines.get(contrato.pk)
+            vista = vistas.get(contrato.pk) or {}
+            if vista.get('vista_disponible'):
+                vigente = vista
+            else:
+                vigente = {
+                    'fecha_final_actualizada': contrato.fecha_final_actualizada,
+                    'modalidad_pago': contrato.modalidad_pago,
+                    'valor_canon': contrato.valor_canon_fijo,
+                    'canon_minimo_garantizado': contrato.canon_minimo_garantizado,
+                    'porcentaje_ventas': contrato.porcentaje_ventas,
+                    'tipo_condicion_ipc': contrato.tipo_condicion_ipc,
+                    'puntos_adicionales_ipc': contrato.puntos_adicionales_ipc,
+                    'periodicidad_ipc': contrato.periodicidad_ipc,
+                    'fecha_aumento_ipc': contrato.fecha_aumento_ipc,
+                }
+            es_vencido = _es_contrato_vencido(contrato, fecha_actual, timeline=timeline)
+            estado_texto = 'Vencido' if es_vencido else 'Vigente'
+        
+            # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
+            otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
+                contrato, 'nueva_fecha_final_actualizada', fecha_actual, timeline=timeline
+            )
+            if otrosi_modificador:
+                if hasattr(otrosi_modificador, 'numero_otrosi'):
+                    otrosi_numero = otrosi_modificador.numero_otrosi
+                elif hasattr(otrosi_modificador, 'numero_renovacion'):
+                    otrosi_numero = otrosi_modificador.numero_renovacion
+                else:
+                    otrosi_numero = str(otrosi_modificador)
+            else:
+                otrosi_numero = 'Contrato Original'
+        
+            tercero = contrato.obtener_tercero()
+            nombre_tercero = tercero.razon_social if tercero else None
+            nit_tercero = tercero.nit if tercero else None
+            tipo_contrato_nombre = str(contrato.tipo_contrato) if contrato.tipo_contrato else None
+            tipo_servicio_nombre = str(contrato.tipo_servicio) if contrato.tipo_servicio else None
+            local_nombre = contrato.local.nombre_comercial_stand if contrato.local else None
+            local_ubicacion = contrato.local.ubicacion if contrato.local else None
+            local_area = float(contrato.local.total_area_m2) if contrato.local and contrato.local.total_area_m2 else None
+        
+            yield (
+                contrato.num_contrato,
+                contrato.get_tipo_contrato_cliente_proveedor_display(),
+                tipo_contrato_nombre,
+                tipo_servicio_nombre,
+                nombre_tercero,
+                nit_tercero,
+                local_nombre,
+                local_ubicacion,
+                local_area,
+                contrato.objeto_destinacion or None,
+                contrato.fecha_firma or None,
+                contrato.fecha_inicial_contrato or None,
+                contrato.fecha_final_inicial or None,
+                vigente['fecha_final_actualizada'] or None,
+                contrato.duracion_inicial_meses,
+                estado_texto,
+                'Sí' if contrato.prorroga_automatica else 'No',
+                contrato.dias_preaviso_no_renovacion or None,
+                contrato.dias_terminacion_anticipada or None,
+                _nombre_opcion('modalidad_pago', vigente['modalidad_pago']),
+                float(vigente['valor_canon']) if vigente['valor_canon'] else None,
+                float(vigente['canon_minimo_garantizado']) if vigente['canon_minimo_garantizado'] else None,
+                float(vigente['porcentaje_ventas']) if vigente['porcentaje_ventas'] else None,
+                'Sí' if contrato.reporta_ventas else 'No',
+                contrato.dia_limite_reporte_ventas or None,
+                'Sí' if contrato.cobra_servicios_publicos_aparte else 'No',
+                'Sí' if contrato.tiene_clausula_sarlaft else 'No',
+                'Sí' if contrato.tiene_clausula_proteccion_datos else 'No',
+                contrato.interes_mora_pagos or None,
+                _nombre_opcion('tipo_condicion_ipc', vigente['tipo_condicion_ipc']),
+                float(vigente['puntos_adicionales_ipc']) if vigente['puntos_adicionales_ipc'] else None,
+                _nombre_opcion('periodicidad_ipc', vigente['periodicidad_ipc']),
+                vigente['fecha_aumento_ipc'].strftime('%d/%m/%Y') if vigente['fecha_aumento_ipc'] else None,
+                'Sí' if contrato.tiene_periodo_gracia else 'No',
+                contrato.fecha_inicio_periodo_gracia or None,
+                contrato.fecha_fin_periodo_gracia or None,
+                contrato.condicion_gracia or None,
+                'Sí' if contrato.exige_poliza_rce else 'No',
+                float(contrato.valor_asegurado_rce) if contrato.valor_asegurado_rce else None,
+                float(contrato.valor_propietario_locatario_ocupante_rce) if contrato.valor_propietario_locatario_ocupante_rce else None,
+                float(contrato.valor_patronal_rce) if contrato.valor_patronal_rce else None,
+                float(contrato.valor_gastos_medicos_rce) if contrato.valor_gastos_medicos_rce else None,
+                float(contrato.valor_vehiculos_rce) if contrato.valor_vehiculos_rce else None,
+                float(contrato.valor_contratistas_rce) if contrato.valor_contratistas_rce else None,
+                float(contrato.valor_perjuicios_extrapatrimoniales_rce) if contrato.valor_perjuicios_extrapatrimoniales_rce else None,
+                float(contrato.valor_dano_moral_rce) if contrato.valor_dano_moral_rce else None,
+                float(contrato.valor_lucro_cesante_rce) if contrato.valor_lucro_cesante_rce else None,
+                contrato.meses_vigencia_rce or None,
+                contrato.fecha_inicio_vigencia_rce or None,
+                contrato.fecha_fin_vigencia_rce or None,
+                'Sí' if contrato.exige_poliza_cumplimiento else 'No',
+                float(contrato.valor_asegurado_cumplimiento) if contrato.valor_asegurado_cumplimiento else None,
+                float(contrato.valor_remuneraciones_cumplimiento) if contrato.valor_remuneraciones_cumplimiento else None,
+                float(contrato.valor_servicios_publicos_cumplimiento) if contrato.valor_servicios_publicos_cumplimiento else None,
+                float(contrato.valor_iva_cumplimiento) if contrato.valor_iva_cumplimiento else None,
+                float(contrato.valor_otros_cumplimiento) if contrato.valor_otros_cumplimiento else None,
+                contrato.meses_vigencia_cumplimiento or None,
+                contrato.fecha_inicio_vigencia_cumplimiento or None,
+                contrato.fecha_fin_vigencia_cumplimiento or None,
+                'Sí' if contrato.exige_poliza_arrendamiento else 'No',
+                float(contrato.valor_asegurado_arrendamiento) if contrato.valor_asegurado_arrendamiento else None,
+                float(contrato.valor_remuneraciones_arrendamiento) if contrato.valor_remuneraciones_arrendamiento else None,
+                float(contrato.valor_servicios_publicos_arrendamiento) if contrato.valor_servicios_publicos_arrendamiento else None,
+                float(contrato.valor_iva_arrendamiento) if contrato.valor_iva_arrendamiento else None,
+                float(contrato.valor_otros_arrendamiento) if contrato.valor_otros_arrendamiento else None,
+                contrato.meses_vigencia_arrendamiento or None,
+                contrato.fecha_inicio_vigencia_arrendamiento or None,
+                contrato.fecha_fin_vigencia_arrendamiento or None,
+                'Sí' if contrato.exige_poliza_todo_riesgo else 'No',
+                float(contrato.valor_asegurado_todo_riesgo) if contrato.valor_asegurado_todo_riesgo else None,
+                contrato.meses_vigencia_todo_riesgo or None,
+                contrato.fecha_inicio_vigencia_todo_riesgo or None,
+                contrato.fecha_fin_vigencia_todo_riesgo or None,
+                'Sí' if contrato.exige_poliza_otra_1 else 'No',
+                contrato.nombre_poliza_otra_1 or None,
+                float(contrato.valor_asegurado_otra_1) if contrato.valor_asegurado_otra_1 else None,
+                contrato.meses_vigencia_otra_1 or None,
+                contrato.fecha_inicio_vigencia_otra_1 or None,
+                contrato.fecha_fin_vigencia_otra_1 or None,
+                float(contrato.clausula_penal_incumplimiento) if contrato.clausula_penal_incumplimiento else None,
+                float(contrato.penalidad_terminacion_anticipada) if contrato.penalidad_terminacion_anticipada else None,
+                float(contrato.multa_mora_no_restitucion) if contrato.multa_mora_no_restitucion else None,
+                contrato.nit_concedente,
+                contrato.rep_legal_concedente,
+                contrato.marca_comercial or None,
+                contrato.supervisor_concedente or None,
+                contrato.supervisor_contraparte or None,
+                otrosi_numero,
+            )
+
+    return columnas, _registros(), len(contratos_lista)
+
+
 @login_required_custom
 def exportar_contratos(request):
     """Vista para exportar contratos con filtros avanzados"""
@@ -1061,299 +1404,18 @@ def exportar_contratos(request):
         form = FiltroExportacionContratosForm(request.POST)
         
         if form.is_valid():
-            queryset = Contrato.objects.select_related(
-                'arrendatario', 'proveedor', 'local', 'tipo_contrato', 'tipo_servicio'
-            ).prefetch_related('otrosi').all()
-            
-            estado = form.cleaned_data.get('estado')
-            tipo_contrato_cliente_proveedor = form.cleaned_data.get('tipo_contrato_cliente_proveedor')
-            tipo_contrato = form.cleaned_data.get('tipo_contrato')
-            fecha_inicio_desde = form.cleaned_data.get('fecha_inicio_desde')
-            fecha_inicio_hasta = form.cleaned_data.get('fecha_inicio_hasta')
-            fecha_final_desde = form.cleaned_data.get('fecha_final_desde')
-            fecha_final_hasta = form.cleaned_data.get('fecha_final_hasta')
-            arrendatario = form.cleaned_data.get('arrendatario')
-            local = form.cleaned_data.get('local')
-            modalidad_pago = form.cleaned_data.get('modalidad_pago')
-            prorroga_automatica = form.cleaned_data.get('prorroga_automatica')
-            
-            if tipo_contrato_cliente_proveedor:
-                queryset = queryset.filter(tipo_contrato_cliente_proveedor=tipo_contrato_cliente_proveedor)
-            
-            if tipo_contrato:
-                queryset = queryset.filter(tipo_contrato=tipo_contrato)
-            
-            if fecha_inicio_desde:
-                queryset = queryset.filter(fecha_inicial_contrato__gte=fecha_inicio_desde)
-            
-            if fecha_inicio_hasta:
-                queryset = queryset.filter(fecha_inicial_contrato__lte=fecha_inicio_hasta)
-            
-            if fecha_final_desde:
-                queryset = queryset.filter(
-                    Q(fecha_final_actualizada__gte=fecha_final_desde) |
-                    Q(fecha_final_actualizada__isnull=True, fecha_final_inicial__gte=fecha_final_desde)
-                )
-            
-            if fecha_final_hasta:
-                queryset = queryset.filter(
-                    Q(fecha_final_actualizada__lte=fecha_final_hasta) |
-                    Q(fecha_final_actualizada__isnull=True, fecha_final_inicial__lte=fecha_final_hasta)
-                )
-            
-            if arrendatario:
-                queryset = queryset.filter(arrendatario=arrendatario)
-            
-            if local:
-                queryset = queryset.filter(local=local)
-            
-            if modalidad_pago:
-                queryset = queryset.filter(modalidad_pago=modalidad_pago)
-            
-            if prorroga_automatica:
-                if prorroga_automatica == 'si':
-                    queryset = queryset.filter(prorroga_automatica=True)
-                elif prorroga_automatica == 'no':
-                    queryset = queryset.filter(prorroga_automatica=False)
-            
-            contratos_lista = list(queryset)
-            
-            if estado:
-                contratos_filtrados = []
-                for contrato in contratos_lista:
-                    es_vencido = _es_contrato_vencido(contrato, fecha_actual)
-                    if estado == 'vigentes' and not es_vencido:
-                        contratos_filtrados.append(contrato)
-                    elif estado == 'vencidos' and es_vencido:
-                        contratos_filtrados.append(contrato)
-                contratos_lista = contratos_filtrados
-            
-            if not contratos_lista:
-                messages.warning(request, 'No hay contratos que coincidan con los filtros seleccionados.')
-                return redirect('gestion:exportar_contratos')
-            
-            columnas = [
-                ColumnaExportacion('Número Contrato', ancho=22),
-                ColumnaExportacion('Tipo Contrato (Cliente/Proveedor)', ancho=30),
-                ColumnaExportacion('Tipo Contrato (Cliente)', ancho=25),
-                ColumnaExportacion('Tipo Servicio (Proveedor)', ancho=25),
-                ColumnaExportacion('Tercero', ancho=35),
-                ColumnaExportacion('NIT Tercero', ancho=18),
-                ColumnaExportacion('Local', ancho=30),
-                ColumnaExportacion('Ubicación Local', ancho=30),
-                ColumnaExportacion('Área (m²)', ancho=15, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Objeto y Destinación', ancho=40),
-                ColumnaExportacion('Fecha Firma', ancho=18, alineacion='center'),
-                ColumnaExportacion('Fecha Inicial', ancho=18, alineacion='center'),
-                ColumnaExportacion('Fecha Final Inicial', ancho=20, alineacion='center'),
-                ColumnaExportacion('Fecha Final Actualizada', ancho=22, alineacion='center'),
-                ColumnaExportacion('Duración Inicial (Meses)', ancho=22, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Estado', ancho=15),
-                ColumnaExportacion('Prórroga Automática', ancho=20),
-                ColumnaExportacion('Días Preaviso', ancho=18, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Terminación Anticipada (Días)', ancho=28, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Modalidad Pago', ancho=25),
-                ColumnaExportacion('Canon Fijo', ancho=18, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Canon Mínimo Garantizado / Valor Mensual', ancho=35, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('% Ventas', ancho=15, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Reporta Ventas', ancho=18),
-                ColumnaExportacion('Día Límite Reporte Ventas', ancho=28, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Cobra Servicios Públicos', ancho=28),
-                ColumnaExportacion('Tiene Cláusula SARLAFT', ancho=25),
-                ColumnaExportacion('Tiene Cláusula Protección de Datos', ancho=35),
-                ColumnaExportacion('Interés Mora', ancho=25),
-                ColumnaExportacion('Tipo Condición IPC', ancho=25),
-                ColumnaExportacion('Puntos Adicionales IPC', ancho=25, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Periodicidad IPC', ancho=20),
-                ColumnaExportacion('Mes Aumento IPC', ancho=20),
-                ColumnaExportacion('Tiene Periodo Gracia', ancho=22),
-                ColumnaExportacion('Fecha Inicio Periodo Gracia', ancho=30, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Periodo Gracia', ancho=28, alineacion='center'),
-                ColumnaExportacion('Condición Gracia', ancho=35),
-                ColumnaExportacion('Exige Póliza RCE', ancho=20),
-                ColumnaExportacion('Valor Asegurado RCE', ancho=25, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('PLO RCE', ancho=18, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Patronal RCE', ancho=18, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Gastos Médicos RCE', ancho=22, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Vehículos RCE', ancho=18, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Contratistas RCE', ancho=20, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Perjuicios Extrapatrimoniales RCE', ancho=35, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Daño Moral RCE', ancho=20, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Lucro Cesante RCE', ancho=22, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Meses Vigencia RCE', ancho=22, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Fecha Inicio Vigencia RCE', ancho=28, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Vigencia RCE', ancho=25, alineacion='center'),
-                ColumnaExportacion('Exige Póliza Cumplimiento', ancho=30),
-                ColumnaExportacion('Valor Asegurado Cumplimiento', ancho=32, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Remuneraciones Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Servicios Públicos Cumplimiento', ancho=35, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('IVA Cumplimiento', ancho=25, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Cuota Admin Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Meses Vigencia Cumplimiento', ancho=30, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Fecha Inicio Vigencia Cumplimiento', ancho=35, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Vigencia Cumplimiento', ancho=32, alineacion='center'),
-                ColumnaExportacion('Exige Póliza Arrendamiento', ancho=32),
-                ColumnaExportacion('Valor Asegurado Arrendamiento', ancho=35, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Remuneraciones Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Servicios Públicos Arrendamiento', ancho=38, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('IVA Arrendamiento', ancho=28, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Cuota Admin Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Meses Vigencia Arrendamiento', ancho=33, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Fecha Inicio Vigencia Arrendamiento', ancho=38, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Vigencia Arrendamiento', ancho=35, alineacion='center'),
-                ColumnaExportacion('Exige Póliza Todo Riesgo', ancho=28),
-                ColumnaExportacion('Valor Asegurado Todo Riesgo', ancho=32, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Meses Vigencia Todo Riesgo', ancho=30, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Fecha Inicio Vigencia Todo Riesgo', ancho=35, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Vigencia Todo Riesgo', ancho=32, alineacion='center'),
-                ColumnaExportacion('Exige Otras Pólizas', ancho=22),
-                ColumnaExportacion('Nombre Otras Pólizas', ancho=28),
-                ColumnaExportacion('Valor Asegurado Otras Pólizas', ancho=32, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Meses Vigencia Otras Pólizas', ancho=30, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Fecha Inicio Vigencia Otras Pólizas', ancho=38, alineacion='center'),
-                ColumnaExportacion('Fecha Fin Vigencia Otras Pólizas', ancho=35, alineacion='center'),
-                ColumnaExportacion('Cláusula Penal Incumplimiento', ancho=32, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Penalidad Terminación Anticipada', ancho=35, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('Multa Mora No Restitución', ancho=28, es_numerica=True, alineacion='right'),
-                ColumnaExportacion('NIT', ancho=20),
-                ColumnaExportacion('Representante Legal', ancho=35),
-                ColumnaExportacion('Marca Comercial', ancho=25),
-                ColumnaExportacion('Supervisor Concedente', ancho=28),
-                ColumnaExportacion('Supervisor Contraparte', ancho=30),
-                ColumnaExportacion('Otrosí Modificador Fecha Final', ancho=35),
-            ]
-            
-            registros = []
-            for contrato in contratos_lista:
-                fecha_final = _obtener_fecha_final_contrato(contrato, fecha_actual)
-                es_vencido = _es_contrato_vencido(contrato, fecha_actual)
-                estado_texto = 'Vencido' if es_vencido else 'Vigente'
-                
-                # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
-                otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-                    contrato, 'nueva_fecha_final_actualizada', fecha_actual
-                )
-                if otrosi_modificador:
-                    if hasattr(otrosi_modificador, 'numero_otrosi'):
-                        otrosi_numero = otrosi_modificador.numero_otrosi
-                    elif hasattr(otrosi_modificador, 'numero_renovacion'):
-                        otrosi_numero = otrosi_modificador.numero_renovacion
-                    else:
-                        otrosi_numero = str(otrosi_modificador)
-                else:
-                    otrosi_numero = 'Contrato Original'
-                
-                tercero = contrato.obtener_tercero()
-                nombre_tercero = tercero.razon_social if tercero else None
-                nit_tercero = tercero.nit if tercero else None
-                tipo_contrato_nombre = str(contrato.tipo_contrato) if contrato.tipo_contrato else None
-                tipo_servicio_nombre = str(contrato.tipo_servicio) if contrato.tipo_servicio else None
-                local_nombre = contrato.local.nombre_comercial_stand if contrato.local else None
-                local_ubicacion = contrato.local.ubicacion if contrato.local else None
-                local_area = float(contrato.local.total_area_m2) if contrato.local and contrato.local.total_area_m2 else None
-                
-                registros.append((
-                    contrato.num_contrato,
-                    contrato.get_tipo_contrato_cliente_proveedor_display(),
-                    tipo_contrato_nombre,
-                    tipo_servicio_nombre,
-                    nombre_tercero,
-                    nit_tercero,
-                    local_nombre,
-                    local_ubicacion,
-                    local_area,
-                    contrato.objeto_destinacion or None,
-                    contrato.fecha_firma or None,
-                    contrato.fecha_inicial_contrato or None,
-                    contrato.fecha_final_inicial or None,
-                    contrato.fecha_final_actualizada or None,
-                    contrato.duracion_inicial_meses,
-                    estado_texto,
-                    'Sí' if contrato.prorroga_automatica else 'No',
-                    contrato.dias_preaviso_no_renovacion or None,
-                    contrato.dias_terminacion_anticipada or None,
-                    contrato.get_modalidad_pago_display() if contrato.modalidad_pago else None,
-                    float(contrato.valor_canon_fijo) if contrato.valor_canon_fijo else None,
-                    float(contrato.canon_minimo_garantizado) if contrato.canon_minimo_garantizado else None,
-                    float(contrato.porcentaje_ventas) if contrato.porcentaje_ventas else None,
-                    'Sí' if contrato.reporta_ventas else 'No',
-                    contrato.dia_limite_reporte_ventas or None,
-                    'Sí' if contrato.cobra_servicios_publicos_aparte else 'No',
-                    'Sí' if contrato.tiene_clausula_sarlaft else 'No',
-                    'Sí' if contrato.tiene_clausula_proteccion_datos else 'No',
-                    contrato.interes_mora_pagos or None,
-                    contrato.get_tipo_condicion_ipc_display() if contrato.tipo_condicion_ipc else None,
-                    float(contrato.puntos_adicionales_ipc) if contrato.puntos_adicionales_ipc else None,
-                    contrato.get_periodicidad_ipc_display() if contrato.periodicidad_ipc else None,
-                    contrato.fecha_aumento_ipc.strftime('%d/%m/%Y') if contrato.fecha_aumento_ipc else None,
-                    'Sí' if contrato.tiene_periodo_gracia else 'No',
-                    contrato.fecha_inicio_periodo_gracia or None,
-                    contrato.fecha_fin_periodo_gracia or None,
-                    contrato.condicion_gracia or None,
-                    'Sí' if contrato.exige_poliza_rce else 'No',
-                    float(contrato.valor_asegurado_rce) if contrato.valor_asegurado_rce else None,
-                    float(contrato.valor_propietario_locatario_ocupante_rce) if contrato.valor_propietario_locatario_ocupante_rce else None,
-                    float(contrato.valor_patronal_rce) if contrato.valor_patronal_rce else None,
-                    float(contrato.valor_gastos_medicos_rce) if contrato.valor_gastos_medicos_rce else None,
-                    float(contrato.valor_vehiculos_rce) if contrato.valor_vehiculos_rce else None,
-                    float(contrato.valor_contratistas_rce) if contrato.valor_contratistas_rce else None,
-                    float(contrato.valor_perjuicios_extrapatrimoniales_rce) if contrato.valor_perjuicios_extrapatrimoniales_rce else None,
-                    float(contrato.valor_dano_moral_rce) if contrato.valor_dano_moral_rce else None,
-                    float(contrato.valor_lucro_cesante_rce) if contrato.valor_lucro_cesante_rce else None,
-                    contrato.meses_vigencia_rce or None,
-                    contrato.fecha_inicio_vigencia_rce or None,
-                    contrato.fecha_fin_vigencia_rce or None,
-                    'Sí' if contrato.exige_poliza_cumplimiento else 'No',
-                    float(contrato.valor_asegurado_cumplimiento) if contrato.valor_asegurado_cumplimiento else None,
-                    float(contrato.valor_remuneraciones_cumplimiento) if contrato.valor_remuneraciones_cumplimiento else None,
-                    float(contrato.valor_servicios_publicos_cumplimiento) if contrato.valor_servicios_publicos_cumplimiento else None,
-                    float(contrato.valor_iva_cumplimiento) if contrato.valor_iva_cumplimiento else None,
-                    float(contrato.valor_otros_cumplimiento) if contrato.valor_otros_cumplimiento else None,
-                    contrato.meses_vigencia_cumplimiento or None,
-                    contrato.fecha_inicio_vigencia_cumplimiento or None,
-                    contrato.fecha_fin_vigencia_cumplimiento or None,
-                    'Sí' if contrato.exige_poliza_arrendamiento else 'No',
-                    float(contrato.valor_asegurado_arrendamiento) if contrato.valor_asegurado_arrendamiento else None,
-                    float(contrato.valor_remuneraciones_arrendamiento) if contrato.valor_remuneraciones_arrendamiento else None,
-                    float(contrato.valor_servicios_publicos_arrendamiento) if contrato.valor_servicios_publicos_arrendamiento else None,
-                    float(contrato.valor_iva_arrendamiento) if contrato.valor_iva_arrendamiento else None,
-                    float(contrato.valor_otros_arrendamiento) if contrato.valor_otros_arrendamiento else None,
-                    contrato.meses_vigencia_arrendamiento or None,
-                    contrato.fecha_inicio_vigencia_arrendamiento or None,
-                    contrato.fecha_fin_vigencia_arrendamiento or None,
-                    'Sí' if contrato.exige_poliza_todo_riesgo else 'No',
-                    float(contrato.valor_asegurado_todo_riesgo) if contrato.valor_asegurado_todo_riesgo else None,
-                    contrato.meses_vigencia_todo_riesgo or None,
-                    contrato.fecha_inicio_vigencia_todo_riesgo or None,
-                    contrato.fecha_fin_vigencia_todo_riesgo or None,
-                    'Sí' if contrato.exige_poliza_otra_1 else 'No',
-                    contrato.nombre_poliza_otra_1 or None,
-                    float(contrato.valor_asegurado_otra_1) if contrato.valor_asegurado_otra_1 else None,
-                    contrato.meses_vigencia_otra_1 or None,
-                    contrato.fecha_inicio_vigencia_otra_1 or None,
-                    contrato.fecha_fin_vigencia_otra_1 or None,
-                    float(contrato.clausula_penal_incumplimiento) if contrato.clausula_penal_incumplimiento else None,
-                    float(contrato.penalidad_terminacion_anticipada) if contrato.penalidad_terminacion_anticipada else None,
-                    float(contrato.multa_mora_no_restitucion) if contrato.multa_mora_no_restitucion else None,
-                    contrato.nit_concedente,
-                    contrato.rep_legal_concedente,
-                    contrato.marca_comercial or None,
-                    contrato.supervisor_concedente or None,
-                    contrato.supervisor_contraparte or None,
-                    otrosi_numero,
-                ))
-            
+            formato = _formato_exportacion(request)
+            # CSV/TSV se transmite fila a fila; solo el Excel se delega a un trabajo en segundo plano
+            if formato == 'xlsx' and exportaciones_asincronas_activas():
+                trabajo = encolar_exportacion('CONTRATOS', request.POST, request.user.username)
+                return redirect('gestion:estado_exportacion', trabajo_id=trabajo.pk)
+
             try:
-                archivo = generar_excel_corporativo(
-                    nombre_hoja='Contratos',
-                    columnas=columnas,
-                    registros=registros,
-                )
+                columnas, registros, _total = _preparar_exportacion_contratos(form.cleaned_data, fecha_actual)
+                return _respuesta_excel_corporativo('Contratos', columnas, registros, 'contratos_exportados', formato)
             except ExportacionVaciaError as error:
                 messages.warning(request, str(error))
                 return redirect('gestion:exportar_contratos')
-            
-            return _respuesta_archivo_excel(archivo, 'contratos_exportados')
     else:
         form = FiltroExportacionContratosForm()
     
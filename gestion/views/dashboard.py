@@ -1,203 +1,186 @@
-from datetime import timedelta
+from datetime import date, timedelta
 
+from django.conf import settings
 from django.contrib import messages
+from django.http import Http404, JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 
 from gestion.decorators import login_required_custom
-from gestion.models import Contrato, Poliza
-from gestion.services.alertas import (
-    obtener_alertas_expiracion_contratos,
-    obtener_alertas_ipc,
-    obtener_alertas_salario_minimo,
-    obtener_alertas_preaviso,
-    obtener_alertas_polizas_requeridas_no_aportadas,
-    obtener_alertas_terminacion_anticipada,
-    obtener_alertas_renovacion_automatica,
-    obtener_polizas_criticas,
-    AlertaPolizaRequerida,
-)
+from gestion.models import Contrato
+from gestion.services.alertas import AlertaPolizaRequerida, obtener_numero_evento
+from gestion.services.cache_alertas import obtener_alertas_cacheadas, obtener_alertas_seccion_cacheadas
 from gestion.services.exportes import (
     ColumnaExportacion,
     ExportacionVaciaError,
-    generar_excel_corporativo,
 )
+from gestion.services.kpis import obtener_kpis_portafolio
 from gestion.utils_otrosi import get_ultimo_otrosi_que_modifico_campo_hasta_fecha
-from .utils import _estado_vigente_contrato, _respuesta_archivo_excel
+from gestion.utils_timeline import ContratoTimeline
+from .utils import _formato_exportacion, _respuesta_excel_corporativo
+
+
+# Secciones del dashboard que se cargan por separado: {sección: tipos de alerta}
+SECCIONES_DASHBOARD = {
+    'vencimiento': ('VENCIMIENTO_CONTRATOS',),
+    'polizas-criticas': ('POLIZAS_CRITICAS',),
+    'preaviso': ('PREAVISO_RENOVACION',),
+    'ajustes': ('ALERTAS_IPC', 'ALERTAS_SALARIO_MINIMO'),
+    'polizas-requeridas': ('POLIZAS_REQUERIDAS',),
+    'terminacion': ('TERMINACION_ANTICIPADA',),
+    'renovacion-automatica': ('RENOVACION_AUTOMATICA',),
+}
 
 
 @login_required_custom
 def dashboard(request):
     """
-    Dashboard principal con alertas avanzadas para la gestión de contratos
+    Dashboard principal con alertas avanzadas para la gestión de contratos.
+    Las secciones de alertas se cargan en paralelo desde dashboard_fragmento.
     """
     fecha_actual = timezone.now().date()
     tipo_filtro = request.GET.get('tipo_alerta', '')  # Filtro para alertas: CLIENTE, PROVEEDOR o vacío (todos)
-    total_contratos = Contrato.objects.count()
-
-    todos_los_contratos = Contrato.objects.prefetch_related('otrosi')
-    contratos_vigentes = 0
-    contratos_vencidos = 0
-    contratos_vigentes_list = []
+    if tipo_filtro not in ('CLIENTE', 'PROVEEDOR'):
+        tipo_filtro = ''
+    # Contadores del encabezado: una consulta con agregación condicional
+    kpis = obtener_kpis_portafolio(fecha_actual)
 
-    for contrato in todos_los_contratos:
-        if _estado_vigente_contrato(contrato, fecha_actual):
-            contratos_vigentes += 1
-            contratos_vigentes_list.append(contrato)
-        else:
-            contratos_vencidos += 1
+    context = {
+        'fecha_actual': fecha_actual,
+        'tipo_filtro': tipo_filtro,
+        'total_contratos': kpis['total_contratos'],
+        'contratos_vigentes': kpis['contratos_vigentes'],
+        'contratos_vencidos': kpis['contratos_vencidos'],
+        'total_polizas': kpis['total_polizas'],
+        'contratos_fijos': kpis['contratos_fijos'],
+        'contratos_variables': kpis['contratos_variables'],
+        'contratos_hibridos': kpis['contratos_hibridos'],
+    }
 
-    total_polizas = Poliza.objects.count()
+    return render(request, 'gestion/dashboard/index.html', context)
 
-    contratos_fijos = 0
-    contratos_variables = 0
-    contratos_hibridos = 0
 
-    for contrato in contratos_vigentes_list:
-        # Usar efecto cadena para obtener modalidad vigente hasta fecha_actual
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_modalidad_pago', fecha_actual
-        )
-        if otrosi_modificador and otrosi_modificador.nueva_modalidad_pago:
-            modalidad_actual = otrosi_modificador.nueva_modalidad_pago
-        else:
-            modalidad_actual = contrato.modalidad_pago
-        
-        if modalidad_actual == 'Fijo':
-            contratos_fijos += 1
-        elif modalidad_actual == 'Variable Puro':
-            contratos_variables += 1
-        elif modalidad_actual == 'Hibrido (Min Garantizado)':
-            contratos_hibridos += 1
-    
-    contratos_por_vencer_list = obtener_alertas_expiracion_contratos(fecha_referencia=fecha_actual, ventana_dias=90)
-    contratos_por_vencer_con_fecha = []
-    for contrato in contratos_por_vencer_list:
-        # Filtrar por tipo de contrato si se especifica
-        if tipo_filtro and contrato.tipo_contrato_cliente_proveedor != tipo_filtro:
-            continue
-        # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
-        otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_final_actualizada', fecha_actual
-        )
-        if otrosi_modificador and otrosi_modificador.nueva_fecha_final_actualizada:
-            fecha_final_actual = otrosi_modificador.nueva_fecha_final_actualizada
-        else:
-            fecha_final_actual = contrato.fecha_final_actualizada or contrato.fecha_final_inicial
-        contratos_por_vencer_con_fecha.append({
-            'contrato': contrato,
-            'fecha_final_actualizada': fecha_final_actual,
-        })
-    total_alertas_vencimiento = len(contratos_por_vencer_con_fecha)
-    
-    polizas_criticas_list = obtener_polizas_criticas(fecha_referencia=fecha_actual)
-    polizas_criticas = []
-    for poliza in polizas_criticas_list:
-        # Filtrar por tipo de contrato si se especifica
-        if tipo_filtro and poliza.contrato.tipo_contrato_cliente_proveedor != tipo_filtro:
-            continue
-        polizas_criticas.append(poliza)
-    total_polizas_criticas = len(polizas_criticas)
-    
-    alertas_preaviso_list = obtener_alertas_preaviso(fecha_referencia=fecha_actual)
-    alertas_preaviso_con_fecha = []
-    for contrato in alertas_preaviso_list:
-        # Filtrar por tipo de contrato si se especifica
-        if tipo_filtro and contrato.tipo_contrato_cliente_proveedor != tipo_filtro:
-            continue
-        # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
+def _contratos_con_fecha_final(contratos, fecha_actual):
+    """Contratos con su fecha final vigente hasta fecha_actual (efecto cadena)."""
+    timelines = ContratoTimeline.para_contratos(contratos)
+    resultado = []
+    for contrato in contratos:
         otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_final_actualizada', fecha_actual
+            contrato, 'nueva_fecha_final_actualizada', fecha_actual, timeline=timelines.get(contrato.pk)
         )
         if otrosi_modificador and otrosi_modificador.nueva_fecha_final_actualizada:
             fecha_final_actual = otrosi_modificador.nueva_fecha_final_actualizada
         else:
             fecha_final_actual = contrato.fecha_final_actualizada or contrato.fecha_final_inicial
-        alertas_preaviso_con_fecha.append({
+        resultado.append({
             'contrato': contrato,
             'fecha_final_actualizada': fecha_final_actual,
         })
-    total_alertas_preaviso = len(alertas_preaviso_con_fecha)
-    
-    alertas_ipc_list = obtener_alertas_ipc(fecha_referencia=fecha_actual, tipo_contrato_cp=tipo_filtro if tipo_filtro else None)
-    alertas_ipc = []
-    for alerta in alertas_ipc_list:
-        alertas_ipc.append(alerta)
-    total_alertas_ipc = len(alertas_ipc)
-    
-    alertas_salario_minimo_list = obtener_alertas_salario_minimo(fecha_referencia=fecha_actual, tipo_contrato_cp=tipo_filtro if tipo_filtro else None)
-    alertas_salario_minimo = []
-    for alerta in alertas_salario_minimo_list:
-        alertas_salario_minimo.append(alerta)
-    total_alertas_salario_minimo = len(alertas_salario_minimo)
-    
-    # Combinar alertas de IPC y Salario Mínimo para mostrar en la misma sección
-    alertas_ajuste_facturacion = list(alertas_ipc) + list(alertas_salario_minimo)
-    # Ordenar por prioridad (danger primero, luego warning, luego success) y luego por meses restantes
-    alertas_ajuste_facturacion.sort(key=lambda alerta: (
-        0 if alerta.color_alerta == 'danger'
-        else 1 if alerta.color_alerta == 'warning'
-        else 2,
-        alerta.meses_restantes,
-        alerta.contrato.num_contrato,
-    ))
-    total_alertas_ajuste_facturacion = len(alertas_ajuste_facturacion)
-    
-    alertas_polizas_requeridas_list = obtener_alertas_polizas_requeridas_no_aportadas(fecha_referencia=fecha_actual)
-    alertas_polizas_requeridas = []
-    for alerta in alertas_polizas_requeridas_list:
-        # Filtrar por tipo de contrato si se especifica
-        if tipo_filtro and alerta.contrato.tipo_contrato_cliente_proveedor != tipo_filtro:
-            continue
-        alertas_polizas_requeridas.append(alerta)
-    total_alertas_polizas_requeridas = len(alertas_polizas_requeridas)
-    
-    alertas_terminacion_list = obtener_alertas_terminacion_anticipada(fecha_referencia=fecha_actual)
-    alertas_terminacion = []
-    for alerta in alertas_terminacion_list:
-        # Filtrar por tipo de contrato si se especifica
-        if tipo_filtro and alerta.contrato.tipo_contrato_cliente_proveedor != tipo_filtro:
-            continue
-        alertas_terminacion.append(alerta)
-    total_alertas_terminacion = len(alertas_terminacion)
-    
-    alertas_renovacion_automatica = obtener_alertas_renovacion_automatica(fecha_referencia=fecha_actual)
-    total_alertas_renovacion_automatica = len(alertas_renovacion_automatica)
-    
+    return resultado
+
+
+def _contexto_seccion(seccion, alertas_por_tipo, fecha_actual):
+    if seccion == 'vencimiento':
+        contratos_por_vencer = _contratos_con_fecha_final(alertas_por_tipo['VENCIMIENTO_CONTRATOS'], fecha_actual)
+        return {
+            'contratos_por_vencer': contratos_por_vencer,
+            'total_alertas_vencimiento': len(contratos_por_vencer),
+        }
+    if seccion == 'polizas-criticas':
+        polizas_criticas = alertas_por_tipo['POLIZAS_CRITICAS']
+        return {
+            'polizas_criticas': polizas_criticas,
+            'total_polizas_criticas': len(polizas_criticas),
+            'hay_polizas_con_colchon': any(
+                getattr(p, 'tiene_colchon', False) for p in polizas_criticas
+            ),
+        }
+    if seccion == 'preaviso':
+        alertas_preaviso = _contratos_con_fecha_final(alertas_por_tipo['PREAVISO_RENOVACION'], fecha_actual)
+        return {
+            'alertas_preaviso_renovacion': alertas_preaviso,
+            'total_alertas_preaviso': len(alertas_preaviso),
+        }
+    if seccion == 'ajustes':
+        alertas_ipc = alertas_por_tipo['ALERTAS_IPC']
+        alertas_salario_minimo = alertas_por_tipo['ALERTAS_SALARIO_MINIMO']
+        # Combinar alertas de IPC y Salario Mínimo para mostrar en la misma sección
+        alertas_ajuste_facturacion = list(alertas_ipc) + list(alertas_salario_minimo)
+        # Ordenar por prioridad (danger primero, luego warning, luego success) y luego por meses restantes
+        alertas_ajuste_facturacion.sort(key=lambda alerta: (
+            0 if alerta.color_alerta == 'danger'
+            else 1 if alerta.color_alerta == 'warning'
+            else 2,
+            alerta.meses_restantes,
+            alerta.contrato.num_contrato,
+        ))
+        return {
+            'alertas_ipc': alertas_ipc,
+            'total_alertas_ipc': len(alertas_ipc),
+            'alertas_salario_minimo': alertas_salario_minimo,
+            'total_alertas_salario_minimo': len(alertas_salario_minimo),
+            'alertas_ajuste_facturacion': alertas_ajuste_facturacion,
+            'total_alertas_ajuste_facturacion': len(alertas_ajuste_facturacion),
+        }
+    if seccion == 'polizas-requeridas':
+        return {
+            'alertas_polizas_requeridas': alertas_por_tipo['POLIZAS_REQUERIDAS'],
+            'total_alertas_polizas_requeridas': len(alertas_por_tipo['POLIZAS_REQUERIDAS']),
+        }
+    if seccion == 'terminacion':
+        return {
+            'alertas_terminacion': alertas_por_tipo['TERMINACION_ANTICIPADA'],
+            'total_alertas_terminacion': len(alertas_por_tipo['TERMINACION_ANTICIPADA']),
+        }
+    return {
+        'alertas_renovacion_automatica': alertas_por_tipo['RENOVACION_AUTOMATICA'],
+        'total_alertas_renovacion_automatica': len(alertas_por_tipo['RENOVACION_AUTOMATICA']),
+    }
+
+
+@login_required_custom
+def dashboard_fragmento(request, seccion):
+    """
+    HTML de una sección de alertas del dashboard. El filtro tipo_alerta (CLIENTE/PROVEEDOR)
+    se aplica en las consultas de MotorAlertas; la renovación automática siempre considera
+    todos los contratos.
+    """
+    tipos = SECCIONES_DASHBOARD.get(seccion)
+    if tipos is None:
+        raise Http404('Sección del dashboard inexistente')
+
+    fecha_actual = timezone.now().date()
+    tipo_filtro = request.GET.get('tipo_alerta', '')
+    if tipo_filtro not in ('CLIENTE', 'PROVEEDOR') or seccion == 'renovacion-automatica':
+        tipo_filtro = ''
+
+    alertas_por_tipo = obtener_alertas_seccion_cacheadas(seccion, tipos, fecha_actual, tipo_filtro or None)
     context = {
         'fecha_actual': fecha_actual,
         'tipo_filtro': tipo_filtro,
-        'total_contratos': total_contratos,
-        'contratos_vigentes': contratos_vigentes,
-        'contratos_vencidos': contratos_vencidos,
-        'total_polizas': total_polizas,
-        'contratos_fijos': contratos_fijos,
-        'contratos_variables': contratos_variables,
-        'contratos_hibridos': contratos_hibridos,
-        'contratos_por_vencer': contratos_por_vencer_con_fecha,
-        'total_alertas_vencimiento': total_alertas_vencimiento,
-        'polizas_criticas': polizas_criticas,
-        'total_polizas_criticas': total_polizas_criticas,
-        'hay_polizas_con_colchon': any(
-            getattr(p, 'tiene_colchon', False) for p in polizas_criticas
-        ),
-        'alertas_preaviso_renovacion': alertas_preaviso_con_fecha,
-        'total_alertas_preaviso': total_alertas_preaviso,
-        'alertas_ipc': alertas_ipc,
-        'total_alertas_ipc': total_alertas_ipc,
-        'alertas_salario_minimo': alertas_salario_minimo,
-        'total_alertas_salario_minimo': total_alertas_salario_minimo,
-        'alertas_ajuste_facturacion': alertas_ajuste_facturacion,
-        'total_alertas_ajuste_facturacion': total_alertas_ajuste_facturacion,
-        'alertas_polizas_requeridas': alertas_polizas_requeridas,
-        'total_alertas_polizas_requeridas': total_alertas_polizas_requeridas,
-        'alertas_terminacion': alertas_terminacion,
-        'total_alertas_terminacion': total_alertas_terminacion,
-        'alertas_renovacion_automatica': alertas_renovacion_automatica,
-        'total_alertas_renovacion_automatica': total_alertas_renovacion_automatica,
+        **_contexto_seccion(seccion, alertas_por_tipo, fecha_actual),
     }
-    
-    return render(request, 'gestion/dashboard/index.html', context)
+    response = render(request, f'gestion/dashboard/fragmentos/{seccion.replace("-", "_")}.html', context)
+    patch_cache_control(response, private=True, max_age=settings.DASHBOARD_FRAGMENTOS_MAX_AGE)
+    return response
+
+
+@login_required_custom
+def kpis_portafolio_api(request):
+    """
+    Contadores del portafolio en formato JSON. `fecha` (AAAA-MM-DD, opcional) es la fecha de
+    referencia; por defecto, hoy.
+    """
+    fecha_referencia = timezone.now().date()
+    if request.GET.get('fecha'):
+        try:
+            fecha_referencia = date.fromisoformat(request.GET['fecha'])
+        except ValueError:
+            return JsonResponse({'error': 'Fecha inválida. Use el formato AAAA-MM-DD.'}, status=400)
+
+    kpis = obtener_kpis_portafolio(fecha_referencia)
+    return JsonResponse({'fecha': fecha_referencia.isoformat(), **kpis})
 
 
 @login_required_custom
@@ -207,13 +190,14 @@ def exportaciones(request):
     Permite seleccionar el informe a descargar.
     """
     fecha_actual = timezone.now().date()
-    contratos_por_vencer = obtener_alertas_expiracion_contratos(fecha_referencia=fecha_actual, ventana_dias=90)
-    polizas_criticas = obtener_polizas_criticas(fecha_referencia=fecha_actual)
-    alertas_preaviso = obtener_alertas_preaviso(fecha_referencia=fecha_actual)
-    alertas_ipc = obtener_alertas_ipc(fecha_referencia=fecha_actual)
-    alertas_salario_minimo = obtener_alertas_salario_minimo(fecha_referencia=fecha_actual)
-    alertas_polizas_requeridas = obtener_alertas_polizas_requeridas_no_aportadas(fecha_referencia=fecha_actual)
-    alertas_terminacion = obtener_alertas_terminacion_anticipada(fecha_referencia=fecha_actual)
+    alertas_por_tipo = obtener_alertas_cacheadas(fecha_actual)
+    contratos_por_vencer = alertas_por_tipo['VENCIMIENTO_CONTRATOS']
+    polizas_criticas = alertas_por_tipo['POLIZAS_CRITICAS']
+    alertas_preaviso = alertas_por_tipo['PREAVISO_RENOVACION']
+    alertas_ipc = alertas_por_tipo['ALERTAS_IPC']
+    alertas_salario_minimo = alertas_por_tipo['ALERTAS_SALARIO_MINIMO']
+    alertas_polizas_requeridas = alertas_por_tipo['POLIZAS_REQUERIDAS']
+    alertas_terminacion = alertas_por_tipo['TERMINACION_ANTICIPADA']
 
     total_contratos = Contrato.objects.count()
     
@@ -303,7 +287,10 @@ def exportar_alertas_ipc(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    alertas = obtener_alertas_ipc(tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None)
+    alertas = obtener_alertas_cacheadas(
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['ALERTAS_IPC'],
+    )['ALERTAS_IPC']
 
     try:
         columnas = [
@@ -339,16 +326,12 @@ def exportar_alertas_ipc(request):
                 alerta.otrosi_modificador or 'Contrato Original',
             ))
 
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Alertas IPC',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Alertas IPC', columnas, registros, 'alertas_ipc', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_ipc')
+    return respuesta
 
 
 @login_required_custom
@@ -372,7 +355,10 @@ def exportar_alertas_salario_minimo(request):
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
     try:
-        alertas = obtener_alertas_salario_minimo(tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None)
+        alertas = obtener_alertas_cacheadas(
+            tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+            tipos=['ALERTAS_SALARIO_MINIMO'],
+        )['ALERTAS_SALARIO_MINIMO']
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -434,11 +420,7 @@ def exportar_alertas_salario_minimo(request):
             messages.warning(request, 'No se pudieron procesar las alertas de Salario Mínimo para exportar.')
             return redirect('gestion:exportaciones')
 
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Alertas Salario Mínimo',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Alertas Salario Mínimo', columnas, registros, 'alertas_salario_minimo', _formato_exportacion(request))
 
     except ExportacionVaciaError:
         messages.warning(request, 'No hay alertas de Salario Mínimo para exportar.')
@@ -456,7 +438,7 @@ def exportar_alertas_salario_minimo(request):
         messages.error(request, f'Error al generar el archivo Excel: {str(e)}. Por favor, intente nuevamente o contacte al administrador.')
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_salario_minimo')
+    return respuesta
 
 
 @login_required_custom
@@ -477,11 +459,11 @@ def exportar_alertas_vencimiento(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    contratos = list(obtener_alertas_expiracion_contratos(
+    contratos = list(obtener_alertas_cacheadas(
         fecha_referencia=fecha_actual,
-        ventana_dias=90,
-        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None
-    ))
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['VENCIMIENTO_CONTRATOS'],
+    )['VENCIMIENTO_CONTRATOS'])
 
     if not contratos:
         messages.warning(request, 'No hay contratos por vencer en la ventana configurada.')
@@ -497,22 +479,23 @@ def exportar_alertas_vencimiento(request):
         ColumnaExportacion('Otrosí Modificador', ancho=25),
     ]
 
+    timelines = ContratoTimeline.para_contratos(contratos)
     registros = []
     for contrato in contratos:
         # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
         otrosi_modificador_fecha = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_final_actualizada', fecha_actual
+            contrato, 'nueva_fecha_final_actualizada', fecha_actual, timeline=timelines.get(contrato.pk)
         )
         if otrosi_modificador_fecha and otrosi_modificador_fecha.nueva_fecha_final_actualizada:
             fecha_final_actual = otrosi_modificador_fecha.nueva_fecha_final_actualizada
-            otrosi_numero = otrosi_modificador_fecha.numero_otrosi
+            otrosi_numero = obtener_numero_evento(otrosi_modificador_fecha)
         else:
             fecha_final_actual = contrato.fecha_final_actualizada or contrato.fecha_final_inicial
             otrosi_numero = None
         
         # Usar efecto cadena para obtener modalidad vigente hasta fecha_actual
         otrosi_modificador_modalidad = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_modalidad_pago', fecha_actual
+            contrato, 'nueva_modalidad_pago', fecha_actual, timeline=timelines.get(contrato.pk)
         )
         if otrosi_modificador_modalidad and otrosi_modificador_modalidad.nueva_modalidad_pago:
             modalidad_actual = otrosi_modificador_modalidad.nueva_modalidad_pago
@@ -539,16 +522,12 @@ def exportar_alertas_vencimiento(request):
         )
 
     try:
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Contratos por Vencer',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Contratos por Vencer', columnas, registros, 'alertas_vencimiento_contratos', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_vencimiento_contratos')
+    return respuesta
 
 
 @login_required_custom
@@ -569,10 +548,11 @@ def exportar_alertas_polizas(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    polizas = list(obtener_polizas_criticas(
+    polizas = list(obtener_alertas_cacheadas(
         fecha_referencia=fecha_actual,
-        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None
-    ))
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['POLIZAS_CRITICAS'],
+    )['POLIZAS_CRITICAS'])
 
     if not polizas:
         messages.warning(request, 'No hay pólizas críticas para exportar.')
@@ -642,16 +622,12 @@ def exportar_alertas_polizas(request):
         )
 
     try:
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Pólizas Críticas',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Pólizas Críticas', columnas, registros, 'alertas_polizas_criticas', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_polizas_criticas')
+    return respuesta
 
 
 @login_required_custom
@@ -672,10 +648,11 @@ def exportar_alertas_preaviso(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    contratos = list(obtener_alertas_preaviso(
+    contratos = list(obtener_alertas_cacheadas(
         fecha_referencia=fecha_actual,
-        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None
-    ))
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['PREAVISO_RENOVACION'],
+    )['PREAVISO_RENOVACION'])
 
     if not contratos:
         messages.warning(request, 'No hay alertas de preaviso disponibles.')
@@ -691,15 +668,16 @@ def exportar_alertas_preaviso(request):
         ColumnaExportacion('Otrosí Modificador', ancho=25),
     ]
 
+    timelines = ContratoTimeline.para_contratos(contratos)
     registros = []
     for contrato in contratos:
         # Usar efecto cadena para obtener fecha final vigente hasta fecha_actual
         otrosi_modificador_fecha = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-            contrato, 'nueva_fecha_final_actualizada', fecha_actual
+            contrato, 'nueva_fecha_final_actualizada', fecha_actual, timeline=timelines.get(contrato.pk)
         )
         if otrosi_modificador_fecha and otrosi_modificador_fecha.nueva_fecha_final_actualizada:
             fecha_final_actual = otrosi_modificador_fecha.nueva_fecha_final_actualizada
-            otrosi_numero = otrosi_modificador_fecha.numero_otrosi
+            otrosi_numero = obtener_numero_evento(otrosi_modificador_fecha)
         else:
             fecha_final_actual = contrato.fecha_final_actualizada or contrato.fecha_final_inicial
             otrosi_numero = None
@@ -725,16 +703,12 @@ def exportar_alertas_preaviso(request):
         )
 
     try:
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Preaviso Renovación',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Preaviso Renovación', columnas, registros, 'alertas_preaviso', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_preaviso')
+    return respuesta
 
 
 @login_required_custom
@@ -758,10 +732,11 @@ def exportar_alertas_polizas_requeridas(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    alertas = obtener_alertas_polizas_requeridas_no_aportadas(
+    alertas = obtener_alertas_cacheadas(
         fecha_referencia=fecha_actual,
-        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None
-    )
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['POLIZAS_REQUERIDAS'],
+    )['POLIZAS_REQUERIDAS']
 
     if not alertas:
         messages.warning(request, 'No hay alertas de pólizas requeridas no aportadas.')
@@ -804,16 +779,12 @@ def exportar_alertas_polizas_requeridas(request):
         )
 
     try:
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Pólizas Requeridas No Aportadas',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Pólizas Requeridas No Aportadas', columnas, registros, 'alertas_polizas_requeridas_no_aportadas', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_polizas_requeridas_no_aportadas')
+    return respuesta
 
 
 @login_required_custom
@@ -837,10 +808,11 @@ def exportar_alertas_terminacion(request):
         }
         return render(request, 'gestion/exportaciones/seleccionar_tipo.html', context)
     
-    alertas = obtener_alertas_terminacion_anticipada(
+    alertas = obtener_alertas_cacheadas(
         fecha_referencia=fecha_actual,
-        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None
-    )
+        tipo_contrato_cp=tipo_contrato_cp if tipo_contrato_cp else None,
+        tipos=['TERMINACION_ANTICIPADA'],
+    )['TERMINACION_ANTICIPADA']
 
     if not alertas:
         messages.warning(request, 'No hay alertas de terminación anticipada.')
@@ -876,14 +848,10 @@ def exportar_alertas_terminacion(request):
         )
 
     try:
-        archivo = generar_excel_corporativo(
-            nombre_hoja='Terminación Anticipada',
-            columnas=columnas,
-            registros=registros,
-        )
+        respuesta = _respuesta_excel_corporativo('Terminación Anticipada', columnas, registros, 'alertas_terminacion_anticipada', _formato_exportacion(request))
     except ExportacionVaciaError as error:
         messages.warning(request, str(error))
         return redirect('gestion:exportaciones')
 
-    return _respuesta_archivo_excel(archivo, 'alertas_terminacion_anticipada')
+    return respuesta
 
@@ -16,25 +16,29 @@ from gestion.utils_otrosi import (
     es_fecha_fuera_vigencia_contrato,
     get_ultimo_otrosi_que_modifico_campo_hasta_fecha,
 )
-from gestion.services.exportes import generar_pdf_calculo_facturacion, generar_excel_calculo_facturacion, generar_excel_informes_ventas
-from gestion.views.utils import obtener_configuracion_empresa
+from gestion.services.exportes import generar_pdf_calculo_facturacion, generar_excel_calculo_facturacion, preparar_exportacion_informes_ventas
+from gestion.utils_timeline import ContratoTimeline
+from gestion.services.busqueda import filtrar_por_busqueda
+from gestion.services.trabajos_exportacion import encolar_exportacion, exportaciones_asincronas_activas
+from gestion.views.utils import obtener_configuracion_empresa, _formato_exportacion, _respuesta_excel_corporativo
 
 
-def _obtener_fecha_final_para_corte(contrato, fecha_referencia):
+def _obtener_fecha_final_para_corte(contrato, fecha_referencia, timeline=None):
     """Determina la fecha final vigente del contrato para la fecha de corte."""
     otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
         contrato,
         'nueva_fecha_final_actualizada',
         fecha_referencia,
+        timeline=timeline,
     )
     if otrosi_modificador and getattr(otrosi_modificador, 'nueva_fecha_final_actualizada', None):
         return otrosi_modificador.nueva_fecha_final_actualizada
     return contrato.fecha_final_actualizada or contrato.fecha_final_inicial
 
 
-def _es_contrato_vigente_en_fecha(contrato, fecha_referencia):
+def _es_contrato_vigente_en_fecha(contrato, fecha_referencia, timeline=None):
     """Verifica si el contrato está vigente para la fecha de corte proporcionada."""
-    fecha_final = _obtener_fecha_final_para_corte(contrato, fecha_referencia)
+    fecha_final = _obtener_fecha_final_para_corte(contrato, fecha_referencia, timeline=timeline)
     if not fecha_final:
         return True
     return fecha_final >= fecha_referencia
@@ -69,12 +73,7 @@ def lista_informes_ventas(request):
             contratos = contratos.filter(tipo_contrato=tipo_contrato)
         
         if buscar:
-            contratos = contratos.filter(
-                Q(arrendatario__razon_social__icontains=buscar) |
-                Q(arrendatario__nit__icontains=buscar) |
-                Q(proveedor__razon_social__icontains=buscar) |
-                Q(proveedor__nit__icontains=buscar)
-            )
+            contratos = filtrar_por_busqueda(contratos, buscar)
     
     from calendar import monthrange
     ultimo_dia_mes = monthrange(año_seleccionado, mes_seleccionado)[1]
@@ -83,18 +82,23 @@ def lista_informes_ventas(request):
     # Determinar contratos que aplican según fecha de corte
     contratos_info = []
     contratos_fuera_periodo = []
+    contratos = list(contratos)
+    timelines = ContratoTimeline.para_contratos(contratos)
     for contrato in contratos:
-        if es_fecha_fuera_vigencia_contrato(contrato, fecha_corte):
+        timeline = timelines.get(contrato.pk)
+        if es_fecha_fuera_vigencia_contrato(contrato, fecha_corte, timeline=timeline):
             contratos_fuera_periodo.append(contrato)
             continue
         
-        contrato_vigente = _es_contrato_vigente_en_fecha(contrato, fecha_corte)
+        contrato_vigente = _es_contrato_vigente_en_fecha(contrato, fecha_corte, timeline=timeline)
         if estado_vigencia == 'vigentes' and not contrato_vigente:
             continue
         if estado_vigencia == 'vencidos' and contrato_vigente:
             continue
 
-        valores_vigentes = obtener_valores_vigentes_facturacion_ventas(contrato, mes_seleccionado, año_seleccionado)
+        valores_vigentes = obtener_valores_vigentes_facturacion_ventas(
+            contrato, mes_seleccionado, año_seleccionado, timeline=timeline
+        )
         if valores_vigentes:
             contratos_info.append({
                 'contrato': contrato,
@@ -736,67 +740,73 @@ def descargar_pdf_calculo(request, calculo_id):
     return response
 
 
-@login_required_custom
-def exportar_informes_excel(request):
-    """Vista para exportar informes de ventas a Excel aplicando los mismos filtros de la lista"""
-    try:
-        from gestion.forms import FiltroInformesEntregadosForm
-        
-        # Aplicar los mismos filtros que en lista_informes_entregados
-        informes = InformeVentas.objects.all().select_related(
-            'contrato', 'contrato__arrendatario', 'contrato__proveedor', 'contrato__local', 'contrato__tipo_contrato', 'contrato__tipo_servicio'
-        )
+def _filtrar_informes_exportacion(parametros):
+    """
+    Aplica a InformeVentas los mismos filtros de lista_informes_entregados.
+    Recibe los parámetros GET (o su copia guardada en un trabajo de exportación).
+    """
+    from gestion.forms import FiltroInformesEntregadosForm
+    
+    # Aplicar los mismos filtros que en lista_informes_entregados
+    informes = InformeVentas.objects.all().select_related(
+        'contrato', 'contrato__arrendatario', 'contrato__proveedor', 'contrato__local', 'contrato__tipo_contrato', 'contrato__tipo_servicio'
+    )
+    
+    # Aplicar filtros desde los parámetros GET de la lista
+    filtro_form = FiltroInformesEntregadosForm(parametros)
+    
+    if filtro_form.is_valid():
+        tipo_contrato_cliente_proveedor = filtro_form.cleaned_data.get('tipo_contrato_cliente_proveedor')
+        tipo_contrato = filtro_form.cleaned_data.get('tipo_contrato')
+        mes = filtro_form.cleaned_data.get('mes')
+        año = filtro_form.cleaned_data.get('año')
+        estado = filtro_form.cleaned_data.get('estado')
+        buscar = filtro_form.cleaned_data.get('buscar')
         
-        # Aplicar filtros desde los parámetros GET
-        filtro_form = FiltroInformesEntregadosForm(request.GET)
+        if tipo_contrato_cliente_proveedor:
+            informes = informes.filter(contrato__tipo_contrato_cliente_proveedor=tipo_contrato_cliente_proveedor)
         
-        if filtro_form.is_valid():
-            tipo_contrato_cliente_proveedor = filtro_form.cleaned_data.get('tipo_contrato_cliente_proveedor')
-            tipo_contrato = filtro_form.cleaned_data.get('tipo_contrato')
-            mes = filtro_form.cleaned_data.get('mes')
-            año = filtro_form.cleaned_data.get('año')
-            estado = filtro_form.cleaned_data.get('estado')
-            buscar = filtro_form.cleaned_data.get('buscar')
-            
-            if tipo_contrato_cliente_proveedor:
-                informes = informes.filter(contrato__tipo_contrato_cliente_proveedor=tipo_contrato_cliente_proveedor)
-            
-            if tipo_contrato:
-                if tipo_contrato_cliente_proveedor == 'PROVEEDOR':
-                    informes = informes.filter(contrato__tipo_servicio=tipo_contrato)
-                else:
-                    informes = informes.filter(contrato__tipo_contrato=tipo_contrato)
-            
-            if mes:
-                informes = informes.filter(mes=int(mes))
-            
-            if año:
-                informes = informes.filter(año=año)
-            
-            if estado:
-                informes = informes.filter(estado=estado)
-            
-            if buscar:
-                informes = informes.filter(
-                    Q(contrato__num_contrato__icontains=buscar) |
-                    Q(contrato__arrendatario__razon_social__icontains=buscar) |
-                    Q(contrato__arrendatario__nit__icontains=buscar) |
-                    Q(contrato__proveedor__razon_social__icontains=buscar) |
-                    Q(contrato__proveedor__nit__icontains=buscar) |
-                    Q(contrato__local__nombre_comercial_stand__icontains=buscar)
-                )
+        if tipo_contrato:
+            if tipo_contrato_cliente_proveedor == 'PROVEEDOR':
+                informes = informes.filter(contrato__tipo_servicio=tipo_contrato)
+            else:
+                informes = informes.filter(contrato__tipo_contrato=tipo_contrato)
         
-        # Generar Excel con los informes filtrados
-        excel_content = generar_excel_informes_ventas(informes_queryset=informes)
+        if mes:
+            informes = informes.filter(mes=int(mes))
         
-        ahora_local = timezone.localtime(timezone.now())
-        fecha_actual = ahora_local.strftime('%Y%m%d_%H%M%S')
-        filename = f'informes_ventas_{fecha_actual}.xlsx'
+        if año:
+            informes = informes.filter(año=año)
         
-        response = HttpResponse(excel_content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if estado:
+            informes = informes.filter(estado=estado)
         
-        return response
+        if buscar:
+            informes = informes.filter(
+                Q(contrato__num_contrato__icontains=buscar) |
+                Q(contrato__arrendatario__razon_social__icontains=buscar) |
+                Q(contrato__arrendatario__nit__icontains=buscar) |
+                Q(contrato__proveedor__razon_social__icontains=buscar) |
+                Q(contrato__proveedor__nit__icontains=buscar) |
+                Q(contrato__local__nombre_comercial_stand__icontains=buscar)
+            )
+    
+    return informes
+
+
+@login_required_custom
+def exportar_informes_excel(request):
+    """Vista para exportar informes de ventas a Excel aplicando los mismos filtros de la lista"""
+    try:
+        formato = _formato_exportacion(request)
+        if formato == 'xlsx' and exportaciones_asincronas_activas():
+            trabajo = encolar_exportacion('INFORMES_VENTAS', request.GET, request.user.username)
+            return redirect('gestion:estado_exportacion', trabajo_id=trabajo.pk)
+
+        # Generar Excel (o CSV/TSV) con los informes filtrados
+        informes = _filtrar_informes_exportacion(request.GET)
+        nombre_hoja, columnas, registros = preparar_exportacion_informes_ventas(informes_queryset=informes)
+        return _respuesta_excel_corporativo(nombre_hoja, columnas, registros, 'informes_ventas', formato)
     except ValueError as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+
+from gestion.decorators import login_required_custom
+from gestion.models import ExportJob
+from gestion.services.trabajos_exportacion import serializar_trabajo
+
+
+def _obtener_trabajo_usuario(request, trabajo_id):
+    """Un trabajo solo es visible para quien lo solicitó (o para superusuarios)."""
+    trabajo = get_object_or_404(ExportJob, pk=trabajo_id)
+    if trabajo.solicitado_por and trabajo.solicitado_por != request.user.username and not request.user.is_superuser:
+        raise Http404('Trabajo de exportación no encontrado')
+    return trabajo
+
+
+@login_required_custom
+def estado_exportacion(request, trabajo_id):
+    """Página que consulta periódicamente el avance del trabajo y ofrece la descarga."""
+    trabajo = _obtener_trabajo_usuario(request, trabajo_id)
+    context = {
+        'trabajo': trabajo,
+        'estado_inicial': serializar_trabajo(trabajo),
+        'titulo': f'Exportación de {trabajo.get_tipo_display()}',
+    }
+    return render(request, 'gestion/exportaciones/trabajo.html', context)
+
+
+@login_required_custom
+def estado_exportacion_api(request, trabajo_id):
+    trabajo = _obtener_trabajo_usuario(request, trabajo_id)
+    return JsonResponse(serializar_trabajo(trabajo))
+
+
+@login_required_custom
+def descargar_exportacion(request, trabajo_id):
+    trabajo = _obtener_trabajo_usuario(request, trabajo_id)
+    if trabajo.estado != 'COMPLETADO' or not trabajo.ruta_archivo:
+        messages.warning(request, 'El archivo de esta exportación no está disponible.')
+        return redirect('gestion:estado_exportacion', trabajo_id=trabajo.pk)
+
+    ruta = Path(trabajo.ruta_archivo)
+    if not ruta.exists():
+        messages.error(request, 'El archivo de esta exportación ya no existe. Genere la exportación nuevamente.')
+        return redirect('gestion:estado_exportacion', trabajo_id=trabajo.pk)
+
+    return FileResponse(
+        open(ruta, 'rb'),
+        as_attachment=True,
+        filename=trabajo.nombre_archivo,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -1,10 +1,12 @@
 from datetime import date, timedelta
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 
 from gestion.models import ConfiguracionEmpresa, SeguimientoContrato, SeguimientoPoliza
 from gestion.forms import DEFAULT_EMPRESA_CONFIG
+from gestion.services.cache_solicitud import memoizar_por_solicitud
 from gestion.utils import calcular_meses_vigencia
 
 
@@ -682,8 +684,62 @@ def _respuesta_archivo_excel(contenido: bytes, nombre_base: str) -> HttpResponse
     return respuesta
 
 
-def _obtener_fecha_final_contrato(contrato, fecha_referencia=None):
-    """Obtiene la fecha final del contrato considerando Otrosí y Renovaciones Automáticas vigentes usando efecto cadena"""
+def _respuesta_archivo_excel_streaming(archivo, nombre_base: str) -> FileResponse:
+    ahora_local = timezone.localtime(timezone.now())
+    marca_tiempo = ahora_local.strftime('%Y%m%d_%H%M%S')
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'{nombre_base}_{marca_tiempo}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def _formato_exportacion(request) -> str:
+    """Formato solicitado (parámetro 'formato' por GET o POST): xlsx, csv o tsv."""
+    from gestion.services.exportes import FORMATOS_TEXTO
+
+    formato = (request.GET.get('formato') or request.POST.get('formato') or 'xlsx').lower()
+    return formato if formato in FORMATOS_TEXTO else 'xlsx'
+
+
+def _respuesta_exportacion_texto(columnas, registros, nombre_base: str, formato: str) -> StreamingHttpResponse:
+    from gestion.services.exportes import FORMATOS_TEXTO, generar_exportacion_texto
+
+    lineas = generar_exportacion_texto(columnas, registros, formato)
+    _, content_type = FORMATOS_TEXTO[formato]
+    ahora_local = timezone.localtime(timezone.now())
+    marca_tiempo = ahora_local.strftime('%Y%m%d_%H%M%S')
+    respuesta = StreamingHttpResponse(lineas, content_type=content_type)
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_base}_{marca_tiempo}.{formato}"'
+    return respuesta
+
+
+def _respuesta_excel_corporativo(nombre_hoja, columnas, registros, nombre_base: str, formato: str = 'xlsx'):
+    """
+    Construye la respuesta de descarga de una exportación corporativa.
+    Con formato csv/tsv las líneas se generan y envían a medida que se consumen los registros.
+    Con EXPORTACIONES_XLSX_STREAMING activo las filas se consumen del iterable a medida
+    que se escriben y el archivo se envía por bloques; si no, se usa el motor en memoria.
+    Lanza ExportacionVaciaError si no hay registros.
+    """
+    from gestion.services.exportes import FORMATOS_TEXTO, generar_excel_corporativo, generar_excel_corporativo_streaming
+
+    if formato in FORMATOS_TEXTO:
+        return _respuesta_exportacion_texto(columnas, registros, nombre_base, formato)
+    if getattr(settings, 'EXPORTACIONES_XLSX_STREAMING', True):
+        archivo = generar_excel_corporativo_streaming(nombre_hoja, columnas, registros)
+        return _respuesta_archivo_excel_streaming(archivo, nombre_base)
+    contenido = generar_excel_corporativo(nombre_hoja, columnas, list(registros))
+    return _respuesta_archivo_excel(contenido, nombre_base)
+
+
+@memoizar_por_solicitud
+def _obtener_fecha_final_contrato(contrato, fecha_referencia=None, timeline=None):
+    """
+    Obtiene la fecha final del contrato considerando Otrosí y Renovaciones Automáticas vigentes usando efecto cadena.
+    Si se indica un ContratoTimeline, los eventos se resuelven en memoria sin consultas.
+    """
     from gestion.utils_otrosi import get_otrosi_vigente, get_ultimo_otrosi_que_modifico_campo_hasta_fecha
     from gestion.models import RenovacionAutomatica
     
@@ -691,17 +747,20 @@ def _obtener_fecha_final_contrato(contrato, fecha_referencia=None):
         fecha_referencia = date.today()
     
     # Primero verificar si hay una Renovación Automática vigente (tiene prioridad sobre Otrosí)
-    renovacion_vigente = RenovacionAutomatica.objects.filter(
-        contrato=contrato,
-        estado='APROBADO',
-        effective_from__lte=fecha_referencia
-    ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
+    if timeline is not None:
+        renovacion_vigente = timeline.renovacion_hasta_fecha(fecha_referencia)
+    else:
+        renovacion_vigente = RenovacionAutomatica.objects.filter(
+            contrato=contrato,
+            estado='APROBADO',
+            effective_from__lte=fecha_referencia
+        ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
     
     if renovacion_vigente and renovacion_vigente.nueva_fecha_final_actualizada:
         return renovacion_vigente.nueva_fecha_final_actualizada
     
     # Si no hay renovación vigente, verificar Otro Sí vigente
-    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_referencia)
+    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_referencia, timeline=timeline)
     
     if otrosi_vigente_actual:
         # Si tiene effective_to, esa es la fecha final vigente
@@ -714,14 +773,19 @@ def _obtener_fecha_final_contrato(contrato, fecha_referencia=None):
     # Si no hay Otro Sí vigente, usar efecto cadena para obtener fecha final vigente hasta fecha_referencia
     # Considerar tanto Otrosí como Renovaciones Automáticas
     otrosi_modificador = get_ultimo_otrosi_que_modifico_campo_hasta_fecha(
-        contrato, 'nueva_fecha_final_actualizada', fecha_referencia
+        contrato, 'nueva_fecha_final_actualizada', fecha_referencia, timeline=timeline
     )
-    renovacion_modificadora = RenovacionAutomatica.objects.filter(
-        contrato=contrato,
-        estado='APROBADO',
-        nueva_fecha_final_actualizada__isnull=False,
-        effective_from__lte=fecha_referencia
-    ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
+    if timeline is not None:
+        renovacion_modificadora = timeline.renovacion_hasta_fecha(
+            fecha_referencia, campo_nombre='nueva_fecha_final_actualizada'
+        )
+    else:
+        renovacion_modificadora = RenovacionAutomatica.objects.filter(
+            contrato=contrato,
+            estado='APROBADO',
+            nueva_fecha_final_actualizada__isnull=False,
+            effective_from__lte=fecha_referencia
+        ).order_by('-effective_from', '-fecha_aprobacion', '-version').first()
     
     # Determinar cuál es más reciente (otrosí o renovación)
     fecha_final = None
@@ -739,16 +803,16 @@ def _obtener_fecha_final_contrato(contrato, fecha_referencia=None):
     return contrato.fecha_final_inicial
 
 
-def _es_contrato_vencido(contrato, fecha_referencia=None):
+def _es_contrato_vencido(contrato, fecha_referencia=None, timeline=None):
     """Determina si un contrato está vencido considerando Otrosí vigentes"""
     if fecha_referencia is None:
         fecha_referencia = date.today()
     
-    fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia)
+    fecha_final = _obtener_fecha_final_contrato(contrato, fecha_referencia, timeline=timeline)
     return fecha_final < fecha_referencia
 
 
-def _estado_vigente_contrato(contrato, fecha_actual=None):
+def _estado_vigente_contrato(contrato, fecha_actual=None, timeline=None):
     """
     Determina si el contrato está vigente en la fecha dada.
     Misma lógica que lista_contratos para mantener consistencia dashboard/lista.
@@ -758,8 +822,8 @@ def _estado_vigente_contrato(contrato, fecha_actual=None):
     if fecha_actual is None:
         fecha_actual = date.today()
 
-    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual)
-    fecha_final_vigente = _obtener_fecha_final_contrato(contrato, fecha_actual)
+    otrosi_vigente_actual = get_otrosi_vigente(contrato, fecha_actual, timeline=timeline)
+    fecha_final_vigente = _obtener_fecha_final_contrato(contrato, fecha_actual, timeline=timeline)
 
     if otrosi_vigente_actual:
         if otrosi_vigente_actual.effective_to: